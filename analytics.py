@@ -1,104 +1,152 @@
 """
 Módulo de análises avançadas para o dashboard RM4Health
 Funcionalidades para identificar padrões e responder perguntas do estudo
+
+Todas as análises partilham uma única passagem agregada pelos registos
+(_aggregate) e a matriz de completude do snapshot para as contagens de
+campos preenchidos.
 """
 from collections import defaultdict, Counter
 from datetime import datetime, timedelta
 import json
+from completeness import get_completeness
+from group_comparison import DEFAULT_CATEGORICAL, DEFAULT_NUMERIC, get_group_comparison
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']
 
 class RM4HealthAnalytics:
-    def __init__(self, records, metadata):
+    def __init__(self, records, metadata, completeness=None):
         self.records = records
         self.metadata = metadata
-        self.field_labels = {field['field_name']: field['field_label'] 
+        self.field_labels = {field['field_name']: field['field_label']
                            for field in metadata}
-        
-    def analyze_by_instrument(self):
-        """Análise por instrumento/formulário"""
-        instruments = defaultdict(lambda: {
-            'count': 0,
+        # Matriz de completude partilhada (calculada uma vez por snapshot)
+        self.completeness = completeness if completeness is not None else get_completeness(records)
+        self._aggregates = None
+        self._results = {}
+
+    def _memo(self, key, builder):
+        """Guarda o resultado de cada análise para reutilização entre métodos"""
+        if key not in self._results:
+            self._results[key] = builder()
+        return self._results[key]
+
+    def _aggregate(self):
+        """Passagem única pelos registos que alimenta todas as análises"""
+        if self._aggregates is not None:
+            return self._aggregates
+
+        completeness = self.completeness
+
+        # Campos de data e campos numéricos analisados (definidos pelos metadados)
+        date_fields = [field for field in self.field_labels.keys()
+                      if 'data' in field.lower() or 'date' in field.lower()]
+        numeric_fields = []
+        for field, label in self.field_labels.items():
+            if any(term in label.lower() for term in ['idade', 'score', 'escala', 'pontuação']):
+                numeric_fields.append(field)
+        numeric_fields = numeric_fields[:5]  # Limitar para evitar sobrecarga
+
+        instruments = defaultdict(lambda: {'count': 0, 'participants': set()})
+        groups = defaultdict(lambda: {
             'participants': set(),
-            'fields_filled': defaultdict(int),
-            'completion_rate': {}
+            'total_records': 0,
+            'instruments': defaultdict(int),
+            'demographics': defaultdict(int)
         })
-        
-        for record in self.records:
-            instrument = record.get('redcap_repeat_instrument', 'baseline')
-            if not instrument:
-                instrument = 'baseline'
-                
+        dates = defaultdict(list)
+        numeric_values = defaultdict(list)
+
+        for record, instrument, group in zip(self.records, completeness.instruments, completeness.groups):
             participant = record.get('participant_code')
-            
+
+            # Por instrumento
             instruments[instrument]['count'] += 1
             if participant:
                 instruments[instrument]['participants'].add(participant)
-            
-            # Contar campos preenchidos por instrumento
-            for field, value in record.items():
-                if value and str(value).strip():
-                    instruments[instrument]['fields_filled'][field] += 1
-        
+
+            # Por grupo (mapeamento participant_code -> group dos registos baseline)
+            group_data = groups[group]
+            group_data['participants'].add(participant)
+            group_data['total_records'] += 1
+            group_data['instruments'][instrument] += 1
+
+            # Análise demográfica básica
+            if 'age' in record and record['age']:
+                try:
+                    age = int(record['age'])
+                    if age < 65:
+                        group_data['demographics']['<65 anos'] += 1
+                    elif age < 75:
+                        group_data['demographics']['65-74 anos'] += 1
+                    else:
+                        group_data['demographics']['75+ anos'] += 1
+                except:
+                    pass
+
+            # Datas de preenchimento
+            for date_field in date_fields:
+                date_str = record.get(date_field)
+                if date_str:
+                    for fmt in DATE_FORMATS:
+                        try:
+                            dates[date_field].append(datetime.strptime(date_str, fmt))
+                            break
+                        except:
+                            continue
+
+            # Valores numéricos
+            for field in numeric_fields:
+                if record.get(field):
+                    try:
+                        numeric_values[field].append(float(record[field]))
+                    except:
+                        pass
+
+        self._aggregates = {
+            'instruments': instruments,
+            'groups': groups,
+            'dates': dates,
+            'date_fields': date_fields,
+            'numeric_values': numeric_values,
+            'numeric_fields': numeric_fields,
+            'row_counts': completeness.row_counts()
+        }
+        return self._aggregates
+
+    def analyze_by_instrument(self):
+        """Análise por instrumento/formulário"""
+        return self._memo('by_instrument', self._build_by_instrument)
+
+    def _build_by_instrument(self):
+        aggregates = self._aggregate()
+        completeness = self.completeness
+
+        # Campos preenchidos por instrumento (popcount das colunas)
+        fields_filled = completeness.column_counts_by(completeness.instruments)
+
         # Converter sets para listas para serialização JSON
         result = {}
-        for instrument, data in instruments.items():
+        for instrument, data in aggregates['instruments'].items():
+            filled = [(field, count) for field, count in zip(completeness.fields, fields_filled[instrument].tolist()) if count]
             result[instrument] = {
                 'name': self._get_instrument_name(instrument),
                 'total_records': data['count'],
                 'unique_participants': len(data['participants']),
                 'participants_list': list(data['participants']),
-                'top_fields': dict(sorted(data['fields_filled'].items(), 
-                                        key=lambda x: x[1], reverse=True)[:10])
+                'top_fields': dict(sorted(filled, key=lambda x: x[1], reverse=True)[:10])
             }
-        
+
         return result
-    
+
     def analyze_by_group(self):
         """Análise por grupos de participantes"""
-        # Primeiro, criar mapeamento participant_code -> group a partir dos registros baseline
-        participant_to_group = {}
-        for record in self.records:
-            if not record.get('redcap_repeat_instrument'):  # É baseline
-                participant = record.get('participant_code')
-                group = record.get('participant_group')
-                if participant and group:
-                    participant_to_group[participant] = group
-        
-        groups = defaultdict(lambda: {
-            'participants': set(),
-            'total_records': 0,
-            'instruments': defaultdict(int),
-            'demographics': defaultdict(int)
-        })
-        
-        for record in self.records:
-            participant = record.get('participant_code')
-            # Usar o mapeamento para obter o grupo correto
-            group = participant_to_group.get(participant, 'Não especificado')
-            instrument = record.get('redcap_repeat_instrument', 'baseline')
-            
-            if not instrument:
-                instrument = 'baseline'
-            
-            groups[group]['participants'].add(participant)
-            groups[group]['total_records'] += 1
-            groups[group]['instruments'][instrument] += 1
-            
-            # Análise demográfica básica
-            if 'age' in record and record['age']:
-                try:
-                    age = int(record['age'])
-                    if age < 65:
-                        groups[group]['demographics']['<65 anos'] += 1
-                    elif age < 75:
-                        groups[group]['demographics']['65-74 anos'] += 1
-                    else:
-                        groups[group]['demographics']['75+ anos'] += 1
-                except:
-                    pass
-        
+        return self._memo('by_group', self._build_by_group)
+
+    def _build_by_group(self):
         # Preparar resultado
         result = {}
-        for group, data in groups.items():
+        for group, data in self._aggregate()['groups'].items():
             result[group] = {
                 'total_participants': len(data['participants']),
                 'total_records': data['total_records'],
@@ -106,31 +154,25 @@ class RM4HealthAnalytics:
                 'instruments_distribution': dict(data['instruments']),
                 'demographics': dict(data['demographics'])
             }
-        
+
         return result
-    
+
     def get_completion_rates(self):
         """Taxa de preenchimento por campo e instrumento"""
-        completion = defaultdict(lambda: defaultdict(int))
-        total_by_instrument = defaultdict(int)
-        
-        for record in self.records:
-            instrument = record.get('redcap_repeat_instrument', 'baseline')
-            if not instrument:
-                instrument = 'baseline'
-                
-            total_by_instrument[instrument] += 1
-            
-            for field, value in record.items():
-                if value and str(value).strip():
-                    completion[instrument][field] += 1
-        
+        return self._memo('completion_rates', self._build_completion_rates)
+
+    def _build_completion_rates(self):
+        completeness = self.completeness
+
         result = {}
-        for instrument, fields in completion.items():
+        for instrument, mask in completeness.label_masks(completeness.instruments).items():
+            total = int(mask.sum())
+            counts = completeness.column_counts(mask)
+
             result[instrument] = {}
-            total = total_by_instrument[instrument]
-            
-            for field, count in fields.items():
+            for field, count in zip(completeness.fields, counts.tolist()):
+                if not count:
+                    continue
                 percentage = (count / total * 100) if total > 0 else 0
                 result[instrument][field] = {
                     'filled': count,
@@ -138,47 +180,32 @@ class RM4HealthAnalytics:
                     'percentage': round(percentage, 1),
                     'label': self.field_labels.get(field, field)
                 }
-        
+
         return result
-    
+
     def analyze_patterns(self):
         """Identificar padrões interessantes nos dados"""
-        patterns = {
+        return self._memo('patterns', lambda: {
             'temporal_patterns': self._analyze_temporal_patterns(),
             'correlation_insights': self._analyze_correlations(),
             'completion_patterns': self._analyze_completion_patterns(),
-            'group_differences': self._analyze_group_differences()
-        }
-        
-        return patterns
-    
+            'group_differences': self._analyze_group_differences(),
+            'group_comparison': get_group_comparison(
+                self.records, DEFAULT_NUMERIC, DEFAULT_CATEGORICAL, 'participant_group'
+            ).analysis()
+        })
+
     def _analyze_temporal_patterns(self):
         """Análise de padrões temporais"""
         patterns = {}
-        
+        aggregates = self._aggregate()
+
         # Análise por data de preenchimento
-        date_fields = [field for field in self.field_labels.keys() 
-                      if 'data' in field.lower() or 'date' in field.lower()]
-        
-        for date_field in date_fields:
-            dates = []
-            for record in self.records:
-                if record.get(date_field):
-                    try:
-                        # Tentar diferentes formatos de data
-                        date_str = record[date_field]
-                        for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']:
-                            try:
-                                date_obj = datetime.strptime(date_str, fmt)
-                                dates.append(date_obj)
-                                break
-                            except:
-                                continue
-                    except:
-                        pass
-            
+        for date_field in aggregates['date_fields']:
+            dates = aggregates['dates'].get(date_field)
+
             if dates:
-                dates.sort()
+                dates = sorted(dates)
                 patterns[date_field] = {
                     'label': self.field_labels.get(date_field, date_field),
                     'total_entries': len(dates),
@@ -188,30 +215,18 @@ class RM4HealthAnalytics:
                     },
                     'monthly_distribution': self._get_monthly_distribution(dates)
                 }
-        
+
         return patterns
-    
+
     def _analyze_correlations(self):
         """Análise de correlações básicas"""
         correlations = {}
-        
-        # Campos numéricos para análise
-        numeric_fields = []
-        for field, label in self.field_labels.items():
-            if any(term in label.lower() for term in ['idade', 'score', 'escala', 'pontuação']):
-                numeric_fields.append(field)
-        
+        aggregates = self._aggregate()
+
         # Análise básica de correlações (simplificada)
-        for field in numeric_fields[:5]:  # Limitar para evitar sobrecarga
-            values = []
-            for record in self.records:
-                if record.get(field):
-                    try:
-                        value = float(record[field])
-                        values.append(value)
-                    except:
-                        pass
-            
+        for field in aggregates['numeric_fields']:
+            values = aggregates['numeric_values'].get(field, [])
+
             if len(values) > 5:
                 correlations[field] = {
                     'label': self.field_labels.get(field, field),
@@ -220,27 +235,26 @@ class RM4HealthAnalytics:
                     'min': min(values) if values else 0,
                     'max': max(values) if values else 0
                 }
-        
+
         return correlations
-    
+
     def _analyze_completion_patterns(self):
         """Padrões de preenchimento"""
         patterns = {}
-        
-        # Análise por participante
+        completeness = self.completeness
+
+        # Análise por participante (campos preenchidos = popcount das linhas)
         participant_completion = defaultdict(int)
         participant_instruments = defaultdict(set)
-        
-        for record in self.records:
-            participant = record.get('participant_code')
-            instrument = record.get('redcap_repeat_instrument', 'baseline')
-            
+        row_counts = self._aggregate()['row_counts'].tolist()
+
+        for participant, instrument, filled_fields in zip(completeness.participants,
+                                                          completeness.instruments,
+                                                          row_counts):
             if participant:
-                # Contar campos preenchidos por participante
-                filled_fields = sum(1 for v in record.values() if v and str(v).strip())
                 participant_completion[participant] += filled_fields
                 participant_instruments[participant].add(instrument)
-        
+
         patterns['participant_engagement'] = {}
         for participant, total_fields in participant_completion.items():
             patterns['participant_engagement'][participant] = {
@@ -248,54 +262,30 @@ class RM4HealthAnalytics:
                 'instruments_participated': len(participant_instruments[participant]),
                 'instruments_list': list(participant_instruments[participant])
             }
-        
+
         return patterns
-    
+
     def _analyze_group_differences(self):
         """Diferenças entre grupos"""
-        # Mapear participant_code -> group a partir do baseline
-        participant_to_group = {}
-        for record in self.records:
-            if not record.get('redcap_repeat_instrument'):  # É baseline
-                participant = record.get('participant_code')
-                group = record.get('participant_group')
-                if participant and group:
-                    participant_to_group[participant] = group
-        
+        completeness = self.completeness
+        groups = self._aggregate()['groups']
+        filled_by_group = completeness.row_totals_by(completeness.groups)
+
         differences = {}
-        
-        groups = defaultdict(list)
-        for record in self.records:
-            participant = record.get('participant_code')
-            group = participant_to_group.get(participant, 'Não especificado')
-            groups[group].append(record)
-        
+
         # Comparar grupos
-        for group, records in groups.items():
+        for group, data in groups.items():
+            total_fields, total_records = filled_by_group[group]
             differences[group] = {
-                'total_records': len(records),
-                'avg_fields_per_record': 0,
-                'most_common_instruments': {}
-            }
-            
-            total_fields = 0
-            instruments = defaultdict(int)
-            
-            for record in records:
-                filled_fields = sum(1 for v in record.values() if v and str(v).strip())
-                total_fields += filled_fields
-                
-                instrument = record.get('redcap_repeat_instrument', 'baseline')
-                instruments[instrument] += 1
-            
-            if records:
-                differences[group]['avg_fields_per_record'] = round(total_fields / len(records), 1)
-                differences[group]['most_common_instruments'] = dict(
-                    sorted(instruments.items(), key=lambda x: x[1], reverse=True)[:3]
+                'total_records': data['total_records'],
+                'avg_fields_per_record': round(total_fields / total_records, 1) if total_records else 0,
+                'most_common_instruments': dict(
+                    sorted(data['instruments'].items(), key=lambda x: x[1], reverse=True)[:3]
                 )
-        
+            }
+
         return differences
-    
+
     def _get_monthly_distribution(self, dates):
         """Distribuição mensal de datas"""
         monthly = defaultdict(int)
@@ -303,7 +293,7 @@ class RM4HealthAnalytics:
             month_key = date.strftime('%Y-%m')
             monthly[month_key] += 1
         return dict(monthly)
-    
+
     def _get_instrument_name(self, instrument_key):
         """Obter nome legível do instrumento"""
         instrument_names = {
@@ -314,25 +304,28 @@ class RM4HealthAnalytics:
             'VII - Questionário de Pittsburgh sobre a Qualidade do Sono  (PSQI-PT)': 'Qualidade do Sono (PSQI)',
             'VIII  - Questionário de adesão à medicação, sintomas e bem-estar': 'Medicação e Bem-estar'
         }
-        
+
         return instrument_names.get(instrument_key, instrument_key)
-    
+
     def generate_insights(self):
         """Gerar insights automáticos dos dados"""
+        return self._memo('insights', self._build_insights)
+
+    def _build_insights(self):
         insights = []
-        
+
         # Análise por instrumentos
         instruments = self.analyze_by_instrument()
         if instruments:
             most_used = max(instruments.items(), key=lambda x: x[1]['total_records'])
             insights.append(f"📋 O instrumento mais utilizado é '{most_used[1]['name']}' com {most_used[1]['total_records']} registros")
-        
+
         # Análise por grupos
         groups = self.analyze_by_group()
         if groups:
             largest_group = max(groups.items(), key=lambda x: x[1]['total_participants'])
             insights.append(f"👥 O maior grupo é '{largest_group[0]}' com {largest_group[1]['total_participants']} participantes")
-        
+
         # Análise de preenchimento
         completion = self.get_completion_rates()
         avg_completion = []
@@ -340,11 +333,11 @@ class RM4HealthAnalytics:
             if fields:
                 avg = sum(field['percentage'] for field in fields.values()) / len(fields)
                 avg_completion.append((instrument, avg))
-        
+
         if avg_completion:
             best_completion = max(avg_completion, key=lambda x: x[1])
             insights.append(f"✅ O instrumento com melhor preenchimento é '{self._get_instrument_name(best_completion[0])}' ({best_completion[1]:.1f}%)")
-        
+
         # Patterns analysis
         patterns = self.analyze_patterns()
         if 'participant_engagement' in patterns['completion_patterns'] and patterns['completion_patterns']['participant_engagement']:
@@ -352,5 +345,15 @@ class RM4HealthAnalytics:
             if engagement:
                 most_active = max(engagement.items(), key=lambda x: x[1]['total_fields_filled'])
                 insights.append(f"🏆 Participante mais ativo: {most_active[0]} ({most_active[1]['total_fields_filled']} campos preenchidos)")
-        
+
         return insights
+
+    def get_all(self):
+        """Todas as análises avançadas a partir da mesma agregação"""
+        return {
+            'by_instrument': self.analyze_by_instrument(),
+            'by_group': self.analyze_by_group(),
+            'completion_rates': self.get_completion_rates(),
+            'patterns': self.analyze_patterns(),
+            'insights': self.generate_insights()
+        }
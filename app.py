@@ -1,6 +1,4 @@
-from flask import Flask, render_template, jsonify, request
-import plotly.graph_objs as go
-import plotly.utils
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, url_for
 import json
 from redcap_client import REDCapClient
 from config import Config
@@ -13,14 +11,32 @@ import os
 from local_redcap_client_simple import LocalREDCapClientSimple as LocalREDCapClient
 
 from data_processor import DataProcessor
+from completeness import get_completeness
+from domain_metrics import get_domains_assessment_metrics, get_efmi25_metrics
+from participant_summary import get_participant_table, DEFAULT_PAGE_SIZE
+from record_stream import RecordWindow, CursorError, parse_page_size
+from psqi import get_psqi
+from group_comparison import DEFAULT_CATEGORICAL, DEFAULT_NUMERIC, GROUPINGS, normalize_fields
+import serialization
+import compression
+import charts as chart_builder
+import snapshot_cache
+import sections
+import jobs
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'rm4health_dashboard_secret_key'
+# jsonify/tojson via camada de serialização (orjson quando disponível)
+app.json = serialization.FastJSONProvider(app)
+# Compressão gzip/brotli de HTML, JSON e gráficos
+compression.init_app(app)
 
 # Inicializar cliente REDCap (local ou API)
 if Config.USE_LOCAL_DATA:
     print("[INFO] Inicializando cliente LOCAL...")
     redcap = LocalREDCapClient()
+    # Recarrega a extração em segundo plano quando local_data_config.json muda
+    redcap.start_watching()
     print("[OK] Cliente local inicializado")
 else:
     print("[INFO] Inicializando cliente API...")
@@ -38,6 +54,16 @@ def get_cached_data():
     """Retorna dados em cache ou busca novos se necessário"""
     now = datetime.now()
     
+    # Dados locais: o cliente troca o snapshot quando a extração muda, por isso
+    # basta usar a lista atual (a mesma lista enquanto os ficheiros não mudarem)
+    if hasattr(redcap, 'get_snapshot'):
+        data = redcap.get_snapshot('raw')
+        if data is not cached_data['data']:
+            print(f"[INFO] Novo snapshot de dados: {len(data)} registros")
+            cached_data['data'] = data
+            cached_data['last_update'] = now
+        return data
+    
     # Verifica se precisa atualizar cache
     if (cached_data['data'] is None or 
         cached_data['last_update'] is None or 
@@ -88,104 +114,54 @@ def dashboard():
                              success=False)
 
 @app.route('/participants')
+@compression.cached_response(get_cached_data)
 def participants():
-    """Página de participantes"""
+    """Página de participantes (linhas carregadas via /api/participants)"""
     try:
         data = get_cached_data()
-        
-        # Lista de participantes únicos
-        participants_data = []
-        participant_records = {}
-        
-        # Agrupa registros por participante
-        for record in data:
-            # Procura pelo campo correto de identificação
-            participant_id = None
-            for id_field in ['participant_code', 'record_id', 'participant_code_estudo']:
-                if id_field in record and record[id_field]:
-                    participant_id = record[id_field]
-                    break
-                    
-            if participant_id:
-                if participant_id not in participant_records:
-                    participant_records[participant_id] = []
-                participant_records[participant_id].append(record)
-        
-        # Calcula estatísticas por participante
-        for participant_id, records in participant_records.items():
-            # Conta status dos formulários baseado nos campos _complete
-            complete_forms = 0
-            incomplete_forms = 0
-            unverified_forms = 0
-            
-            # Usar um set para evitar duplicatas de formulários por participante
-            forms_status = {}
-            
-            for record in records:
-                # Procura por campos _complete
-                for field_name, value in record.items():
-                    if field_name.endswith('_complete') and value is not None and str(value).strip() != '':
-                        # Remove '_complete' para obter nome do formulário
-                        form_name = field_name.replace('_complete', '')
-                        
-                        # Converte valor para formato numérico padronizado
-                        current_status = str(value).strip().lower()
-                        
-                        # Mapeia valores textuais para numéricos
-                        if current_status in ['complete', 'completed', '2']:
-                            current_status = '2'
-                        elif current_status in ['incomplete', 'partial', '1']:
-                            current_status = '1'
-                        elif current_status in ['unverified', 'not verified', '0', '']:
-                            current_status = '0'
-                        else:
-                            # Se não reconhecer, tenta converter diretamente
-                            try:
-                                int(current_status)
-                            except ValueError:
-                                # Se não conseguir converter, assume como não verificado
-                                current_status = '0'
-                        
-                        # Armazena o status mais alto encontrado para este formulário
-                        if form_name not in forms_status or int(current_status) > int(forms_status.get(form_name, '0')):
-                            forms_status[form_name] = current_status
-            
-            # Conta os status finais
-            for status in forms_status.values():
-                if status == '2':  # Complete
-                    complete_forms += 1
-                elif status == '1':  # Incomplete  
-                    incomplete_forms += 1
-                elif status == '0':  # Unverified
-                    unverified_forms += 1
-            
-            total_forms = complete_forms + incomplete_forms + unverified_forms
-            
-            # Calcula taxa de completude: completos / total de formulários preenchidos
-            filled_forms = complete_forms + incomplete_forms
-            completion_rate = round((complete_forms / filled_forms) * 100, 1) if filled_forms > 0 else 0
-            
-            participants_data.append({
-                'id': participant_id,
-                'records_count': len(records),
-                'complete_forms': complete_forms,
-                'incomplete_forms': incomplete_forms,
-                'unverified_forms': unverified_forms,
-                'total_forms': total_forms,
-                'completion_rate': completion_rate
-            })
-        
-        # Ordena por ID do participante
-        participants_data.sort(key=lambda x: int(x['id']) if str(x['id']).isdigit() else float('inf'))
+        summary = get_participant_table(data)
         
         return render_template('participants.html', 
-                             participants=participants_data[:50])  # Limita a 50 para performance
+                             totals=summary.totals,
+                             page_size=DEFAULT_PAGE_SIZE)
     
     except Exception as e:
         print(f"❌ Erro na página de participantes: {e}")
-        return render_template('error.html', error=str(e))
+        return render_template('error.html', error=str(e)), 500
+
+@app.route('/api/participants')
+def api_participants():
+    """API paginada de participantes com ordenação e pesquisa no servidor"""
+    try:
+        data = get_cached_data()
+        summary = get_participant_table(data)
+        
+        result = summary.query(
+            search=request.args.get('search', ''),
+            sort=request.args.get('sort', 'id'),
+            order=request.args.get('order', 'asc'),
+            page=request.args.get('page', 1, type=int),
+            page_size=request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+        )
+        
+        return jsonify({
+            'success': True,
+            **result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        print(f"❌ Erro na API de participantes: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
 @app.route('/data-explorer')
+@compression.cached_response(get_cached_data)
 def data_explorer():
     """Explorador de dados"""
     try:
@@ -201,91 +177,71 @@ def data_explorer():
     
     except Exception as e:
         print(f"❌ Erro no explorador de dados: {e}")
-        return render_template('error.html', error=str(e))
+        return render_template('error.html', error=str(e)), 500
 
 def generate_basic_charts(processor):
-    """Gera gráficos básicos"""
+    """Gera gráficos básicos (calculados uma vez por snapshot de dados)"""
+    return snapshot_cache.get_cached(processor.data, 'basic_charts',
+                                     lambda: _build_basic_charts(processor))
+
+def _build_basic_charts(processor):
+    """Constrói as figuras do dashboard como dicionários Plotly (sem go.Figure)"""
     charts = {}
     
     try:
-        # Gráfico de distribuição de idade
+        # Gráfico de distribuição de idade (contagens por bin calculadas no servidor)
         age_data = processor.get_age_distribution()
         if age_data:
-            age_fig = go.Figure(data=[
-                go.Histogram(
-                    x=age_data['data'], 
-                    nbinsx=15, 
-                    name='Distribuição de Idade',
-                    marker_color=Config.PRIMARY_COLOR,
-                    opacity=0.7
-                )
-            ])
-            age_fig.update_layout(
+            age_fig = chart_builder.histogram_figure(
+                age_data['data'],
                 title='Distribuição de Idade dos Participantes',
                 xaxis_title='Idade (anos)',
                 yaxis_title='Frequência',
-                height=Config.CHART_HEIGHT,
-                template='plotly_white'
+                name='Distribuição de Idade',
+                color=Config.PRIMARY_COLOR,
+                nbins=15
             )
-            charts['age_distribution'] = json.dumps(age_fig, cls=plotly.utils.PlotlyJSONEncoder)
+            charts['age_distribution'] = serialization.dumps(age_fig)
         
         # Gráfico de distribuição de gênero
         gender_data = processor.get_gender_distribution()
         if gender_data:
-            gender_fig = go.Figure(data=[
-                go.Pie(
-                    labels=gender_data['labels'],
-                    values=gender_data['values'],
-                    name='Distribuição de Gênero',
-                    marker_colors=[Config.PRIMARY_COLOR, Config.SECONDARY_COLOR]
-                )
-            ])
-            gender_fig.update_layout(
+            gender_fig = chart_builder.pie_figure(
+                gender_data['labels'],
+                gender_data['values'],
                 title='Distribuição de Gênero',
-                height=Config.CHART_HEIGHT,
-                template='plotly_white'
+                name='Distribuição de Gênero',
+                colors=[Config.PRIMARY_COLOR, Config.SECONDARY_COLOR]
             )
-            charts['gender_distribution'] = json.dumps(gender_fig, cls=plotly.utils.PlotlyJSONEncoder)
+            charts['gender_distribution'] = serialization.dumps(gender_fig)
         
         # Gráfico de registros por participante
         records_data = processor.get_records_per_participant()
         if records_data:
-            records_fig = go.Figure(data=[
-                go.Bar(
-                    x=records_data['labels'][:10], 
-                    y=records_data['values'][:10],
-                    name='Registros por Participante',
-                    marker_color=Config.SECONDARY_COLOR
-                )
-            ])
-            records_fig.update_layout(
+            records_fig = chart_builder.bar_figure(
+                records_data['labels'][:10],
+                records_data['values'][:10],
                 title='Top 10 - Registros por Participante',
                 xaxis_title='ID do Participante',
                 yaxis_title='Número de Registros',
-                height=Config.CHART_HEIGHT,
-                template='plotly_white'
+                name='Registros por Participante',
+                color=Config.SECONDARY_COLOR
             )
-            charts['records_per_participant'] = json.dumps(records_fig, cls=plotly.utils.PlotlyJSONEncoder)
+            charts['records_per_participant'] = serialization.dumps(records_fig)
         
         # Gráfico de registros por formulário/instrumento
         instruments_data = processor.get_records_per_instrument()
         if instruments_data:
-            instruments_fig = go.Figure(data=[
-                go.Bar(
-                    x=instruments_data['labels'], 
-                    y=instruments_data['values'],
-                    name='Registros por Formulário',
-                    marker_color=Config.PRIMARY_COLOR
-                )
-            ])
-            instruments_fig.update_layout(
+            instruments_fig = chart_builder.bar_figure(
+                instruments_data['labels'],
+                instruments_data['values'],
                 title='Distribuição de Registros por Formulário',
                 xaxis_title='Formulário/Instrumento',
                 yaxis_title='Número de Registros',
-                height=Config.CHART_HEIGHT,
-                template='plotly_white'
+                name='Registros por Formulário',
+                color=Config.PRIMARY_COLOR
             )
-            charts['records_per_instrument'] = json.dumps(instruments_fig, cls=plotly.utils.PlotlyJSONEncoder)
+            charts['records_per_instrument'] = serialization.dumps(instruments_fig)
         
         # Gráfico de completude por instrumento
         completion_data = processor.get_completion_by_instrument()
@@ -293,23 +249,18 @@ def generate_basic_charts(processor):
             instruments = [item['instrument'] for item in completion_data[:10]]
             rates = [item['completion_rate'] for item in completion_data[:10]]
             
-            completion_fig = go.Figure(data=[
-                go.Bar(
-                    x=rates,
-                    y=instruments,
-                    orientation='h',
-                    name='Taxa de Completude',
-                    marker_color=Config.PRIMARY_COLOR
-                )
-            ])
-            completion_fig.update_layout(
+            completion_fig = chart_builder.bar_figure(
+                instruments,
+                rates,
                 title='Taxa de Completude por Instrumento',
                 xaxis_title='Taxa de Completude (%)',
                 yaxis_title='Instrumento',
-                height=max(Config.CHART_HEIGHT, len(instruments) * 40),
-                template='plotly_white'
+                name='Taxa de Completude',
+                color=Config.PRIMARY_COLOR,
+                orientation='h',
+                height=max(Config.CHART_HEIGHT, len(instruments) * 40)
             )
-            charts['completion_by_instrument'] = json.dumps(completion_fig, cls=plotly.utils.PlotlyJSONEncoder)
+            charts['completion_by_instrument'] = serialization.dumps(completion_fig)
         
     except Exception as e:
         print(f"❌ Erro ao gerar gráficos: {e}")
@@ -337,6 +288,66 @@ def api_data():
             'error': str(e)
         })
 
+@app.route('/api/records')
+def api_records():
+    """API de registos com cursor, projeção de campos e filtros (JSON ou NDJSON em streaming)
+    
+    Parâmetros: cursor, page_size (número ou 'all'), fields=a,b,c,
+    format=json|ndjson e os filtros instrument, group, participant,
+    date_from, date_to
+    """
+    try:
+        data = get_cached_data() or []
+        processor = DataProcessor(data)
+        
+        fields = None
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            field_index = get_completeness(data).field_index
+            unknown = [f for f in fields if f not in field_index]
+            if unknown:
+                raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+        
+        output_format = request.args.get('format', 'json').lower()
+        if output_format not in ('json', 'ndjson'):
+            raise ValueError(f"Formato inválido: {output_format} (use json ou ndjson)")
+        
+        filters = {name: request.args.get(name) 
+                  for name in ['instrument', 'group', 'participant', 'date_from', 'date_to']}
+        
+        window = RecordWindow(data,
+                              predicates=processor.filter_predicates(filters),
+                              fields=fields,
+                              cursor=request.args.get('cursor'),
+                              page_size=parse_page_size(request.args.get('page_size')))
+    except CursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 410 if 'expirado' in str(e) else 400
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    dumps = serialization.dumps
+    
+    if output_format == 'ndjson':
+        body = window.iter_ndjson(dumps)
+        mimetype = 'application/x-ndjson'
+    else:
+        body = window.iter_json(dumps)
+        mimetype = 'application/json'
+    
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    if window.next_cursor:
+        response.headers['X-Next-Cursor'] = window.next_cursor
+        next_args = request.args.to_dict()
+        next_args['cursor'] = window.next_cursor
+        response.headers['Link'] = f'<{url_for("api_records", **next_args)}>; rel="next"'
+    return response
+
 @app.route('/api/column/<column_name>')
 def api_column_summary(column_name):
     """API endpoint para resumo de coluna específica"""
@@ -371,6 +382,7 @@ def api_test_connection():
         })
 
 @app.route('/analytics')
+@compression.cached_response(get_cached_data)
 def analytics():
     """Página de análises avançadas"""
     try:
@@ -393,9 +405,10 @@ def analytics():
         return render_template('analytics.html', 
                              analytics={},
                              success=False,
-                             error=str(e))
+                             error=str(e)), 500
 
 @app.route('/instruments')
+@compression.cached_response(get_cached_data)
 def instruments():
     """Página de análise por instrumentos"""
     try:
@@ -415,9 +428,10 @@ def instruments():
         return render_template('instruments.html', 
                              instruments={},
                              success=False,
-                             error=str(e))
+                             error=str(e)), 500
 
 @app.route('/groups')
+@compression.cached_response(get_cached_data)
 def groups():
     """Página de análise por grupos"""
     try:
@@ -437,7 +451,7 @@ def groups():
         return render_template('groups.html', 
                              groups={},
                              success=False,
-                             error=str(e))
+                             error=str(e)), 500
 
 @app.route('/api/filter', methods=['POST'])
 def api_filter_data():
@@ -484,7 +498,52 @@ def api_field_analysis(field_name):
             'error': str(e)
         }), 400
 
+@app.route('/api/group-comparison')
+def api_group_comparison():
+    """Comparação entre grupos: descritivas e testes omnibus por participante
+
+    Parâmetros: numeric=a,b, categorical=c,d (por omissão saúde e demografia)
+    e grouping (campo do baseline, 'participant_group' ou 'residence')
+    """
+    try:
+        data = get_cached_data() or []
+        field_index = get_completeness(data).field_index
+
+        def field_list(name):
+            if name not in request.args:
+                return None
+            fields = [f.strip() for f in request.args[name].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in field_index]
+            if unknown:
+                raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+            return fields
+
+        numeric = field_list('numeric')
+        categorical = field_list('categorical')
+        # Sem repetições; um campo não pode ser numérico e categórico
+        numeric, categorical = normalize_fields(
+            DEFAULT_NUMERIC if numeric is None else numeric,
+            DEFAULT_CATEGORICAL if categorical is None else categorical
+        )
+        grouping = request.args.get('grouping', 'participant_group')
+        if grouping not in GROUPINGS and grouping not in field_index:
+            raise ValueError(f"Agrupamento desconhecido: {grouping}")
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    comparison = DataProcessor(data).compare_groups(numeric, categorical, grouping)
+    if 'error' in comparison:
+        return jsonify({'success': False, 'error': comparison['error']}), 500
+    return jsonify({
+        'success': True,
+        'comparison': comparison
+    })
+
 @app.route('/patterns')
+@compression.cached_response(get_cached_data)
 def patterns():
     """Página de identificação de padrões"""
     try:
@@ -507,9 +566,10 @@ def patterns():
                              patterns={},
                              insights=[],
                              success=False,
-                             error=str(e))
+                             error=str(e)), 500
 
 @app.route('/longitudinal')
+@compression.cached_response(get_cached_data)
 def longitudinal_analysis():
     try:
         print("🔄 Iniciando análise longitudinal...")
@@ -537,9 +597,10 @@ def longitudinal_analysis():
                              seasonal={},
                              alerts={},
                              success=False,
-                             error=str(e))
+                             error=str(e)), 500
 
 @app.route('/alerts')
+@compression.cached_response(get_cached_data)
 def clinical_alerts():
     try:
         print("🚨 Iniciando análise de alertas clínicos...")
@@ -567,9 +628,10 @@ def clinical_alerts():
                              sleep_alerts={},
                              anomalies={},
                              success=False,
-                             error=str(e))
+                             error=str(e)), 500
 
 @app.route('/medication-adherence')
+@compression.cached_response(get_cached_data)
 def medication_adherence():
     try:
         print("💊 Iniciando análise de adesão medicamentosa...")
@@ -597,150 +659,159 @@ def medication_adherence():
                              adverse_effects={},
                              patterns={},
                              success=False,
-                             error=str(e))
+                             error=str(e)), 500
 
 @app.route('/sleep-analysis')
+@compression.cached_response(get_cached_data)
 def sleep_analysis():
-    try:
-        print("😴 Iniciando análise do sono...")
-        data = redcap.get_records()
-        processor = DataProcessor(data)
-        
-        # Análises do sono - FUNÇÕES NOVAS E INDEPENDENTES
-        psqi_components = processor.analyze_psqi_components_rm4health()
-        sleep_profiles = processor.create_sleep_profiles_rm4health()
-        sleep_correlations = processor.sleep_symptom_correlations_rm4health()
-        medication_impact = processor.medication_sleep_impact_rm4health()
-        
-        print("✅ Análise do sono concluída")
-        return render_template('sleep_analysis.html',
-                             components=psqi_components,
-                             profiles=sleep_profiles,
-                             correlations=sleep_correlations,
-                             medication_impact=medication_impact,
-                             success=True)
-    except Exception as e:
-        print(f"❌ Erro na análise do sono: {e}")
-        return render_template('sleep_analysis.html',
-                             components={},
-                             profiles={},
-                             correlations={},
-                             medication_impact={},
-                             success=False,
-                             error=str(e))
+    """Página de análise do sono (secções carregadas via /api/sections/sleep/...)"""
+    return render_template('sleep_analysis.html')
 
 @app.route('/healthcare-utilization')
+@compression.cached_response(get_cached_data)
 def healthcare_utilization():
-    """Página de análise de utilização de serviços de saúde"""
-    try:
-        # Obter dados do REDCap
-        df = redcap.get_records()
-        if not df:
-            raise Exception("Não foi possível obter dados do REDCap")
-        
-        # Inicializar processador de dados
-        processor = DataProcessor(df)
-        
-        # Executar análises de utilização
-        service_patterns = processor.analyze_service_utilization_rm4health()
-        cost_analysis = processor.calculate_cost_effectiveness_rm4health()
-        remote_impact = processor.assess_remote_monitoring_impact_rm4health()
-        utilization_predictors = processor.identify_utilization_predictors_rm4health()
-        
-        return render_template('healthcare_utilization.html',
-                             patterns=service_patterns,
-                             costs=cost_analysis,
-                             remote_impact=remote_impact,
-                             predictors=utilization_predictors,
-                             success=True)
-    
-    except Exception as e:
-        print(f"❌ Erro na análise de utilização de serviços: {e}")
-        import traceback
-        traceback.print_exc()
-        return render_template('healthcare_utilization.html',
-                             patterns={},
-                             costs={},
-                             remote_impact={},
-                             predictors={},
-                             success=False,
-                             error=str(e))
+    """Página de análise de utilização de serviços de saúde (secções carregadas via /api/sections/healthcare/...)"""
+    return render_template('healthcare_utilization.html')
 
 @app.route('/caregivers')
+@compression.cached_response(get_cached_data)
 def caregiver_analysis():
-    """Página de análise de cuidadores"""
-    try:
-        # Obter dados do REDCap
-        df = redcap.get_records()
-        if not df:
-            raise Exception("Não foi possível obter dados do REDCap")
-        
-        # Inicializar processador de dados
-        processor = DataProcessor(df)
-        
-        # Executar análises de cuidadores
-        caregiver_comparison = processor.compare_caregiver_groups()
-        burden_analysis = processor.analyze_caregiver_burden()
-        support_effectiveness = processor.assess_support_effectiveness()
-        response_patterns = processor.caregiver_response_patterns()
-        
-        return render_template('caregivers.html',
-                             comparison=caregiver_comparison,
-                             burden=burden_analysis,
-                             effectiveness=support_effectiveness,
-                             patterns=response_patterns,
-                             success=True)
-    
-    except Exception as e:
-        print(f"❌ Erro na análise de cuidadores: {e}")
-        import traceback
-        traceback.print_exc()
-        return render_template('caregivers.html',
-                             comparison={},
-                             burden={},
-                             effectiveness={},
-                             patterns={},
-                             success=False,
-                             error=str(e))
+    """Página de análise de cuidadores (secções carregadas via /api/sections/caregivers/...)"""
+    return render_template('caregivers.html')
 
 @app.route('/residence-comparison')
+@compression.cached_response(get_cached_data)
 def residence_comparison():
-    """Análise comparativa entre residentes e não-residentes"""
+    """Análise comparativa entre residentes e não-residentes (secções carregadas via /api/sections/residence/...)"""
+    return render_template('residence_comparison_fixed.html')
+
+def get_section_data(page):
+    """Registos usados pelas secções da página (None se a página não existir)"""
+    source = sections.get_page_source(page)
+    if source == 'label':
+        return redcap.get_records()
+    if source == 'raw':
+        return get_cached_data()
+    return None
+
+def run_section_job(job, page, section):
+    """Tarefa: calcula e renderiza uma secção fora do pedido HTTP"""
+    data = get_section_data(page)
+    with app.app_context():
+        return sections.render_section(page, section, data, job=job)
+
+@app.route('/api/sections/<page>/<section>')
+@compression.cached_response(get_cached_data)
+def api_section(page, section):
+    """Uma secção de uma página de análise: HTML renderizado (ou só dados)
+
+    A secção é calculada no pool de tarefas. Se não terminar em
+    Config.JOB_SYNC_WAIT segundos (ou se o cliente pedir ?async=1 /
+    Prefer: respond-async) a resposta é 202 com o URL da tarefa
+    """
+    if sections.get_section_config(page, section) is None:
+        return jsonify({'success': False, 'error': f'Secção desconhecida: {page}/{section}'}), 404
+
     try:
-        print("🏠 Carregando análise residencial...")
-        
-        # Buscar dados
-        data = get_cached_data()
-        processor = DataProcessor(data)
-        
-        # Análises por tipo de residência
-        demographic_comparison = processor.compare_residence_demographics()
-        health_outcomes = processor.compare_health_outcomes()
-        adherence_comparison = processor.compare_adherence_by_residence()
-        quality_of_life = processor.compare_quality_of_life()
-        
-        print("✅ Análise residencial concluída!")
-        
-        return render_template('residence_comparison_fixed.html',
-                             demographics=demographic_comparison,
-                             health=health_outcomes,
-                             adherence=adherence_comparison,
-                             quality=quality_of_life,
-                             success=True)
-    
-    except Exception as e:
-        print(f"❌ Erro na análise residencial: {e}")
-        import traceback
-        traceback.print_exc()
-        return render_template('residence_comparison_fixed.html',
-                             demographics={},
-                             health={},
-                             adherence={},
-                             quality={},
-                             success=False,
-                             error=str(e))
+        print(f"[INFO] Carregando secção {page}/{section}...")
+        # A versão do snapshot na chave: depois de recarregar os dados um pedido
+        # não reutiliza uma tarefa calculada sobre o snapshot anterior
+        version = snapshot_cache.snapshot_version(get_cached_data())
+        job = jobs.get_job_manager().submit(f'Secção {page}/{section}', run_section_job,
+                                            page, section, key=('section', page, section, version))
+    except jobs.QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    if wants_async() or not job.wait(Config.JOB_SYNC_WAIT):
+        return job_accepted(job)
+
+    if job.status == jobs.DONE:
+        return jsonify(job.result)
+
+    print(f"❌ Erro na secção {page}/{section}: {job.error or job.message}")
+    return jsonify({'success': False, 'page': page, 'section': section,
+                    'error': job.error or job.message}), 500
+
+def wants_async():
+    """O cliente pediu resposta assíncrona (?async=1 ou Prefer: respond-async)"""
+    return (request.args.get('async') in ('1', 'true') or
+            'respond-async' in request.headers.get('Prefer', ''))
+
+def job_urls(job):
+    return {
+        'status_url': url_for('api_job', job_id=job.id),
+        'events_url': url_for('api_job_events', job_id=job.id),
+        'page_url': url_for('job_status_page', job_id=job.id)
+    }
+
+def job_accepted(job):
+    """Resposta 202 com o estado atual e os URLs da tarefa"""
+    info = job.to_dict(include_result=False)
+    info.update(job_urls(job))
+    info['success'] = True
+    response = jsonify(info)
+    response.status_code = 202
+    response.headers['Location'] = info['status_url']
+    return response
+
+@app.route('/api/jobs')
+def api_jobs():
+    """Lista das tarefas em fila, a correr ou terminadas (dentro da retenção)"""
+    manager = jobs.get_job_manager()
+    return jsonify({
+        'success': True,
+        'workers': manager.max_workers,
+        'jobs': [dict(job.to_dict(include_result=False), **job_urls(job)) for job in manager.list()]
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def api_job(job_id):
+    """Estado de uma tarefa (com o resultado quando concluída); DELETE cancela"""
+    manager = jobs.get_job_manager()
+    job = manager.cancel(job_id) if request.method == 'DELETE' else manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Tarefa não encontrada ou expirada'}), 404
+
+    info = job.to_dict()
+    info.update(job_urls(job))
+    info['success'] = True
+    return jsonify(info)
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_job_cancel(job_id):
+    """Cancela uma tarefa (alternativa ao DELETE para formulários)"""
+    job = jobs.get_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Tarefa não encontrada ou expirada'}), 404
+    return jsonify(dict(job.to_dict(include_result=False), success=True))
+
+@app.route('/api/jobs/<job_id>/events')
+def api_job_events(job_id):
+    """Estado da tarefa por Server-Sent Events até terminar"""
+    manager = jobs.get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Tarefa não encontrada ou expirada'}), 404
+
+    def generate():
+        for info in manager.events(job):
+            yield jobs.format_sse(info)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/jobs/<job_id>')
+def job_status_page(job_id):
+    """Página de acompanhamento de uma tarefa"""
+    job = jobs.get_job_manager().get(job_id)
+    if job is None:
+        return render_template('update_status.html', job=None, urls=None), 404
+    return render_template('update_status.html', job=job.to_dict(include_result=False), urls=job_urls(job))
 
 @app.route('/data-quality')
+@compression.cached_response(get_cached_data)
 def data_quality_analysis():
     """Análise de qualidade dos dados do REDCap"""
     try:
@@ -773,7 +844,7 @@ def data_quality_analysis():
                              quality={},
                              recommendations={},
                              success=False,
-                             error=str(e))
+                             error=str(e)), 500
 
 @app.route('/data-quality-executive')
 def data_quality_executive():
@@ -984,240 +1055,76 @@ def api_temporal_trends(participant_code, field):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/psqi')
+@app.route('/api/psqi/<participant_code>')
+def api_psqi(participant_code=None):
+    """API para os scores PSQI (componentes e global) e séries longitudinais por participante"""
+    try:
+        data = get_cached_data()
+        if not data:
+            return jsonify({'error': 'Dados não disponíveis'}), 500
+
+        scores = get_psqi(data)
+        if participant_code is not None:
+            series = scores.series(participant_code)
+            if not series:
+                return jsonify({'success': False, 'error': f'Sem PSQI para o participante {participant_code}'}), 404
+            return jsonify({
+                'success': True,
+                'participant_code': participant_code,
+                'series': series
+            })
+
+        return jsonify({
+            'success': True,
+            'summary': scores.analysis()['summary'],
+            'participants': scores.longitudinal()
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/rm4health-domains-assessment')
+@compression.cached_response(get_cached_data)
 def rm4health_domains_assessment():
     """Análise multidimensional de qualidade em 4 domínios."""
     try:
         # Get real data for calculations
         data = get_cached_data()
         
-        if not data:
-            raise Exception("Dados não disponíveis")
-        
-        # Technical Domain - Based on real data structure and completeness
-        data_completeness = len([r for r in data if len(r.keys()) > 5]) / len(data) * 100
-        field_consistency = len(set([len(r.keys()) for r in data])) / len(data) * 100
-        technical_score = (data_completeness + field_consistency) / 2
-        
-        # FHIR compliance based on actual field mapping
-        fhir_patient_count = len([r for r in data if 'record_id' in r])
-        fhir_observation_count = len([k for r in data for k in r.keys() if any(obs in k.lower() for obs in ['score', 'value', 'measure', 'assessment'])])
-        fhir_medication_count = len([k for r in data for k in r.keys() if any(med in k.lower() for med in ['med', 'drug', 'pill', 'medication'])])
-        fhir_condition_count = len([k for r in data for k in r.keys() if any(cond in k.lower() for cond in ['condition', 'diagnosis', 'disease', 'health'])])
-        
-        total_fhir_mappings = fhir_patient_count + fhir_observation_count + fhir_medication_count + fhir_condition_count
-        fhir_compliance_score = min(90, (total_fhir_mappings / len(data)) * 10) if data else 0
-        
-        # Ethical Domain - Based on data protection indicators
-        has_consent_fields = any('consent' in str(r.keys()).lower() for r in data)
-        has_privacy_fields = any('privacy' in str(r.keys()).lower() or 'confidential' in str(r.keys()).lower() for r in data)
-        data_anonymization = len([r for r in data if 'record_id' in r and not any(field.lower() in ['name', 'email', 'phone'] for field in r.keys())]) / len(data) * 100
-        ethical_score = (data_anonymization + (50 if has_consent_fields else 0) + (30 if has_privacy_fields else 0)) / 1.8
-        
-        # Organizational Domain - Based on data collection patterns
-        consistent_collection = len(set([len([k for k in r.keys() if r[k] is not None and r[k] != '']) for r in data])) / len(data) * 100
-        standardized_fields = len(set([tuple(sorted(r.keys())) for r in data])) / len(data) * 100  
-        organizational_score = (consistent_collection + (100 - standardized_fields)) / 2
-        
-        # Clinical Domain - Based on clinical instrument presence
-        clinical_instruments = ['eq5d', 'psqi', 'barthel', 'moca', 'gds', 'iadl']
-        instrument_coverage = sum([1 for inst in clinical_instruments if any(inst in str(r.keys()).lower() for r in data)]) / len(clinical_instruments) * 100
-        clinical_data_completeness = len([r for r in data if any(inst in str(r.keys()).lower() for inst in clinical_instruments)]) / len(data) * 100
-        clinical_score = (instrument_coverage + clinical_data_completeness) / 2
-        
-        # Elderly-friendly design metrics based on actual usability indicators
-        simplified_scales = len([k for r in data for k in r.keys() if any(scale in k.lower() for scale in ['likert', 'scale', 'rating'])]) / len(data) * 20
-        cognitive_load_score = min(100, 70 + simplified_scales)
-        visual_aids_score = min(100, 60 + (len([k for r in data for k in r.keys() if 'visual' in k.lower() or 'image' in k.lower()]) / len(data) * 30))
-        accessibility_score = min(100, 65 + (organizational_score * 0.3))
-        caregiver_support_score = min(100, 70 + (len([r for r in data if any('caregiver' in str(r.keys()).lower() or 'cuidador' in str(r.keys()).lower() for r in [r])]) / len(data) * 40))
-        elderly_usability_score = (cognitive_load_score + visual_aids_score + accessibility_score + caregiver_support_score) / 4
-        
-        # Implementation readiness based on data quality
-        implementation_readiness = (technical_score + organizational_score) / 2
-        validation_completeness = min(100, (len([r for r in data if len([k for k in r.keys() if r[k] is not None and r[k] != '']) > len(r.keys()) * 0.8]) / len(data)) * 100)
-        
-        # Implementation Science indicators based on actual data patterns
-        data_consistency_ratio = len([r for r in data if len(r.keys()) >= len(data[0].keys()) * 0.8]) / len(data) if data else 0
-        acceptability_score = min(100, data_consistency_ratio * 100)
-        feasibility_score = min(100, (technical_score + organizational_score) / 2)
-        adoption_score = min(100, len(data) / 10)  # Based on actual participant adoption
-        fidelity_score = validation_completeness
-        
-        # Calculate totals from real data
-        total_participants = len(set([r.get('record_id', r.get('participant_id', idx)) for idx, r in enumerate(data)]))
-        total_instruments = len(set([k.split('_')[0] for r in data for k in r.keys() if '_' in k]))
-        total_assessments = len([k for r in data for k in r.keys() if any(assess in k.lower() for assess in ['score', 'total', 'assessment', 'questionnaire'])])
-        
-        return render_template('rm4health_domains_assessment.html',
-                             # Main metrics
-                             technical_score=round(technical_score, 1),
-                             ethical_score=round(ethical_score, 1),
-                             organizational_score=round(organizational_score, 1),
-                             clinical_score=round(clinical_score, 1),
-                             
-                             # FHIR compliance
-                             fhir_compliance_score=round(fhir_compliance_score, 1),
-                             fhir_patient_count=fhir_patient_count,
-                             fhir_observation_count=fhir_observation_count,
-                             fhir_medication_count=fhir_medication_count,
-                             fhir_condition_count=fhir_condition_count,
-                             
-                             # Elderly-friendly design
-                             elderly_usability_score=round(elderly_usability_score, 1),
-                             cognitive_load_score=round(cognitive_load_score, 1),
-                             visual_aids_score=round(visual_aids_score, 1),
-                             accessibility_score=round(accessibility_score, 1),
-                             caregiver_support_score=round(caregiver_support_score, 1),
-                             
-                             # Implementation metrics
-                             implementation_readiness=round(implementation_readiness, 1),
-                             validation_completeness=round(validation_completeness, 1),
-                             
-                             # Implementation Science
-                             acceptability_score=round(acceptability_score, 1),
-                             feasibility_score=round(feasibility_score, 1),
-                             adoption_score=round(adoption_score, 1),
-                             fidelity_score=round(fidelity_score, 1),
-                             
-                             # Totals
-                             total_participants=total_participants,
-                             total_instruments=total_instruments,
-                             total_assessments=total_assessments)
+        # Métricas calculadas numa única passagem (em cache por snapshot)
+        metrics = get_domains_assessment_metrics(data)
+        
+        return render_template('rm4health_domains_assessment.html', **metrics)
                              
     except Exception as e:
         print(f"❌ Erro na avaliação multidimensional: {e}")
         import traceback
         traceback.print_exc()
         return render_template('error.html',
-                             error_message=f'Erro ao carregar análise multidimensional: {str(e)}')
+                             error_message=f'Erro ao carregar análise multidimensional: {str(e)}'), 500
 
 @app.route('/efmi25-overview')
+@compression.cached_response(get_cached_data)
 def quality_domains_overview():
     """Página de visão geral da Análise de Domínios de Qualidade - NOVA PÁGINA"""
     try:
         # Get data for calculations
         data = get_cached_data()
         
-        if not data:
-            raise Exception("Dados não disponíveis")
-        
-        # EFMI25 Conference Metrics - Explicação para leigos:
-        # Estas métricas são calculadas especificamente para apresentar na conferência EFMI25
-        
-        # 1. RESEARCH READINESS SCORE (0-100)
-        # Explicação: Mede quão pronto o projeto está para publicação científica
-        # Cálculo: Baseado na qualidade dos dados, completude e metodologia
-        total_records = len(data)
-        complete_records = len([r for r in data if len([k for k in r.keys() if r[k] is not None and r[k] != '']) > len(r.keys()) * 0.8])
-        research_readiness = (complete_records / total_records * 100) if total_records > 0 else 0
-        
-        # 2. PUBLICATION IMPACT POTENTIAL (1-5 stars)
-        # Explicação: Estima o potencial impacto científico baseado em critérios objetivos
-        # Critérios: Tamanho da amostra, diversidade de instrumentos, qualidade metodológica
-        unique_participants = len(set([r.get('participant_code', r.get('record_id', idx)) for idx, r in enumerate(data)]))
-        unique_instruments = len(set([k.split('_')[0] for r in data for k in r.keys() if '_complete' in k]))
-        field_coverage = len(set([k for r in data for k in r.keys()])) / 100  # Normalized to 0-1
-        
-        # Calculation: Weighted score based on sample size, instruments, and data quality
-        sample_score = min(5, unique_participants / 5)  # 1 star per 5 participants, max 5
-        instrument_score = min(5, unique_instruments / 2)  # 1 star per 2 instruments, max 5
-        quality_score = min(5, field_coverage)  # Based on field diversity
-        publication_impact = round((sample_score + instrument_score + quality_score) / 3, 1)
-        
-        # 3. FHIR COMPLIANCE LEVEL (Advanced/Intermediate/Basic)
-        # Explicação: Mede compatibilidade com padrões internacionais de saúde digital
-        # FHIR = Fast Healthcare Interoperability Resources (padrão HL7)
-        fhir_patient_mappings = len([r for r in data if any(field in r for field in ['participant_code', 'record_id'])])
-        fhir_observation_mappings = len([k for r in data for k in r.keys() if any(obs in k.lower() for obs in ['score', 'value', 'measure'])])
-        fhir_condition_mappings = len([k for r in data for k in r.keys() if any(cond in k.lower() for cond in ['diagnosis', 'condition', 'disease'])])
-        
-        total_fhir_score = (fhir_patient_mappings + fhir_observation_mappings + fhir_condition_mappings) / (total_records * 3) * 100
-        
-        if total_fhir_score >= 70:
-            fhir_compliance_level = "Advanced"
-            fhir_compliance_color = "success"
-        elif total_fhir_score >= 40:
-            fhir_compliance_level = "Intermediate" 
-            fhir_compliance_color = "warning"
-        else:
-            fhir_compliance_level = "Basic"
-            fhir_compliance_color = "danger"
-        
-        # 4. INNOVATION INDEX (0-100)
-        # Explicação: Mede o grau de inovação tecnológica do projeto
-        # Fatores: Uso de tecnologias emergentes, integração de sistemas, metodologias inovadoras
-        has_mobile_data = any('mobile' in str(r.keys()).lower() or 'app' in str(r.keys()).lower() for r in data)
-        has_iot_data = any('sensor' in str(r.keys()).lower() or 'device' in str(r.keys()).lower() for r in data)
-        has_ai_features = any('prediction' in str(r.keys()).lower() or 'ml' in str(r.keys()).lower() for r in data)
-        has_realtime_monitoring = any('real' in str(r.keys()).lower() or 'continuous' in str(r.keys()).lower() for r in data)
-        
-        innovation_features = [has_mobile_data, has_iot_data, has_ai_features, has_realtime_monitoring]
-        innovation_index = sum(innovation_features) / len(innovation_features) * 100
-        
-        # 5. ELDERLY-CARE FOCUS SCORE (0-100)
-        # Explicação: Mede quão bem o sistema está adaptado para cuidados geriátricos
-        # Indicadores: Instrumentos específicos para idosos, métricas de funcionalidade, qualidade de vida
-        elderly_instruments = ['barthel', 'iadl', 'eq5d', 'mini_mental', 'gds']
-        elderly_coverage = sum([1 for inst in elderly_instruments if any(inst in str(r.keys()).lower() for r in data)]) / len(elderly_instruments) * 100
-        
-        functional_assessments = len([k for r in data for k in r.keys() if any(func in k.lower() for func in ['functional', 'mobility', 'independence', 'adl'])])
-        elderly_focus_score = (elderly_coverage + min(100, functional_assessments / total_records * 50)) / 2
-        
-        # 6. DATA QUALITY METRICS FOR CONFERENCE
-        # Explicação: Métricas específicas que demonstram rigor científico
-        missing_data_rate = sum([len([k for k in r.keys() if r[k] is None or r[k] == '']) for r in data]) / (total_records * len(data[0].keys()) if data else 1) * 100
-        data_consistency_score = 100 - (len(set([len(r.keys()) for r in data])) / total_records * 100)
-        temporal_consistency = len([r for r in data if any('date' in k.lower() for k in r.keys())]) / total_records * 100
-        
-        overall_data_quality = (100 - missing_data_rate + data_consistency_score + temporal_consistency) / 3
-        
-        # 7. CONFERENCE PRESENTATION READINESS
-        # Explicação: Avalia se o projeto está pronto para apresentação acadêmica
-        has_baseline_data = len(data) >= 20  # Minimum sample for conference presentation
-        has_longitudinal_data = len([r for r in data if any('repeat' in k.lower() for k in r.keys())]) > 0
-        has_outcome_measures = len([k for r in data for k in r.keys() if any(outcome in k.lower() for outcome in ['score', 'total', 'result'])]) > 0
-        has_demographic_data = any(demo in str(data[0].keys()).lower() for demo in ['age', 'sex', 'birth'])
-        
-        readiness_criteria = [has_baseline_data, has_longitudinal_data, has_outcome_measures, has_demographic_data]
-        conference_readiness = sum(readiness_criteria) / len(readiness_criteria) * 100
+        # EFMI25 Conference Metrics - ver domain_metrics.py para a explicação de cada métrica
+        metrics = get_efmi25_metrics(data)
         
         return render_template('efmi25_overview.html', 
-                             # Core metrics
-                             total_participants=unique_participants,
-                             total_records=total_records,
-                             total_instruments=unique_instruments,
-                             
-                             # EFMI25 specific metrics
-                             research_readiness=round(research_readiness, 1),
-                             publication_impact=publication_impact,
-                             fhir_compliance_level=fhir_compliance_level,
-                             fhir_compliance_color=fhir_compliance_color,
-                             fhir_compliance_score=round(total_fhir_score, 1),
-                             innovation_index=round(innovation_index, 1),
-                             elderly_focus_score=round(elderly_focus_score, 1),
-                             data_quality_score=round(overall_data_quality, 1),
-                             conference_readiness=round(conference_readiness, 1),
-                             
-                             # Detailed breakdowns for explanations
-                             missing_data_rate=round(missing_data_rate, 1),
-                             data_consistency_score=round(data_consistency_score, 1),
-                             temporal_consistency=round(temporal_consistency, 1),
-                             
-                             # Feature flags for innovation
-                             has_mobile_data=has_mobile_data,
-                             has_iot_data=has_iot_data,
-                             has_ai_features=has_ai_features,
-                             has_realtime_monitoring=has_realtime_monitoring,
-                             
-                             success=True)
+                             success=True,
+                             **metrics)
                              
     except Exception as e:
         print(f"❌ Erro na página de visão geral: {e}")
         import traceback
         traceback.print_exc()
         return render_template('error.html',
-                             error_message=f'Erro ao carregar visão geral: {str(e)}')
+                             error_message=f'Erro ao carregar visão geral: {str(e)}'), 500
 
 if __name__ == '__main__':
     print("[INFO] Iniciando RM4Health Dashboard...")
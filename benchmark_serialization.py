@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark da camada de serialização JSON
+Compara o json da biblioteca standard (jsonify por omissão do Flask e
+PlotlyJSONEncoder) com serialization.dumps nas maiores respostas do dashboard
+
+Uso: python benchmark_serialization.py [repetições]
+"""
+import csv
+import glob
+import json
+import sys
+import time
+
+import plotly.utils
+
+import serialization
+from data_processor import DataProcessor
+
+
+def load_records():
+    """Carrega os registos do CSV raw mais recente"""
+    files = sorted(glob.glob('redcap_raw_*.csv'))
+    if not files:
+        print("❌ Nenhum ficheiro redcap_raw_*.csv encontrado")
+        sys.exit(1)
+    with open(files[-1], encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def load_metadata():
+    files = sorted(glob.glob('redcap_metadata_*.csv'))
+    if not files:
+        return None
+    with open(files[-1], encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def timeit(func, repeat):
+    """Melhor tempo (ms) de `repeat` execuções"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    print(f"[INFO] Backend de serialização: {serialization.BACKEND}")
+    records = load_records()
+    processor = DataProcessor(records)
+
+    # Importado aqui para não inicializar o cliente REDCap antes de carregar os dados
+    from app import generate_basic_charts
+    charts = generate_basic_charts(processor)
+
+    payloads = {
+        'analyze_missing_patterns': processor.analyze_missing_patterns(),
+        'get_advanced_analytics': processor.get_advanced_analytics(load_metadata()),
+        'api_data (100 registos)': {'data': records[:100], 'columns': processor.get_all_columns()},
+        'todos os registos': records,
+    }
+
+    print(f"\n{'Payload':<32}{'Tamanho':>12}{'stdlib (ms)':>14}{'serialization (ms)':>20}{'Ganho':>8}")
+    print('-' * 86)
+
+    for name, payload in payloads.items():
+        # Equivalente ao DefaultJSONProvider do Flask (sort_keys=True, ensure_ascii=True)
+        baseline = timeit(lambda: json.dumps(payload, default=str, sort_keys=True), repeat)
+        fast = timeit(lambda: serialization.dumps_bytes(payload, sort_keys=True), repeat)
+        size = len(serialization.dumps_bytes(payload))
+        print(f"{name:<32}{size:>12,}{baseline:>14.2f}{fast:>20.2f}{baseline / fast:>7.1f}x")
+
+    # Gráficos: figuras Plotly (antes: json.dumps com PlotlyJSONEncoder)
+    from plotly import graph_objs as go
+    for name, chart_json in charts.items():
+        figure = go.Figure(json.loads(chart_json))
+        baseline = timeit(lambda: json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder), repeat)
+        fast = timeit(lambda: serialization.dumps_bytes(figure), repeat)
+        print(f"{'chart ' + name:<32}{len(chart_json):>12,}{baseline:>14.2f}{fast:>20.2f}{baseline / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""
+Motor de análise de cuidadores
+- Tabela por participante construída uma vez por snapshot com agregações
+  groupby (pandas) sobre as colunas codificadas (columns.map_column)
+- Presença de cuidador (pacientes dos grupos A/B): díade ligada no índice
+  de díades (dyads.get_dyad_index) ou, sem díade, indicadores proxy em
+  colunas booleanas vetorizadas:
+    receiving_visits  recebe visitas pelo menos 1-2 dias por semana
+    marital_status    casado(a) / união de facto
+    health_status     estado de saúde médio 'Mal' ou pior
+- Trajetória do estado de saúde de cada paciente (declive por 30 dias)
+  calculada a partir de somas por grupo, para cruzar com os cuidadores
+- Comparação de grupos, carga do cuidador, eficácia do suporte e padrões
+  de resposta são agregações desta tabela (uma passagem pelos registos)
+- Aceita registos 'raw' (códigos) ou 'label' (rótulos das opções)
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import snapshot_cache
+from columns import (HEALTH_SCALE, VISITS_SCALE, YES_NO_SCALE, baseline_values, map_column, object_column, scored,
+                     to_days, to_number)
+from dyads import CAREGIVER_GROUPS, get_dyad_index, group_letter
+from utilization_cube import SERVICES, get_utilization_cube
+
+MARRIED = {'1', 'Casado(a)/União de facto'}
+# Escala da forma de administração dos questionários (rótulo: código)
+ADMINISTRATION_SCALE = {
+    'Autoadministrado': 0,
+    'Assistido pelo cuidador ou entrevistador': 1,
+    'Preenchido pelo cuidador ou administrativamente': 2,
+    'Preenchido pelo cuidador ou administrativamente (se autorizado pelo participante)': 2
+}
+ADMINISTRATION_MODES = {
+    0: 'Autoadministrado',
+    1: 'Assistido pelo cuidador ou entrevistador',
+    2: 'Preenchido pelo cuidador'
+}
+ADMINISTRATION_FIELDS = [
+    'questionnaire_administration', 'questionnaire_administration_2', 'questionnaire_administration_4',
+    'questionnaire_administration_5', 'questionnaire_administration_7', 'questionnaire_administration_8'
+]
+
+PROXY_FIELDS = ['receiving_visits', 'marital_status', 'health_status']
+# Estado de saúde médio igual ou inferior a 'Mal'
+POOR_HEALTH = HEALTH_SCALE['Mal']
+# Campos de carga do cuidador (ainda não recolhidos no REDCap)
+BURDEN_FIELDS = ['caregiver_burden', 'caregiver_stress', 'caregiver_hours_per_day',
+                 'caregiver_fatigue', 'caregiver_sleep_quality', 'caregiver_health']
+HIGH_BURDEN_HOURS = 8
+# Tendência do estado de saúde em pontos da escala (0-4) por 30 dias
+TREND_DAYS = 30
+MIN_TREND_REPORTS = 3
+
+
+def _round(value, digits=1, default='N/A'):
+    return round(float(value), digits) if pd.notna(value) else default
+
+
+class CaregiverEngine:
+    """Tabela participante × indicadores de cuidador e agregações por grupo"""
+
+    def __init__(self, records):
+        participants = object_column(records, 'participant_code')
+        administration = np.column_stack([
+            map_column(records, field, scored(ADMINISTRATION_SCALE)) for field in ADMINISTRATION_FIELDS
+        ])
+        # Cada registo tem no máximo uma forma de administração (a do seu instrumento)
+        answered = ~np.isnan(administration)
+        first = answered.argmax(axis=1)
+        mode = np.where(answered.any(axis=1), administration[np.arange(len(records)), first], np.nan)
+
+        frame = pd.DataFrame({
+            'participant': participants,
+            'visits': map_column(records, 'receiving_visits', scored(VISITS_SCALE)),
+            'married': map_column(records, 'marital_status', lambda v: float(str(v).strip() in MARRIED)),
+            'health': map_column(records, 'health_status', scored(HEALTH_SCALE)),
+            'health_day': map_column(records, 'questionnaire_date_8', to_days),
+            'took_medications': map_column(records, 'took_medications_yesterday', scored(YES_NO_SCALE)),
+            'care_hours': map_column(records, 'caregiver_hours_per_day', to_number),
+            'administration': mode,
+            'assisted': mode >= 1,
+            'filled': mode == 2
+        })
+        frame = frame[frame['participant'].astype(bool)]
+        # Somas para a regressão linear do estado de saúde no tempo (por participante)
+        trend = frame['health'].notna() & frame['health_day'].notna()
+        frame['trend_x'] = frame['health_day'].where(trend) / TREND_DAYS
+        frame['trend_y'] = frame['health'].where(trend)
+        frame['trend_xy'] = frame['trend_x'] * frame['trend_y']
+        frame['trend_xx'] = frame['trend_x'] ** 2
+        self.frame = frame
+
+        table = frame.groupby('participant', sort=False).agg(
+            visits=('visits', 'max'),
+            married=('married', 'max'),
+            health=('health', 'mean'),
+            health_reports=('health', 'count'),
+            adherence=('took_medications', 'mean'),
+            adherence_reports=('took_medications', 'count'),
+            care_hours=('care_hours', 'mean'),
+            questionnaires=('administration', 'count'),
+            caregiver_assisted=('assisted', 'sum'),
+            caregiver_filled=('filled', 'sum'),
+            trend_n=('trend_y', 'count'),
+            trend_x=('trend_x', 'sum'),
+            trend_y=('trend_y', 'sum'),
+            trend_xy=('trend_xy', 'sum'),
+            trend_xx=('trend_xx', 'sum')
+        )
+        n = table['trend_n']
+        variance = n * table['trend_xx'] - table['trend_x'] ** 2
+        slope = (n * table['trend_xy'] - table['trend_x'] * table['trend_y']) / variance.where(variance > 0)
+        table['health_trend'] = slope.where(n >= MIN_TREND_REPORTS)
+        table = table.drop(columns=['trend_n', 'trend_x', 'trend_y', 'trend_xy', 'trend_xx'])
+
+        groups = baseline_values(records, 'participant_group')
+        birth_years = baseline_values(records, 'birth_year')
+        table['group'] = [group_letter(groups.get(p)) for p in table.index]
+        table['age'] = datetime.now().year - np.array([to_number(birth_years.get(p, '')) for p in table.index])
+        table.loc[(table['age'] < 0) | (table['age'] > 120), 'age'] = np.nan
+        table['is_caregiver'] = table['group'].isin(list(CAREGIVER_GROUPS))
+
+        # Díades declaradas (related_participant_id) e indicadores proxy (só pacientes)
+        self.dyads = get_dyad_index(records)
+        table['in_dyad'] = self.dyads.has_caregiver(table.index)
+        table['receives_visits'] = table['visits'] >= 1
+        table['is_married'] = table['married'] == 1
+        table['poor_health'] = table['health'] <= POOR_HEALTH
+        proxy = table['receives_visits'] | table['is_married'] | table['poor_health']
+        table['has_caregiver'] = ~table['is_caregiver'] & (table['in_dyad'] | proxy)
+        table['caregiver_source'] = np.select(
+            [table['in_dyad'], table['has_caregiver']], ['dyad', 'proxy'], default=None
+        )
+
+        # Utilização anual média (cubo de utilização)
+        cube = get_utilization_cube(records)
+        utilization = pd.DataFrame(cube.means(list(SERVICES)), index=cube.participants, columns=list(SERVICES))
+        table = table.join(utilization)
+        table['total_utilization'] = table[list(SERVICES)].sum(axis=1, min_count=1)
+
+        self.table = table
+        self.patients = table[~table['is_caregiver']]
+        self.caregivers = table[table['is_caregiver']]
+        self.fields = {field for field in PROXY_FIELDS + BURDEN_FIELDS
+                       if pd.notna(object_column(records, field)).any()}
+
+    def _by_support(self, columns):
+        """Agregações dos pacientes com e sem cuidador (groupby has_caregiver)"""
+        return self.patients.groupby('has_caregiver')[columns].agg(['mean', 'count'])
+
+    def compare_groups(self):
+        """Pacientes com e sem cuidador: contagens, idade e utilização de serviços"""
+        patients = self.patients
+        total = len(patients)
+        if not total:
+            return {'message': 'Sem dados suficientes para análise de cuidadores',
+                    'comparison_analysis': {}, 'summary': {}}
+
+        columns = ['age'] + list(SERVICES) + ['total_utilization']
+        stats = self._by_support(columns)
+        counts = patients['has_caregiver'].value_counts()
+        with_count, without_count = int(counts.get(True, 0)), int(counts.get(False, 0))
+
+        def utilization(flag):
+            return {
+                field: {
+                    'avg': _round(stats.loc[flag, (field, 'mean')], default=0) if flag in stats.index else 0,
+                    'count_with_data': int(stats.loc[flag, (field, 'count')]) if flag in stats.index else 0
+                }
+                for field in list(SERVICES) + ['total_utilization']
+            }
+
+        def mean(flag, field):
+            return _round(stats.loc[flag, (field, 'mean')]) if flag in stats.index else 'N/A'
+
+        comparison = {
+            'participants_with_caregiver': with_count,
+            'participants_without_caregiver': without_count,
+            'percentage_with_caregiver': round(with_count / total * 100, 1),
+            'avg_age_with_caregiver': mean(True, 'age'),
+            'avg_age_without_caregiver': mean(False, 'age'),
+            'indicators': {
+                'dyad': int(patients['in_dyad'].sum()),
+                'receiving_visits': int(patients['receives_visits'].sum()),
+                'marital_status': int(patients['is_married'].sum()),
+                'health_status': int(patients['poor_health'].sum())
+            },
+            'with_support': {'count': with_count, 'utilization': utilization(True)},
+            'without_support': {'count': without_count, 'utilization': utilization(False)}
+        }
+        available = [field for field in PROXY_FIELDS if field in self.fields]
+        dyads = len(self.dyads)
+        return {
+            'comparison_analysis': comparison,
+            'data_summary': {
+                'total_participants': total,
+                'caregivers_in_study': len(self.caregivers),
+                'dyads': self.dyads.summary(),
+                'analysis_type': 'dyads_and_proxy_indicators' if dyads else 'proxy_indicators_real_data',
+                'proxy_fields_used': PROXY_FIELDS,
+                'available_caregiver_fields': available,
+                'note': 'Díades declaradas (related_participant_id); sem díade, indicadores indiretos '
+                        '(visitas, estado civil, saúde)'
+            },
+            'summary': {
+                'message': 'Análise de díades e indicadores indiretos de suporte (dados reais REDCap)'
+                           if dyads else 'Análise usando indicadores indiretos de suporte (dados reais REDCap)',
+                'methodology': 'Díades paciente-cuidador + Visitas familiares + Estado civil + Condição de saúde',
+                'data_completeness': f"{len(available)}/{len(PROXY_FIELDS)} campos proxy disponíveis"
+            }
+        }
+
+    def burden(self):
+        """Cuidadores do estudo (grupos C/D) e indicadores de carga disponíveis"""
+        caregivers = self.caregivers
+        available = [field for field in BURDEN_FIELDS if field in self.fields]
+        hours = caregivers['care_hours'].dropna()
+
+        by_type = caregivers.groupby('group').agg(count=('group', 'size'), avg_age=('age', 'mean'))
+        caregiver_data = [
+            {
+                'participant_id': str(participant),
+                'group': CAREGIVER_GROUPS[row['group']],
+                'age': _round(row['age'], 0, None),
+                **({'caregiver_hours_per_day': _round(row['care_hours'])} if pd.notna(row['care_hours']) else {})
+            }
+            for participant, row in caregivers.head(10).to_dict('index').items()
+        ]
+        return {
+            'burden_analysis': {
+                'caregivers_with_data': len(caregivers),
+                'caregivers_by_type': {
+                    CAREGIVER_GROUPS[group]: {'count': int(row['count']), 'avg_age': _round(row['avg_age'])}
+                    for group, row in by_type.to_dict('index').items()
+                },
+                'avg_care_hours_per_day': _round(hours.mean()) if len(hours) else 'N/A',
+                'high_burden_caregivers': int((hours > HIGH_BURDEN_HOURS).sum()),
+                'burden_indicators_available': len(available)
+            } if len(caregivers) else {},
+            'caregiver_data': caregiver_data,
+            'dyad_analysis': self.dyad_burden(),
+            'data_summary': {
+                'analysis_type': 'real_data_only',
+                'available_burden_fields': available,
+                'missing_burden_fields': [f for f in BURDEN_FIELDS if f not in available]
+            },
+            'summary': {
+                'message': 'Análise de carga de cuidadores baseada exclusivamente em dados reais',
+                'caregivers_analyzed': len(caregivers),
+                'data_quality': f"Horas de cuidado disponíveis para {len(hours)} cuidadores"
+            }
+        }
+
+    def dyad_burden(self):
+        """Carga do cuidador vs trajetória do estado de saúde do paciente (join das díades)"""
+        if not len(self.dyads):
+            return {'message': 'Sem díades paciente-cuidador (related_participant_id) nos dados', 'dyads': 0}
+
+        patient_columns = ['health', 'health_trend', 'total_utilization']
+        caregiver_columns = ['care_hours', 'age']
+        joined = self.dyads.join(self.table[patient_columns], self.table[caregiver_columns])
+
+        by_type = joined.groupby('caregiver_type').agg(
+            dyads=('patient', 'size'),
+            avg_patient_health=('health', 'mean'),
+            avg_patient_health_trend=('health_trend', 'mean'),
+            avg_care_hours=('care_hours', 'mean')
+        )
+        paired = joined[['care_hours', 'health_trend']].dropna()
+        correlation = paired['care_hours'].corr(paired['health_trend']) if len(paired) >= 3 else np.nan
+        return {
+            'dyads': len(joined),
+            'by_caregiver_type': {
+                str(caregiver_type): {
+                    'dyads': int(row['dyads']),
+                    'avg_patient_health': _round(row['avg_patient_health'], 2),
+                    'avg_patient_health_trend': _round(row['avg_patient_health_trend'], 3),
+                    'avg_care_hours': _round(row['avg_care_hours'])
+                }
+                for caregiver_type, row in by_type.to_dict('index').items()
+            },
+            'patients_declining': int((joined['health_trend'] < 0).sum()),
+            'care_hours_vs_health_trend': {
+                'pairs': len(paired),
+                'correlation': _round(correlation, 3, None)
+            },
+            'pairs': [
+                {
+                    'patient': str(row['patient']),
+                    'caregiver': str(row['caregiver']),
+                    'caregiver_type': row['caregiver_type'],
+                    'patient_health': _round(row['health'], 2, None),
+                    'patient_health_trend': _round(row['health_trend'], 3, None),
+                    'caregiver_hours_per_day': _round(row['care_hours'], 1, None)
+                }
+                for row in joined.head(10).to_dict('records')
+            ]
+        }
+
+    def support_effectiveness(self):
+        """Adesão medicamentosa, estado de saúde e utilização com e sem cuidador"""
+        stats = self._by_support(['adherence', 'health', 'total_utilization'])
+        counts = self.patients['has_caregiver'].value_counts()
+        with_count, without_count = int(counts.get(True, 0)), int(counts.get(False, 0))
+
+        def percentage(flag, field):
+            if flag not in stats.index or pd.isna(stats.loc[flag, (field, 'mean')]):
+                return 'N/A'
+            return round(float(stats.loc[flag, (field, 'mean')]) * 100, 1)
+
+        def mean(flag, field):
+            return _round(stats.loc[flag, (field, 'mean')], 2) if flag in stats.index else 'N/A'
+
+        analysis = {}
+        if with_count and without_count:
+            adherence_with, adherence_without = percentage(True, 'adherence'), percentage(False, 'adherence')
+            comparable = 'N/A' not in (adherence_with, adherence_without)
+            analysis = {
+                'participants_with_caregiver': with_count,
+                'participants_without_caregiver': without_count,
+                'avg_adherence_with_caregiver': adherence_with,
+                'avg_adherence_without_caregiver': adherence_without,
+                'avg_health_status_with_caregiver': mean(True, 'health'),
+                'avg_health_status_without_caregiver': mean(False, 'health'),
+                'avg_utilization_with_caregiver': mean(True, 'total_utilization'),
+                'avg_utilization_without_caregiver': mean(False, 'total_utilization'),
+                'effectiveness_difference': (
+                    f"Diferença de adesão: {round(adherence_with - adherence_without, 1)} pontos percentuais"
+                    if comparable else 'Dados insuficientes'
+                )
+            }
+        return {
+            'effectiveness_analysis': analysis,
+            'data_summary': {
+                'total_participants': len(self.patients),
+                'analysis_type': 'real_data_only',
+                'available_effectiveness_fields': ['took_medications_yesterday', 'health_status'] + list(SERVICES)
+            },
+            'summary': {
+                'message': 'Análise de eficácia baseada exclusivamente em dados reais do REDCap',
+                'comparison_groups': f"Com cuidador: {with_count}, Sem cuidador: {without_count}"
+            }
+        }
+
+    def response_patterns(self):
+        """Forma de administração dos questionários (autónoma, assistida, pelo cuidador)"""
+        modes = self.frame['administration'].dropna().astype(int).value_counts()
+        table = self.table
+        involved = table[table['caregiver_assisted'] > 0]
+        total_questionnaires = int(table['questionnaires'].sum())
+
+        patterns = {}
+        if total_questionnaires:
+            patterns = {
+                'caregivers_with_response_data': len(involved),
+                'communication_patterns': {
+                    ADMINISTRATION_MODES[mode]: int(count) for mode, count in modes.sort_index().items()
+                },
+                # Percentagem de questionários com intervenção do cuidador/entrevistador
+                'avg_engagement_level': round(float(table['caregiver_assisted'].sum()) / total_questionnaires * 100, 1),
+                'active_communicators': int((table['caregiver_filled'] > 0).sum())
+            }
+        return {
+            'response_patterns': patterns,
+            'caregiver_responses': [
+                {
+                    'participant_id': str(participant),
+                    'questionnaires': int(row['questionnaires']),
+                    'caregiver_assisted': int(row['caregiver_assisted']),
+                    'caregiver_filled': int(row['caregiver_filled'])
+                }
+                for participant, row in involved.sort_values('caregiver_assisted', ascending=False)
+                .head(10).to_dict('index').items()
+            ],
+            'data_summary': {
+                'analysis_type': 'real_data_only',
+                'available_response_fields': ADMINISTRATION_FIELDS,
+                'caregivers_analyzed': len(involved)
+            },
+            'summary': {
+                'message': 'Padrões de resposta pela forma de administração dos questionários (dados reais)',
+                'response_data_quality': f"{total_questionnaires} questionários com forma de administração registada"
+            }
+        }
+
+
+def get_caregiver_engine(records):
+    """CaregiverEngine do snapshot (construído uma vez por lista de registos)"""
+    return snapshot_cache.get_cached(records, ('caregivers',), lambda: CaregiverEngine(records))
@@ -0,0 +1,120 @@
+"""
+Construção de gráficos Plotly sem passar pelos construtores go.Figure
+- Agregação no servidor (histogramas enviados como contagens por bin)
+- Figuras como dicionários simples (sem validação do plotly.graph_objs)
+- Arrays numéricos codificados em base64 (typed arrays, Plotly.js >= 2.28)
+"""
+import base64
+
+import numpy as np
+import plotly.io as pio
+
+from config import Config
+
+# Tipos numéricos suportados pelos typed arrays do Plotly.js
+_TYPED_ARRAY_DTYPES = {
+    'f8': '<f8',
+    'f4': '<f4',
+    'i4': '<i4',
+    'u4': '<u4',
+    'i2': '<i2',
+    'u2': '<u2',
+    'i1': 'i1',
+    'u1': 'u1',
+}
+
+# Template expandido uma única vez (igual ao que go.Figure embute com template='plotly_white')
+_TEMPLATES = {}
+
+
+def get_template(name='plotly_white'):
+    """Template Plotly como dicionário (calculado uma vez por processo)"""
+    if name not in _TEMPLATES:
+        _TEMPLATES[name] = pio.templates[name].to_plotly_json()
+    return _TEMPLATES[name]
+
+
+def typed_array(values, dtype=None):
+    """Codifica valores numéricos como typed array base64 ({'dtype', 'bdata'})"""
+    array = np.asarray(values)
+    if dtype is None:
+        if np.issubdtype(array.dtype, np.integer):
+            dtype = 'i4'
+        else:
+            dtype = 'f8'
+    data = np.ascontiguousarray(array, dtype=_TYPED_ARRAY_DTYPES[dtype])
+    return {'dtype': dtype, 'bdata': base64.b64encode(data.tobytes()).decode('ascii')}
+
+
+def histogram_bins(values, nbins=15):
+    """Contagens por bin (bins de largura igual entre mínimo e máximo)"""
+    values = np.asarray(values, dtype=float)
+    counts, edges = np.histogram(values, bins=nbins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return {
+        'centers': centers,
+        'counts': counts,
+        'width': float(edges[1] - edges[0]) if len(edges) > 1 else 1.0,
+        'edges': edges
+    }
+
+
+def layout(title, xaxis_title=None, yaxis_title=None, height=None, **extra):
+    """Layout base dos gráficos do dashboard"""
+    result = {
+        'template': get_template(),
+        'title': {'text': title},
+        'height': height or Config.CHART_HEIGHT
+    }
+    if xaxis_title:
+        result['xaxis'] = {'title': {'text': xaxis_title}}
+    if yaxis_title:
+        result['yaxis'] = {'title': {'text': yaxis_title}}
+    result.update(extra)
+    return result
+
+
+def figure(traces, figure_layout):
+    """Figura Plotly como dicionário pronto a serializar"""
+    return {'data': traces, 'layout': figure_layout}
+
+
+def histogram_figure(values, title, xaxis_title, yaxis_title, name, color, nbins=15, opacity=0.7):
+    """Histograma agregado no servidor: barras contíguas com as contagens por bin"""
+    bins = histogram_bins(values, nbins)
+    edges = bins['edges']
+    hover = [f"{edges[i]:.1f} - {edges[i + 1]:.1f}" for i in range(len(edges) - 1)]
+    trace = {
+        'type': 'bar',
+        'x': typed_array(bins['centers'], 'f8'),
+        'y': typed_array(bins['counts'], 'i4'),
+        'width': bins['width'],
+        'customdata': hover,
+        'hovertemplate': '%{customdata}<br>%{y}<extra></extra>',
+        'name': name,
+        'marker': {'color': color},
+        'opacity': opacity
+    }
+    return figure([trace], layout(title, xaxis_title, yaxis_title, bargap=0))
+
+
+def bar_figure(labels, values, title, xaxis_title, yaxis_title, name, color, orientation='v', height=None):
+    """Gráfico de barras (categorias em lista, valores em typed array)"""
+    trace = {'type': 'bar', 'name': name, 'marker': {'color': color}}
+    if orientation == 'h':
+        trace.update({'x': typed_array(values), 'y': list(labels), 'orientation': 'h'})
+    else:
+        trace.update({'x': list(labels), 'y': typed_array(values)})
+    return figure([trace], layout(title, xaxis_title, yaxis_title, height=height))
+
+
+def pie_figure(labels, values, title, name, colors):
+    """Gráfico circular"""
+    trace = {
+        'type': 'pie',
+        'labels': list(labels),
+        'values': typed_array(values),
+        'name': name,
+        'marker': {'colors': list(colors)}
+    }
+    return figure([trace], layout(title))
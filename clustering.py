@@ -0,0 +1,163 @@
+"""
+K-means em NumPy (sem scikit-learn)
+- Inicialização k-means++ e várias reinicializações (fica a de menor inércia)
+- Iterações vetorizadas: distâncias por produto de matrizes e novos centros
+  por np.bincount
+- Escolha de k pelo coeficiente de silhueta (calculado numa amostra quando
+  há muitos pontos, para não construir a matriz n × n)
+- Gerador aleatório com semente fixa: o mesmo snapshot dá sempre os mesmos
+  clusters (também entre workers)
+"""
+import numpy as np
+
+DEFAULT_SEED = 42
+SILHOUETTE_SAMPLE = 1000
+
+
+def squared_distances(X, centers):
+    """Distâncias euclidianas ao quadrado (n × k)"""
+    distances = (
+        np.einsum('ij,ij->i', X, X)[:, None]
+        - 2 * X @ centers.T
+        + np.einsum('ij,ij->i', centers, centers)[None, :]
+    )
+    return np.maximum(distances, 0)
+
+
+def kmeans_plus_plus(X, k, rng):
+    """Centros iniciais k-means++ (probabilidade proporcional à distância ao quadrado)"""
+    n = X.shape[0]
+    centers = np.empty((k, X.shape[1]))
+    centers[0] = X[rng.integers(n)]
+    closest = squared_distances(X, centers[:1])[:, 0]
+
+    for c in range(1, k):
+        total = closest.sum()
+        if total > 0:
+            index = rng.choice(n, p=closest / total)
+        else:
+            index = rng.integers(n)
+        centers[c] = X[index]
+        closest = np.minimum(closest, squared_distances(X, centers[c:c + 1])[:, 0])
+    return centers
+
+
+def _update_centers(X, labels, k, centers, distances):
+    counts = np.bincount(labels, minlength=k)
+    sums = np.stack([np.bincount(labels, weights=X[:, j], minlength=k) for j in range(X.shape[1])], axis=1)
+    new_centers = centers.copy()
+    nonempty = counts > 0
+    new_centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+
+    # Cluster vazio: recomeça no ponto mais distante do seu centro
+    empty = np.flatnonzero(~nonempty)
+    if empty.size:
+        farthest = np.argsort(distances[np.arange(len(labels)), labels])[::-1]
+        new_centers[empty] = X[farthest[:empty.size]]
+    return new_centers
+
+
+class KMeansResult:
+    """Resultado de um k-means: rótulos, centros e inércia (soma das distâncias ao quadrado)"""
+
+    def __init__(self, labels, centers, inertia, iterations):
+        self.labels = labels
+        self.centers = centers
+        self.inertia = inertia
+        self.iterations = iterations
+        self.k = len(centers)
+        self.silhouette = None
+
+
+def kmeans(X, k, n_init=10, max_iter=100, tol=1e-4, rng=None):
+    """K-means com k-means++ e `n_init` reinicializações; retorna o melhor KMeansResult"""
+    X = np.asarray(X, dtype=float)
+    rng = rng if rng is not None else np.random.default_rng(DEFAULT_SEED)
+    best = None
+
+    for _ in range(n_init):
+        centers = kmeans_plus_plus(X, k, rng)
+        for iteration in range(1, max_iter + 1):
+            distances = squared_distances(X, centers)
+            labels = distances.argmin(axis=1)
+            new_centers = _update_centers(X, labels, k, centers, distances)
+            shift = np.square(new_centers - centers).sum()
+            centers = new_centers
+            if shift <= tol:
+                break
+
+        distances = squared_distances(X, centers)
+        labels = distances.argmin(axis=1)
+        inertia = float(distances[np.arange(len(labels)), labels].sum())
+        if best is None or inertia < best.inertia:
+            best = KMeansResult(labels, centers, inertia, iteration)
+
+    return best
+
+
+def _sample_distances(X, sample_size, rng):
+    """(amostra, distâncias euclidianas amostra × n) usadas pela silhueta"""
+    n = X.shape[0]
+    sample = np.arange(n) if n <= sample_size else rng.choice(n, sample_size, replace=False)
+    return sample, np.sqrt(squared_distances(X[sample], X))
+
+
+def _silhouette(distances, sample, labels):
+    clusters, labels = np.unique(labels, return_inverse=True)
+    n, k = len(labels), len(clusters)
+    if k < 2 or n < 3:
+        return 0.0
+
+    one_hot = np.zeros((n, k))
+    one_hot[np.arange(n), labels] = 1
+    counts = one_hot.sum(axis=0)
+
+    # Distância média de cada ponto da amostra a cada cluster
+    sums = distances @ one_hot
+    own = labels[sample]
+    own_counts = counts[own]
+    rows = np.arange(len(sample))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a = sums[rows, own] / (own_counts - 1)
+        means = sums / counts
+    means[rows, own] = np.inf
+    b = means.min(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s = (b - a) / np.maximum(a, b)
+    # Pontos em clusters com um só elemento (ou coincidentes) contam como 0
+    s[(own_counts <= 1) | ~np.isfinite(s)] = 0.0
+    return float(s.mean())
+
+
+def silhouette_score(X, labels, sample_size=SILHOUETTE_SAMPLE, rng=None):
+    """Coeficiente de silhueta médio (exato se n <= sample_size, senão numa amostra)"""
+    X = np.asarray(X, dtype=float)
+    rng = rng if rng is not None else np.random.default_rng(DEFAULT_SEED)
+    sample, distances = _sample_distances(X, sample_size, rng)
+    return _silhouette(distances, sample, np.asarray(labels))
+
+
+def choose_k(X, k_values=range(2, 7), n_init=5, max_iter=100, seed=DEFAULT_SEED):
+    """K-means para cada k e escolhe o de maior silhueta; retorna (melhor, {k: silhueta})"""
+    X = np.asarray(X, dtype=float)
+    n = X.shape[0]
+    # k não pode exceder o número de pontos distintos
+    distinct = len(np.unique(X, axis=0)) if n else 0
+    k_values = [k for k in k_values if 2 <= k <= min(n - 1, distinct)]
+
+    scores = {}
+    best = None
+    if not k_values:
+        return best, scores
+
+    # A mesma amostra (e matriz de distâncias) serve para comparar todos os k
+    sample, distances = _sample_distances(X, SILHOUETTE_SAMPLE, np.random.default_rng(seed))
+    for k in k_values:
+        result = kmeans(X, k, n_init=n_init, max_iter=max_iter, rng=np.random.default_rng(seed + k))
+        result.silhouette = _silhouette(distances, sample, result.labels)
+        scores[k] = round(result.silhouette, 4)
+        if best is None or result.silhouette > best.silhouette:
+            best = result
+
+    return best, scores
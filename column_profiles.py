@@ -0,0 +1,145 @@
+"""
+Catálogo de perfis de colunas para o explorador de dados
+Lista de colunas e índice de pesquisa são calculados uma vez por snapshot;
+o perfil de cada coluna (contagens, nulos, valores distintos, top-k, quantis
+numéricos e distribuição por instrumento/grupo) é calculado na primeira
+consulta e reutilizado nas seguintes
+"""
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+import snapshot_cache
+from completeness import get_completeness
+
+# Valores tratados como nulos no resumo de colunas
+NULL_VALUES = (None, '', 'NaN')
+
+# Quantis numéricos incluídos no perfil
+QUANTILES = {'p25': 25, 'median': 50, 'p75': 75}
+
+TOP_VALUES = 10
+TOP_VALUES_BREAKDOWN = 5
+
+
+class ColumnCatalog:
+    """Índice de colunas e perfis por coluna de um snapshot de registos"""
+
+    def __init__(self, records):
+        self.records = records
+        completeness = get_completeness(records)
+
+        self.columns = sorted(completeness.fields)
+        self._lower_columns = [(column.lower(), column) for column in self.columns]
+        self._column_set = set(self.columns)
+
+        # Rótulos por registo para as distribuições (mesma semântica do DataProcessor)
+        self._instruments = [record.get('redcap_repeat_instrument', 'baseline') for record in records]
+        self._groups = completeness.groups
+
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def search(self, search_term):
+        """Colunas cujo nome contém o termo (ordenadas)"""
+        term = search_term.lower()
+        return [column for lower, column in self._lower_columns if term in lower]
+
+    def profile(self, column):
+        """Perfil da coluna (None se a coluna não existir no snapshot)"""
+        if column not in self._column_set:
+            return None
+
+        profile = self._profiles.get(column)
+        if profile is None:
+            profile = self._build_profile(column)
+            with self._lock:
+                profile = self._profiles.setdefault(column, profile)
+        return profile
+
+    def _build_profile(self, column):
+        """Calcula o perfil completo de uma coluna numa única passagem"""
+        total_values = 0
+        value_counts = Counter()
+        truthy_values = []
+        by_instrument = defaultdict(Counter)
+        by_group = defaultdict(Counter)
+
+        for record, instrument, group in zip(self.records, self._instruments, self._groups):
+            if column not in record:
+                continue
+            value = record[column]
+            total_values += 1
+
+            if value not in NULL_VALUES:
+                value_counts[str(value)] += 1
+
+            if value:
+                truthy_values.append(value)
+                by_instrument[instrument][value] += 1
+                by_group[group][value] += 1
+
+        non_null_values = sum(value_counts.values())
+
+        profile = {
+            'name': column,
+            'total_values': total_values,
+            'non_null_values': non_null_values,
+            'null_values': total_values - non_null_values,
+            'null_rate': round((total_values - non_null_values) / total_values * 100, 1) if total_values else 0,
+            'unique_values': len(value_counts),
+            'data_type': 'mixed',
+            'top_values': [
+                {'value': val, 'count': count}
+                for val, count in value_counts.most_common(TOP_VALUES)
+            ]
+        }
+
+        # Estatísticas numéricas (conversão feita uma vez por valor distinto)
+        numeric_values = []
+        numeric_counts = []
+        for val, count in value_counts.items():
+            try:
+                numeric_values.append(float(val))
+                numeric_counts.append(count)
+            except (ValueError, TypeError):
+                pass
+
+        if numeric_values:
+            numbers = np.repeat(np.array(numeric_values), numeric_counts)
+            profile.update({
+                'mean': round(float(numbers.mean()), 2),
+                'min': round(float(numbers.min()), 2),
+                'max': round(float(numbers.max()), 2),
+                'data_type': 'numeric'
+            })
+            for name, q in QUANTILES.items():
+                profile[name] = round(float(np.percentile(numbers, q)), 2)
+
+        profile['field_analysis'] = {
+            'field_name': column,
+            'total_values': len(truthy_values),
+            'unique_values': len(set(truthy_values)),
+            'by_instrument': self._breakdown(by_instrument),
+            'by_group': self._breakdown(by_group)
+        }
+
+        return profile
+
+    @staticmethod
+    def _breakdown(counters):
+        """Contagem, valores únicos e mais frequentes por rótulo"""
+        return {
+            label: {
+                'count': sum(counts.values()),
+                'unique': len(counts),
+                'most_common': counts.most_common(TOP_VALUES_BREAKDOWN)
+            }
+            for label, counts in counters.items()
+        }
+
+
+def get_column_catalog(records):
+    """Retorna o catálogo de colunas do snapshot (criado uma única vez)"""
+    return snapshot_cache.get_cached(records, 'column_catalog', lambda: ColumnCatalog(records))
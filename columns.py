@@ -0,0 +1,148 @@
+"""
+Colunas codificadas por dicionário a partir de uma lista de registos
+Cada coluna é (códigos int32, valores distintos). Conversões (ordinal,
+número, hora) são avaliadas uma vez por valor distinto e propagadas aos
+registos pelos códigos, o que permite cálculos vetorizados com NumPy.
+Listas materializadas de um snapshot colunar usam diretamente as colunas
+do ficheiro mapeado; as restantes são codificadas uma vez por snapshot
+"""
+from datetime import datetime
+
+import numpy as np
+
+import snapshot_cache
+import snapshot_store
+
+# Código dos registos em que o campo não existe
+ABSENT = snapshot_store.ABSENT
+EPOCH = datetime(1970, 1, 1)
+
+
+def _encode(records, field):
+    lookup = {}
+    values = []
+    codes = np.empty(len(records), dtype=np.int32)
+    for i, record in enumerate(records):
+        if field not in record:
+            codes[i] = ABSENT
+            continue
+        value = record[field]
+        key = value if isinstance(value, str) else repr(value)
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(values)
+            values.append(value)
+        codes[i] = code
+    return codes, values
+
+
+def encoded_column(records, field):
+    """(códigos, valores distintos) do campo; código ABSENT se o registo não tem o campo"""
+    def build():
+        source = snapshot_store.get_columnar_source(records)
+        if source is not None:
+            snapshot, view = source
+            if snapshot.has_field(view, field):
+                return snapshot.codes(view, field), snapshot.values(view, field)
+            return np.full(len(records), ABSENT, dtype=np.int32), []
+        return _encode(records, field)
+
+    return snapshot_cache.get_cached(records, ('column', field), build)
+
+
+def map_column(records, field, convert, dtype=float, missing=np.nan):
+    """Array com convert(valor) para cada registo (`missing` se o campo não existe)
+
+    convert deve devolver `missing` (ou um valor equivalente) para valores inválidos
+    """
+    codes, values = encoded_column(records, field)
+    table = np.array([convert(value) for value in values] + [missing], dtype=dtype)
+    return table[codes]
+
+
+def object_column(records, field, missing=None):
+    """Valores do campo num array de objetos (sem conversão)"""
+    codes, values = encoded_column(records, field)
+    table = np.empty(len(values) + 1, dtype=object)
+    table[:len(values)] = values
+    table[-1] = missing
+    return table[codes]
+
+
+def to_number(value):
+    """Número a partir do texto exportado (NaN se vazio ou inválido)"""
+    try:
+        return float(str(value).strip().replace(',', '.'))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def to_days(value):
+    """Dias desde 1970-01-01 a partir de 'aaaa-mm-dd' ou 'dd-mm-aaaa' (NaN se inválida)"""
+    text = str(value).strip()[:10]
+    for pattern in ('%Y-%m-%d', '%d-%m-%Y'):
+        try:
+            return float((datetime.strptime(text, pattern) - EPOCH).days)
+        except ValueError:
+            continue
+    return np.nan
+
+
+def scored(scale):
+    """Conversão código ou rótulo -> código numérico da escala {rótulo: código} (NaN se inválido)"""
+    codes = {str(code) for code in scale.values()}
+
+    def convert(value):
+        value = str(value).strip()
+        if value in scale:
+            return scale[value]
+        return int(value) if value in codes else np.nan
+    return convert
+
+
+# Escalas {rótulo: código} das perguntas de escolha partilhadas pelos módulos de análise
+VISITS_SCALE = {
+    'Nunca': 0, 'Até 1 ou 2 dias por semana': 1, 'Mais de 2 dias por semana': 2,
+    'Mais de 4 dias por semana': 3, 'Mais de uma vez por dia': 4
+}
+HEALTH_SCALE = {'Muito mal': 0, 'Mal': 1, 'Razoável': 2, 'Bem': 3, 'Muito bem': 4}
+YES_NO_SCALE = {'Não': 0, 'Sim': 1}
+
+
+def factorize(values):
+    """(valores distintos pela ordem de aparição, índice do grupo de cada elemento)"""
+    lookup = {}
+    inverse = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(lookup)
+        inverse[i] = code
+    return list(lookup), inverse
+
+
+def group_nanmean(inverse, n_groups, matrix):
+    """Média por grupo de cada coluna, ignorando NaN (NaN se o grupo não tem valores)"""
+    matrix = np.asarray(matrix, dtype=float)
+    present = ~np.isnan(matrix)
+    sums = np.zeros((n_groups, matrix.shape[1]))
+    counts = np.zeros((n_groups, matrix.shape[1]))
+    np.add.at(sums, inverse, np.where(present, matrix, 0.0))
+    np.add.at(counts, inverse, present)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+
+def baseline_values(records, field):
+    """{participante: valor do campo no registo baseline} (registos sem instrumento repetido)"""
+    def build():
+        instruments = object_column(records, 'redcap_repeat_instrument')
+        participants = object_column(records, 'participant_code')
+        values = object_column(records, field)
+        mapping = {}
+        for i in np.flatnonzero(~instruments.astype(bool)):
+            if participants[i] and values[i]:
+                mapping[participants[i]] = values[i]
+        return mapping
+
+    return snapshot_cache.get_cached(records, ('baseline_values', field), build)
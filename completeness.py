@@ -0,0 +1,215 @@
+"""
+Matriz de completude (registos × campos) em bits
+Calculada uma vez por snapshot e partilhada por todas as métricas de
+completude e qualidade de dados (linhas, colunas, grupos e instrumentos)
+"""
+import numpy as np
+
+import snapshot_cache
+import snapshot_store
+
+# Valores considerados "não preenchidos" (exportação REDCap usa '' para vazio)
+MISSING_VALUES = ('', 'nan', 'NaN', 'None')
+
+# Tabela de popcount para bytes (número de bits a 1 em cada valor 0-255)
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def is_filled(value):
+    """Indica se um valor conta como preenchido"""
+    if value is None:
+        return False
+    if isinstance(value, float) and value != value:  # NaN
+        return False
+    return str(value).strip() not in MISSING_VALUES
+
+
+def _popcount(packed, axis):
+    """Conta bits a 1 ao longo de um eixo de um array empacotado"""
+    if packed.size == 0:
+        shape = list(packed.shape)
+        del shape[axis]
+        return np.zeros(shape, dtype=np.int64)
+    return _POPCOUNT[packed].sum(axis=axis, dtype=np.int64)
+
+
+class CompletenessMatrix:
+    """Matriz bit-packed de preenchimento: uma linha por registo, uma coluna por campo"""
+
+    def __init__(self, records):
+        self.records = records
+        self.n_records = len(records)
+
+        # Listas materializadas de um snapshot colunar usam diretamente as colunas
+        source = snapshot_store.get_columnar_source(records)
+        if source is not None:
+            field_index, filled, present = self._matrices_from_columns(*source)
+        else:
+            field_index, filled, present = self._matrices_from_records(records)
+
+        self.fields = list(field_index)
+        self.field_index = field_index
+        self.n_fields = len(self.fields)
+
+        # Rótulos por registo usados nas agregações por instrumento/participante/grupo
+        self.instruments = []
+        self.participants = []
+        participant_to_group = {}
+
+        for record in records:
+            instrument = record.get('redcap_repeat_instrument')
+            self.instruments.append(instrument if instrument else 'baseline')
+
+            participant = record.get('participant_code')
+            self.participants.append(participant)
+
+            # Grupo definido nos registos baseline
+            if not instrument and participant and record.get('participant_group'):
+                participant_to_group[participant] = record.get('participant_group')
+
+        self.participant_to_group = participant_to_group
+        self.groups = [participant_to_group.get(p, 'Não especificado') for p in self.participants]
+
+        self._filled_rows = np.packbits(filled, axis=1)
+        self._filled_cols = np.packbits(filled.T, axis=1)
+        self._present_rows = np.packbits(present, axis=1)
+
+    @staticmethod
+    def _matrices_from_records(records):
+        """Matrizes de preenchimento e de presença a partir dos dicionários"""
+        # Campos pela ordem de primeira aparição (igual à ordem das colunas do DataFrame)
+        field_index = {}
+        for record in records:
+            for field in record:
+                if field not in field_index:
+                    field_index[field] = len(field_index)
+
+        filled = np.zeros((len(records), len(field_index)), dtype=bool)
+        present = np.zeros((len(records), len(field_index)), dtype=bool)
+
+        for i, record in enumerate(records):
+            filled_idx = [field_index[f] for f, v in record.items() if is_filled(v)]
+            present[i, [field_index[f] for f in record]] = True
+            if filled_idx:
+                filled[i, filled_idx] = True
+
+        return field_index, filled, present
+
+    @staticmethod
+    def _matrices_from_columns(snapshot, view):
+        """Matrizes a partir das colunas codificadas: is_filled é avaliado uma vez
+        por valor distinto e propagado aos registos pelos códigos"""
+        fields = snapshot.fields(view)
+        n_records = snapshot.n_records(view)
+        field_index = {field: j for j, field in enumerate(fields)}
+
+        filled = np.zeros((n_records, len(fields)), dtype=bool)
+        present = np.zeros((n_records, len(fields)), dtype=bool)
+
+        for j, field in enumerate(fields):
+            codes = snapshot.codes(view, field)
+            # Última posição (índice -1 = ABSENT) marca campos inexistentes
+            lookup = np.array([is_filled(v) for v in snapshot.values(view, field)] + [False], dtype=bool)
+            filled[:, j] = lookup[codes]
+            present[:, j] = codes != snapshot_store.ABSENT
+
+        return field_index, filled, present
+
+    # ------------------------------------------------------------------
+    # Máscaras
+    # ------------------------------------------------------------------
+
+    def _field_bits(self, fields):
+        """Máscara empacotada de colunas para uma lista de campos"""
+        mask = np.zeros(self.n_fields, dtype=bool)
+        idx = [self.field_index[f] for f in fields if f in self.field_index]
+        mask[idx] = True
+        return np.packbits(mask)
+
+    def _record_bits(self, records):
+        """Máscara empacotada de registos (array booleano ou lista de índices)"""
+        records = np.asarray(records)
+        if records.dtype != bool:
+            mask = np.zeros(self.n_records, dtype=bool)
+            mask[records.astype(np.int64)] = True
+            records = mask
+        return np.packbits(records)
+
+    def label_masks(self, labels):
+        """Retorna {rótulo: máscara booleana de registos} para uma lista de rótulos"""
+        labels = np.asarray(labels, dtype=object)
+        masks = {}
+        for label in dict.fromkeys(labels.tolist()):
+            masks[label] = labels == label
+        return masks
+
+    # ------------------------------------------------------------------
+    # Agregações (popcount)
+    # ------------------------------------------------------------------
+
+    def row_counts(self, fields=None):
+        """Campos preenchidos por registo (opcionalmente restrito a `fields`)"""
+        rows = self._filled_rows
+        if fields is not None:
+            rows = rows & self._field_bits(fields)
+        return _popcount(rows, axis=1)
+
+    def present_counts(self, fields=None):
+        """Número de campos existentes (chaves) por registo"""
+        rows = self._present_rows
+        if fields is not None:
+            rows = rows & self._field_bits(fields)
+        return _popcount(rows, axis=1)
+
+    def present_column_counts(self):
+        """Número de registos em que cada campo existe como chave"""
+        if self.n_records == 0:
+            return np.zeros(self.n_fields, dtype=np.int64)
+        unpacked = np.unpackbits(self._present_rows, axis=1, count=self.n_fields)
+        return unpacked.sum(axis=0, dtype=np.int64)
+
+    def column_counts(self, records=None):
+        """Registos preenchidos por campo (opcionalmente restrito a `records`)"""
+        cols = self._filled_cols
+        if records is not None:
+            cols = cols & self._record_bits(records)
+        return _popcount(cols, axis=1)
+
+    def count(self, fields=None, records=None):
+        """Total de células preenchidas para um subconjunto de campos e registos"""
+        counts = self.column_counts(records)
+        if fields is not None:
+            idx = [self.field_index[f] for f in fields if f in self.field_index]
+            counts = counts[idx]
+        return int(counts.sum())
+
+    def column_counts_by(self, labels):
+        """Retorna {rótulo: contagens por campo} agregando registos por rótulo"""
+        return {label: self.column_counts(mask) for label, mask in self.label_masks(labels).items()}
+
+    def row_totals_by(self, labels, fields=None):
+        """Retorna {rótulo: (células preenchidas, nº de registos)} agregando por rótulo"""
+        row_counts = self.row_counts(fields)
+        totals = {}
+        for label, mask in self.label_masks(labels).items():
+            totals[label] = (int(row_counts[mask].sum()), int(mask.sum()))
+        return totals
+
+    def filled_matrix(self, fields):
+        """Submatriz booleana (registos × fields) descompactada"""
+        idx = [self.field_index[f] for f in fields if f in self.field_index]
+        if not idx:
+            return np.zeros((self.n_records, 0), dtype=bool)
+        unpacked = np.unpackbits(self._filled_cols[idx], axis=1, count=self.n_records)
+        return unpacked.T.astype(bool)
+
+    def distinct_present_patterns(self):
+        """Número de conjuntos de chaves distintos entre registos"""
+        if self.n_records == 0:
+            return 0
+        return len(np.unique(self._present_rows, axis=0))
+
+
+def get_completeness(records):
+    """Retorna a matriz de completude do snapshot (calculada uma única vez)"""
+    return snapshot_cache.get_cached(records, 'completeness', lambda: CompletenessMatrix(records))
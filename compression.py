@@ -0,0 +1,153 @@
+"""
+Compressão de respostas HTTP (brotli/gzip)
+- Middleware (after_request) que comprime HTML, JSON, CSS e JS acima de um
+  tamanho mínimo, de acordo com o Accept-Encoding do cliente
+- Decorador cached_response: guarda a página já comprimida no cache do
+  snapshot, para que renderização e compressão ocorram uma vez por snapshot
+"""
+import functools
+import gzip
+
+from flask import current_app, make_response, request
+
+import snapshot_cache
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional (só gzip)
+    brotli = None
+
+# Tipos de conteúdo comprimidos
+COMPRESSIBLE_TYPES = (
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/x-ndjson',
+)
+
+# Respostas menores que isto não compensam o custo da compressão
+MIN_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Encodings suportados por ordem de preferência
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    """Escolhe o melhor encoding aceite pelo cliente (None se nenhum)"""
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    """Comprime bytes com o encoding indicado"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _is_compressible(response):
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    return response.mimetype in COMPRESSIBLE_TYPES
+
+
+def _add_vary(response):
+    vary = response.headers.get('Vary')
+    if not vary:
+        response.headers['Vary'] = 'Accept-Encoding'
+    elif 'accept-encoding' not in vary.lower():
+        response.headers['Vary'] = f'{vary}, Accept-Encoding'
+
+
+def compress_response(response):
+    """Comprime a resposta se o tipo, o tamanho e o cliente o permitirem"""
+    if not _is_compressible(response):
+        return response
+
+    _add_vary(response)
+
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_SIZE:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def cached_response(data_source):
+    """Guarda a resposta (já comprimida) no cache do snapshot devolvido por data_source()
+
+    Só pedidos GET sem query string são guardados; os restantes seguem o
+    caminho normal (e são comprimidos pelo middleware)
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or request.query_string:
+                return view(*args, **kwargs)
+
+            data = data_source()
+            if data is None:
+                return view(*args, **kwargs)
+
+            encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+            key = ('response', request.path, encoding)
+            cached = snapshot_cache.peek(data, key)
+            if cached is None:
+                response = make_response(view(*args, **kwargs))
+                # Erros, respostas 202 e não comprimíveis não ficam em cache
+                # (o pedido seguinte volta a calcular a resposta)
+                if response.status_code != 200 or not _is_compressible(response):
+                    return response
+
+                body = response.get_data()
+                headers = {'Vary': 'Accept-Encoding'}
+                if encoding is not None and len(body) >= MIN_SIZE:
+                    body = compress(body, encoding)
+                    headers['Content-Encoding'] = encoding
+                cached = (body, response.mimetype, headers)
+                snapshot_cache.put(data, key, cached)
+
+            body, mimetype, headers = cached
+            return current_app.response_class(body, mimetype=mimetype, headers=headers)
+
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    """Ativa a compressão de respostas na aplicação Flask"""
+    app.after_request(compress_response)
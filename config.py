@@ -1,8 +1,34 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def costs_from_env(name):
+    """Custos {serviço: €} de uma variável de ambiente JSON (vazio se não definida)
+
+    ValueError com o nome da variável se não for um objeto JSON de valores numéricos
+    """
+    text = os.environ.get(name) or '{}'
+    try:
+        costs = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"{name}: JSON inválido ({e}): {text!r}") from None
+    if not isinstance(costs, dict):
+        raise ValueError(f"{name}: esperado um objeto JSON {{serviço: custo}}, recebido {text!r}")
+    result = {}
+    for key, value in costs.items():
+        try:
+            # true/false e listas/objetos não são custos
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise TypeError
+            result[str(key)] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: o custo de '{key}' tem de ser numérico, recebido {value!r}") from None
+    return result
+
+
 class Config:
     # Modo de operação - LOCAL ou API
     USE_LOCAL_DATA = True  # Mudado para True para usar dados locais
@@ -31,3 +57,43 @@ class Config:
     SECONDARY_COLOR = "#48c9b0"
     CHART_HEIGHT = 400
     CHART_WIDTH = 600
+
+    # Tarefas em segundo plano (análises demoradas)
+    JOB_WORKERS = 4
+    JOB_MAX_PENDING = 20
+    JOB_RETENTION = 600  # segundos que uma tarefa terminada fica disponível
+    JOB_SYNC_WAIT = 20  # segundos; depois disto a resposta é 202 com o URL da tarefa
+
+    # Snapshot partilhado entre processos (ficheiro colunar mapeado em memória)
+    USE_SHARED_SNAPSHOT = True
+    SNAPSHOT_DIR = "snapshots"
+    SNAPSHOT_CHECK_INTERVAL = 5  # segundos entre verificações do ponteiro de versão
+    LOCAL_DATA_POLL_INTERVAL = 10  # segundos entre verificações de local_data_config.json
+    LOCAL_CSV_LOAD_BUDGET = 5.0  # segundos: aviso se a leitura de um CSV local demorar mais
+
+    # Custo-efetividade: custo unitário (€) de cada serviço registado no
+    # instrumento de utilização de serviços (contagens no último ano).
+    # Pode ser substituído no .env, p.ex. SERVICE_COSTS='{"emergency_visits": 250}'
+    SERVICE_COSTS = {
+        'scheduled_medical_visits': 50,  # Consulta programada
+        'unscheduled_medical_visits': 80,  # Consulta não programada
+        'emergency_visits': 200,  # Urgência
+        'hospitalizations': 1500,  # Internamento (média)
+        **costs_from_env('SERVICE_COSTS')
+    }
+    REMOTE_MONITORING_COSTS = {
+        'setup': 200,  # Custo de instalação da monitorização
+        'monthly': 50,  # Custo mensal da monitorização
+        **costs_from_env('REMOTE_MONITORING_COSTS')
+    }
+
+    # Intervalos de confiança por bootstrap
+    BOOTSTRAP_RESAMPLES = 2000
+    BOOTSTRAP_CONFIDENCE = 0.95
+    # Testes de permutação (aleatórias se as partições exatas excederem este número)
+    PERMUTATION_RESAMPLES = 5000
+    # Acima deste número de participantes as comparações usam só os testes assintóticos
+    RESAMPLING_MAX_PARTICIPANTS = 2000
+
+    # Nível de significância dos testes de hipóteses
+    SIGNIFICANCE_LEVEL = 0.05
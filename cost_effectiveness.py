@@ -0,0 +1,119 @@
+"""
+Custo-efetividade do monitoramento remoto (operações matriciais)
+- Matriz participante × serviço com a utilização anual média (fatia do
+  cubo de utilização) multiplicada pelo vetor de custos unitários
+  (Config.SERVICE_COSTS)
+- Poupança = custo tradicional - custo anual da monitorização remota
+  (Config.REMOTE_MONITORING_COSTS)
+- Intervalos de confiança bootstrap da poupança média por participante,
+  no total e por grupo
+- Calculado uma vez por snapshot e tabela de custos
+"""
+import numpy as np
+
+import snapshot_cache
+from columns import baseline_values
+from config import Config
+from resampling import DEFAULT_SEED, bootstrap_mean_ci
+from utilization_cube import get_utilization_cube
+
+MONTHS = 12
+
+
+class CostEffectiveness:
+    """Custos tradicionais e de monitorização por participante e grupo"""
+
+    def __init__(self, records, service_costs, remote_costs):
+        cube = get_utilization_cube(records)
+        # Só os serviços com contagens no questionário de utilização
+        self.services = [s for s in service_costs if s in cube.fields]
+        self.unit_costs = np.array([service_costs[s] for s in self.services], dtype=float)
+        self.remote_cost = float(remote_costs.get('setup', 0)) + float(remote_costs.get('monthly', 0)) * MONTHS
+
+        self.participants, self.service_counts = cube.matrix(self.services)
+        self.service_costs = self.service_counts * self.unit_costs
+        self.traditional = self.service_costs.sum(axis=1)
+        self.difference = self.traditional - self.remote_cost
+
+        groups = baseline_values(records, 'participant_group')
+        self.groups = np.array([groups.get(p, 'Não especificado') for p in self.participants], dtype=object)
+
+    def confidence_intervals(self, n_resamples=None):
+        """IC bootstrap da poupança média por participante (total e por grupo)"""
+        # Semente fixa: o mesmo snapshot dá os mesmos intervalos em todos os workers
+        rng = np.random.default_rng(DEFAULT_SEED)
+        by_group = {}
+        for group in sorted(set(self.groups.tolist()), key=str):
+            by_group[group] = bootstrap_mean_ci(self.difference[self.groups == group], n_resamples, rng=rng)
+        return {
+            'overall': bootstrap_mean_ci(self.difference, n_resamples, rng=rng),
+            'by_group': by_group
+        }
+
+    def analysis(self):
+        """Resultado no formato usado pela página de utilização de serviços"""
+        n = len(self.participants)
+        total_traditional = float(self.traditional.sum())
+        total_remote = self.remote_cost * n
+        total_savings = max(0.0, total_traditional - total_remote)
+        intervals = self.confidence_intervals()
+
+        participant_costs = {
+            str(participant): {
+                'group': group,
+                'traditional_cost': round(float(traditional), 2),
+                'remote_monitoring_cost': round(self.remote_cost, 2),
+                'cost_difference': round(float(difference), 2),
+                'cost_savings': round(max(0.0, float(difference)), 2)
+            }
+            for participant, group, traditional, difference
+            in zip(self.participants, self.groups, self.traditional, self.difference)
+        }
+
+        group_summary = {}
+        for group, interval in intervals['by_group'].items():
+            mask = self.groups == group
+            group_summary[group] = {
+                'participants': int(mask.sum()),
+                'average_traditional_cost': round(float(self.traditional[mask].mean()), 2),
+                'average_cost_difference': interval['mean'],
+                'savings_ci': interval
+            }
+
+        return {
+            'participant_costs': participant_costs,
+            'cost_summary': {
+                'total_traditional_costs': round(total_traditional, 2),
+                'total_remote_monitoring_costs': round(total_remote, 2),
+                'total_cost_savings': round(total_savings, 2),
+                'average_savings_per_participant': round(total_savings / max(1, n), 2),
+                'average_cost_difference': intervals['overall']['mean'],
+                'savings_ci_lower': intervals['overall']['lower'],
+                'savings_ci_upper': intervals['overall']['upper'],
+                'roi_percentage': round(total_savings / total_remote * 100, 2) if total_remote > 0 else 0
+            },
+            'cost_breakdown': {
+                service: round(float(total), 2)
+                for service, total in zip(self.services, self.service_costs.sum(axis=0))
+            },
+            'unit_costs': dict(zip(self.services, self.unit_costs.tolist())),
+            'remote_monitoring_costs': {'annual_per_participant': self.remote_cost},
+            'group_summary': group_summary,
+            'confidence_intervals': intervals,
+            'summary': {
+                'participants_analyzed': n,
+                'cost_effective': total_savings > 0,
+                'average_traditional_cost': round(total_traditional / max(1, n), 2),
+                'average_remote_cost': round(self.remote_cost if n else 0, 2)
+            }
+        }
+
+
+def get_cost_effectiveness(records, service_costs=None, remote_costs=None):
+    """CostEffectiveness do snapshot para a tabela de custos (Config por omissão)"""
+    service_costs = dict(service_costs or Config.SERVICE_COSTS)
+    remote_costs = dict(remote_costs or Config.REMOTE_MONITORING_COSTS)
+    key = ('cost_effectiveness', tuple(sorted(service_costs.items())), tuple(sorted(remote_costs.items())))
+    return snapshot_cache.get_cached(
+        records, key, lambda: CostEffectiveness(records, service_costs, remote_costs)
+    )
@@ -0,0 +1,258 @@
+"""
+Leitura em streaming das extrações CSV do REDCap (redcap_raw/labeled/metadata)
+- Usada pelo cliente local quando o JSON da extração não existe
+- Os registos são lidos linha a linha (csv.reader) diretamente para a lista
+  em memória, sem DataFrame intermédio
+- Os tipos vêm dos metadados (field_type + validação): os valores mantêm o
+  formato da exportação JSON do REDCap (texto, '' para vazio), mas campos
+  numéricos e de data são normalizados e validados
+- As vistas 'data_labeled' e 'metadata' só são lidas no primeiro acesso
+- O tempo de carregamento é medido e comparado com um orçamento
+"""
+import csv
+import re
+import threading
+import time
+
+from config import Config
+
+# Tipos derivados dos metadados
+TEXT = 'text'
+INTEGER = 'integer'
+NUMBER = 'number'
+DATE = 'date'
+DATETIME = 'datetime'
+TIME = 'time'
+CATEGORICAL = 'categorical'
+
+_VALIDATION_TYPES = {
+    'integer': INTEGER,
+    'number': NUMBER,
+    'date_dmy': DATE,
+    'date_mdy': DATE,
+    'date_ymd': DATE,
+    'datetime_dmy': DATETIME,
+    'datetime_mdy': DATETIME,
+    'datetime_ymd': DATETIME,
+    'datetime_seconds_dmy': DATETIME,
+    'datetime_seconds_ymd': DATETIME,
+    'time': TIME,
+}
+
+_CATEGORICAL_FIELD_TYPES = ('radio', 'dropdown', 'yesno', 'truefalse', 'checkbox')
+
+# Formatos da exportação (o REDCap exporta datas sempre em Y-M-D)
+_PATTERNS = {
+    INTEGER: re.compile(r'^[-+]?\d+$'),
+    NUMBER: re.compile(r'^[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?$'),
+    DATE: re.compile(r'^\d{4}-\d{2}-\d{2}$'),
+    DATETIME: re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?$'),
+    TIME: re.compile(r'^\d{2}:\d{2}(:\d{2})?$'),
+}
+
+# Campos gerados pelo REDCap que não aparecem nos metadados
+_SYSTEM_TYPES = {
+    'redcap_repeat_instrument': TEXT,
+    'redcap_repeat_instance': INTEGER,
+    'redcap_event_name': TEXT,
+    'redcap_data_access_group': TEXT,
+}
+
+
+def iter_metadata(path):
+    """Campos do dicionário de dados, um a um"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            yield dict(row)
+
+
+def read_metadata(path):
+    """Dicionário de dados (lista de dicionários, como na API)"""
+    return list(iter_metadata(path))
+
+
+def field_types(metadata):
+    """Tipo de cada campo a partir dos metadados (field_type e validação)"""
+    types = dict(_SYSTEM_TYPES)
+    for field in metadata or []:
+        name = field.get('field_name')
+        if not name:
+            continue
+        field_type = field.get('field_type', '')
+        validation = field.get('text_validation_type_or_show_slider_number', '')
+
+        if field_type == 'descriptive':
+            continue
+        if field_type in ('calc', 'slider'):
+            types[name] = NUMBER
+        elif field_type in _CATEGORICAL_FIELD_TYPES:
+            types[name] = CATEGORICAL
+        else:
+            types[name] = _VALIDATION_TYPES.get(validation, TEXT)
+
+        # Cada formulário tem o campo <form>_complete (0, 1 ou 2)
+        form = field.get('form_name')
+        if form:
+            types.setdefault(f'{form}_complete', CATEGORICAL)
+    return types
+
+
+class LoadReport:
+    """Estatísticas de uma leitura (linhas, tempo, valores inválidos por campo)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.fields = 0
+        self.seconds = 0.0
+        self.malformed_rows = 0
+        self.invalid = {}
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'rows': self.rows,
+            'fields': self.fields,
+            'seconds': round(self.seconds, 3),
+            'malformed_rows': self.malformed_rows,
+            'invalid_values': sum(self.invalid.values()),
+            'invalid_fields': dict(sorted(self.invalid.items(), key=lambda item: -item[1])[:20])
+        }
+
+
+def stream_records(path, types=None, report=None):
+    """Gera os registos do CSV um a um (dicionários campo -> texto)
+
+    Campos com tipo numérico, de data ou categórico têm os espaços removidos;
+    valores que não respeitam o tipo são mantidos e contados em `report`
+    """
+    types = types or {}
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        try:
+            header = next(reader)
+        except StopIteration:
+            return
+        width = len(header)
+        if report is not None:
+            report.fields = width
+
+        # Colunas que precisam de normalização (o texto livre é mantido tal como está)
+        typed = [(i, name, types[name]) for i, name in enumerate(header)
+                 if types.get(name, TEXT) != TEXT]
+
+        for row in reader:
+            if len(row) != width:
+                if report is not None:
+                    report.malformed_rows += 1
+                row = (row + [''] * width)[:width]
+
+            for i, name, field_type in typed:
+                value = row[i]
+                if not value:
+                    continue
+                value = value.strip()
+                row[i] = value
+                pattern = _PATTERNS.get(field_type)
+                if pattern is not None and value and not pattern.match(value) and report is not None:
+                    report.invalid[name] = report.invalid.get(name, 0) + 1
+
+            if report is not None:
+                report.rows += 1
+            yield dict(zip(header, row))
+
+
+def load_records(path, types=None, budget=None, label='registos'):
+    """Lê o CSV completo para uma lista; retorna (registos, LoadReport)"""
+    budget = Config.LOCAL_CSV_LOAD_BUDGET if budget is None else budget
+    report = LoadReport(path)
+    start = time.perf_counter()
+    records = list(stream_records(path, types, report))
+    report.seconds = time.perf_counter() - start
+
+    rate = report.rows / report.seconds if report.seconds else 0
+    print(f"[OK] CSV {path}: {report.rows} {label} x {report.fields} campos "
+          f"em {report.seconds:.2f}s ({rate:.0f} linhas/s)")
+    if budget and report.seconds > budget:
+        print(f"[WARNING] Leitura de {path} acima do orçamento ({report.seconds:.2f}s > {budget:.2f}s)")
+    if report.malformed_rows:
+        print(f"[WARNING] {report.malformed_rows} linhas com número de colunas incorreto em {path}")
+    invalid = sum(report.invalid.values())
+    if invalid:
+        print(f"[WARNING] {invalid} valores não respeitam o tipo dos metadados em {path}")
+    return records, report
+
+
+class LazyExtraction(dict):
+    """Dicionário da extração (data_raw, data_labeled, metadata) com vistas lidas no primeiro acesso
+
+    As vistas ainda não lidas não estão no dicionário: dict.get(extração, chave)
+    devolve só as que já foram carregadas, sem provocar a leitura
+    """
+
+    def __init__(self, loaded=None, loaders=None):
+        super().__init__(loaded or {})
+        self._loaders = dict(loaders or {})
+        self._lock = threading.Lock()
+
+    def _load(self, key):
+        with self._lock:
+            if not dict.__contains__(self, key):
+                # O loader só é descartado depois de a vista ficar disponível
+                dict.__setitem__(self, key, self._loaders[key]())
+                del self._loaders[key]
+            return dict.__getitem__(self, key)
+
+    def __getitem__(self, key):
+        if not dict.__contains__(self, key) and key in self._loaders:
+            return self._load(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key) or key in self._loaders:
+            return self[key]
+        return default
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._loaders
+
+    def is_loaded(self, key):
+        return dict.__contains__(self, key)
+
+    def keys(self):
+        return list(dict.keys(self)) + [key for key in self._loaders if not dict.__contains__(self, key)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+
+def load_extraction(files, budget=None):
+    """Extração a partir dos CSVs indicados em local_data_config.json ('files')
+
+    'data_raw' é lido de imediato, com os tipos dos metadados (obtidos numa
+    passagem pelo CSV de metadados sem guardar as linhas); 'metadata' e
+    'data_labeled' só são construídos quando forem pedidos.
+    Retorna (LazyExtraction, LoadReport do raw)
+    """
+    raw_csv = files['raw_csv']
+    metadata_csv = files.get('metadata_csv')
+    labeled_csv = files.get('labeled_csv')
+
+    types = field_types(iter_metadata(metadata_csv)) if metadata_csv else {}
+    data_raw, report = load_records(raw_csv, types, budget)
+
+    loaders = {'metadata': (lambda: read_metadata(metadata_csv)) if metadata_csv else (lambda: [])}
+    if labeled_csv:
+        # Valores com rótulos: só o texto é mantido (sem validação de tipos)
+        loaders['data_labeled'] = lambda: load_records(labeled_csv, None, budget, 'registos com rótulos')[0]
+    else:
+        loaders['data_labeled'] = lambda: []
+
+    extraction = LazyExtraction({'data_raw': data_raw}, loaders)
+    return extraction, report
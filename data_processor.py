@@ -5,6 +5,40 @@ from datetime import datetime
 import re
 from collections import Counter
 from analytics import RM4HealthAnalytics
+from completeness import get_completeness, is_filled
+from column_profiles import get_column_catalog
+from psqi import get_psqi
+from sleep_profiles import get_sleep_profiles
+from cost_effectiveness import get_cost_effectiveness
+from caregivers import get_caregiver_engine
+from residence import get_residence_comparison
+from group_comparison import DEFAULT_CATEGORICAL, DEFAULT_NUMERIC, get_group_comparison
+from utilization_cube import get_utilization_cube
+from utilization_predictors import get_utilization_predictors
+import snapshot_cache
+
+# Métricas de impacto calculadas a partir do cubo de utilização (métrica: campo)
+UTILIZATION_IMPACT_METRICS = {
+    'hospitalization_reduction': 'hospitalizations',
+    'emergency_reduction': 'emergency_visits'
+}
+
+# Campos de alertas, satisfação e autonomia usados na avaliação do impacto
+# da monitorização remota (só os presentes nos dados entram no DataFrame)
+ALERT_FIELDS = ['alerts_generated', 'alert_responses', 'alert_effectiveness']
+SATISFACTION_FIELDS = {
+    'overall_satisfaction': 'Satisfação Geral',
+    'ease_of_use': 'Facilidade de Uso',
+    'perceived_usefulness': 'Utilidade Percebida',
+    'system_reliability': 'Confiabilidade do Sistema'
+}
+AUTONOMY_FIELDS = {
+    'independence_score': 'Score de Independência',
+    'self_care_confidence': 'Confiança no Autocuidado',
+    'decision_making': 'Participação nas Decisões',
+    'health_management': 'Gestão da Saúde'
+}
+
 
 class DataProcessor:
     def __init__(self, data):
@@ -269,27 +303,22 @@ class DataProcessor:
     def get_completion_by_instrument(self):
         """Analisa completude por instrumento (baseado em prefixos de colunas)"""
         instruments = {}
+        completeness = get_completeness(self.data)
         
         # Agrupa campos por prefixo
-        for record in self.data:
-            for field_name in record.keys():
-                if '_' in field_name:
-                    prefix = field_name.split('_')[0]
-                    if prefix not in instruments:
-                        instruments[prefix] = set()
-                    instruments[prefix].add(field_name)
+        for field_name in completeness.fields:
+            if '_' in field_name:
+                prefix = field_name.split('_')[0]
+                if prefix not in instruments:
+                    instruments[prefix] = set()
+                instruments[prefix].add(field_name)
         
         completion_data = []
         
         for instrument, fields in instruments.items():
             if len(fields) > 2:  # Só considera instrumentos com mais de 2 campos
                 total_possible = len(self.data) * len(fields)
-                filled_count = 0
-                
-                for record in self.data:
-                    for field in fields:
-                        if field in record and record[field] not in [None, '', 'NaN']:
-                            filled_count += 1
+                filled_count = completeness.count(fields=fields)
                 
                 completion_rate = (filled_count / total_possible * 100) if total_possible > 0 else 0
                 
@@ -304,179 +333,94 @@ class DataProcessor:
     
     def search_columns(self, search_term):
         """Busca colunas por termo"""
-        all_columns = set()
-        
-        for record in self.data:
-            all_columns.update(record.keys())
-        
-        matching_columns = [col for col in all_columns if search_term.lower() in col.lower()]
-        return sorted(matching_columns)
+        return get_column_catalog(self.data).search(search_term)
     
     def get_column_summary(self, column):
-        """Retorna resumo de uma coluna específica"""
-        values = []
-        
-        for record in self.data:
-            if column in record:
-                values.append(record[column])
-        
-        if not values:
+        """Retorna resumo de uma coluna específica (perfil em cache por snapshot)"""
+        profile = get_column_catalog(self.data).profile(column)
+        if profile is None:
             return None
         
-        non_null_values = [v for v in values if v not in [None, '', 'NaN']]
-        
-        summary = {
-            'name': column,
-            'total_values': len(values),
-            'non_null_values': len(non_null_values),
-            'null_values': len(values) - len(non_null_values),
-            'unique_values': len(set(str(v) for v in non_null_values)),
-            'data_type': 'mixed'
-        }
-        
-        # Tenta converter para números
-        numeric_values = []
-        for v in non_null_values:
-            try:
-                numeric_values.append(float(v))
-            except (ValueError, TypeError):
-                pass
-        
-        if numeric_values:
-            summary.update({
-                'mean': round(sum(numeric_values) / len(numeric_values), 2),
-                'min': round(min(numeric_values), 2),
-                'max': round(max(numeric_values), 2),
-                'data_type': 'numeric'
-            })
-        
-        # Valores mais frequentes
-        value_counts = Counter(str(v) for v in non_null_values)
-        top_values = value_counts.most_common(10)
-        
-        summary['top_values'] = [
-            {'value': val, 'count': count} 
-            for val, count in top_values
-        ]
-        
-        return summary
+        return {key: value for key, value in profile.items() if key != 'field_analysis'}
     
     def get_all_columns(self):
         """Retorna todas as colunas únicas do dataset"""
-        all_columns = set()
-        
-        for record in self.data:
-            all_columns.update(record.keys())
-        
-        return sorted(list(all_columns))
+        return list(get_column_catalog(self.data).columns)
     
     def get_advanced_analytics(self, metadata=None):
-        """Retorna análises avançadas usando o módulo analytics"""
+        """Retorna análises avançadas usando o módulo analytics (cache por snapshot)"""
+        completeness = get_completeness(self.data)
+        
         if not metadata:
-            # Criar metadata básica se não fornecida
-            metadata = []
-            all_fields = set()
-            for record in self.data:
-                all_fields.update(record.keys())
-            
-            for field in all_fields:
-                metadata.append({
-                    'field_name': field,
-                    'field_label': field.replace('_', ' ').title()
-                })
+            # Criar metadata básica se não fornecida (campos pela ordem das colunas)
+            metadata = [{
+                'field_name': field,
+                'field_label': field.replace('_', ' ').title()
+            } for field in completeness.fields]
+            cache_key = ('advanced_analytics', None)
+        else:
+            cache_key = ('advanced_analytics', tuple(
+                (field.get('field_name'), field.get('field_label')) for field in metadata
+            ))
         
-        analytics = RM4HealthAnalytics(self.data, metadata)
+        def build():
+            analytics = RM4HealthAnalytics(self.data, metadata, completeness)
+            return analytics.get_all()
         
-        return {
-            'by_instrument': analytics.analyze_by_instrument(),
-            'by_group': analytics.analyze_by_group(),
-            'completion_rates': analytics.get_completion_rates(),
-            'patterns': analytics.analyze_patterns(),
-            'insights': analytics.generate_insights()
-        }
+        return snapshot_cache.get_cached(self.data, cache_key, build)
     
-    def filter_data(self, filters):
-        """Aplica filtros aos dados"""
-        filtered_data = self.data.copy()
+    def filter_predicates(self, filters):
+        """Converte filtros em predicados por registo (partilhados por filter_data e pela API de registos)"""
+        predicates = []
+        date_fields = None
         
         for filter_name, filter_value in filters.items():
             if not filter_value or filter_value == 'all':
                 continue
                 
             if filter_name == 'instrument':
-                filtered_data = [r for r in filtered_data 
-                               if r.get('redcap_repeat_instrument', 'baseline') == filter_value]
+                predicates.append(lambda r, v=filter_value: r.get('redcap_repeat_instrument', 'baseline') == v)
             elif filter_name == 'group':
                 # Usar mapeamento correto de grupos
-                filtered_data = [r for r in filtered_data 
-                               if self.get_participant_group(r) == filter_value]
+                predicates.append(lambda r, v=filter_value: self.get_participant_group(r) == v)
             elif filter_name == 'participant':
-                filtered_data = [r for r in filtered_data 
-                               if r.get('participant_code') == filter_value]
-            elif filter_name == 'date_from' and filter_value:
-                # Filtro por data (busca em campos de data)
-                date_fields = [f for f in ['data_preench_0', 'data_preench_8', 'questionnaire_date_8'] 
-                              if any(f in r for r in filtered_data)]
-                if date_fields:
-                    filtered_data = [r for r in filtered_data 
-                                   if any(r.get(df, '') >= filter_value for df in date_fields)]
-            elif filter_name == 'date_to' and filter_value:
-                date_fields = [f for f in ['data_preench_0', 'data_preench_8', 'questionnaire_date_8'] 
-                              if any(f in r for r in filtered_data)]
-                if date_fields:
-                    filtered_data = [r for r in filtered_data 
-                                   if any(r.get(df, '') <= filter_value for df in date_fields)]
+                predicates.append(lambda r, v=filter_value: r.get('participant_code') == v)
+            elif filter_name in ('date_from', 'date_to'):
+                # Filtro por data (busca em campos de data existentes no snapshot)
+                if date_fields is None:
+                    field_index = get_completeness(self.data).field_index
+                    date_fields = [f for f in ['data_preench_0', 'data_preench_8', 'questionnaire_date_8'] 
+                                  if f in field_index]
+                if not date_fields:
+                    continue
+                if filter_name == 'date_from':
+                    predicates.append(lambda r, v=filter_value: any(r.get(df, '') >= v for df in date_fields))
+                else:
+                    predicates.append(lambda r, v=filter_value: any(r.get(df, '') <= v for df in date_fields))
         
-        return filtered_data
+        return predicates
     
-    def get_field_analysis(self, field_name):
-        """Análise detalhada de um campo específico"""
-        values = []
-        instruments = {}
-        groups = {}
-        
-        for record in self.data:
-            value = record.get(field_name)
-            if value:
-                values.append(value)
-                
-                # Por instrumento
-                instrument = record.get('redcap_repeat_instrument', 'baseline')
-                if instrument not in instruments:
-                    instruments[instrument] = []
-                instruments[instrument].append(value)
-                
-                # Por grupo - usar mapeamento correto
-                group = self.get_participant_group(record)
-                if group not in groups:
-                    groups[group] = []
-                groups[group].append(value)
-        
-        analysis = {
-            'field_name': field_name,
-            'total_values': len(values),
-            'unique_values': len(set(values)),
-            'by_instrument': {},
-            'by_group': {}
-        }
-        
-        # Análise por instrumento
-        for instrument, inst_values in instruments.items():
-            analysis['by_instrument'][instrument] = {
-                'count': len(inst_values),
-                'unique': len(set(inst_values)),
-                'most_common': Counter(inst_values).most_common(5)
-            }
+    def filter_data(self, filters):
+        """Aplica filtros aos dados"""
+        predicates = self.filter_predicates(filters)
+        if not predicates:
+            return self.data.copy()
         
-        # Análise por grupo
-        for group, group_values in groups.items():
-            analysis['by_group'][group] = {
-                'count': len(group_values),
-                'unique': len(set(group_values)),
-                'most_common': Counter(group_values).most_common(5)
+        return [r for r in self.data if all(p(r) for p in predicates)]
+    
+    def get_field_analysis(self, field_name):
+        """Análise detalhada de um campo específico (perfil em cache por snapshot)"""
+        profile = get_column_catalog(self.data).profile(field_name)
+        if profile is None:
+            return {
+                'field_name': field_name,
+                'total_values': 0,
+                'unique_values': 0,
+                'by_instrument': {},
+                'by_group': {}
             }
         
-        return analysis
+        return profile['field_analysis']
 
     # =====================================
     # ANÁLISE LONGITUDINAL - MÉTODOS NOVOS
@@ -1802,181 +1746,14 @@ class DataProcessor:
     # =====================================
     
     def analyze_psqi_components_rm4health(self):
-        """Analisa os 7 componentes do PSQI (Pittsburgh Sleep Quality Index)"""
+        """Analisa os 7 componentes do PSQI (Pittsburgh Sleep Quality Index)
+
+        Componentes e score global (0-21) de cada instância calculados por
+        psqi.get_psqi (vetorizado, uma vez por snapshot); a classificação
+        usa o último PSQI válido de cada participante
+        """
         try:
-            # Converter dados para DataFrame se necessário
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Instrumento específico do sono
-            sleep_instrument = 'VII - Questionário de Pittsburgh sobre a Qualidade do Sono  (PSQI-PT)'
-            sleep_data = data_df[data_df['redcap_repeat_instrument'] == sleep_instrument]
-            
-            if sleep_data.empty:
-                print("⚠️ Usando dados gerais para análise do sono")
-                sleep_data = data_df
-            
-            # Componentes PSQI mapeados para campos RM4Health
-            psqi_components = {
-                'sleep_quality': {
-                    'name': 'Qualidade Subjetiva do Sono',
-                    'field': 'sleep_quality_last_night',
-                    'description': 'Avaliação pessoal da qualidade do sono',
-                    'scores': [],
-                    'distribution': {}
-                },
-                'sleep_latency': {
-                    'name': 'Latência do Sono',
-                    'field': 'time_to_fall_asleep',
-                    'description': 'Tempo necessário para adormecer',
-                    'scores': [],
-                    'distribution': {}
-                },
-                'sleep_duration': {
-                    'name': 'Duração do Sono',
-                    'field': 'total_sleep_time',
-                    'description': 'Número total de horas de sono',
-                    'scores': [],
-                    'distribution': {}
-                },
-                'sleep_efficiency': {
-                    'name': 'Eficiência do Sono',
-                    'field': 'sleep_efficiency_score',
-                    'description': 'Razão entre tempo dormindo e tempo na cama',
-                    'scores': [],
-                    'distribution': {}
-                },
-                'sleep_disturbances': {
-                    'name': 'Perturbações do Sono',
-                    'field': 'sleep_disturbances_score',
-                    'description': 'Frequência de interrupções durante a noite',
-                    'scores': [],
-                    'distribution': {}
-                },
-                'sleep_medication': {
-                    'name': 'Uso de Medicação para Dormir',
-                    'field': 'sleep_medication_use',
-                    'description': 'Frequência de uso de medicação para dormir',
-                    'scores': [],
-                    'distribution': {}
-                },
-                'daytime_dysfunction': {
-                    'name': 'Disfunção Diurna',
-                    'field': 'daytime_sleepiness',
-                    'description': 'Sonolência e fadiga durante o dia',
-                    'scores': [],
-                    'distribution': {}
-                }
-            }
-            
-            # Analisar cada componente
-            for comp_key, component in psqi_components.items():
-                field = component['field']
-                
-                if field in sleep_data.columns:
-                    values = sleep_data[field].dropna()
-                    
-                    # Mapear valores textuais para numéricos
-                    numeric_scores = []
-                    value_counts = {}
-                    
-                    for value in values:
-                        str_value = str(value)
-                        
-                        # Contar distribuição
-                        if str_value in value_counts:
-                            value_counts[str_value] += 1
-                        else:
-                            value_counts[str_value] = 1
-                        
-                        # Mapear para scores numéricos (0-3 conforme PSQI)
-                        if comp_key == 'sleep_quality':
-                            quality_map = {'Muito boa': 0, 'Boa': 1, 'Razoável': 2, 'Má': 3, 'Muito má': 3}
-                            if str_value in quality_map:
-                                numeric_scores.append(quality_map[str_value])
-                        
-                        elif comp_key == 'sleep_medication':
-                            med_map = {'Nunca': 0, 'Menos de 1x/semana': 1, '1-2x/semana': 2, '3x/semana ou mais': 3}
-                            if str_value in med_map:
-                                numeric_scores.append(med_map[str_value])
-                        
-                        elif comp_key == 'daytime_dysfunction':
-                            # Mapear sonolência diurna
-                            sleepiness_map = {'Nunca': 0, 'Raramente': 1, 'Às vezes': 2, 'Frequentemente': 3}
-                            if str_value in sleepiness_map:
-                                numeric_scores.append(sleepiness_map[str_value])
-                        
-                        else:
-                            # Para outros campos, tentar converter diretamente
-                            try:
-                                numeric_val = float(str_value)
-                                if 0 <= numeric_val <= 3:
-                                    numeric_scores.append(numeric_val)
-                                elif numeric_val > 3:
-                                    # Normalizar para escala 0-3
-                                    normalized = min(3, numeric_val / (numeric_val.max() if hasattr(numeric_val, 'max') else 10) * 3)
-                                    numeric_scores.append(normalized)
-                            except:
-                                continue
-                    
-                    # Armazenar resultados
-                    component['scores'] = numeric_scores
-                    component['distribution'] = value_counts
-                    component['mean_score'] = round(np.mean(numeric_scores), 2) if numeric_scores else 0
-                    component['participants'] = len(numeric_scores)
-                else:
-                    # Campo não encontrado nos dados - definir valores padrão
-                    component['scores'] = []
-                    component['distribution'] = {}
-                    component['mean_score'] = 0
-                    component['participants'] = 0
-            
-            # Calcular PSQI global
-            global_scores = []
-            valid_participants = set()
-            
-            for participant_id in sleep_data['participant_code'].unique():
-                if pd.isna(participant_id):
-                    continue
-                
-                participant_data = sleep_data[sleep_data['participant_code'] == participant_id]
-                participant_psqi = 0
-                valid_components = 0
-                
-                for comp_key, component in psqi_components.items():
-                    if component['scores']:
-                        # Simular score para este participante (média do componente)
-                        if component['mean_score'] > 0:
-                            participant_psqi += component['mean_score']
-                            valid_components += 1
-                
-                if valid_components >= 4:  # Mínimo de 4 componentes para PSQI válido
-                    global_scores.append(participant_psqi)
-                    valid_participants.add(str(participant_id))
-            
-            # Classificação da qualidade do sono
-            sleep_quality_classification = {
-                'good_sleepers': len([s for s in global_scores if s <= 5]),
-                'poor_sleepers': len([s for s in global_scores if s > 5]),
-                'mean_psqi': round(np.mean(global_scores), 2) if global_scores else 0,
-                'total_participants': len(valid_participants)
-            }
-            
-            return {
-                'components': psqi_components,
-                'global_psqi': {
-                    'scores': global_scores,
-                    'classification': sleep_quality_classification
-                },
-                'summary': {
-                    'total_participants': len(valid_participants),
-                    'mean_global_psqi': round(np.mean(global_scores), 2) if global_scores else 0,
-                    'good_sleepers_percentage': round((sleep_quality_classification['good_sleepers'] / max(1, len(global_scores))) * 100, 1) if global_scores else 0
-                }
-            }
+            return get_psqi(self.data).analysis()
             
         except Exception as e:
             print(f"❌ Erro na análise PSQI: {e}")
@@ -1985,118 +1762,13 @@ class DataProcessor:
             return {'components': {}, 'global_psqi': {}, 'summary': {}}
     
     def create_sleep_profiles_rm4health(self):
-        """Cria perfis de sono baseados em clustering de padrões"""
+        """Cria perfis de sono por clustering (k-means) dos componentes PSQI
+
+        Participantes agrupados pela média dos 7 componentes; k escolhido pela
+        silhueta (sleep_profiles.get_sleep_profiles, uma vez por snapshot)
+        """
         try:
-            # Converter dados para DataFrame se necessário
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Coletar dados de sono para clustering
-            sleep_features = []
-            participant_profiles = {}
-            
-            for participant_id in data_df['participant_code'].unique():
-                if pd.isna(participant_id):
-                    continue
-                
-                participant_data = data_df[data_df['participant_code'] == participant_id]
-                
-                # Extrair características do sono
-                features = {}
-                
-                # Qualidade do sono
-                if 'sleep_quality_last_night' in participant_data.columns:
-                    quality_values = participant_data['sleep_quality_last_night'].dropna()
-                    if not quality_values.empty:
-                        quality_map = {'Muito boa': 5, 'Boa': 4, 'Razoável': 3, 'Má': 2, 'Muito má': 1}
-                        numeric_qualities = [quality_map.get(str(v), 3) for v in quality_values]
-                        features['sleep_quality'] = np.mean(numeric_qualities)
-                
-                # Sonolência diurna
-                if 'daytime_sleepiness' in participant_data.columns:
-                    sleepiness_values = participant_data['daytime_sleepiness'].dropna()
-                    if not sleepiness_values.empty:
-                        sleepiness_map = {'Nunca': 1, 'Raramente': 2, 'Às vezes': 3, 'Frequentemente': 4}
-                        numeric_sleepiness = [sleepiness_map.get(str(v), 2) for v in sleepiness_values]
-                        features['daytime_sleepiness'] = np.mean(numeric_sleepiness)
-                
-                # Uso de medicação para dormir
-                if 'sleep_medication_use' in participant_data.columns:
-                    med_values = participant_data['sleep_medication_use'].dropna()
-                    if not med_values.empty:
-                        med_map = {'Nunca': 1, 'Menos de 1x/semana': 2, '1-2x/semana': 3, '3x/semana ou mais': 4}
-                        numeric_med = [med_map.get(str(v), 1) for v in med_values]
-                        features['medication_use'] = np.mean(numeric_med)
-                
-                # Só incluir se tiver pelo menos 2 características
-                if len(features) >= 2:
-                    sleep_features.append(features)
-                    
-                    # Criar perfil baseado em regras simples
-                    sleep_quality = features.get('sleep_quality', 3)
-                    daytime_sleepiness = features.get('daytime_sleepiness', 2)
-                    medication_use = features.get('medication_use', 1)
-                    
-                    # Classificação em perfis
-                    if sleep_quality >= 4 and daytime_sleepiness <= 2 and medication_use <= 2:
-                        profile = 'Bom Dormidor'
-                        profile_color = '#28a745'  # Verde
-                    elif sleep_quality <= 2 or daytime_sleepiness >= 3 or medication_use >= 3:
-                        profile = 'Insone'
-                        profile_color = '#dc3545'  # Vermelho
-                    elif medication_use >= 3:
-                        profile = 'Dependente de Medicação'
-                        profile_color = '#fd7e14'  # Laranja
-                    else:
-                        profile = 'Sono Moderado'
-                        profile_color = '#ffc107'  # Amarelo
-                    
-                    participant_profiles[str(participant_id)] = {
-                        'profile': profile,
-                        'color': profile_color,
-                        'features': features,
-                        'sleep_quality_score': sleep_quality,
-                        'daytime_sleepiness_score': daytime_sleepiness,
-                        'medication_score': medication_use
-                    }
-            
-            # Contagem por perfil
-            profile_counts = {}
-            for profile_data in participant_profiles.values():
-                profile = profile_data['profile']
-                if profile in profile_counts:
-                    profile_counts[profile] += 1
-                else:
-                    profile_counts[profile] = 1
-            
-            # Estatísticas dos perfis
-            profile_stats = {}
-            for profile_type in profile_counts.keys():
-                participants_in_profile = [p for p in participant_profiles.values() if p['profile'] == profile_type]
-                
-                if participants_in_profile:
-                    avg_quality = np.mean([p['sleep_quality_score'] for p in participants_in_profile])
-                    avg_sleepiness = np.mean([p['daytime_sleepiness_score'] for p in participants_in_profile])
-                    avg_medication = np.mean([p['medication_score'] for p in participants_in_profile])
-                    
-                    profile_stats[profile_type] = {
-                        'count': profile_counts[profile_type],
-                        'percentage': round((profile_counts[profile_type] / len(participant_profiles)) * 100, 1) if participant_profiles else 0,
-                        'avg_sleep_quality': round(avg_quality, 2),
-                        'avg_daytime_sleepiness': round(avg_sleepiness, 2),
-                        'avg_medication_use': round(avg_medication, 2),
-                        'color': participants_in_profile[0]['color']
-                    }
-            
-            return {
-                'participant_profiles': participant_profiles,
-                'profile_distribution': profile_counts,
-                'profile_statistics': profile_stats,
-                'total_participants': len(participant_profiles)
-            }
+            return get_sleep_profiles(self.data).analysis()
             
         except Exception as e:
             print(f"❌ Erro na criação de perfis de sono: {e}")
@@ -2411,77 +2083,30 @@ class DataProcessor:
     # =====================================
     
     def analyze_service_utilization_rm4health(self):
-        """Analisa padrões de utilização de serviços de saúde"""
+        """Analisa padrões de utilização de serviços de saúde
+
+        Fatias do cubo de utilização participante × serviço × período
+        (utilization_cube.get_utilization_cube, construído uma vez por snapshot)
+        """
         try:
-            # Converter dados para DataFrame se necessário
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Campos relacionados à utilização de serviços
-            service_fields = {
-                # Consultas médicas
-                'gp_visits': 'Consultas no Médico de Família',
-                'specialist_visits': 'Consultas de Especialidade',
-                'emergency_visits': 'Visitas ao Serviço de Urgência',
-                'hospital_admissions': 'Internamentos Hospitalares',
-                
-                # Serviços de apoio
-                'nursing_visits': 'Visitas de Enfermagem',
-                'physiotherapy_sessions': 'Sessões de Fisioterapia',
-                'social_support_services': 'Serviços de Apoio Social',
-                
-                # Medicação e tratamentos
-                'medication_changes': 'Alterações de Medicação',
-                'treatment_adherence': 'Adesão ao Tratamento',
-                
-                # Monitoramento remoto
-                'remote_monitoring_alerts': 'Alertas de Monitorização',
-                'telemedicine_consultations': 'Teleconsultas'
-            }
+            cube = get_utilization_cube(self.data)
+            total_participants = len(cube.participants)
             
-            # Filtrar dados de utilização
-            utilization_data = data_df[data_df['participant_code'].notna()].copy()
-            
-            # Análise por tipo de serviço
+            # Análise por tipo de serviço (e eventos do mesmo questionário)
             service_utilization = {}
-            total_participants = len(utilization_data['participant_code'].unique())
-            
-            for field_key, field_name in service_fields.items():
-                if field_key in utilization_data.columns:
-                    # Contabilizar utilização
-                    field_data = utilization_data[field_key].dropna()
-                    
-                    # Estatísticas básicas
-                    utilization_count = len(field_data[field_data.notna() & (field_data != '') & (field_data != '0')])
-                    utilization_rate = (utilization_count / total_participants * 100) if total_participants > 0 else 0
-                    
-                    # Frequência de utilização
-                    frequency_distribution = {}
-                    for value in field_data:
-                        str_value = str(value).strip()
-                        if str_value and str_value != '0' and str_value != 'nan':
-                            if str_value in frequency_distribution:
-                                frequency_distribution[str_value] += 1
-                            else:
-                                frequency_distribution[str_value] = 1
-                    
-                    service_utilization[field_key] = {
-                        'name': field_name,
-                        'utilization_count': utilization_count,
-                        'utilization_rate': round(utilization_rate, 2),
-                        'frequency_distribution': frequency_distribution,
-                        'participants_using': utilization_count,
-                        'total_participants': total_participants
-                    }
+            for field in cube.fields:
+                summary = cube.field_summary(field)
+                summary['utilization_count'] = summary['participants_using']
+                summary['utilization_rate'] = round(summary['participants_using'] / total_participants * 100, 2) \
+                    if total_participants > 0 else 0
+                summary['total_participants'] = total_participants
+                service_utilization[field] = summary
             
             # Análise de padrões de utilização
-            utilization_patterns = self._analyze_utilization_patterns(utilization_data)
+            utilization_patterns = self._analyze_utilization_patterns(cube)
             
             # Classificação por intensidade de utilização
-            intensity_classification = self._classify_utilization_intensity(utilization_data, service_fields)
+            intensity_classification = self._classify_utilization_intensity(cube)
             
             return {
                 'service_utilization': service_utilization,
@@ -2504,96 +2129,29 @@ class DataProcessor:
             return {'service_utilization': {}, 'utilization_patterns': {}, 'intensity_classification': {}, 'summary': {}}
     
     def calculate_cost_effectiveness_rm4health(self):
-        """Calcula análise de custo-efetividade do monitoramento remoto"""
+        """Calcula análise de custo-efetividade do monitoramento remoto
+
+        Custos por participante calculados de forma matricial (contagens ×
+        Config.SERVICE_COSTS) com IC bootstrap da poupança média por
+        participante e por grupo (cost_effectiveness.get_cost_effectiveness)
+        """
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Custos estimados por tipo de serviço (em euros)
-            service_costs = {
-                'gp_visits': 50,  # Consulta médico de família
-                'specialist_visits': 120,  # Consulta especialidade
-                'emergency_visits': 200,  # Urgência
-                'hospital_admissions': 1500,  # Internamento (média)
-                'nursing_visits': 30,  # Visita enfermagem
-                'physiotherapy_sessions': 40,  # Fisioterapia
-                'telemedicine_consultations': 25,  # Teleconsulta
-                'remote_monitoring_setup': 200,  # Custo setup monitorização
-                'remote_monitoring_monthly': 50  # Custo mensal monitorização
-            }
-            
-            utilization_data = data_df[data_df['participant_code'].notna()].copy()
-            total_participants = len(utilization_data['participant_code'].unique())
-            
-            # Calcular custos por participante
-            participant_costs = {}
-            total_traditional_costs = 0
-            total_remote_monitoring_costs = 0
-            
-            for _, participant in utilization_data.iterrows():
-                participant_id = participant['participant_code']
-                if pd.isna(participant_id):
-                    continue
-                
-                traditional_cost = 0
-                remote_cost = service_costs['remote_monitoring_setup'] + (service_costs['remote_monitoring_monthly'] * 12)
-                
-                # Somar custos tradicionais
-                for service, cost in service_costs.items():
-                    if service.startswith('remote_monitoring'):
-                        continue
-                    
-                    if service in participant and pd.notna(participant[service]):
-                        try:
-                            visits = float(participant[service])
-                            if visits > 0:
-                                traditional_cost += visits * cost
-                        except:
-                            continue
-                
-                participant_costs[str(participant_id)] = {
-                    'traditional_cost': traditional_cost,
-                    'remote_monitoring_cost': remote_cost,
-                    'cost_difference': traditional_cost - remote_cost,
-                    'cost_savings': max(0, traditional_cost - remote_cost)
-                }
-                
-                total_traditional_costs += traditional_cost
-                total_remote_monitoring_costs += remote_cost
+            result = get_cost_effectiveness(self.data).analysis()
             
-            # Análise de efetividade
-            effectiveness_metrics = {
-                'reduced_emergency_visits': self._calculate_emergency_reduction(utilization_data),
+            # Análise de efetividade (só com os campos que existem nos dados)
+            effectiveness_fields = [
+                'treatment_adherence', 'remote_monitoring_alerts', 'health_alerts',
+                'early_detection', 'satisfaction', 'system_satisfaction', 'overall_satisfaction'
+            ]
+            present = [f for f in effectiveness_fields if f in get_completeness(self.data).field_index]
+            utilization_data = pd.DataFrame(self.data, columns=present)
+            result['effectiveness_metrics'] = {
+                'reduced_emergency_visits': self._calculate_emergency_reduction(get_utilization_cube(self.data)),
                 'improved_treatment_adherence': self._calculate_adherence_improvement(utilization_data),
                 'early_detection_rate': self._calculate_early_detection_rate(utilization_data),
                 'patient_satisfaction': self._estimate_patient_satisfaction(utilization_data)
             }
-            
-            # Cálculo ROI (Return on Investment)
-            total_savings = max(0, total_traditional_costs - total_remote_monitoring_costs)
-            roi_percentage = (total_savings / total_remote_monitoring_costs * 100) if total_remote_monitoring_costs > 0 else 0
-            
-            return {
-                'participant_costs': participant_costs,
-                'cost_summary': {
-                    'total_traditional_costs': round(total_traditional_costs, 2),
-                    'total_remote_monitoring_costs': round(total_remote_monitoring_costs, 2),
-                    'total_cost_savings': round(total_savings, 2),
-                    'average_savings_per_participant': round(total_savings / max(1, total_participants), 2),
-                    'roi_percentage': round(roi_percentage, 2)
-                },
-                'effectiveness_metrics': effectiveness_metrics,
-                'cost_breakdown': service_costs,
-                'summary': {
-                    'participants_analyzed': total_participants,
-                    'cost_effective': total_savings > 0,
-                    'average_traditional_cost': round(total_traditional_costs / max(1, total_participants), 2),
-                    'average_remote_cost': round(total_remote_monitoring_costs / max(1, total_participants), 2)
-                }
-            }
+            return result
             
         except Exception as e:
             print(f"❌ Erro na análise de custo-efetividade: {e}")
@@ -2604,13 +2162,15 @@ class DataProcessor:
     def assess_remote_monitoring_impact_rm4health(self):
         """Avalia o impacto do monitoramento remoto na utilização de serviços"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            impact_data = data_df[data_df['participant_code'].notna()].copy()
+            # Só o código do participante e os campos de alertas, satisfação e
+            # autonomia presentes nos dados (não o snapshot inteiro)
+            field_index = get_completeness(self.data).field_index
+            present = ['participant_code'] + [
+                field for field in ALERT_FIELDS + list(SATISFACTION_FIELDS) + list(AUTONOMY_FIELDS)
+                if field in field_index
+            ]
+            impact_data = pd.DataFrame(self.data, columns=present)
+            impact_data = impact_data[impact_data['participant_code'].notna()]
             
             # Campos para análise de impacto
             impact_fields = {
@@ -2624,22 +2184,24 @@ class DataProcessor:
             
             impact_analysis = {}
             
-            # Análise pré/pós implementação
-            baseline_period = self._get_baseline_metrics(impact_data)
-            monitoring_period = self._get_monitoring_metrics(impact_data)
+            # Análise pré/pós implementação (períodos do cubo de utilização)
+            cube = get_utilization_cube(self.data)
+            baseline_period = self._get_baseline_metrics(cube)
+            monitoring_period = self._get_monitoring_metrics(cube)
             
             # Calcular impactos específicos
             for field_key, field_name in impact_fields.items():
+                baseline_value = baseline_period.get(field_key, 0)
+                monitoring_value = monitoring_period.get(field_key, 0)
+                # Métricas de redução (contagens de utilização): melhoria = descida
+                lower_is_better = field_key in UTILIZATION_IMPACT_METRICS
                 impact_analysis[field_key] = {
                     'name': field_name,
-                    'baseline_value': baseline_period.get(field_key, 0),
-                    'monitoring_value': monitoring_period.get(field_key, 0),
-                    'absolute_change': monitoring_period.get(field_key, 0) - baseline_period.get(field_key, 0),
-                    'percentage_change': self._calculate_percentage_change(
-                        baseline_period.get(field_key, 0), 
-                        monitoring_period.get(field_key, 0)
-                    ),
-                    'improvement': monitoring_period.get(field_key, 0) > baseline_period.get(field_key, 0)
+                    'baseline_value': baseline_value,
+                    'monitoring_value': monitoring_value,
+                    'absolute_change': round(monitoring_value - baseline_value, 2),
+                    'percentage_change': self._calculate_percentage_change(baseline_value, monitoring_value),
+                    'improvement': monitoring_value < baseline_value if lower_is_better else monitoring_value > baseline_value
                 }
             
             # Análise de alertas e intervenções
@@ -2673,131 +2235,15 @@ class DataProcessor:
             return {'impact_analysis': {}, 'alert_impact': {}, 'satisfaction_metrics': {}, 'autonomy_impact': {}, 'baseline_period': {}, 'monitoring_period': {}, 'summary': {}}
     
     def identify_utilization_predictors_rm4health(self):
-        """Identifica preditores de alta utilização de serviços de saúde - APENAS DADOS REAIS"""
+        """Identifica preditores de utilização de serviços de saúde - APENAS DADOS REAIS
+
+        Modelos OLS, Poisson e logístico (IRLS em NumPy) da utilização anual em
+        função de idade, sexo, escolaridade, estado civil e grupo, com
+        coeficientes, erros-padrão e valores-p (calculados uma vez por snapshot)
+        """
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            predictor_data = data_df[data_df['participant_code'].notna()].copy()
-            
-            if len(predictor_data) == 0:
-                return {'message': 'Sem dados suficientes para análise de preditores', 
-                       'predictor_analysis': {}, 'summary': {}}
-            
-            # Variáveis preditoras disponíveis nos dados reais
-            available_predictors = {
-                'demographic': {},
-                'clinical': {},
-                'behavioral': {},
-                'technology': {}
-            }
-            
-            # Verificar quais campos existem nos dados
-            potential_predictors = {
-                'age': ('demographic', 'Idade'),
-                'gender': ('demographic', 'Género'),
-                'education_level': ('demographic', 'Nível de Educação'),
-                'marital_status': ('demographic', 'Estado Civil'),
-                'number_of_conditions': ('clinical', 'Número de Condições Crónicas'),
-                'medication_count': ('clinical', 'Número de Medicamentos'),
-                'treatment_adherence': ('behavioral', 'Adesão ao Tratamento'),
-                'social_support': ('behavioral', 'Apoio Social'),
-                'technology_acceptance': ('technology', 'Aceitação da Tecnologia'),
-                'digital_literacy': ('technology', 'Literacia Digital')
-            }
-            
-            # Analisar apenas campos que existem nos dados
-            for field, (category, name) in potential_predictors.items():
-                if field in predictor_data.columns:
-                    field_data = predictor_data[field].dropna()
-                    if len(field_data) > 0:
-                        available_predictors[category][field] = {
-                            'name': name,
-                            'data_points': len(field_data),
-                            'unique_values': len(field_data.unique()),
-                            'coverage_rate': round((len(field_data) / len(predictor_data)) * 100, 1)
-                        }
-            
-            # CAMPOS REAIS IDENTIFICADOS na investigação do REDCap
-            service_fields = ['scheduled_medical_visits', 'unscheduled_medical_visits', 'emergency_visits', 'hospitalizations']
-            utilization_scores = {}
-            participants_with_data = 0
-            
-            for _, participant in predictor_data.iterrows():
-                participant_id = str(participant['participant_code'])
-                utilization_count = 0
-                total_services = 0
-                
-                for service in service_fields:
-                    if service in participant.index:
-                        value_str = str(participant[service]).strip()
-                        
-                        # Verificar se o valor não está vazio e não é '0'
-                        if value_str and value_str not in ['', '0', 'nan', 'None', 'NaN']:
-                            try:
-                                value = float(value_str)
-                                if value > 0:
-                                    utilization_count += value
-                                    total_services += 1
-                            except ValueError:
-                                # Se não é número mas não está vazio, contar como 1
-                                utilization_count += 1
-                                total_services += 1
-                
-                # Só incluir participantes que têm pelo menos algum dado de utilização
-                if total_services > 0:
-                    participants_with_data += 1
-                    utilization_scores[participant_id] = {
-                        'total_services_used': total_services,
-                        'utilization_score': utilization_count,
-                        'is_high_utilizer': total_services >= 2 or utilization_count >= 3
-                    }
-            
-            # Estatísticas reais de utilização
-            high_utilizers = [p for p, data in utilization_scores.items() if data['is_high_utilizer']]
-            total_participants_with_data = len(utilization_scores)
-            high_utilization_rate = (len(high_utilizers) / total_participants_with_data * 100) if total_participants_with_data > 0 else 0
-            
-            # Análise de correlações reais (simplificada)
-            correlation_analysis = {}
-            for category, predictors in available_predictors.items():
-                if predictors:  # Só analisa se há preditores nesta categoria
-                    correlation_analysis[category] = {
-                        'available_predictors': len(predictors),
-                        'data_quality': 'real_data_analysis',
-                        'predictors': predictors
-                    }
-            
-            return {
-                'predictor_analysis': correlation_analysis,
-                'utilization_analysis': {
-                    'total_participants': len(predictor_data),
-                    'participants_with_utilization_data': total_participants_with_data,
-                    'high_utilizers_count': len(high_utilizers),
-                    'high_utilization_rate': round(high_utilization_rate, 1),
-                    'average_services_per_participant': round(sum(s['total_services_used'] for s in utilization_scores.values()) / total_participants_with_data, 1) if total_participants_with_data > 0 else 0,
-                    'utilization_coverage': round((total_participants_with_data / len(predictor_data)) * 100, 1) if len(predictor_data) > 0 else 0
-                },
-                'high_utilizers': high_utilizers[:10],  # Top 10 para demonstração
-                'data_summary': {
-                    'analysis_type': 'real_data_only',
-                    'simulation_used': False,
-                    'available_data_fields': list(set(potential_predictors.keys()).intersection(set(predictor_data.columns.tolist()))),
-                    'missing_data_fields': list(set(potential_predictors.keys()) - set(predictor_data.columns.tolist())),
-                    'service_fields_analyzed': service_fields
-                },
-                'summary': {
-                    'message': f'Análise baseada exclusivamente em dados reais do REDCap',
-                    'participants_analyzed': len(predictor_data),
-                    'participants_with_utilization': total_participants_with_data,
-                    'data_completeness': f"{len([c for c in available_predictors.values() if c])}/4 categorias com dados",
-                    'high_utilizer_identification': f"{len(high_utilizers)} participantes identificados"
-                }
-            }
-            
+            return get_utilization_predictors(self.data).analysis()
+
         except Exception as e:
             print(f"❌ Erro na identificação de preditores de utilização: {e}")
             import traceback
@@ -2813,8 +2259,8 @@ class DataProcessor:
     # FUNÇÕES AUXILIARES PARA UTILIZAÇÃO DE SERVIÇOS
     # =====================================
     
-    def _analyze_utilization_patterns(self, data):
-        """Analisa padrões de utilização de serviços"""
+    def _analyze_utilization_patterns(self, cube):
+        """Analisa padrões de utilização de serviços (fatias do cubo de utilização)"""
         patterns = {
             'seasonal_patterns': {},
             'day_of_week_patterns': {},
@@ -2822,88 +2268,56 @@ class DataProcessor:
             'utilization_trends': {}
         }
         
-        # Análise simplificada de padrões
-        try:
-            # Padrões por tipo de utilizador
-            high_users = data[data.apply(lambda row: sum(1 for col in ['gp_visits', 'specialist_visits', 'emergency_visits'] 
-                                                       if col in row and pd.notna(row[col]) and str(row[col]) not in ['0', '']), axis=1) >= 2]
-            low_users = data[data.apply(lambda row: sum(1 for col in ['gp_visits', 'specialist_visits', 'emergency_visits'] 
-                                                      if col in row and pd.notna(row[col]) and str(row[col]) not in ['0', '']), axis=1) <= 1]
-            
-            patterns['user_types'] = {
-                'high_utilizers': len(high_users),
-                'low_utilizers': len(low_users),
-                'moderate_utilizers': len(data) - len(high_users) - len(low_users)
-            }
-            
-        except Exception as e:
-            print(f"Erro na análise de padrões: {e}")
+        # Padrões por tipo de utilizador (número de serviços utilizados)
+        services_used = cube.services_used()
+        patterns['user_types'] = {
+            'high_utilizers': int((services_used >= 3).sum()),
+            'moderate_utilizers': int((services_used == 2).sum()),
+            'low_utilizers': int((services_used <= 1).sum())
+        }
+        
+        # Combinações de serviços utilizados
+        used = np.nan_to_num(cube.means()) > 0
+        combinations = Counter(
+            ' + '.join(cube.names[field] for field, flag in zip(cube.fields, row) if flag) or 'Nenhum'
+            for row in used
+        )
+        patterns['service_combinations'] = dict(combinations.most_common(10))
+        
+        # Tendência: média anual por serviço no baseline e durante o monitoramento
+        patterns['utilization_trends'] = {
+            cube.names[field]: values for field, values in cube.paired_period_means().items()
+        }
         
         return patterns
     
-    def _classify_utilization_intensity(self, data, service_fields):
-        """Classifica a intensidade de utilização"""
-        classification = {
-            'low_intensity': 0,
-            'moderate_intensity': 0,
-            'high_intensity': 0,
-            'very_high_intensity': 0
+    def _classify_utilization_intensity(self, cube):
+        """Classifica a intensidade de utilização (número de serviços utilizados)"""
+        services_used = cube.services_used()
+        return {
+            'low_intensity': int((services_used == 0).sum()),
+            'moderate_intensity': int(((services_used >= 1) & (services_used <= 2)).sum()),
+            'high_intensity': int(((services_used >= 3) & (services_used <= 4)).sum()),
+            'very_high_intensity': int((services_used > 4).sum())
         }
-        
-        for _, participant in data.iterrows():
-            service_count = 0
-            for field_key in service_fields.keys():
-                if field_key in participant and pd.notna(participant[field_key]) and str(participant[field_key]) not in ['0', '']:
-                    try:
-                        if float(participant[field_key]) > 0:
-                            service_count += 1
-                    except:
-                        service_count += 1
-            
-            if service_count == 0:
-                classification['low_intensity'] += 1
-            elif service_count <= 2:
-                classification['moderate_intensity'] += 1
-            elif service_count <= 4:
-                classification['high_intensity'] += 1
-            else:
-                classification['very_high_intensity'] += 1
-        
-        return classification
     
-    def _calculate_emergency_reduction(self, data):
-        """Calcula redução de visitas de emergência baseada em dados reais"""
-        if 'emergency_visits' not in data.columns:
-            return {'message': 'Campo emergency_visits não encontrado', 'reduction': 0}
-        
-        emergency_data = data['emergency_visits'].dropna()
-        if len(emergency_data) == 0:
-            return {'message': 'Sem dados de emergência disponíveis', 'reduction': 0}
-        
-        # Converter para numérico, ignorando strings inválidas
-        numeric_values = []
-        for value in emergency_data:
-            try:
-                # Tentar converter para float
-                if str(value).replace('.', '').replace('-', '').isdigit():
-                    numeric_values.append(float(value))
-                elif str(value).strip() not in ['', '0', 'nan']:
-                    # Se não é numérico mas não é vazio, contar como 1
-                    numeric_values.append(1)
-            except:
-                continue
-        
-        if not numeric_values:
-            return {'message': 'Dados de emergência não numéricos', 'reduction': 0}
-        
-        # Análise real: média de visitas de emergência
-        avg_emergency_visits = sum(numeric_values) / len(numeric_values)
-        participants_with_emergency = len([x for x in numeric_values if x > 0])
+    def _calculate_emergency_reduction(self, cube):
+        """Calcula redução de idas à urgência (baseline vs monitoramento) com dados reais"""
+        periods = cube.paired_period_means(['emergency_visits'])['emergency_visits']
+        if not periods['participants']:
+            return {'message': 'Sem dados de urgência em baseline e monitoramento', 'reduction': 0}
         
+        means = cube.means(['emergency_visits'])[:, 0]
+        answered = ~np.isnan(means)
+        baseline, monitoring = periods['baseline'], periods['monitoring']
         return {
-            'average_emergency_visits': round(avg_emergency_visits, 2),
-            'participants_with_emergency': participants_with_emergency,
-            'emergency_rate': round((participants_with_emergency / len(data)) * 100, 1),
+            'average_emergency_visits': round(float(means[answered].mean()), 2),
+            'participants_with_emergency': int((means[answered] > 0).sum()),
+            'emergency_rate': round(float((means[answered] > 0).mean()) * 100, 1),
+            'baseline_average': baseline,
+            'monitoring_average': monitoring,
+            'paired_participants': periods['participants'],
+            'reduction': round((baseline - monitoring) / baseline * 100, 1) if baseline > 0 else 0,
             'data_source': 'real_data_analysis'
         }
     
@@ -2994,61 +2408,25 @@ class DataProcessor:
             'data_source': 'real_data_analysis'
         }
     
-    def _get_baseline_metrics(self, data):
-        """Obtém métricas do período baseline usando dados reais"""
-        metrics = {}
-        
-        # Campos potenciais de baseline
-        baseline_fields = {
-            'baseline_hospitalizations': 'hospitalization_reduction',
-            'baseline_emergency_visits': 'emergency_reduction', 
-            'baseline_medication_adherence': 'medication_adherence_improvement',
-            'baseline_quality_of_life': 'quality_of_life_improvement'
+    def _period_metrics(self, cube, period):
+        """Média anual de internamentos e idas à urgência no período (participantes com os dois períodos)"""
+        periods = cube.paired_period_means(list(UTILIZATION_IMPACT_METRICS.values()))
+        metrics = {
+            metric: periods[field][period]
+            for metric, field in UTILIZATION_IMPACT_METRICS.items()
+            if periods[field]['participants']
         }
-        
-        for field, metric_name in baseline_fields.items():
-            if field in data.columns:
-                field_data = data[field].dropna()
-                if len(field_data) > 0:
-                    try:
-                        numeric_data = [float(x) for x in field_data if str(x).replace('.', '').replace('-', '').isdigit()]
-                        if numeric_data:
-                            metrics[metric_name] = round(sum(numeric_data) / len(numeric_data), 2)
-                    except:
-                        metrics[metric_name] = len([x for x in field_data if str(x) not in ['', '0']])
-        
         if not metrics:
-            return {'message': 'Dados de baseline não disponíveis nos campos REDCap'}
-        
+            return {'message': 'Dados de utilização em baseline e monitoramento não disponíveis'}
         return metrics
     
-    def _get_monitoring_metrics(self, data):
-        """Obtém métricas do período de monitoramento usando dados reais"""
-        metrics = {}
-        
-        # Campos potenciais de monitoramento
-        monitoring_fields = {
-            'monitoring_hospitalizations': 'hospitalization_reduction',
-            'monitoring_emergency_visits': 'emergency_reduction',
-            'current_medication_adherence': 'medication_adherence_improvement', 
-            'current_quality_of_life': 'quality_of_life_improvement'
-        }
-        
-        for field, metric_name in monitoring_fields.items():
-            if field in data.columns:
-                field_data = data[field].dropna()
-                if len(field_data) > 0:
-                    try:
-                        numeric_data = [float(x) for x in field_data if str(x).replace('.', '').replace('-', '').isdigit()]
-                        if numeric_data:
-                            metrics[metric_name] = round(sum(numeric_data) / len(numeric_data), 2)
-                    except:
-                        metrics[metric_name] = len([x for x in field_data if str(x) not in ['', '0']])
-        
-        if not metrics:
-            return {'message': 'Dados de monitoramento não disponíveis nos campos REDCap'}
-        
-        return metrics
+    def _get_baseline_metrics(self, cube):
+        """Obtém métricas do período baseline (primeiro questionário de utilização)"""
+        return self._period_metrics(cube, 'baseline')
+    
+    def _get_monitoring_metrics(self, cube):
+        """Obtém métricas do período de monitoramento (questionários seguintes)"""
+        return self._period_metrics(cube, 'monitoring')
     
     def _calculate_percentage_change(self, baseline, monitoring):
         """Calcula mudança percentual"""
@@ -3058,10 +2436,9 @@ class DataProcessor:
     
     def _analyze_alert_effectiveness(self, data):
         """Analisa efetividade dos alertas baseada em dados reais"""
-        alert_fields = ['alerts_generated', 'alert_responses', 'alert_effectiveness']
         alert_data = {}
         
-        for field in alert_fields:
+        for field in ALERT_FIELDS:
             if field in data.columns:
                 field_data = data[field].dropna()
                 if len(field_data) > 0:
@@ -3080,15 +2457,8 @@ class DataProcessor:
     
     def _analyze_satisfaction_metrics(self, data):
         """Analisa métricas de satisfação baseada em dados reais"""
-        satisfaction_fields = {
-            'overall_satisfaction': 'Satisfação Geral',
-            'ease_of_use': 'Facilidade de Uso', 
-            'perceived_usefulness': 'Utilidade Percebida',
-            'system_reliability': 'Confiabilidade do Sistema'
-        }
-        
         satisfaction_analysis = {}
-        for field, description in satisfaction_fields.items():
+        for field, description in SATISFACTION_FIELDS.items():
             if field in data.columns:
                 field_data = data[field].dropna()
                 if len(field_data) > 0:
@@ -3116,15 +2486,8 @@ class DataProcessor:
     
     def _analyze_autonomy_impact_real(self, data):
         """Analisa impacto na autonomia baseado em dados reais"""
-        autonomy_fields = {
-            'independence_score': 'Score de Independência',
-            'self_care_confidence': 'Confiança no Autocuidado',
-            'decision_making': 'Participação nas Decisões',
-            'health_management': 'Gestão da Saúde'
-        }
-        
         autonomy_analysis = {}
-        for field, description in autonomy_fields.items():
+        for field, description in AUTONOMY_FIELDS.items():
             if field in data.columns:
                 field_data = data[field].dropna()
                 if len(field_data) > 0:
@@ -3165,122 +2528,13 @@ class DataProcessor:
     # =====================================
     
     def compare_caregiver_groups(self):
-        """Compara participantes com e sem cuidadores - DADOS REAIS ADAPTADOS"""
+        """Compara participantes com e sem cuidadores - DADOS REAIS ADAPTADOS
+
+        Classificação por indicadores proxy calculada uma vez por snapshot
+        (caregivers.get_caregiver_engine) e agregada por groupby
+        """
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Filtrar dados válidos
-            valid_data = data_df[data_df['participant_code'].notna()].copy()
-            
-            if len(valid_data) == 0:
-                return {'message': 'Sem dados suficientes para análise de cuidadores', 
-                       'comparison': {}, 'summary': {}}
-            
-            # CAMPOS REAIS IDENTIFICADOS NO REDCap (baseado na investigação)
-            # Como não há campos específicos de cuidador, vamos usar outros indicadores
-            # que possam sugerir presença de suporte familiar/social
-            
-            proxy_caregiver_fields = [
-                'receiving_visits',  # Recebe visitas de amigos/família
-                'receiving_visits_2',
-                'marital_status',    # Estado civil (casado pode indicar suporte)
-                'health_status',     # Estado de saúde (pior = mais provável ter cuidador)
-            ]
-            
-            # Determinar quem tem provável suporte de cuidador
-            likely_with_caregiver = []
-            likely_without_caregiver = []
-            
-            for _, participant in valid_data.iterrows():
-                participant_id = participant.get('participant_code', 'N/A')
-                has_caregiver_indicators = False
-                
-                # Indicadores de provável presença de cuidador
-                # 1. Recebe visitas regulares
-                if 'receiving_visits' in participant:
-                    visits = str(participant['receiving_visits']).strip()
-                    if visits in ['1', '2']:  # Assumindo 1=sim, 2=frequentemente
-                        has_caregiver_indicators = True
-                
-                # 2. Estado civil casado
-                if 'marital_status' in participant:
-                    marital = str(participant['marital_status']).strip()
-                    if marital in ['1', '2']:  # Assumindo códigos para casado/união
-                        has_caregiver_indicators = True
-                
-                # 3. Estado de saúde deteriorado (mais provável ter cuidador)
-                if 'health_status' in participant:
-                    health = str(participant['health_status']).strip()
-                    if health in ['4', '5']:  # Assumindo 4-5 = saúde pior
-                        has_caregiver_indicators = True
-                
-                if has_caregiver_indicators:
-                    likely_with_caregiver.append(participant)
-                else:
-                    likely_without_caregiver.append(participant)
-            
-            # Análise comparativa baseada nos dados disponíveis
-            comparison_analysis = {}
-            
-            if len(likely_with_caregiver) > 0 and len(likely_without_caregiver) > 0:
-                
-                # Comparar utilização de serviços entre grupos
-                utilization_fields = ['scheduled_medical_visits', 'unscheduled_medical_visits', 
-                                    'emergency_visits', 'hospitalizations']
-                
-                group_comparison = {
-                    'with_support': {'count': len(likely_with_caregiver), 'utilization': {}},
-                    'without_support': {'count': len(likely_without_caregiver), 'utilization': {}}
-                }
-                
-                for field in utilization_fields:
-                    # Grupo com suporte
-                    values_with = []
-                    for p in likely_with_caregiver:
-                        if field in p and pd.notna(p[field]) and str(p[field]).strip():
-                            try:
-                                values_with.append(float(p[field]))
-                            except:
-                                pass
-                    
-                    # Grupo sem suporte
-                    values_without = []
-                    for p in likely_without_caregiver:
-                        if field in p and pd.notna(p[field]) and str(p[field]).strip():
-                            try:
-                                values_without.append(float(p[field]))
-                            except:
-                                pass
-                    
-                    group_comparison['with_support']['utilization'][field] = {
-                        'avg': round(sum(values_with) / len(values_with), 1) if values_with else 0,
-                        'count_with_data': len(values_with)
-                    }
-                    group_comparison['without_support']['utilization'][field] = {
-                        'avg': round(sum(values_without) / len(values_without), 1) if values_without else 0,
-                        'count_with_data': len(values_without)
-                    }
-                
-                comparison_analysis = group_comparison
-            
-            return {
-                'comparison_analysis': comparison_analysis,
-                'data_summary': {
-                    'total_participants': len(valid_data),
-                    'analysis_type': 'proxy_indicators_real_data',
-                    'proxy_fields_used': proxy_caregiver_fields,
-                    'note': 'Análise baseada em indicadores indiretos (visitas, estado civil, saúde)'
-                },
-                'summary': {
-                    'message': 'Análise usando indicadores indiretos de suporte (dados reais REDCap)',
-                    'methodology': 'Visitas familiares + Estado civil + Condição de saúde',
-                    'data_completeness': f"{len([f for f in proxy_caregiver_fields if f in valid_data.columns])}/4 campos proxy disponíveis"
-                }
-            }
+            return get_caregiver_engine(self.data).compare_groups()
             
         except Exception as e:
             print(f"❌ Erro na comparação de grupos de cuidadores: {e}")
@@ -3293,80 +2547,9 @@ class DataProcessor:
             }
     
     def analyze_caregiver_burden(self):
-        """Analisa a carga do cuidador - APENAS DADOS REAIS"""
+        """Analisa a carga do cuidador (cuidadores dos grupos C/D) - APENAS DADOS REAIS"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            valid_data = data_df[data_df['participant_code'].notna()].copy()
-            
-            if len(valid_data) == 0:
-                return {'message': 'Sem dados suficientes para análise da carga do cuidador', 
-                       'burden_analysis': {}, 'summary': {}}
-            
-            # Campos relacionados com carga do cuidador
-            burden_fields = ['caregiver_burden', 'caregiver_stress', 'caregiver_hours_per_day',
-                           'caregiver_fatigue', 'caregiver_sleep_quality', 'caregiver_health']
-            
-            burden_data = []
-            caregiver_profiles = []
-            
-            for _, participant in valid_data.iterrows():
-                participant_burden = {}
-                has_burden_data = False
-                
-                for field in burden_fields:
-                    if field in participant and pd.notna(participant[field]):
-                        try:
-                            value = str(participant[field]).strip()
-                            if value not in ['', '0', 'None']:
-                                participant_burden[field] = value
-                                has_burden_data = True
-                        except:
-                            pass
-                
-                if has_burden_data:
-                    participant_burden['participant_id'] = participant['participant_code']
-                    burden_data.append(participant_burden)
-                    caregiver_profiles.append(participant)
-            
-            # Análise da carga
-            burden_analysis = {}
-            if burden_data:
-                # Análise de horas de cuidado
-                care_hours = []
-                for burden in burden_data:
-                    if 'caregiver_hours_per_day' in burden:
-                        try:
-                            hours = float(burden['caregiver_hours_per_day'])
-                            care_hours.append(hours)
-                        except:
-                            pass
-                
-                burden_analysis = {
-                    'caregivers_with_data': len(burden_data),
-                    'avg_care_hours_per_day': round(sum(care_hours) / len(care_hours), 1) if care_hours else 'N/A',
-                    'high_burden_caregivers': len([h for h in care_hours if h > 8]) if care_hours else 0,
-                    'burden_indicators_available': len(burden_fields) - len([f for f in burden_fields if f not in valid_data.columns])
-                }
-            
-            return {
-                'burden_analysis': burden_analysis,
-                'caregiver_data': burden_data[:10],  # Top 10 para demonstração
-                'data_summary': {
-                    'analysis_type': 'real_data_only',
-                    'available_burden_fields': [f for f in burden_fields if f in valid_data.columns],
-                    'missing_burden_fields': [f for f in burden_fields if f not in valid_data.columns]
-                },
-                'summary': {
-                    'message': 'Análise de carga de cuidadores baseada exclusivamente em dados reais',
-                    'caregivers_analyzed': len(burden_data),
-                    'data_quality': f"Dados de carga disponíveis para {len(burden_data)} cuidadores"
-                }
-            }
+            return get_caregiver_engine(self.data).burden()
             
         except Exception as e:
             print(f"❌ Erro na análise da carga do cuidador: {e}")
@@ -3381,83 +2564,7 @@ class DataProcessor:
     def assess_support_effectiveness(self):
         """Avalia a eficácia do suporte do cuidador - APENAS DADOS REAIS"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            valid_data = data_df[data_df['participant_code'].notna()].copy()
-            
-            if len(valid_data) == 0:
-                return {'message': 'Sem dados suficientes para análise de eficácia do suporte', 
-                       'effectiveness': {}, 'summary': {}}
-            
-            # Campos relacionados com eficácia do suporte
-            effectiveness_fields = ['medication_adherence', 'appointment_compliance', 
-                                  'health_improvement', 'quality_of_life_score',
-                                  'emergency_visits', 'hospitalization_rate']
-            
-            # Participantes com e sem cuidadores
-            with_caregiver = []
-            without_caregiver = []
-            caregiver_fields = ['caregiver', 'has_caregiver', 'caregiver_support']
-            
-            for _, participant in valid_data.iterrows():
-                has_caregiver_support = False
-                for field in caregiver_fields:
-                    if field in participant and pd.notna(participant[field]):
-                        if str(participant[field]).strip() not in ['', '0', 'No', 'Não', 'None']:
-                            has_caregiver_support = True
-                            break
-                
-                if has_caregiver_support:
-                    with_caregiver.append(participant)
-                else:
-                    without_caregiver.append(participant)
-            
-            # Comparar outcomes
-            effectiveness_analysis = {}
-            if len(with_caregiver) > 0 and len(without_caregiver) > 0:
-                
-                # Adesão à medicação
-                adherence_with = []
-                adherence_without = []
-                
-                for p in with_caregiver:
-                    if 'medication_adherence' in p and pd.notna(p['medication_adherence']):
-                        try:
-                            adherence_with.append(float(p['medication_adherence']))
-                        except:
-                            pass
-                
-                for p in without_caregiver:
-                    if 'medication_adherence' in p and pd.notna(p['medication_adherence']):
-                        try:
-                            adherence_without.append(float(p['medication_adherence']))
-                        except:
-                            pass
-                
-                effectiveness_analysis = {
-                    'participants_with_caregiver': len(with_caregiver),
-                    'participants_without_caregiver': len(without_caregiver),
-                    'avg_adherence_with_caregiver': round(sum(adherence_with) / len(adherence_with), 1) if adherence_with else 'N/A',
-                    'avg_adherence_without_caregiver': round(sum(adherence_without) / len(adherence_without), 1) if adherence_without else 'N/A',
-                    'effectiveness_difference': 'Análise disponível com dados reais' if (adherence_with and adherence_without) else 'Dados insuficientes'
-                }
-            
-            return {
-                'effectiveness_analysis': effectiveness_analysis,
-                'data_summary': {
-                    'total_participants': len(valid_data),
-                    'analysis_type': 'real_data_only',
-                    'available_effectiveness_fields': [f for f in effectiveness_fields if f in valid_data.columns]
-                },
-                'summary': {
-                    'message': 'Análise de eficácia baseada exclusivamente em dados reais do REDCap',
-                    'comparison_groups': f"Com cuidador: {len(with_caregiver)}, Sem cuidador: {len(without_caregiver)}"
-                }
-            }
+            return get_caregiver_engine(self.data).support_effectiveness()
             
         except Exception as e:
             print(f"❌ Erro na avaliação da eficácia do suporte: {e}")
@@ -3470,88 +2577,9 @@ class DataProcessor:
             }
     
     def caregiver_response_patterns(self):
-        """Analisa padrões de resposta dos cuidadores - APENAS DADOS REAIS"""
+        """Analisa padrões de resposta (forma de administração dos questionários) - APENAS DADOS REAIS"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            valid_data = data_df[data_df['participant_code'].notna()].copy()
-            
-            if len(valid_data) == 0:
-                return {'message': 'Sem dados suficientes para análise de padrões de resposta', 
-                       'patterns': {}, 'summary': {}}
-            
-            # Campos de resposta/interação
-            response_fields = ['response_time', 'response_frequency', 'engagement_level',
-                             'caregiver_questions', 'caregiver_concerns', 'communication_preference']
-            
-            caregiver_responses = []
-            response_patterns = {}
-            
-            # Identificar cuidadores com dados de resposta
-            caregiver_fields = ['caregiver', 'has_caregiver', 'caregiver_support']
-            
-            for _, participant in valid_data.iterrows():
-                has_caregiver = False
-                for field in caregiver_fields:
-                    if field in participant and pd.notna(participant[field]):
-                        if str(participant[field]).strip() not in ['', '0', 'No', 'Não', 'None']:
-                            has_caregiver = True
-                            break
-                
-                if has_caregiver:
-                    response_data = {'participant_id': participant['participant_code']}
-                    has_response_data = False
-                    
-                    for field in response_fields:
-                        if field in participant and pd.notna(participant[field]):
-                            response_data[field] = str(participant[field]).strip()
-                            has_response_data = True
-                    
-                    if has_response_data:
-                        caregiver_responses.append(response_data)
-            
-            # Analisar padrões
-            if caregiver_responses:
-                # Análise de frequência de comunicação
-                communication_frequency = {}
-                engagement_levels = []
-                
-                for response in caregiver_responses:
-                    if 'response_frequency' in response:
-                        freq = response['response_frequency'].lower()
-                        communication_frequency[freq] = communication_frequency.get(freq, 0) + 1
-                    
-                    if 'engagement_level' in response:
-                        try:
-                            level = float(response['engagement_level'])
-                            engagement_levels.append(level)
-                        except:
-                            pass
-                
-                response_patterns = {
-                    'caregivers_with_response_data': len(caregiver_responses),
-                    'communication_patterns': communication_frequency,
-                    'avg_engagement_level': round(sum(engagement_levels) / len(engagement_levels), 1) if engagement_levels else 'N/A',
-                    'active_communicators': len([r for r in caregiver_responses if 'communication_preference' in r])
-                }
-            
-            return {
-                'response_patterns': response_patterns,
-                'caregiver_responses': caregiver_responses[:10],  # Top 10
-                'data_summary': {
-                    'analysis_type': 'real_data_only',
-                    'available_response_fields': [f for f in response_fields if f in valid_data.columns],
-                    'caregivers_analyzed': len(caregiver_responses)
-                },
-                'summary': {
-                    'message': 'Análise de padrões de resposta baseada exclusivamente em dados reais',
-                    'response_data_quality': f"Dados de resposta disponíveis para {len(caregiver_responses)} cuidadores"
-                }
-            }
+            return get_caregiver_engine(self.data).response_patterns()
             
         except Exception as e:
             print(f"❌ Erro na análise de padrões de resposta: {e}")
@@ -3563,66 +2591,39 @@ class DataProcessor:
                 'message': 'Erro na análise de padrões de resposta'
             }
     
+    # COMPARAÇÃO ENTRE GRUPOS (QUALQUER AGRUPAMENTO)
+    # =============================================
+    
+    def compare_groups(self, numeric=None, categorical=None, grouping='participant_group'):
+        """Descritivas por grupo e testes omnibus (ANOVA, Kruskal-Wallis, qui-quadrado)
+        
+        Args:
+            numeric: campos numéricos (por omissão os indicadores de saúde)
+            categorical: campos categóricos (por omissão a demografia)
+            grouping: campo do baseline ou 'residence' (A vs B)
+        """
+        try:
+            numeric = DEFAULT_NUMERIC if numeric is None else numeric
+            categorical = DEFAULT_CATEGORICAL if categorical is None else categorical
+            return get_group_comparison(self.data, numeric, categorical, grouping).analysis()
+        except Exception as e:
+            print(f"❌ Erro na comparação entre grupos: {e}")
+            import traceback
+            traceback.print_exc()
+            return {
+                'error': str(e),
+                'numeric': {},
+                'categorical': {},
+                'message': 'Erro na comparação entre grupos'
+            }
+    
     # ANÁLISE RESIDENCIAL - RESIDENTES VS NÃO-RESIDENTES
     # ================================================
     
     def compare_residence_demographics(self):
         """Compara características demográficas entre residentes e não-residentes"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Filtrar apenas participantes únicos (com participant_code_estudo preenchido)
-            valid_data = data_df[
-                (data_df['participant_code_estudo'].notna()) & 
-                (data_df['participant_code_estudo'] != '')
-            ].copy()
-            
-            print(f"🔍 Debug Residência: {len(data_df)} registros total, {len(valid_data)} participantes únicos")
-            
-            if len(valid_data) == 0:
-                return {'message': 'Sem dados suficientes para análise demográfica residencial', 
-                       'comparison': {}, 'summary': {}}
-            
-            # Usar classificação baseada no campo participant_group do REDCap
-            residents, non_residents = self._classify_by_residence(valid_data)
-            
-            print(f"🏠 Classificação: {len(residents)} residentes, {len(non_residents)} não-residentes")
-            
-            # Análise demográfica comparativa
-            demographic_analysis = {
-                'residents': {
-                    'count': len(residents),
-                    'demographics': self._analyze_group_demographics(residents)
-                },
-                'non_residents': {
-                    'count': len(non_residents),
-                    'demographics': self._analyze_group_demographics(non_residents)
-                }
-            }
-            
-            # Testes estatísticos (simplificados)
-            statistical_tests = self._perform_demographic_tests(residents, non_residents)
-            
-            return {
-                'demographic_comparison': demographic_analysis,
-                'statistical_significance': statistical_tests,
-                'data_summary': {
-                    'total_participants': len(valid_data),
-                    'residents_count': len(residents),
-                    'non_residents_count': len(non_residents),
-                    'analysis_type': 'redcap_participant_group_classification'
-                },
-                'summary': {
-                    'message': f'Análise demográfica: {len(residents)} residentes vs {len(non_residents)} não-residentes',
-                    'methodology': 'Classificação baseada no campo participant_group do REDCap',
-                    'data_coverage': f"{len(residents) + len(non_residents)}/{len(valid_data)} participantes classificados"
-                }
-            }
-            
+            return get_residence_comparison(self.data).demographics()
         except Exception as e:
             print(f"❌ Erro na comparação demográfica residencial: {e}")
             import traceback
@@ -3636,51 +2637,7 @@ class DataProcessor:
     def compare_health_outcomes(self):
         """Compara outcomes de saúde entre residentes e não-residentes"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Filtrar apenas participantes únicos
-            valid_data = data_df[
-                (data_df['participant_code_estudo'].notna()) & 
-                (data_df['participant_code_estudo'] != '')
-            ].copy()
-            
-            # Identificar grupos residenciais
-            residents, non_residents = self._classify_by_residence(valid_data)
-            
-            # Campos de outcomes de saúde reais
-            health_fields = [
-                'health_status', 'symptom_severity', 'quality_of_life',
-                'functional_status', 'cognitive_status', 'pain_level',
-                'mobility_score', 'independence_level'
-            ]
-            
-            health_comparison = {
-                'residents': {
-                    'count': len(residents),
-                    'health_metrics': self._analyze_health_metrics(residents, health_fields)
-                },
-                'non_residents': {
-                    'count': len(non_residents),
-                    'health_metrics': self._analyze_health_metrics(non_residents, health_fields)
-                }
-            }
-            
-            # Diferenças significativas
-            health_differences = self._compare_health_metrics(residents, non_residents, health_fields)
-            
-            return {
-                'health_outcomes_comparison': health_comparison,
-                'significant_differences': health_differences,
-                'summary': {
-                    'message': f'Comparação de saúde: {len(residents)} residentes vs {len(non_residents)} não-residentes',
-                    'key_findings': self._summarize_health_differences(health_differences)
-                }
-            }
-            
+            return get_residence_comparison(self.data).health()
         except Exception as e:
             print(f"❌ Erro na comparação de outcomes de saúde: {e}")
             return {
@@ -3692,50 +2649,7 @@ class DataProcessor:
     def compare_adherence_by_residence(self):
         """Compara adesão medicamentosa entre residentes e não-residentes"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Filtrar apenas participantes únicos
-            valid_data = data_df[
-                (data_df['participant_code_estudo'].notna()) & 
-                (data_df['participant_code_estudo'] != '')
-            ].copy()
-            
-            # Identificar grupos residenciais
-            residents, non_residents = self._classify_by_residence(valid_data)
-            
-            # Campos de adesão medicamentosa reais
-            adherence_fields = [
-                'took_medications_yesterday', 'medication_adherence_score',
-                'missed_doses_week', 'medication_compliance', 'pill_count'
-            ]
-            
-            adherence_comparison = {
-                'residents': {
-                    'count': len(residents),
-                    'adherence_metrics': self._analyze_adherence_metrics(residents, adherence_fields)
-                },
-                'non_residents': {
-                    'count': len(non_residents),
-                    'adherence_metrics': self._analyze_adherence_metrics(non_residents, adherence_fields)
-                }
-            }
-            
-            # Fatores específicos por grupo
-            residence_factors = self._identify_adherence_factors_by_residence(residents, non_residents)
-            
-            return {
-                'adherence_comparison': adherence_comparison,
-                'residence_specific_factors': residence_factors,
-                'summary': {
-                    'message': f'Adesão medicamentosa: {len(residents)} residentes vs {len(non_residents)} não-residentes',
-                    'key_differences': self._summarize_adherence_differences(adherence_comparison)
-                }
-            }
-            
+            return get_residence_comparison(self.data).adherence()
         except Exception as e:
             print(f"❌ Erro na comparação de adesão por residência: {e}")
             return {
@@ -3747,50 +2661,7 @@ class DataProcessor:
     def compare_quality_of_life(self):
         """Compara qualidade de vida entre residentes e não-residentes"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                data_df = pd.DataFrame(self.data)
-            else:
-                data_df = self.data
-            
-            # Filtrar apenas participantes únicos
-            valid_data = data_df[
-                (data_df['participant_code_estudo'].notna()) & 
-                (data_df['participant_code_estudo'] != '')
-            ].copy()
-            
-            # Identificar grupos residenciais
-            residents, non_residents = self._classify_by_residence(valid_data)
-            
-            # Campos de qualidade de vida reais
-            qol_fields = [
-                'life_satisfaction', 'social_interaction', 'emotional_wellbeing',
-                'physical_comfort', 'autonomy', 'security_feeling'
-            ]
-            
-            qol_comparison = {
-                'residents': {
-                    'count': len(residents),
-                    'qol_metrics': self._analyze_qol_metrics(residents, qol_fields)
-                },
-                'non_residents': {
-                    'count': len(non_residents),
-                    'qol_metrics': self._analyze_qol_metrics(non_residents, qol_fields)
-                }
-            }
-            
-            # Dimensões específicas de qualidade de vida
-            qol_dimensions = self._analyze_qol_dimensions(residents, non_residents)
-            
-            return {
-                'quality_of_life_comparison': qol_comparison,
-                'qol_dimensions': qol_dimensions,
-                'summary': {
-                    'message': f'Qualidade de vida: {len(residents)} residentes vs {len(non_residents)} não-residentes',
-                    'key_insights': self._summarize_qol_differences(qol_comparison)
-                }
-            }
-            
+            return get_residence_comparison(self.data).quality_of_life()
         except Exception as e:
             print(f"❌ Erro na comparação de qualidade de vida: {e}")
             return {
@@ -3799,296 +2670,6 @@ class DataProcessor:
                 'message': 'Erro na análise de qualidade de vida'
             }
     
-    # MÉTODOS AUXILIARES PARA ANÁLISE RESIDENCIAL
-    # ==========================================
-    
-    def _classify_by_residence(self, data_df):
-        """Classifica participantes por tipo de residência baseado no campo participant_group do REDCap"""
-        residents = []
-        non_residents = []
-        
-        print(f"🔍 DEBUG _classify_by_residence: Iniciando classificação com {len(data_df)} participantes")
-        
-        for _, participant in data_df.iterrows():
-            participant_id = participant.get('participant_code_estudo') or participant.get('participant_code', 'N/A')
-            
-            # Usar mapeamento correto de grupos
-            group = self.get_participant_group(participant_id)
-            value = str(group).strip().lower()
-            
-            print(f"🏠 DEBUG: Participante {participant_id} - grupo: '{value}'")
-            
-            # 'a' = Residente (Grupo A)
-            if value == 'a':
-                residents.append(participant)
-                print(f"   ✅ Adicionado como RESIDENTE")
-            # 'b' = Não-Residente (Grupo B) 
-            elif value == 'b':
-                non_residents.append(participant)
-                print(f"   🏠 Adicionado como NÃO-RESIDENTE")
-            else:
-                print(f"   ⚪ Ignorado (grupo '{value}')")
-            # Grupos C e D são cuidadores, não contam para esta análise
-        
-        print(f"🔍 DEBUG _classify_by_residence: RESULTADO FINAL - {len(residents)} residentes, {len(non_residents)} não-residentes")
-        return residents, non_residents
-    
-    def _analyze_group_demographics(self, group_data):
-        """Analisa demografia de um grupo de forma mais útil"""
-        if not group_data:
-            return {}
-        
-        demographics = {}
-        
-        # Converter para DataFrame se necessário
-        if isinstance(group_data, list):
-            import pandas as pd
-            group_df = pd.DataFrame(group_data)
-        else:
-            group_df = group_data if hasattr(group_data, 'iterrows') else pd.DataFrame(group_data)
-        
-        # Idade (baseado em birth_year)
-        if 'birth_year' in group_df.columns:
-            birth_years = []
-            for _, participant in group_df.iterrows():
-                if pd.notna(participant.get('birth_year')):
-                    try:
-                        birth_year = int(participant['birth_year'])
-                        current_year = 2025  # Ano atual
-                        age = current_year - birth_year
-                        if 0 < age < 120:  # Validação básica
-                            birth_years.append(age)
-                    except:
-                        pass
-            
-            if birth_years:
-                demographics['age'] = {
-                    'mean': round(sum(birth_years) / len(birth_years), 1),
-                    'min': min(birth_years),
-                    'max': max(birth_years),
-                    'count': len(birth_years)
-                }
-        
-        # Distribuição de sexo
-        if 'sex' in group_df.columns:
-            sex_counts = group_df['sex'].value_counts().to_dict()
-            demographics['sex_distribution'] = sex_counts
-        
-        # Estado civil
-        if 'marital_status' in group_df.columns:
-            marital_counts = group_df['marital_status'].value_counts().to_dict()
-            demographics['marital_status'] = marital_counts
-        
-        # Nível educacional
-        if 'education_level' in group_df.columns:
-            education_counts = group_df['education_level'].value_counts().to_dict()
-            demographics['education_level'] = education_counts
-        
-        return demographics
-    
-    def _perform_demographic_tests(self, residents, non_residents):
-        """Realiza testes estatísticos simplificados"""
-        tests = {}
-        
-        # Teste de idade (t-test simplificado)
-        resident_ages = [float(p.get('age', 0)) for p in residents if pd.notna(p.get('age', 0))]
-        non_resident_ages = [float(p.get('age', 0)) for p in non_residents if pd.notna(p.get('age', 0))]
-        
-        if len(resident_ages) > 0 and len(non_resident_ages) > 0:
-            age_diff = abs(sum(resident_ages)/len(resident_ages) - sum(non_resident_ages)/len(non_resident_ages))
-            tests['age_difference'] = {
-                'difference': round(age_diff, 1),
-                'significance': 'significant' if age_diff > 5 else 'not_significant'
-            }
-        
-        return tests
-    
-    def _analyze_health_metrics(self, group_data, health_fields):
-        """Analisa métricas de saúde de um grupo"""
-        if not group_data:
-            return {}
-        
-        metrics = {}
-        
-        for field in health_fields:
-            values = []
-            for participant in group_data:
-                if field in participant and pd.notna(participant[field]):
-                    value_str = str(participant[field]).strip()
-                    if value_str and value_str not in ['', '0', 'nan', 'None', 'NaN']:
-                        try:
-                            value = float(value_str)
-                            if value != 0:  # Só adiciona valores não-zero
-                                values.append(value)
-                        except (ValueError, TypeError):
-                            # Para valores categóricos, ignora
-                            pass
-            
-            if values:
-                metrics[field] = {
-                    'mean': round(sum(values) / len(values), 2),
-                    'count': len(values)
-                }
-        
-        return metrics
-    
-    def _compare_health_metrics(self, residents, non_residents, health_fields):
-        """Compara métricas de saúde entre grupos"""
-        differences = {}
-        
-        for field in health_fields:
-            # Processar valores para residentes
-            res_values = []
-            for p in residents:
-                if field in p and pd.notna(p[field]):
-                    value_str = str(p[field]).strip()
-                    if value_str and value_str not in ['', '0', 'nan', 'None', 'NaN']:
-                        try:
-                            value = float(value_str)
-                            if value != 0:
-                                res_values.append(value)
-                        except (ValueError, TypeError):
-                            pass
-            
-            # Processar valores para não-residentes
-            non_res_values = []
-            for p in non_residents:
-                if field in p and pd.notna(p[field]):
-                    value_str = str(p[field]).strip()
-                    if value_str and value_str not in ['', '0', 'nan', 'None', 'NaN']:
-                        try:
-                            value = float(value_str)
-                            if value != 0:
-                                non_res_values.append(value)
-                        except (ValueError, TypeError):
-                            pass
-            
-            if len(res_values) > 0 and len(non_res_values) > 0:
-                res_mean = sum(res_values) / len(res_values)
-                non_res_mean = sum(non_res_values) / len(non_res_values)
-                difference = abs(res_mean - non_res_mean)
-                
-                differences[field] = {
-                    'residents_mean': round(res_mean, 2),
-                    'non_residents_mean': round(non_res_mean, 2),
-                    'difference': round(difference, 2),
-                    'direction': 'residents_higher' if res_mean > non_res_mean else 'non_residents_higher'
-                }
-        
-        return differences
-    
-    def _summarize_health_differences(self, differences):
-        """Resume as principais diferenças de saúde"""
-        if not differences:
-            return "Dados insuficientes para comparação"
-        
-        significant_diffs = [field for field, data in differences.items() if data['difference'] > 1]
-        
-        if significant_diffs:
-            return f"Diferenças significativas encontradas em: {', '.join(significant_diffs)}"
-        else:
-            return "Perfis de saúde similares entre grupos"
-    
-    def _analyze_adherence_metrics(self, group_data, adherence_fields):
-        """Analisa métricas de adesão de um grupo"""
-        if not group_data:
-            return {}
-        
-        metrics = {}
-        
-        # Análise específica para 'took_medications_yesterday'
-        took_meds_yes = 0
-        took_meds_total = 0
-        
-        for participant in group_data:
-            took_meds = participant.get('took_medications_yesterday')
-            if took_meds and str(took_meds).strip():
-                took_meds_total += 1
-                if str(took_meds).lower() in ['sim', 'yes', '1']:
-                    took_meds_yes += 1
-        
-        if took_meds_total > 0:
-            metrics['adherence_rate'] = {
-                'percentage': round((took_meds_yes / took_meds_total) * 100, 1),
-                'count': took_meds_total
-            }
-        
-        return metrics
-    
-    def _identify_adherence_factors_by_residence(self, residents, non_residents):
-        """Identifica fatores específicos de adesão por tipo de residência"""
-        factors = {
-            'residents': ['Supervisão profissional', 'Horários estruturados', 'Apoio de cuidadores'],
-            'non_residents': ['Autonomia na gestão', 'Responsabilidade individual', 'Flexibilidade de horários']
-        }
-        
-        return factors
-    
-    def _summarize_adherence_differences(self, adherence_comparison):
-        """Resume diferenças de adesão"""
-        res_metrics = adherence_comparison.get('residents', {}).get('adherence_metrics', {})
-        non_res_metrics = adherence_comparison.get('non_residents', {}).get('adherence_metrics', {})
-        
-        res_rate = res_metrics.get('adherence_rate', {}).get('percentage', 0)
-        non_res_rate = non_res_metrics.get('adherence_rate', {}).get('percentage', 0)
-        
-        if res_rate > non_res_rate:
-            return f"Residentes têm maior adesão ({res_rate}% vs {non_res_rate}%)"
-        elif non_res_rate > res_rate:
-            return f"Não-residentes têm maior adesão ({non_res_rate}% vs {res_rate}%)"
-        else:
-            return "Adesão similar entre grupos"
-    
-    def _analyze_qol_metrics(self, group_data, qol_fields):
-        """Analisa métricas de qualidade de vida de um grupo"""
-        if not group_data:
-            return {}
-        
-        metrics = {}
-        
-        for field in qol_fields:
-            values = []
-            for participant in group_data:
-                if field in participant and pd.notna(participant[field]):
-                    try:
-                        values.append(float(participant[field]))
-                    except:
-                        pass
-            
-            if values:
-                metrics[field] = {
-                    'mean': round(sum(values) / len(values), 2),
-                    'count': len(values)
-                }
-        
-        return metrics
-    
-    def _analyze_qol_dimensions(self, residents, non_residents):
-        """Analisa dimensões específicas de qualidade de vida"""
-        dimensions = {
-            'social_integration': {
-                'residents': 'Atividades comunitárias estruturadas',
-                'non_residents': 'Redes sociais independentes'
-            },
-            'autonomy': {
-                'residents': 'Autonomia limitada mas supervisionada',
-                'non_residents': 'Autonomia completa'
-            },
-            'security': {
-                'residents': 'Segurança 24/7',
-                'non_residents': 'Segurança domiciliar'
-            }
-        }
-        
-        return dimensions
-    
-    def _summarize_qol_differences(self, qol_comparison):
-        """Resume diferenças de qualidade de vida"""
-        res_count = qol_comparison.get('residents', {}).get('count', 0)
-        non_res_count = qol_comparison.get('non_residents', {}).get('count', 0)
-        
-        return f"Comparação entre {res_count} residentes e {non_res_count} não-residentes"
-    
     # Funções auxiliares removidas - apenas análise de dados reais implementada
     # _assess_patient_autonomy_impact, _define_high_utilization_threshold, etc.
     # foram substituídas por lógica baseada exclusivamente em dados do REDCap
@@ -4099,26 +2680,23 @@ class DataProcessor:
     def analyze_missing_patterns(self):
         """Analisa padrões de dados ausentes"""
         try:
-            if isinstance(self.data, list):
-                import pandas as pd
-                df = pd.DataFrame(self.data)
-            else:
-                df = self.data
+            completeness = get_completeness(self.data)
             
-            print(f"🔍 Analisando missing data em {len(df)} registros...")
+            print(f"🔍 Analisando missing data em {completeness.n_records} registros...")
             
             # Calcular percentagens de missing data por coluna
             missing_stats = {}
-            total_records = len(df)
+            total_records = completeness.n_records
+            column_counts = completeness.column_counts()
             
-            for col in df.columns:
-                missing_count = df[col].isnull().sum()
+            for col, complete_count in zip(completeness.fields, column_counts.tolist()):
+                missing_count = total_records - complete_count
                 missing_percent = (missing_count / total_records) * 100 if total_records > 0 else 0
                 
                 missing_stats[col] = {
                     'missing_count': int(missing_count),
                     'missing_percent': round(missing_percent, 1),
-                    'complete_count': int(total_records - missing_count),
+                    'complete_count': int(complete_count),
                     'complete_percent': round(100 - missing_percent, 1)
                 }
             
@@ -4127,25 +2705,25 @@ class DataProcessor:
             moderate_missing_fields = {k: v for k, v in missing_stats.items() if 20 <= v['missing_percent'] <= 50}
             low_missing_fields = {k: v for k, v in missing_stats.items() if v['missing_percent'] < 20}
             
-            # Padrões por participante
+            # Padrões por participante (popcount das linhas de cada participante)
             participant_completeness = {}
-            if 'participant_code_estudo' in df.columns:
-                for participant in df['participant_code_estudo'].unique():
-                    if pd.notna(participant):
-                        participant_data = df[df['participant_code_estudo'] == participant]
-                        total_fields = len(df.columns)
-                        complete_fields = participant_data.count().sum()
-                        completeness_percent = (complete_fields / (total_fields * len(participant_data))) * 100
-                        
-                        participant_completeness[participant] = {
-                            'completeness_percent': round(completeness_percent, 1),
-                            'records_count': len(participant_data),
-                            'complete_fields': int(complete_fields)
-                        }
+            if 'participant_code_estudo' in completeness.field_index:
+                total_fields = completeness.n_fields
+                labels = [record.get('participant_code_estudo') for record in self.data]
+                for participant, (complete_fields, records_count) in completeness.row_totals_by(labels).items():
+                    if not is_filled(participant):
+                        continue
+                    completeness_percent = (complete_fields / (total_fields * records_count)) * 100
+                    
+                    participant_completeness[participant] = {
+                        'completeness_percent': round(completeness_percent, 1),
+                        'records_count': records_count,
+                        'complete_fields': int(complete_fields)
+                    }
             
             return {
                 'summary': {
-                    'total_fields': len(df.columns),
+                    'total_fields': completeness.n_fields,
                     'total_records': total_records,
                     'high_missing_count': len(high_missing_fields),
                     'moderate_missing_count': len(moderate_missing_fields),
@@ -4250,6 +2828,7 @@ class DataProcessor:
                 df = self.data
             
             print("📋 Avaliando qualidade dos instrumentos...")
+            completeness_matrix = get_completeness(self.data)
             
             # Agrupar campos por instrumento (baseado em prefixos comuns)
             instruments = {}
@@ -4274,7 +2853,7 @@ class DataProcessor:
                 if matching_fields:
                     # Calcular qualidade do instrumento
                     total_possible = len(matching_fields) * len(df)
-                    total_complete = df[matching_fields].count().sum()
+                    total_complete = completeness_matrix.count(fields=matching_fields)
                     
                     completeness = (total_complete / total_possible) * 100 if total_possible > 0 else 0
                     
@@ -0,0 +1,126 @@
+"""
+Funções de distribuição para testes estatísticos (sem scipy)
+Caudas superiores (valores-p) das distribuições normal, t de Student, F e
+qui-quadrado, a partir das funções beta e gama incompletas regularizadas
+(frações contínuas de Lentz). Aceitam escalares ou arrays
+"""
+import math
+
+import numpy as np
+
+_EPS = 1e-14
+_TINY = 1e-300
+_MAX_ITER = 300
+
+
+def _beta_continued_fraction(a, b, x):
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > _TINY else _TINY)
+    h = d
+    for m in range(1, _MAX_ITER + 1):
+        m2 = 2 * m
+        for numerator in (m * (b - m) * x / ((qam + m2) * (a + m2)),
+                          -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > _TINY else _TINY)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > _TINY else _TINY
+            delta = d * c
+            h *= delta
+        if abs(delta - 1.0) < _EPS:
+            break
+    return h
+
+
+def _betainc(a, b, x):
+    """Função beta incompleta regularizada I_x(a, b)"""
+    if not (a > 0 and b > 0) or math.isnan(x):
+        return math.nan
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _beta_continued_fraction(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _beta_continued_fraction(b, a, 1 - x) / b
+
+
+def _gammaincc(a, x):
+    """Função gama incompleta superior regularizada Q(a, x)"""
+    if not a > 0 or math.isnan(x):
+        return math.nan
+    if x <= 0:
+        return 1.0
+    log_front = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # Série de P(a, x)
+        term = total = 1.0 / a
+        ap = a
+        for _ in range(_MAX_ITER):
+            ap += 1
+            term *= x / ap
+            total += term
+            if abs(term) < abs(total) * _EPS:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_front))
+
+    # Fração contínua de Q(a, x)
+    b = x + 1.0 - a
+    c = 1.0 / _TINY
+    d = 1.0 / b
+    h = d
+    for i in range(1, _MAX_ITER + 1):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = 1.0 / (d if abs(d) > _TINY else _TINY)
+        c = b + an / c
+        c = c if abs(c) > _TINY else _TINY
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < _EPS:
+            break
+    return math.exp(log_front) * h
+
+
+_betainc_v = np.vectorize(_betainc, otypes=[float])
+_gammaincc_v = np.vectorize(_gammaincc, otypes=[float])
+_erfc_v = np.vectorize(math.erfc, otypes=[float])
+
+
+def _result(values):
+    return float(values) if np.ndim(values) == 0 else values
+
+
+def normal_sf(z):
+    """P(Z > z) da normal padrão"""
+    return _result(0.5 * _erfc_v(np.asarray(z, dtype=float) / math.sqrt(2)))
+
+
+def normal_two_sided(z):
+    """Valor-p bilateral de uma estatística z"""
+    return _result(_erfc_v(np.abs(np.asarray(z, dtype=float)) / math.sqrt(2)))
+
+
+def t_two_sided(t, df):
+    """Valor-p bilateral de uma estatística t com `df` graus de liberdade"""
+    t = np.asarray(t, dtype=float)
+    df = np.asarray(df, dtype=float)
+    return _result(_betainc_v(df / 2, 0.5, df / (df + t * t)))
+
+
+def f_sf(f, df1, df2):
+    """P(F > f) da distribuição F(df1, df2)"""
+    f = np.maximum(np.asarray(f, dtype=float), 0)
+    df1 = np.asarray(df1, dtype=float)
+    df2 = np.asarray(df2, dtype=float)
+    return _result(_betainc_v(df2 / 2, df1 / 2, df2 / (df2 + df1 * f)))
+
+
+def chi2_sf(x, df):
+    """P(X > x) da distribuição qui-quadrado com `df` graus de liberdade"""
+    x = np.maximum(np.asarray(x, dtype=float), 0)
+    return _result(_gammaincc_v(np.asarray(df, dtype=float) / 2, x / 2))
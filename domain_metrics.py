@@ -0,0 +1,341 @@
+"""
+Métricas das páginas /rm4health-domains-assessment e /efmi25-overview
+Uma única passagem pelo esquema (nomes de campos) e pela matriz de completude
+produz todas as contagens por palavra-chave, a variabilidade do número de campos
+e a cobertura de instrumentos. O resultado fica em cache por snapshot.
+"""
+import snapshot_cache
+from completeness import get_completeness
+
+# Grupos de palavras-chave procuradas nos nomes dos campos
+KEYWORD_GROUPS = {
+    # Domínios RM4Health
+    'observation': ['score', 'value', 'measure', 'assessment'],
+    'medication': ['med', 'drug', 'pill', 'medication'],
+    'condition': ['condition', 'diagnosis', 'disease', 'health'],
+    'consent': ['consent'],
+    'privacy': ['privacy', 'confidential'],
+    'scale': ['likert', 'scale', 'rating'],
+    'visual': ['visual', 'image'],
+    'caregiver': ['caregiver', 'cuidador'],
+    'assessment': ['score', 'total', 'assessment', 'questionnaire'],
+    'clinical_instrument': ['eq5d', 'psqi', 'barthel', 'moca', 'gds', 'iadl'],
+    # EFMI25
+    'efmi_observation': ['score', 'value', 'measure'],
+    'efmi_condition': ['diagnosis', 'condition', 'disease'],
+    'mobile': ['mobile', 'app'],
+    'iot': ['sensor', 'device'],
+    'ai': ['prediction', 'ml'],
+    'realtime': ['real', 'continuous'],
+    'functional': ['functional', 'mobility', 'independence', 'adl'],
+    'date': ['date'],
+    'repeat': ['repeat'],
+    'outcome': ['score', 'total', 'result'],
+}
+
+# Instrumentos avaliados individualmente (cobertura)
+CLINICAL_INSTRUMENTS = ['eq5d', 'psqi', 'barthel', 'moca', 'gds', 'iadl']
+ELDERLY_INSTRUMENTS = ['barthel', 'iadl', 'eq5d', 'mini_mental', 'gds']
+
+# Campos identificadores diretos (anonimização)
+IDENTIFYING_FIELDS = ['name', 'email', 'phone']
+
+
+class SchemaProfile:
+    """Perfil do esquema do snapshot: campos por palavra-chave e contagens de presença"""
+
+    def __init__(self, records):
+        self.records = records
+        self.completeness = get_completeness(records)
+        matrix = self.completeness
+
+        self.n_records = matrix.n_records
+        self.fields = matrix.fields
+        self.key_counts = matrix.present_counts()
+        self.filled_counts = matrix.row_counts()
+        presence = matrix.present_column_counts().tolist()
+        self.presence = dict(zip(self.fields, presence))
+
+        # Passagem única pelo esquema: cada campo é testado contra todos os grupos
+        self.keyword_fields = {group: [] for group in KEYWORD_GROUPS}
+        self.instrument_fields = {inst: [] for inst in set(CLINICAL_INSTRUMENTS + ELDERLY_INSTRUMENTS)}
+        self.prefixes = set()
+        self.complete_prefixes = set()
+
+        for field in self.fields:
+            lower = field.lower()
+            for group, keywords in KEYWORD_GROUPS.items():
+                if any(keyword in lower for keyword in keywords):
+                    self.keyword_fields[group].append(field)
+            for inst, inst_fields in self.instrument_fields.items():
+                if inst in lower:
+                    inst_fields.append(field)
+            if '_' in field:
+                self.prefixes.add(field.split('_')[0])
+                if '_complete' in field:
+                    self.complete_prefixes.add(field.split('_')[0])
+
+    def occurrences(self, group):
+        """Número de pares (registo, campo) cujo nome contém uma palavra-chave do grupo"""
+        return sum(self.presence[f] for f in self.keyword_fields[group])
+
+    def records_with(self, fields):
+        """Número de registos que têm pelo menos um dos campos"""
+        if not fields:
+            return 0
+        return int((self.completeness.present_counts(fields) > 0).sum())
+
+    def any_record_with(self, fields):
+        """Indica se algum registo tem pelo menos um dos campos"""
+        return any(self.presence.get(f, 0) > 0 for f in fields)
+
+    def distinct_ids(self, id_fields):
+        """Número de identificadores distintos (índice do registo quando não existe id)"""
+        ids = set()
+        for idx, record in enumerate(self.records):
+            value = idx
+            for id_field in reversed(id_fields):
+                if id_field in record:
+                    value = record[id_field]
+            ids.add(value)
+        return len(ids)
+
+
+def get_schema_profile(records):
+    """Retorna o perfil de esquema do snapshot (calculado uma única vez)"""
+    return snapshot_cache.get_cached(records, 'schema_profile', lambda: SchemaProfile(records))
+
+
+def _domains_assessment(records):
+    """Calcula as métricas da avaliação multidimensional em 4 domínios"""
+    profile = get_schema_profile(records)
+    n = profile.n_records
+    key_counts = profile.key_counts
+    filled_counts = profile.filled_counts
+
+    # Technical Domain - Based on real data structure and completeness
+    data_completeness = int((key_counts > 5).sum()) / n * 100
+    field_consistency = len(set(key_counts.tolist())) / n * 100
+    technical_score = (data_completeness + field_consistency) / 2
+
+    # FHIR compliance based on actual field mapping
+    fhir_patient_count = profile.presence.get('record_id', 0)
+    fhir_observation_count = profile.occurrences('observation')
+    fhir_medication_count = profile.occurrences('medication')
+    fhir_condition_count = profile.occurrences('condition')
+
+    total_fhir_mappings = fhir_patient_count + fhir_observation_count + fhir_medication_count + fhir_condition_count
+    fhir_compliance_score = min(90, (total_fhir_mappings / n) * 10)
+
+    # Ethical Domain - Based on data protection indicators
+    has_consent_fields = profile.any_record_with(profile.keyword_fields['consent'])
+    has_privacy_fields = profile.any_record_with(profile.keyword_fields['privacy'])
+    identifying = [f for f in profile.fields if f.lower() in IDENTIFYING_FIELDS]
+    matrix = profile.completeness
+    with_record_id = matrix.present_counts(['record_id']) > 0
+    without_identifiers = matrix.present_counts(identifying) == 0
+    data_anonymization = int((with_record_id & without_identifiers).sum()) / n * 100
+    ethical_score = (data_anonymization + (50 if has_consent_fields else 0) + (30 if has_privacy_fields else 0)) / 1.8
+
+    # Organizational Domain - Based on data collection patterns
+    consistent_collection = len(set(filled_counts.tolist())) / n * 100
+    standardized_fields = matrix.distinct_present_patterns() / n * 100
+    organizational_score = (consistent_collection + (100 - standardized_fields)) / 2
+
+    # Clinical Domain - Based on clinical instrument presence
+    instrument_coverage = sum(1 for inst in CLINICAL_INSTRUMENTS
+                              if profile.any_record_with(profile.instrument_fields[inst])) / len(CLINICAL_INSTRUMENTS) * 100
+    clinical_data_completeness = profile.records_with(profile.keyword_fields['clinical_instrument']) / n * 100
+    clinical_score = (instrument_coverage + clinical_data_completeness) / 2
+
+    # Elderly-friendly design metrics based on actual usability indicators
+    simplified_scales = profile.occurrences('scale') / n * 20
+    cognitive_load_score = min(100, 70 + simplified_scales)
+    visual_aids_score = min(100, 60 + (profile.occurrences('visual') / n * 30))
+    accessibility_score = min(100, 65 + (organizational_score * 0.3))
+    caregiver_support_score = min(100, 70 + (profile.records_with(profile.keyword_fields['caregiver']) / n * 40))
+    elderly_usability_score = (cognitive_load_score + visual_aids_score + accessibility_score + caregiver_support_score) / 4
+
+    # Implementation readiness based on data quality
+    implementation_readiness = (technical_score + organizational_score) / 2
+    validation_completeness = min(100, (int((filled_counts > key_counts * 0.8).sum()) / n) * 100)
+
+    # Implementation Science indicators based on actual data patterns
+    data_consistency_ratio = int((key_counts >= key_counts[0] * 0.8).sum()) / n
+    acceptability_score = min(100, data_consistency_ratio * 100)
+    feasibility_score = min(100, (technical_score + organizational_score) / 2)
+    adoption_score = min(100, n / 10)  # Based on actual participant adoption
+    fidelity_score = validation_completeness
+
+    # Calculate totals from real data
+    total_participants = profile.distinct_ids(['record_id', 'participant_id'])
+    total_instruments = len(profile.prefixes)
+    total_assessments = profile.occurrences('assessment')
+
+    return {
+        # Main metrics
+        'technical_score': round(technical_score, 1),
+        'ethical_score': round(ethical_score, 1),
+        'organizational_score': round(organizational_score, 1),
+        'clinical_score': round(clinical_score, 1),
+
+        # FHIR compliance
+        'fhir_compliance_score': round(fhir_compliance_score, 1),
+        'fhir_patient_count': fhir_patient_count,
+        'fhir_observation_count': fhir_observation_count,
+        'fhir_medication_count': fhir_medication_count,
+        'fhir_condition_count': fhir_condition_count,
+
+        # Elderly-friendly design
+        'elderly_usability_score': round(elderly_usability_score, 1),
+        'cognitive_load_score': round(cognitive_load_score, 1),
+        'visual_aids_score': round(visual_aids_score, 1),
+        'accessibility_score': round(accessibility_score, 1),
+        'caregiver_support_score': round(caregiver_support_score, 1),
+
+        # Implementation metrics
+        'implementation_readiness': round(implementation_readiness, 1),
+        'validation_completeness': round(validation_completeness, 1),
+
+        # Implementation Science
+        'acceptability_score': round(acceptability_score, 1),
+        'feasibility_score': round(feasibility_score, 1),
+        'adoption_score': round(adoption_score, 1),
+        'fidelity_score': round(fidelity_score, 1),
+
+        # Totals
+        'total_participants': total_participants,
+        'total_instruments': total_instruments,
+        'total_assessments': total_assessments
+    }
+
+
+def _efmi25_overview(records):
+    """Calcula as métricas da visão geral EFMI25"""
+    profile = get_schema_profile(records)
+    total_records = profile.n_records
+    key_counts = profile.key_counts
+    filled_counts = profile.filled_counts
+
+    # EFMI25 Conference Metrics - Explicação para leigos:
+    # Estas métricas são calculadas especificamente para apresentar na conferência EFMI25
+
+    # 1. RESEARCH READINESS SCORE (0-100)
+    # Explicação: Mede quão pronto o projeto está para publicação científica
+    # Cálculo: Baseado na qualidade dos dados, completude e metodologia
+    complete_records = int((filled_counts > key_counts * 0.8).sum())
+    research_readiness = (complete_records / total_records * 100) if total_records > 0 else 0
+
+    # 2. PUBLICATION IMPACT POTENTIAL (1-5 stars)
+    # Explicação: Estima o potencial impacto científico baseado em critérios objetivos
+    # Critérios: Tamanho da amostra, diversidade de instrumentos, qualidade metodológica
+    unique_participants = profile.distinct_ids(['participant_code', 'record_id'])
+    unique_instruments = len(profile.complete_prefixes)
+    field_coverage = len(profile.fields) / 100  # Normalized to 0-1
+
+    # Calculation: Weighted score based on sample size, instruments, and data quality
+    sample_score = min(5, unique_participants / 5)  # 1 star per 5 participants, max 5
+    instrument_score = min(5, unique_instruments / 2)  # 1 star per 2 instruments, max 5
+    quality_score = min(5, field_coverage)  # Based on field diversity
+    publication_impact = round((sample_score + instrument_score + quality_score) / 3, 1)
+
+    # 3. FHIR COMPLIANCE LEVEL (Advanced/Intermediate/Basic)
+    # Explicação: Mede compatibilidade com padrões internacionais de saúde digital
+    # FHIR = Fast Healthcare Interoperability Resources (padrão HL7)
+    fhir_patient_mappings = profile.records_with(['participant_code', 'record_id'])
+    fhir_observation_mappings = profile.occurrences('efmi_observation')
+    fhir_condition_mappings = profile.occurrences('efmi_condition')
+
+    total_fhir_score = (fhir_patient_mappings + fhir_observation_mappings + fhir_condition_mappings) / (total_records * 3) * 100
+
+    if total_fhir_score >= 70:
+        fhir_compliance_level = "Advanced"
+        fhir_compliance_color = "success"
+    elif total_fhir_score >= 40:
+        fhir_compliance_level = "Intermediate"
+        fhir_compliance_color = "warning"
+    else:
+        fhir_compliance_level = "Basic"
+        fhir_compliance_color = "danger"
+
+    # 4. INNOVATION INDEX (0-100)
+    # Explicação: Mede o grau de inovação tecnológica do projeto
+    # Fatores: Uso de tecnologias emergentes, integração de sistemas, metodologias inovadoras
+    has_mobile_data = profile.any_record_with(profile.keyword_fields['mobile'])
+    has_iot_data = profile.any_record_with(profile.keyword_fields['iot'])
+    has_ai_features = profile.any_record_with(profile.keyword_fields['ai'])
+    has_realtime_monitoring = profile.any_record_with(profile.keyword_fields['realtime'])
+
+    innovation_features = [has_mobile_data, has_iot_data, has_ai_features, has_realtime_monitoring]
+    innovation_index = sum(innovation_features) / len(innovation_features) * 100
+
+    # 5. ELDERLY-CARE FOCUS SCORE (0-100)
+    # Explicação: Mede quão bem o sistema está adaptado para cuidados geriátricos
+    # Indicadores: Instrumentos específicos para idosos, métricas de funcionalidade, qualidade de vida
+    elderly_coverage = sum(1 for inst in ELDERLY_INSTRUMENTS
+                           if profile.any_record_with(profile.instrument_fields[inst])) / len(ELDERLY_INSTRUMENTS) * 100
+
+    functional_assessments = profile.occurrences('functional')
+    elderly_focus_score = (elderly_coverage + min(100, functional_assessments / total_records * 50)) / 2
+
+    # 6. DATA QUALITY METRICS FOR CONFERENCE
+    # Explicação: Métricas específicas que demonstram rigor científico
+    missing_data_rate = int((key_counts - filled_counts).sum()) / (total_records * int(key_counts[0])) * 100
+    data_consistency_score = 100 - (len(set(key_counts.tolist())) / total_records * 100)
+    temporal_consistency = profile.records_with(profile.keyword_fields['date']) / total_records * 100
+
+    overall_data_quality = (100 - missing_data_rate + data_consistency_score + temporal_consistency) / 3
+
+    # 7. CONFERENCE PRESENTATION READINESS
+    # Explicação: Avalia se o projeto está pronto para apresentação acadêmica
+    first_record_fields = [f.lower() for f in records[0].keys()]
+    has_baseline_data = total_records >= 20  # Minimum sample for conference presentation
+    has_longitudinal_data = profile.records_with(profile.keyword_fields['repeat']) > 0
+    has_outcome_measures = profile.occurrences('outcome') > 0
+    has_demographic_data = any(demo in field for field in first_record_fields for demo in ['age', 'sex', 'birth'])
+
+    readiness_criteria = [has_baseline_data, has_longitudinal_data, has_outcome_measures, has_demographic_data]
+    conference_readiness = sum(readiness_criteria) / len(readiness_criteria) * 100
+
+    return {
+        # Core metrics
+        'total_participants': unique_participants,
+        'total_records': total_records,
+        'total_instruments': unique_instruments,
+
+        # EFMI25 specific metrics
+        'research_readiness': round(research_readiness, 1),
+        'publication_impact': publication_impact,
+        'fhir_compliance_level': fhir_compliance_level,
+        'fhir_compliance_color': fhir_compliance_color,
+        'fhir_compliance_score': round(total_fhir_score, 1),
+        'innovation_index': round(innovation_index, 1),
+        'elderly_focus_score': round(elderly_focus_score, 1),
+        'data_quality_score': round(overall_data_quality, 1),
+        'conference_readiness': round(conference_readiness, 1),
+
+        # Detailed breakdowns for explanations
+        'missing_data_rate': round(missing_data_rate, 1),
+        'data_consistency_score': round(data_consistency_score, 1),
+        'temporal_consistency': round(temporal_consistency, 1),
+
+        # Feature flags for innovation
+        'has_mobile_data': has_mobile_data,
+        'has_iot_data': has_iot_data,
+        'has_ai_features': has_ai_features,
+        'has_realtime_monitoring': has_realtime_monitoring
+    }
+
+
+def get_domains_assessment_metrics(records):
+    """Métricas de /rm4health-domains-assessment (em cache por snapshot)"""
+    if not records:
+        raise Exception("Dados não disponíveis")
+    return snapshot_cache.get_cached(records, 'domains_assessment', lambda: _domains_assessment(records))
+
+
+def get_efmi25_metrics(records):
+    """Métricas de /efmi25-overview (em cache por snapshot)"""
+    if not records:
+        raise Exception("Dados não disponíveis")
+    return snapshot_cache.get_cached(records, 'efmi25_overview', lambda: _efmi25_overview(records))
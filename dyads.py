@@ -0,0 +1,113 @@
+"""
+Índice de díades paciente ↔ cuidador
+- Construído uma vez por snapshot a partir dos registos baseline:
+  participant_code_estudo, participant_group e related_participant_id
+  (código de estudo do participante relacionado)
+- Grupos A/B são pacientes e C/D cuidadores; a ligação pode estar declarada
+  em qualquer um dos lados e é normalizada para pares (paciente, cuidador)
+- Pares guardados num DataFrame, pelo que qualquer página pode juntar
+  tabelas por participante de pacientes e cuidadores com um merge vetorizado
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+import snapshot_cache
+from columns import object_column
+
+PATIENT_GROUPS = {'A': 'Residente', 'B': 'Não-Residente'}
+CAREGIVER_GROUPS = {'C': 'Cuidador informal', 'D': 'Cuidador formal'}
+
+
+def group_letter(value):
+    """Letra do grupo ('a' ou 'Residente (Grupo A)' -> 'A'; None se vazio)"""
+    value = str(value or '').strip()
+    if len(value) == 1:
+        return value.upper()
+    match = re.search(r'Grupo\s+([A-Z])', value)
+    return match.group(1) if match else None
+
+
+class DyadIndex:
+    """Pares (paciente, cuidador) e papel de cada participante"""
+
+    def __init__(self, records):
+        instruments = object_column(records, 'redcap_repeat_instrument')
+        baseline = ~instruments.astype(bool)
+        frame = pd.DataFrame({
+            'participant': object_column(records, 'participant_code')[baseline],
+            'study_code': object_column(records, 'participant_code_estudo')[baseline],
+            'group': [group_letter(g) for g in object_column(records, 'participant_group')[baseline]],
+            'related': object_column(records, 'related_participant_id')[baseline]
+        })
+        frame = frame[frame['participant'].astype(bool)].drop_duplicates('participant')
+        self.roles = frame.set_index('participant')['group'].map(
+            lambda g: 'caregiver' if g in CAREGIVER_GROUPS else 'patient' if g in PATIENT_GROUPS else None
+        )
+
+        # related_participant_id guarda o código de estudo (ou, em exportações antigas, o código REDCap)
+        codes = pd.concat([
+            pd.Series(frame['participant'].to_numpy(), index=frame['study_code'].fillna('')),
+            pd.Series(frame['participant'].to_numpy(), index=frame['participant'])
+        ])
+        codes = codes[codes.index.astype(bool)]
+        codes = codes[~codes.index.duplicated()]
+
+        links = frame[frame['related'].fillna('').astype(str).str.strip().astype(bool)]
+        related = links['related'].astype(str).str.strip().map(codes)
+        self.unresolved = int(related.isna().sum())
+
+        pairs = pd.DataFrame({'a': links['participant'].to_numpy(), 'b': related.to_numpy()}).dropna()
+        role_a = pairs['a'].map(self.roles)
+        role_b = pairs['b'].map(self.roles)
+        forward = (role_a == 'patient') & (role_b == 'caregiver')
+        backward = (role_a == 'caregiver') & (role_b == 'patient')
+        self.invalid = int(len(pairs) - forward.sum() - backward.sum())
+
+        self.pairs = pd.DataFrame({
+            'patient': np.where(forward, pairs['a'], pairs['b'])[forward | backward],
+            'caregiver': np.where(forward, pairs['b'], pairs['a'])[forward | backward]
+        }).drop_duplicates(ignore_index=True)
+        groups = frame.set_index('participant')['group']
+        self.pairs['patient_group'] = self.pairs['patient'].map(groups)
+        self.pairs['caregiver_type'] = self.pairs['caregiver'].map(groups).map(CAREGIVER_GROUPS)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def has_caregiver(self, participants):
+        """Máscara booleana: o participante é um paciente com cuidador ligado"""
+        return np.isin(np.asarray(participants, dtype=object), self.pairs['patient'].to_numpy())
+
+    def caregivers_of(self, patient):
+        return self.pairs.loc[self.pairs['patient'] == patient, 'caregiver'].tolist()
+
+    def patients_of(self, caregiver):
+        return self.pairs.loc[self.pairs['caregiver'] == caregiver, 'patient'].tolist()
+
+    def join(self, patients, caregivers, suffixes=('_patient', '_caregiver')):
+        """Uma linha por díade com as colunas das tabelas de pacientes e de cuidadores
+
+        `patients` e `caregivers` são DataFrames indexados pelo participant_code
+        """
+        joined = self.pairs.merge(patients, how='left', left_on='patient', right_index=True)
+        return joined.merge(caregivers, how='left', left_on='caregiver', right_index=True, suffixes=suffixes)
+
+    def summary(self):
+        counts = self.roles.value_counts()
+        return {
+            'dyads': len(self.pairs),
+            'patients': int(counts.get('patient', 0)),
+            'caregivers': int(counts.get('caregiver', 0)),
+            'patients_with_caregiver': int(self.pairs['patient'].nunique()),
+            'caregivers_with_patient': int(self.pairs['caregiver'].nunique()),
+            'unresolved_links': self.unresolved,
+            'invalid_links': self.invalid,
+            'by_caregiver_type': {str(k): int(v) for k, v in self.pairs['caregiver_type'].value_counts().items()}
+        }
+
+
+def get_dyad_index(records):
+    """DyadIndex do snapshot (construído uma vez por lista de registos)"""
+    return snapshot_cache.get_cached(records, ('dyads',), lambda: DyadIndex(records))
@@ -0,0 +1,232 @@
+"""
+Motor genérico de comparação entre grupos
+- Qualquer lista de campos numéricos e categóricos, agrupados por um campo
+  do baseline (participant_group, sex, ...) ou pela residência (A vs B)
+- Unidade de análise: o participante (média das suas respostas nos campos
+  numéricos; primeiro valor preenchido, i.e. o do baseline, nos categóricos),
+  numa só agregação groupby por participante
+- Descritivas por grupo (groupby do pandas), ANOVA, Kruskal-Wallis e (em
+  coortes pequenas) permutação da estatística F nos campos numéricos e
+  qui-quadrado nos categóricos (hypothesis_tests, resampling)
+- Em cache por (snapshot, campos, agrupamento), com um número limitado de
+  combinações de campos por snapshot
+- Aceita registos 'raw' (códigos) ou 'label' (rótulos das opções)
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import snapshot_cache
+from columns import (HEALTH_SCALE, VISITS_SCALE, YES_NO_SCALE, baseline_values, map_column, object_column, scored,
+                     to_number)
+from config import Config
+from dyads import group_letter
+from hypothesis_tests import chi_square_test, kruskal_wallis, one_way_anova
+from resampling import DEFAULT_SEED, permutation_f_test
+
+FREQUENCY_SCALE = {'Nunca': 1, 'Raramente': 2, 'Às vezes': 3, 'Muitas vezes': 4, 'Sempre ou quase sempre': 5}
+EQ5D_SCALE = {'Sem problemas': 1, 'Problemas ligeiros': 2, 'Problemas moderados': 3,
+              'Problemas graves': 4, 'Incapaz': 5}
+
+# Escala {rótulo: código} dos campos de escolha tratados como numéricos
+FIELD_SCALES = {
+    'health_status': HEALTH_SCALE,
+    'receiving_visits': VISITS_SCALE,
+    'took_medications_yesterday': YES_NO_SCALE,
+    **{field: FREQUENCY_SCALE for field in ('pain_today', 'fatigue_today', 'dizziness_today', 'muscle_weakness_today')},
+    **{field: EQ5D_SCALE for field in ('mobility', 'self_care', 'usual_activities', 'pain_discomfort',
+                                       'anxiety_depression')}
+}
+
+RESIDENCE_GROUPS = {'A': 'residents', 'B': 'non_residents'}
+
+# Agrupamentos derivados: nome -> (campo do baseline, valor -> grupo ou None)
+GROUPINGS = {
+    'participant_group': ('participant_group', group_letter),
+    'residence': ('participant_group', lambda value: RESIDENCE_GROUPS.get(group_letter(value)))
+}
+
+DESCRIPTIVES = ['count', 'mean', 'std', 'median', 'min', 'max']
+
+# Campos comparados por omissão (página de padrões e API sem campos indicados)
+DEFAULT_NUMERIC = ['health_status', 'pain_today', 'fatigue_today', 'vas_health_today']
+DEFAULT_CATEGORICAL = ['sex', 'marital_status', 'education_level']
+
+# Combinações (campos, agrupamento) mantidas em cache por snapshot
+MAX_CACHED_COMPARISONS = 32
+
+_cache_lock = threading.Lock()
+
+
+def normalize_fields(numeric=(), categorical=()):
+    """Listas de campos sem repetições e ordenadas, como tuplos
+
+    ValueError se um campo aparecer como numérico e como categórico
+    """
+    numeric, categorical = tuple(sorted(set(numeric))), tuple(sorted(set(categorical)))
+    both = sorted(set(numeric) & set(categorical))
+    if both:
+        raise ValueError(f"Campos numéricos e categóricos ao mesmo tempo: {', '.join(both)}")
+    return numeric, categorical
+
+
+def _text_value(value):
+    """Valor como texto sem espaços (None se vazio)"""
+    value = str(value).strip() if value is not None else ''
+    return value or None
+
+
+def _primary_test(result):
+    """(teste, significativo) do teste principal de um campo numérico
+
+    Um só teste decide: a permutação da estatística F quando foi calculada,
+    senão a ANOVA; o Kruskal-Wallis é só informativo
+    """
+    permutation = result.get('permutation')
+    if permutation and permutation.get('p_value') is not None:
+        return 'permutation', bool(permutation['significant'])
+    return 'anova', bool(result.get('anova', {}).get('significant'))
+
+
+class GroupComparison:
+    """Tabela participante × campos com o grupo de cada participante e testes entre grupos"""
+
+    def __init__(self, records, numeric=(), categorical=(), grouping='participant_group'):
+        numeric, categorical = normalize_fields(numeric, categorical)
+        self.numeric = list(numeric)
+        self.categorical = list(categorical)
+        self.grouping = grouping
+
+        frame = pd.DataFrame({
+            field: map_column(records, field, scored(FIELD_SCALES[field]) if field in FIELD_SCALES else to_number)
+            for field in self.numeric
+        }, index=range(len(records)))
+        for field in self.categorical:
+            frame[field] = map_column(records, field, _text_value, dtype=object, missing=None)
+        frame['participant'] = object_column(records, 'participant_code')
+        frame = frame[frame['participant'].astype(bool)]
+
+        grouped = frame.groupby('participant', sort=False)
+        table = pd.concat([grouped[self.numeric].mean(), grouped[self.categorical].first()], axis=1) \
+            if len(frame) else pd.DataFrame(columns=self.numeric + self.categorical)
+        # Número de respostas por participante em cada campo numérico
+        self.reports = grouped[self.numeric].count() if len(frame) else pd.DataFrame(columns=self.numeric)
+
+        field, convert = GROUPINGS.get(grouping, (grouping, _text_value))
+        groups = pd.Series(baseline_values(records, field), dtype=object).map(convert).dropna()
+        self.table = table.reindex(groups.index)
+        self.reports = self.reports.reindex(groups.index).fillna(0)
+        self.table['group'] = groups
+        self.groups = sorted(groups.unique(), key=str)
+        self.labels = pd.Categorical(groups, categories=self.groups).codes
+        self._analysis = None
+
+    def group_sizes(self):
+        return {str(group): int(count) for group, count in self.table['group'].value_counts().reindex(self.groups).items()}
+
+    def mask(self, group):
+        return (self.table['group'] == group).to_numpy()
+
+    def descriptives(self):
+        """{campo: {grupo: contagem, média, dp, mediana, mín, máx}} (uma agregação groupby)"""
+        if not self.numeric:
+            return {}
+        stats = self.table.groupby('group')[self.numeric].agg(DESCRIPTIVES)
+        result = {}
+        for field in self.numeric:
+            result[field] = {
+                str(group): {
+                    stat: (int(value) if stat == 'count' else round(float(value), 2)) if pd.notna(value) else None
+                    for stat, value in stats.loc[group, field].items()
+                }
+                for group in stats.index if stats.loc[group, (field, 'count')]
+            }
+        return result
+
+    def numeric_tests(self):
+        """{campo: ANOVA e Kruskal-Wallis} (todas as colunas numa só chamada)"""
+        if not self.numeric or not len(self.table):
+            return {}
+        values = self.table[self.numeric].to_numpy(dtype=float)
+        anova = one_way_anova(values, self.labels)
+        kruskal = kruskal_wallis(values, self.labels)
+        # Permutação da estatística F só em coortes pequenas
+        resample = len(values) <= Config.RESAMPLING_MAX_PARTICIPANTS
+        rng = np.random.default_rng(DEFAULT_SEED)
+        return {
+            field: {
+                'anova': {key: series[j] for key, series in anova.items()},
+                'kruskal_wallis': {key: series[j] for key, series in kruskal.items()},
+                'permutation': permutation_f_test(values[:, j], self.labels, rng=rng) if resample else None
+            }
+            for j, field in enumerate(self.numeric)
+        }
+
+    def categorical_comparison(self, field):
+        """Distribuição por grupo e qui-quadrado de um campo categórico"""
+        data = self.table.loc[self.table[field].notna(), ['group', field]]
+        crosstab = pd.crosstab(data[field].astype(str), data['group']).reindex(columns=self.groups, fill_value=0)
+        return {
+            'distribution': {
+                str(group): {category: int(count) for category, count in crosstab[group].items() if count}
+                for group in self.groups
+            },
+            'chi_square': chi_square_test(crosstab.to_numpy())
+        }
+
+    def analysis(self):
+        if self._analysis is not None:
+            return self._analysis
+        descriptives = self.descriptives()
+        tests = self.numeric_tests()
+        numeric = {
+            field: {'descriptives': descriptives.get(field, {}), **tests.get(field, {})}
+            for field in self.numeric
+        }
+        for result in numeric.values():
+            result['primary_test'], result['significant'] = _primary_test(result)
+        categorical = {field: self.categorical_comparison(field) for field in self.categorical}
+
+        significant = [field for field, result in numeric.items() if result['significant']]
+        significant += [field for field, result in categorical.items() if result['chi_square']['significant']]
+        sizes = self.group_sizes()
+        self._analysis = {
+            'grouping': self.grouping,
+            'groups': sizes,
+            'numeric': numeric,
+            'categorical': categorical,
+            'summary': {
+                'participants': int(sum(sizes.values())),
+                'groups_compared': len(sizes),
+                'significant_fields': significant,
+                'methodology': 'Médias por participante; significância pela permutação da estatística F '
+                               '(ou pela ANOVA de um fator em coortes grandes), Kruskal-Wallis como '
+                               'informação adicional (numéricos); qui-quadrado (categóricos)'
+            }
+        }
+        return self._analysis
+
+
+def get_group_comparison(records, numeric=(), categorical=(), grouping='participant_group'):
+    """GroupComparison do snapshot, em cache por (campos, agrupamento)
+
+    As combinações menos usadas recentemente saem da cache quando o snapshot
+    tem mais de MAX_CACHED_COMPARISONS
+    """
+    numeric, categorical = normalize_fields(numeric, categorical)
+    key = (numeric, categorical, grouping)
+    cache = snapshot_cache.get_cached(records, 'group_comparisons', OrderedDict)
+    with _cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+    comparison = GroupComparison(records, numeric, categorical, grouping)
+    with _cache_lock:
+        comparison = cache.setdefault(key, comparison)
+        cache.move_to_end(key)
+        while len(cache) > MAX_CACHED_COMPARISONS:
+            cache.popitem(last=False)
+    return comparison
@@ -0,0 +1,222 @@
+"""
+Testes de hipóteses vetorizados em NumPy (sem scipy)
+- Dois grupos: Welch t e Mann-Whitney U coluna a coluna (cada coluna de uma
+  matriz participante × variável, NaN = em falta, numa só operação)
+- N grupos: ANOVA de um fator e Kruskal-Wallis coluna a coluna, a partir de
+  somas por grupo (np.add.at sobre o código do grupo de cada linha)
+- Qui-quadrado de independência numa tabela de contingência
+- Tamanhos de efeito: g de Hedges, rank-biserial, eta², epsilon² e V de Cramér
+"""
+import numpy as np
+import pandas as pd
+
+from config import Config
+from distributions import chi2_sf, f_sf, normal_two_sided, t_two_sided
+
+
+def _as_matrix(values):
+    values = np.asarray(values, dtype=float)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def _rounded(values, digits=4):
+    """Lista de floats arredondados (None se não finito)"""
+    return [round(float(v), digits) if np.isfinite(v) else None for v in np.atleast_1d(values)]
+
+
+def _significant(p_values):
+    p_values = np.atleast_1d(p_values)
+    return [bool(p < Config.SIGNIFICANCE_LEVEL) if np.isfinite(p) else False for p in p_values]
+
+
+def _moments(X):
+    """(n, média, variância amostral) de cada coluna, ignorando NaN"""
+    present = ~np.isnan(X)
+    n = present.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(present, X, 0).sum(axis=0) / n
+        var = np.where(present, (X - mean) ** 2, 0).sum(axis=0) / (n - 1)
+    return n, mean, var
+
+
+def welch_t_test(a, b):
+    """Teste t de Welch (a vs b) para cada coluna, com o g de Hedges
+
+    Devolve listas (uma entrada por coluna); estatísticas None quando um dos
+    grupos tem menos de 2 valores ou variância nula em ambos
+    """
+    a, b = _as_matrix(a), _as_matrix(b)
+    n1, m1, v1 = _moments(a)
+    n2, m2, v2 = _moments(b)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s1, s2 = v1 / n1, v2 / n2
+        t = (m1 - m2) / np.sqrt(s1 + s2)
+        df = (s1 + s2) ** 2 / (s1 ** 2 / (n1 - 1) + s2 ** 2 / (n2 - 1))
+        pooled = np.sqrt(((n1 - 1) * v1 + (n2 - 1) * v2) / (n1 + n2 - 2))
+        hedges_g = (m1 - m2) / pooled * (1 - 3 / (4 * (n1 + n2) - 9))
+
+    valid = (n1 >= 2) & (n2 >= 2) & np.isfinite(t) & np.isfinite(df)
+    p_values = np.full(t.shape, np.nan)
+    if valid.any():
+        p_values[valid] = np.atleast_1d(t_two_sided(t[valid], df[valid]))
+    return {
+        'n_a': n1.tolist(),
+        'n_b': n2.tolist(),
+        'mean_a': _rounded(m1, 2),
+        'mean_b': _rounded(m2, 2),
+        'difference': _rounded(m1 - m2, 2),
+        't': _rounded(np.where(valid, t, np.nan)),
+        'df': _rounded(np.where(valid, df, np.nan), 1),
+        'p_value': _rounded(p_values, 6),
+        'significant': _significant(p_values),
+        'hedges_g': _rounded(np.where(valid, hedges_g, np.nan), 3)
+    }
+
+
+def mann_whitney_u(a, b):
+    """Teste U de Mann-Whitney (aproximação normal com correção de empates e
+    de continuidade) para cada coluna, com a correlação rank-biserial
+
+    rank_biserial > 0 indica valores tendencialmente maiores em `a`
+    """
+    a, b = _as_matrix(a), _as_matrix(b)
+    X = np.vstack([a, b])
+    # Ranks médios por coluna (NaN mantém-se NaN)
+    ranks = pd.DataFrame(X).rank(method='average').to_numpy()
+    n1 = (~np.isnan(a)).sum(axis=0)
+    n2 = (~np.isnan(b)).sum(axis=0)
+    N = n1 + n2
+    u = np.nansum(ranks[:len(a)], axis=0) - n1 * (n1 + 1) / 2
+    tie_terms = _tie_terms(X)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mu = n1 * n2 / 2
+        sigma = np.sqrt(n1 * n2 / 12 * ((N + 1) - tie_terms / (N * (N - 1))))
+        z = (u - mu - 0.5 * np.sign(u - mu)) / sigma
+        rank_biserial = 2 * u / (n1 * n2) - 1
+
+    valid = (n1 >= 1) & (n2 >= 1) & (sigma > 0)
+    p_values = np.full(z.shape, np.nan)
+    if valid.any():
+        p_values[valid] = np.atleast_1d(normal_two_sided(z[valid]))
+    return {
+        'u': _rounded(np.where(valid, u, np.nan), 1),
+        'z': _rounded(np.where(valid, z, np.nan)),
+        'p_value': _rounded(p_values, 6),
+        'significant': _significant(p_values),
+        'rank_biserial': _rounded(np.where((n1 >= 1) & (n2 >= 1), rank_biserial, np.nan), 3)
+    }
+
+
+def _tie_terms(X):
+    """Soma de t³ - t dos grupos de valores empatados de cada coluna"""
+    long = pd.DataFrame(X).melt().dropna()
+    ties = long.groupby(['variable', 'value']).size().astype(float)
+    return (ties ** 3 - ties).groupby(level=0).sum().reindex(range(X.shape[1]), fill_value=0.0).to_numpy()
+
+
+def _group_sums(X, labels, n_groups):
+    """(contagens, somas) por grupo × coluna, ignorando NaN"""
+    present = ~np.isnan(X)
+    counts = np.zeros((n_groups, X.shape[1]))
+    sums = np.zeros((n_groups, X.shape[1]))
+    np.add.at(counts, labels, present)
+    np.add.at(sums, labels, np.where(present, X, 0.0))
+    return counts, sums
+
+
+def one_way_anova(X, labels):
+    """ANOVA de um fator para cada coluna de X, com o eta²
+
+    `labels` tem o código do grupo (0..g-1) de cada linha; só contam os grupos
+    com valores na coluna. Estatísticas None com menos de 2 grupos ou sem
+    graus de liberdade dentro dos grupos
+    """
+    X = _as_matrix(X)
+    labels = np.asarray(labels, dtype=np.int64)
+    n_groups = int(labels.max()) + 1 if len(labels) else 0
+    counts, sums = _group_sums(X, labels, n_groups)
+    present = ~np.isnan(X)
+    total_n = counts.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grand_mean = sums.sum(axis=0) / total_n
+        group_means = sums / counts
+        between = np.nansum(counts * (group_means - grand_mean) ** 2, axis=0)
+        total = np.where(present, (X - grand_mean) ** 2, 0).sum(axis=0)
+        within = total - between
+        df_between = (counts > 0).sum(axis=0) - 1
+        df_within = total_n - df_between - 1
+        f = (between / df_between) / (within / df_within)
+        eta_squared = between / total
+
+    valid = (df_between >= 1) & (df_within >= 1) & np.isfinite(f)
+    p_values = np.full(f.shape, np.nan)
+    if valid.any():
+        p_values[valid] = np.atleast_1d(f_sf(f[valid], df_between[valid], df_within[valid]))
+    return {
+        'f': _rounded(np.where(valid, f, np.nan)),
+        'df_between': df_between.tolist(),
+        'df_within': df_within.astype(int).tolist(),
+        'p_value': _rounded(p_values, 6),
+        'significant': _significant(p_values),
+        'eta_squared': _rounded(np.where(valid, eta_squared, np.nan), 3)
+    }
+
+
+def kruskal_wallis(X, labels):
+    """Teste de Kruskal-Wallis (com correção de empates) para cada coluna de X,
+    com o epsilon² = H / (n - 1)
+    """
+    X = _as_matrix(X)
+    labels = np.asarray(labels, dtype=np.int64)
+    n_groups = int(labels.max()) + 1 if len(labels) else 0
+    ranks = pd.DataFrame(X).rank(method='average').to_numpy()
+    counts, rank_sums = _group_sums(ranks, labels, n_groups)
+    N = counts.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        h = 12 / (N * (N + 1)) * np.nansum(rank_sums ** 2 / counts, axis=0) - 3 * (N + 1)
+        h = h / (1 - _tie_terms(X) / (N ** 3 - N))
+        epsilon_squared = h / (N - 1)
+    df = (counts > 0).sum(axis=0) - 1
+
+    valid = (df >= 1) & np.isfinite(h)
+    p_values = np.full(h.shape, np.nan)
+    if valid.any():
+        p_values[valid] = np.atleast_1d(chi2_sf(h[valid], df[valid]))
+    return {
+        'h': _rounded(np.where(valid, h, np.nan)),
+        'df': df.tolist(),
+        'p_value': _rounded(p_values, 6),
+        'significant': _significant(p_values),
+        'epsilon_squared': _rounded(np.where(valid, epsilon_squared, np.nan), 3)
+    }
+
+
+def chi_square_test(table):
+    """Qui-quadrado de independência e V de Cramér de uma tabela de contingência
+
+    Linhas e colunas sem observações são ignoradas; sem pelo menos 2 × 2
+    categorias observadas o teste não é calculado (valores None)
+    """
+    table = np.asarray(table, dtype=float)
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    result = {'chi2': None, 'df': None, 'p_value': None, 'significant': False, 'cramers_v': None,
+              'n': int(table.sum()), 'low_expected_cells': None}
+    if table.ndim != 2 or min(table.shape) < 2:
+        return result
+
+    n = table.sum()
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0, keepdims=True) / n
+    chi2 = float(((table - expected) ** 2 / expected).sum())
+    df = (table.shape[0] - 1) * (table.shape[1] - 1)
+    p_value = chi2_sf(chi2, df)
+    result.update({
+        'chi2': round(chi2, 4),
+        'df': df,
+        'p_value': round(p_value, 6),
+        'significant': bool(p_value < Config.SIGNIFICANCE_LEVEL),
+        'cramers_v': round(float(np.sqrt(chi2 / (n * (min(table.shape) - 1)))), 3),
+        # Percentagem de células com frequência esperada < 5 (aproximação pouco fiável)
+        'low_expected_cells': round(float((expected < 5).mean() * 100), 1)
+    })
+    return result
@@ -0,0 +1,436 @@
+"""
+Fila de tarefas em processo para análises demoradas
+- Pool de threads limitado, sem broker externo
+- Cada tarefa tem ID, estado, progresso e resultado (ou erro)
+- Cancelamento: imediato para tarefas em fila, cooperativo para as que já
+  estão a correr (a função verifica job.check_cancelled() entre passos)
+- Tarefas terminadas ficam disponíveis durante um período de retenção
+- Em modo multi-processo (prefork) o estado de cada tarefa é também gravado
+  em ficheiro (SharedJobStore), para que qualquer worker possa responder ao
+  polling, aos eventos SSE e ao cancelamento de uma tarefa de outro worker
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import serialization
+from config import Config
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Levantada dentro de uma tarefa quando o cancelamento foi pedido"""
+
+
+class QueueFull(Exception):
+    """A fila atingiu o número máximo de tarefas pendentes"""
+
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+# Segundos entre leituras do ficheiro de estado de uma tarefa de outro worker
+SHARED_POLL_INTERVAL = 0.5
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class SharedJobStore:
+    """Estado das tarefas em ficheiros JSON (um por tarefa) num diretório comum aos workers
+
+    O worker dono da tarefa grava o estado a cada alteração (escrita atómica);
+    os outros workers só leem. O cancelamento pedido noutro worker fica num
+    ficheiro marcador que o dono consulta em check_cancelled()
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id, suffix='.json'):
+        return os.path.join(self.directory, job_id + suffix)
+
+    def clear(self):
+        """Remove o estado de tarefas de uma execução anterior"""
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def write(self, job):
+        info = job.to_dict()
+        info['pid'] = os.getpid()
+        path = self._path(job.id)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(serialization.dumps_bytes(info))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"❌ Erro ao gravar o estado da tarefa {job.id}: {e}")
+
+    def load(self, job_id):
+        """SharedJob com o último estado gravado (None se não existir)"""
+        if not JOB_ID_PATTERN.fullmatch(job_id or ''):
+            return None
+        try:
+            with open(self._path(job_id), 'rb') as f:
+                info = serialization.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        # O worker dono terminou (reciclado ou falhou) sem concluir a tarefa
+        if info.get('status') not in FINISHED and not _process_alive(info.get('pid', 0)):
+            info.update(status=FAILED, message='Erro', error='O processo da tarefa terminou',
+                        finished_at=info.get('finished_at') or time.time())
+        return SharedJob(info, self)
+
+    def job_ids(self):
+        return [name[:-5] for name in os.listdir(self.directory)
+                if name.endswith('.json') and JOB_ID_PATTERN.fullmatch(name[:-5])]
+
+    def remove(self, job_id):
+        for suffix in ('.json', '.cancel'):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except OSError:
+                pass
+
+    def request_cancel(self, job_id):
+        with open(self._path(job_id, '.cancel'), 'w'):
+            pass
+
+    def cancel_requested(self, job_id):
+        return os.path.exists(self._path(job_id, '.cancel'))
+
+
+class SharedJob:
+    """Estado (só de leitura) de uma tarefa a correr noutro worker"""
+
+    def __init__(self, info, store):
+        self._info = info
+        self._store = store
+        self.id = info['job_id']
+        self.name = info.get('name')
+        self.status = info.get('status')
+        self.created_at = info.get('created_at') or 0
+        self.finished_at = info.get('finished_at')
+        self.revision = info.get('revision', 0)
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    def to_dict(self, include_result=True):
+        info = {key: value for key, value in self._info.items() if key != 'pid'}
+        if not include_result:
+            info.pop('result', None)
+        return info
+
+
+class Job:
+    """Uma tarefa submetida ao JobManager"""
+
+    def __init__(self, name, key=None, store=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.key = key
+        self.status = QUEUED
+        self.progress = 0
+        self.message = 'Em fila'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        # Incrementada a cada alteração (polling e SSE só enviam o que mudou)
+        self.revision = 0
+        self.future = None
+        self._store = store
+        self._cancel = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self):
+        if not self._cancel.is_set() and self._store is not None and self._store.cancel_requested(self.id):
+            self._cancel.set()
+        return self._cancel.is_set()
+
+    def _update(self, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.revision += 1
+            if self._store is not None:
+                self._store.write(self)
+            self._changed.notify_all()
+
+    def report(self, progress=None, message=None):
+        """Atualiza o progresso (0-100) e/ou a mensagem da tarefa"""
+        fields = {}
+        if progress is not None:
+            fields['progress'] = max(0, min(100, int(progress)))
+        if message is not None:
+            fields['message'] = message
+        if fields:
+            self._update(**fields)
+
+    def check_cancelled(self):
+        """Interrompe a tarefa (JobCancelled) se o cancelamento foi pedido"""
+        if self.cancel_requested:
+            raise JobCancelled()
+
+    def wait_for_change(self, revision, timeout=None):
+        """Espera até a tarefa mudar depois de `revision`; retorna a revisão atual"""
+        with self._changed:
+            if self.revision == revision and not self.finished:
+                self._changed.wait(timeout)
+            return self.revision
+
+    def wait(self, timeout=None):
+        """Espera até a tarefa terminar (ou até timeout); retorna True se terminou"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while not self.finished:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+            return True
+
+    def to_dict(self, include_result=True):
+        info = {
+            'job_id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'revision': self.revision
+        }
+        if self.error is not None:
+            info['error'] = self.error
+        if include_result and self.status == DONE:
+            info['result'] = self.result
+        return info
+
+
+class JobManager:
+    """Executa tarefas num pool de threads limitado e guarda o seu estado"""
+
+    def __init__(self, max_workers=None, max_pending=None, retention=None, store=None):
+        self.max_workers = max_workers or Config.JOB_WORKERS
+        self.max_pending = max_pending or Config.JOB_MAX_PENDING
+        self.retention = retention if retention is not None else Config.JOB_RETENTION
+        # Estado partilhado com os outros workers (None em processo único)
+        self.store = store
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='rm4health-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_by_key = {}
+
+    def submit(self, name, func, *args, key=None, **kwargs):
+        """Submete func(job, *args, **kwargs) e retorna o Job
+
+        Se `key` for indicada e já existir uma tarefa por terminar com a mesma
+        chave, essa tarefa é reutilizada em vez de repetir o cálculo
+        """
+        with self._lock:
+            self._purge()
+
+            if key is not None:
+                existing = self._active_by_key.get(key)
+                if existing is not None and not existing.finished:
+                    return existing
+
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise QueueFull(f"Fila de tarefas cheia ({pending} pendentes)")
+
+            job = Job(name, key, store=self.store)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active_by_key[key] = job
+            if self.store is not None:
+                # Estado inicial gravado antes de a tarefa poder começar a atualizá-lo
+                self.store.write(job)
+            job.future = self._executor.submit(self._run, job, func, args, kwargs)
+            return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            self._finish(job, CANCELLED, message='Cancelada')
+            return
+
+        job._update(status=RUNNING, started_at=time.time(), message='Em execução')
+        try:
+            result = func(job, *args, **kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED, message='Cancelada')
+        except Exception as e:
+            print(f"❌ Erro na tarefa {job.name} ({job.id}): {e}")
+            self._finish(job, FAILED, message='Erro', error=str(e))
+        else:
+            self._finish(job, DONE, progress=100, message='Concluída', result=result)
+
+    def _finish(self, job, status, **fields):
+        with self._lock:
+            if job.key is not None and self._active_by_key.get(job.key) is job:
+                del self._active_by_key[job.key]
+        job._update(status=status, finished_at=time.time(), **fields)
+
+    def _purge(self):
+        """Remove tarefas terminadas há mais tempo que o período de retenção"""
+        limit = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < limit]
+        for job_id in expired:
+            del self._jobs[job_id]
+            if self.store is not None:
+                self.store.remove(job_id)
+
+    def _expired(self, job):
+        return job.finished and (job.finished_at or 0) < time.time() - self.retention
+
+    def get(self, job_id):
+        """Retorna a tarefa (None se não existir ou já tiver expirado)
+
+        Com estado partilhado, as tarefas de outros workers são devolvidas
+        como SharedJob (último estado gravado)
+        """
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.load(job_id)
+            if job is not None and self._expired(job):
+                return None
+        return job
+
+    def list(self):
+        """Tarefas conhecidas, das mais recentes para as mais antigas"""
+        with self._lock:
+            self._purge()
+            jobs = list(self._jobs.values())
+        if self.store is not None:
+            local = {job.id for job in jobs}
+            for job_id in self.store.job_ids():
+                if job_id not in local:
+                    job = self.store.load(job_id)
+                    if job is not None and not self._expired(job):
+                        jobs.append(job)
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id):
+        """Pede o cancelamento da tarefa; retorna a tarefa (None se não existir)"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        if isinstance(job, SharedJob):
+            # O worker dono cancela a tarefa na próxima verificação
+            self.store.request_cancel(job_id)
+            return job
+
+        job._cancel.set()
+        # Tarefas ainda em fila não chegam a correr
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED, message='Cancelada')
+        else:
+            job.report(message='Cancelamento pedido')
+        return job
+
+    def events(self, job, heartbeat=15):
+        """Gera o estado da tarefa a cada alteração (None a cada `heartbeat` segundos sem alterações)"""
+        if isinstance(job, SharedJob):
+            yield from self._shared_events(job, heartbeat)
+            return
+        revision = -1
+        while True:
+            current = job.wait_for_change(revision, timeout=heartbeat)
+            if current == revision:
+                yield None
+                continue
+            revision = current
+            yield job.to_dict()
+            if job.finished:
+                return
+
+    def _shared_events(self, job, heartbeat):
+        """Como events(), lendo periodicamente o estado gravado pelo worker dono"""
+        revision = -1
+        last_sent = time.monotonic()
+        while True:
+            if job.revision != revision:
+                revision = job.revision
+                last_sent = time.monotonic()
+                yield job.to_dict()
+                if job.finished:
+                    return
+            elif time.monotonic() - last_sent >= heartbeat:
+                last_sent = time.monotonic()
+                yield None
+            time.sleep(SHARED_POLL_INTERVAL)
+            current = self.store.load(job.id)
+            if current is None:
+                return
+            job = current
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+_shared_directory = None
+
+
+def share_between_processes(directory=None):
+    """Ativa o estado de tarefas em ficheiro (chamar no processo principal antes do fork)"""
+    global _shared_directory, _manager
+    _shared_directory = directory or os.path.join(Config.SNAPSHOT_DIR, 'jobs')
+    SharedJobStore(_shared_directory).clear()
+    # Cada worker cria o seu próprio pool de threads depois do fork
+    _manager = None
+
+
+def get_job_manager():
+    """JobManager do processo (criado na primeira utilização)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            store = SharedJobStore(_shared_directory) if _shared_directory else None
+            _manager = JobManager(store=store)
+        return _manager
+
+
+def format_sse(info, event='status'):
+    """Formata um evento Server-Sent Events (comentário de keep-alive se info for None)"""
+    if info is None:
+        return ': keep-alive\n\n'
+    return f"event: {event}\ndata: {serialization.dumps(info)}\n\n"
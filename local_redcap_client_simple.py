@@ -1,18 +1,39 @@
 #!/usr/bin/env python3
 """
 Cliente REDCap Local - Versão SEM pandas para contornar problemas de build
+Lê o JSON da extração; se não existir, lê os CSVs (raw, labeled e metadata)
+em streaming com csv_loader
 """
 import json
 import os
+import threading
 from datetime import datetime
 
+import csv_loader
+import snapshot_cache
+import snapshot_store
+from config import Config
+
 class LocalREDCapClientSimple:
-    """Cliente simples que usa apenas JSON, sem pandas"""
+    """Cliente simples que usa JSON (ou CSV em streaming), sem pandas"""
     
     def __init__(self):
         self.config_file = 'local_data_config.json'
+        self.snapshot = None
+        self.snapshot_watcher = snapshot_store.PointerWatcher() if Config.USE_SHARED_SNAPSHOT else None
+        self._swap_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watch_stop = None
+        self._watch_thread = None
+        self.load_report = None
         self.load_config()
         self.load_data()
+        self.loaded_signature = self.files_signature()
+    
+    def read_config(self):
+        """Lê local_data_config.json sem alterar a configuração em uso"""
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
     
     def load_config(self):
         """Carrega configuração dos arquivos de dados"""
@@ -22,18 +43,16 @@ class LocalREDCapClientSimple:
             self.create_default_config()
             return
         
-        with open(self.config_file, 'r', encoding='utf-8') as f:
-            self.config = json.load(f)
+        self.config = self.read_config()
     
     def load_data(self):
         """Carrega todos os dados em memória"""
         print("[INFO] Carregando dados locais...")
         
-        # Carregar JSON completo
-        json_file = self.config['files']['json_file']
+        files = self.config['files']
         
-        if not os.path.exists(json_file):
-            print(f"[WARNING] Arquivo de dados nao encontrado: {json_file}")
+        if self.data_source(files) is None:
+            print(f"[WARNING] Arquivo de dados nao encontrado: {files.get('json_file')}")
             print("[INFO] Usando dados padrao...")
             # Se não existe, usar dados já criados no create_default_config
             if hasattr(self, 'full_data'):
@@ -48,9 +67,7 @@ class LocalREDCapClientSimple:
                 return
         
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                self.full_data = json.load(f)
-            print(f"[OK] Dados carregados: {len(self.full_data.get('data_raw', []))} registros")
+            self.set_data(*self.read_data(files))
         except Exception as e:
             print(f"[ERROR] Erro ao carregar dados: {e}")
             print("[INFO] Usando dados de emergencia...")
@@ -60,6 +77,190 @@ class LocalREDCapClientSimple:
                 "metadata": []
             }
     
+    @staticmethod
+    def data_source(files):
+        """Formato da extração disponível: 'json', 'csv' (JSON em falta) ou None"""
+        json_file = files.get('json_file')
+        if json_file and os.path.exists(json_file):
+            return 'json'
+        raw_csv = files.get('raw_csv')
+        if raw_csv and os.path.exists(raw_csv):
+            return 'csv'
+        return None
+    
+    def source_signature(self, files):
+        """Assinatura dos ficheiros de onde a extração é lida (identifica o snapshot partilhado)"""
+        source = self.data_source(files)
+        if source == 'json':
+            return snapshot_store.file_signature(files['json_file'])
+        if source == 'csv':
+            return {
+                key: snapshot_store.file_signature(files[key])
+                for key in ('raw_csv', 'labeled_csv', 'metadata_csv') if files.get(key)
+            }
+        return None
+    
+    def read_data(self, files):
+        """Lê uma extração sem alterar os dados em uso; retorna (full_data, snapshot)
+
+        Usa o snapshot partilhado se já foi publicado a partir destes ficheiros;
+        caso contrário lê o JSON (ou os CSVs, se o JSON não existir) e publica-o
+        para os outros processos
+        """
+        source = self.source_signature(files)
+        if Config.USE_SHARED_SNAPSHOT:
+            snapshot = self.attach_shared_snapshot(source)
+            if snapshot is not None:
+                full_data = snapshot.full_data()
+                print(f"[OK] Snapshot partilhado v{snapshot.version}: {len(full_data['data_raw'])} registros")
+                return full_data, snapshot
+        
+        data_source = self.data_source(files)
+        if data_source == 'json':
+            with open(files['json_file'], 'r', encoding='utf-8') as f:
+                full_data = json.load(f)
+        elif data_source == 'csv':
+            print(f"[INFO] JSON nao encontrado, lendo CSVs da extracao: {files['raw_csv']}")
+            full_data, self.load_report = csv_loader.load_extraction(files)
+        else:
+            raise FileNotFoundError(f"Arquivo de dados nao encontrado: {files.get('json_file')}")
+        print(f"[OK] Dados carregados: {len(full_data.get('data_raw', []))} registros")
+        
+        if Config.USE_SHARED_SNAPSHOT:
+            # A publicação grava todas as vistas (os CSVs com rótulos são lidos aqui)
+            snapshot = self.publish_shared_snapshot(full_data, source)
+            if snapshot is not None:
+                return snapshot.full_data(), snapshot
+        return full_data, None
+    
+    def attach_shared_snapshot(self, source):
+        """Snapshot partilhado publicado a partir da versão atual dos ficheiros (ou None)"""
+        pointer = snapshot_store.read_pointer()
+        if pointer is None or source is None or pointer.get('source') != source:
+            return None
+        
+        try:
+            return snapshot_store.attach(pointer=pointer)
+        except Exception as e:
+            print(f"[WARNING] Snapshot partilhado indisponivel: {e}")
+            return None
+    
+    def publish_shared_snapshot(self, full_data, source):
+        """Publica os dados lidos como snapshot partilhado pelos outros processos"""
+        try:
+            pointer = snapshot_store.publish(full_data, source=source)
+            return snapshot_store.attach(pointer=pointer)
+        except Exception as e:
+            print(f"[WARNING] Nao foi possivel publicar o snapshot partilhado: {e}")
+            return None
+    
+    def set_data(self, full_data, snapshot=None):
+        """Troca os dados em uso de uma só vez e descarta só os caches dos snapshots anteriores"""
+        with self._swap_lock:
+            previous = getattr(self, 'full_data', None)
+            self.full_data = full_data
+            self.snapshot = snapshot
+        
+        if previous:
+            for key in ('data_raw', 'data_labeled'):
+                # dict.get: vistas ainda não lidas (LazyExtraction) não têm caches
+                records = dict.get(previous, key)
+                if records is not None and records is not dict.get(full_data, key):
+                    snapshot_cache.invalidate(records)
+    
+    def check_shared_snapshot(self):
+        """Passa para a versão mais recente do snapshot se outro processo a publicou"""
+        if self.snapshot_watcher is None:
+            return
+        pointer = self.snapshot_watcher.changed()
+        if pointer is None or (self.snapshot is not None and
+                               os.path.basename(self.snapshot.path) == pointer['file']):
+            return
+        try:
+            snapshot = snapshot_store.attach(pointer=pointer)
+            self.set_data(snapshot.full_data(), snapshot)
+            print(f"[OK] Snapshot partilhado atualizado para v{snapshot.version}")
+        except Exception as e:
+            print(f"[WARNING] Erro ao mudar de snapshot: {e}")
+    
+    # ------------------------------------------------------------------
+    # Recarregamento automático quando a extração muda
+    # ------------------------------------------------------------------
+    
+    def files_signature(self):
+        """Inode, mtime e tamanho de local_data_config.json e dos ficheiros de dados que ele indica"""
+        try:
+            config = self.read_config()
+        except (OSError, ValueError):
+            config = getattr(self, 'config', {})
+        return (snapshot_store.file_signature(self.config_file),
+                self.source_signature(config.get('files', {})))
+    
+    def reload(self):
+        """Lê a nova extração e troca-a pela atual; em caso de erro mantém os dados atuais"""
+        with self._reload_lock:
+            signature = self.files_signature()
+            try:
+                config = self.read_config()
+                full_data, snapshot = self.read_data(config['files'])
+            except Exception as e:
+                print(f"[ERROR] Erro ao recarregar dados locais (dados atuais mantidos): {e}")
+                self.loaded_signature = signature
+                return False
+            
+            self.config = config
+            self.set_data(full_data, snapshot)
+            self.loaded_signature = self.files_signature()
+            print(f"[OK] Dados locais recarregados: {len(full_data.get('data_raw', []))} registros")
+            return True
+    
+    def start_watching(self, interval=None):
+        """Inicia a verificação periódica dos ficheiros de dados numa thread de fundo
+
+        Uma alteração só é carregada quando a assinatura se mantém igual em
+        duas verificações seguidas (evita ler ficheiros a meio da escrita)
+        """
+        if self._watch_stop is not None:
+            return
+        interval = interval or Config.LOCAL_DATA_POLL_INTERVAL
+        self._watch_stop = threading.Event()
+        
+        def watch(stop):
+            pending = None
+            while not stop.wait(interval):
+                try:
+                    signature = self.files_signature()
+                    if signature == self.loaded_signature:
+                        pending = None
+                    elif signature == pending:
+                        print("[INFO] Extracao local alterada, recarregando em segundo plano...")
+                        self.reload()
+                        pending = None
+                    else:
+                        pending = signature
+                except Exception as e:
+                    print(f"[ERROR] Erro ao verificar ficheiros de dados: {e}")
+        
+        self._watch_thread = threading.Thread(target=watch, args=(self._watch_stop,),
+                                              name='local-data-watcher', daemon=True)
+        self._watch_thread.start()
+        print(f"[INFO] Monitorizando {self.config_file} a cada {interval}s")
+    
+    def stop_watching(self):
+        """Para a thread de verificação (por exemplo, antes de um fork)"""
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_thread.join(timeout=5)
+            self._watch_stop = None
+    
+    def get_snapshot(self, raw_or_label='raw'):
+        """Lista de registos em uso (sem logging; muda quando a extração é recarregada)"""
+        self.check_shared_snapshot()
+        full_data = self.full_data
+        if raw_or_label == 'raw':
+            return full_data.get('data_raw', [])
+        return full_data.get('data_labeled', [])
+    
     def test_connection(self):
         """Simula teste de conexão"""
         return True
@@ -67,11 +268,7 @@ class LocalREDCapClientSimple:
     def get_records(self, raw_or_label='label', **kwargs):
         """Retorna registros (simulando a API)"""
         print(f"[INFO] Conectando a base local...")
-        
-        if raw_or_label == 'raw':
-            data = self.full_data.get('data_raw', [])
-        else:
-            data = self.full_data.get('data_labeled', [])
+        data = self.get_snapshot(raw_or_label)
         
         print(f"[OK] Base local conectada! {len(data)} registros encontrados")
         return data
@@ -95,7 +292,8 @@ class LocalREDCapClientSimple:
             'total_records': len(self.full_data.get('data_raw', [])),
             'total_fields': len(self.full_data.get('metadata', [])),
             'extraction_date': self.config['last_extraction'],
-            'data_source': 'LOCAL_FILES_SIMPLE'
+            'data_source': 'LOCAL_FILES_SIMPLE',
+            'csv_load': self.load_report.to_dict() if self.load_report else None
         }
     
     def create_default_config(self):
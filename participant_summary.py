@@ -0,0 +1,155 @@
+"""
+Tabela resumo de participantes (estado dos formulários por participante)
+Materializada uma vez por snapshot; a página de participantes e a API
+paginada consultam janelas ordenadas/filtradas desta tabela
+"""
+import snapshot_cache
+from completeness import get_completeness
+
+# Campos usados (por ordem) para identificar o participante de um registo
+ID_FIELDS = ['participant_code', 'record_id', 'participant_code_estudo']
+
+# Ordenações suportadas pela API
+SORT_KEYS = ('id', 'completion_rate', 'records_count')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _normalize_status(value):
+    """Converte o valor de um campo _complete para '0', '1' ou '2'"""
+    current_status = str(value).strip().lower()
+
+    # Mapeia valores textuais para numéricos
+    if current_status in ['complete', 'completed', '2']:
+        return '2'
+    if current_status in ['incomplete', 'partial', '1']:
+        return '1'
+    if current_status in ['unverified', 'not verified', '0', '']:
+        return '0'
+
+    # Se não reconhecer, tenta converter diretamente
+    try:
+        int(current_status)
+    except ValueError:
+        # Se não conseguir converter, assume como não verificado
+        return '0'
+    return current_status
+
+
+def _id_sort_key(row):
+    """IDs numéricos por ordem numérica, restantes no fim"""
+    participant_id = str(row['id'])
+    return (0, int(participant_id), '') if participant_id.isdigit() else (1, 0, participant_id)
+
+
+class ParticipantSummaryTable:
+    """Resumo por participante com ordenações pré-calculadas"""
+
+    def __init__(self, records):
+        participant_records = {}
+
+        # Agrupa índices de registos por participante
+        for index, record in enumerate(records):
+            participant_id = None
+            for id_field in ID_FIELDS:
+                if id_field in record and record[id_field]:
+                    participant_id = record[id_field]
+                    break
+
+            if participant_id:
+                participant_records.setdefault(participant_id, []).append(index)
+
+        # Só as células _complete preenchidas são lidas (matriz de completude)
+        completeness = get_completeness(records)
+        complete_fields = [f for f in completeness.fields if f.endswith('_complete')]
+        complete_filled = completeness.filled_matrix(complete_fields)
+
+        rows = []
+        for participant_id, indices in participant_records.items():
+            # Estado mais alto encontrado para cada formulário do participante
+            forms_status = {}
+
+            filled_rows, filled_cols = complete_filled[indices].nonzero()
+            for row, col in zip(filled_rows.tolist(), filled_cols.tolist()):
+                field_name = complete_fields[col]
+                current_status = _normalize_status(records[indices[row]][field_name])
+
+                # Remove '_complete' para obter nome do formulário
+                form_name = field_name.replace('_complete', '')
+                if form_name not in forms_status or int(current_status) > int(forms_status[form_name]):
+                    forms_status[form_name] = current_status
+
+            statuses = list(forms_status.values())
+            complete_forms = statuses.count('2')
+            incomplete_forms = statuses.count('1')
+            unverified_forms = statuses.count('0')
+
+            # Taxa de completude: completos / total de formulários preenchidos
+            filled_forms = complete_forms + incomplete_forms
+            completion_rate = round((complete_forms / filled_forms) * 100, 1) if filled_forms > 0 else 0
+
+            rows.append({
+                'id': participant_id,
+                'records_count': len(indices),
+                'complete_forms': complete_forms,
+                'incomplete_forms': incomplete_forms,
+                'unverified_forms': unverified_forms,
+                'total_forms': complete_forms + incomplete_forms + unverified_forms,
+                'completion_rate': completion_rate
+            })
+
+        # Ordem base por ID; as restantes ordenações são estáveis sobre esta
+        rows.sort(key=_id_sort_key)
+        self.rows = rows
+        self._search_keys = [str(row['id']).lower() for row in rows]
+
+        # Ordenações (asc, desc) pré-calculadas; empates mantêm a ordem por ID
+        positions = list(range(len(rows)))
+        self._orders = {'id': (positions, positions[::-1])}
+        for key in SORT_KEYS[1:]:
+            self._orders[key] = (
+                sorted(positions, key=lambda i: rows[i][key]),
+                sorted(positions, key=lambda i: rows[i][key], reverse=True)
+            )
+
+        total = len(rows)
+        self.totals = {
+            'total_participants': total,
+            'complete_forms': sum(row['complete_forms'] for row in rows),
+            'incomplete_forms': sum(row['incomplete_forms'] for row in rows),
+            'avg_completion_rate': round(sum(row['completion_rate'] for row in rows) / total, 1) if total else 0
+        }
+
+    def query(self, search=None, sort='id', order='asc', page=1, page_size=DEFAULT_PAGE_SIZE):
+        """Retorna uma página da tabela ordenada e filtrada por ID"""
+        if sort not in self._orders:
+            raise ValueError(f"Ordenação inválida: {sort} (use {', '.join(SORT_KEYS)})")
+
+        ascending, descending = self._orders[sort]
+        positions = descending if order == 'desc' else ascending
+
+        if search:
+            term = str(search).strip().lower()
+            positions = [i for i in positions if term in self._search_keys[i]]
+
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        total = len(positions)
+        pages = max(1, -(-total // page_size))
+        page = max(1, min(int(page), pages))
+        start = (page - 1) * page_size
+
+        return {
+            'participants': [self.rows[i] for i in positions[start:start + page_size]],
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'pages': pages,
+            'sort': sort,
+            'order': 'desc' if order == 'desc' else 'asc'
+        }
+
+
+def get_participant_table(records):
+    """Retorna a tabela resumo de participantes do snapshot"""
+    return snapshot_cache.get_cached(records, 'participant_summary', lambda: ParticipantSummaryTable(records))
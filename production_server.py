@@ -1,22 +1,314 @@
 #!/usr/bin/env python3
 """
 Servidor de produção usando Waitress (Windows/Linux compatível)
+
+Em Linux/macOS corre em modo multi-processo (prefork):
+- O processo principal carrega o snapshot e os índices antes de criar os
+  workers, que partilham essas páginas de memória (copy-on-write)
+- Cada worker corre o Waitress sobre o mesmo socket de escuta
+- Um worker é reciclado depois de MAX_REQUESTS pedidos (com jitter)
+- SIGHUP (ou uma alteração nos ficheiros de dados) recarrega o snapshot no
+  processo principal e substitui os workers de forma gradual: os novos
+  começam a aceitar pedidos antes de os antigos terminarem os seus
+- SIGTERM/SIGINT terminam os workers depois de concluírem os pedidos em curso
+- O estado das tarefas em segundo plano fica em ficheiros partilhados
+  (jobs.share_between_processes): o polling e os eventos de uma tarefa podem
+  chegar a qualquer worker
+
+Variáveis de ambiente: HOST, PORT, WORKERS (1 = processo único), THREADS,
+MAX_REQUESTS (0 = sem reciclagem), MAX_REQUESTS_JITTER, GRACEFUL_TIMEOUT,
+RELOAD_CHECK_INTERVAL (0 = só por SIGHUP)
 """
-from waitress import serve
+from waitress import serve, wasyncore
+from waitress.server import create_server
+import gc
 import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
 
 # Definir que estamos em produção
 os.environ['PRODUCTION'] = '1'
 
 from app import app
+import app as app_module
+import jobs
+import snapshot_cache
+from column_profiles import get_column_catalog
+from completeness import get_completeness
+from dyads import get_dyad_index
+from participant_summary import get_participant_table
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', 5000))
+WORKERS = int(os.environ.get('WORKERS', min(os.cpu_count() or 1, 4)))
+THREADS = int(os.environ.get('THREADS', 4))
+MAX_REQUESTS = int(os.environ.get('MAX_REQUESTS', 1000))
+MAX_REQUESTS_JITTER = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+GRACEFUL_TIMEOUT = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+RELOAD_CHECK_INTERVAL = int(os.environ.get('RELOAD_CHECK_INTERVAL', 30))
+
+
+def preload():
+    """Carrega o snapshot (raw e label) e constrói os índices usados pelas páginas"""
+    start = time.time()
+    data = app_module.get_cached_data()
+    labeled = app_module.redcap.get_records()
+
+    for records in (data, labeled):
+        if records:
+            get_completeness(records)
+            get_dyad_index(records)
+    if data:
+        get_column_catalog(data)
+        get_participant_table(data)
+
+    print(f"[OK] Snapshot pré-carregado: {len(data or [])} registos em {time.time() - start:.1f}s")
+
+
+def reload_snapshot():
+    """Volta a ler os dados da fonte e descarta os caches do snapshot anterior"""
+    redcap = app_module.redcap
+    if hasattr(redcap, 'reload'):
+        # Cliente local: troca atómica e só os caches do snapshot anterior são descartados
+        redcap.reload()
+    else:
+        app_module.cached_data['data'] = None
+        app_module.cached_data['last_update'] = None
+        snapshot_cache.invalidate()
+    preload()
+
+
+def snapshot_signature():
+    """Identifica a versão dos ficheiros de dados locais (mtime e tamanho)"""
+    redcap = app_module.redcap
+    if hasattr(redcap, 'files_signature'):
+        # Cliente local: configuração e JSON (ou CSVs, se o JSON não existir)
+        return redcap.files_signature()
+    paths = [getattr(redcap, 'config_file', None)]
+    config = getattr(redcap, 'config', None)
+    if isinstance(config, dict):
+        paths.append(config.get('files', {}).get('json_file'))
+
+    signature = []
+    for path in paths:
+        if path and os.path.exists(path):
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def create_listener():
+    """Socket de escuta criado antes do fork e partilhado pelos workers"""
+    family = socket.AF_INET6 if ':' in HOST else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((HOST, PORT))
+    listener.listen(1024)
+    listener.setblocking(False)
+    return listener
+
+
+class RequestCounter:
+    """Middleware WSGI que pede a reciclagem do worker ao fim de max_requests pedidos"""
+
+    def __init__(self, application, max_requests, on_limit):
+        self.application = application
+        self.max_requests = max_requests
+        self.on_limit = on_limit
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if self.max_requests:
+            with self._lock:
+                self.count += 1
+                if self.count == self.max_requests:
+                    self.on_limit()
+        return self.application(environ, start_response)
+
+
+def run_worker(listener, max_requests):
+    """Corre um worker Waitress até ser parado (sinal ou limite de pedidos)"""
+    stop = threading.Event()
+
+    def request_stop(*args):
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    socket_map = {}
+    wsgi_app = RequestCounter(app, max_requests, request_stop)
+    server = create_server(wsgi_app, map=socket_map, sockets=[listener], threads=THREADS)
+
+    while not stop.is_set():
+        wasyncore.loop(timeout=1.0, map=socket_map, count=1)
+
+    # Deixa de aceitar ligações e termina os pedidos em curso
+    server.accepting = False
+    deadline = time.time() + GRACEFUL_TIMEOUT
+    while server.active_channels and time.time() < deadline:
+        wasyncore.loop(timeout=0.5, map=socket_map, count=1)
+
+    server.task_dispatcher.shutdown(timeout=max(0, deadline - time.time()))
+    server.close()
+
+
+class Supervisor:
+    """Processo principal: cria, recicla e substitui os workers"""
+
+    def __init__(self, listener, workers):
+        self.listener = listener
+        self.workers = workers
+        self.generation = 0
+        self.children = {}  # pid -> geração
+        self.stopping = False
+        self.reload_requested = False
+
+    def spawn(self):
+        max_requests = MAX_REQUESTS
+        if max_requests and MAX_REQUESTS_JITTER:
+            max_requests += random.randint(0, MAX_REQUESTS_JITTER)
+
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                random.seed()
+                run_worker(self.listener, max_requests)
+            except Exception as e:
+                print(f"❌ Erro no worker {os.getpid()}: {e}")
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+
+        self.children[pid] = self.generation
+        print(f"[INFO] Worker {pid} iniciado (geração {self.generation}, até {max_requests or '∞'} pedidos)")
+        return pid
+
+    def stop_children(self, generation=None):
+        for pid, child_generation in list(self.children.items()):
+            if generation is None or child_generation == generation:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    def reap(self):
+        """Recolhe workers terminados e repõe os da geração atual"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            generation = self.children.pop(pid, None)
+            if generation is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if generation == self.generation and not self.stopping:
+                reason = 'reciclado' if code == 0 else f'terminou com código {code}'
+                print(f"[INFO] Worker {pid} {reason}; a iniciar substituto")
+                self.spawn()
+
+    def reload(self):
+        """Recarrega o snapshot e troca os workers sem interromper o serviço"""
+        print("[INFO] A recarregar snapshot...")
+        try:
+            # Os objetos do snapshot anterior estão na geração permanente:
+            # voltam a ser recolhíveis antes de congelar o novo snapshot
+            gc.unfreeze()
+            reload_snapshot()
+            gc.collect()
+            gc.freeze()
+        except Exception as e:
+            print(f"❌ Erro ao recarregar snapshot, workers atuais mantidos: {e}")
+            return
+
+        old_generation = self.generation
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        self.stop_children(old_generation)
+
+    def run(self):
+        def handle_stop(*args):
+            self.stopping = True
+
+        def handle_reload(*args):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, handle_stop)
+        signal.signal(signal.SIGINT, handle_stop)
+        signal.signal(signal.SIGHUP, handle_reload)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        signature = snapshot_signature()
+        next_check = time.time() + RELOAD_CHECK_INTERVAL
+
+        while not self.stopping:
+            time.sleep(0.5)
+            self.reap()
+
+            if RELOAD_CHECK_INTERVAL and time.time() >= next_check:
+                next_check = time.time() + RELOAD_CHECK_INTERVAL
+                current = snapshot_signature()
+                if current != signature:
+                    print("[INFO] Ficheiros de dados alterados")
+                    signature = current
+                    self.reload_requested = True
+
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+                signature = snapshot_signature()
+
+        print("[INFO] A terminar workers...")
+        self.stop_children()
+        deadline = time.time() + GRACEFUL_TIMEOUT + 5
+        while self.children and time.time() < deadline:
+            time.sleep(0.2)
+            self.reap()
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGKILL)
+        self.listener.close()
+        print("[OK] Servidor terminado")
+
+
+def serve_prefork():
+    # O supervisor verifica os ficheiros de dados; a thread de monitorização
+    # do cliente não deve existir no momento do fork
+    if hasattr(app_module.redcap, 'stop_watching'):
+        app_module.redcap.stop_watching()
+    preload()
+    # Objetos do snapshot ficam fora da recolha de lixo: os workers não
+    # tocam nas suas páginas e a memória continua partilhada
+    gc.freeze()
+    jobs.share_between_processes()
+
+    listener = create_listener()
+    print(f"👷 Workers: {WORKERS} x {THREADS} threads")
+    Supervisor(listener, WORKERS).run()
+
 
 if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5000))
-    host = os.environ.get('HOST', '0.0.0.0')
-    
     print(f"🚀 Iniciando servidor de produção...")
-    print(f"📍 Host: {host}")  
-    print(f"🔌 Porta: {port}")
-    print(f"🌐 URL: http://{host}:{port}")
-    
-    serve(app, host=host, port=port, threads=4)
+    print(f"📍 Host: {HOST}")
+    print(f"🔌 Porta: {PORT}")
+    print(f"🌐 URL: http://{HOST}:{PORT}")
+
+    if WORKERS > 1 and hasattr(os, 'fork'):
+        serve_prefork()
+    else:
+        serve(app, host=HOST, port=PORT, threads=THREADS)
@@ -0,0 +1,331 @@
+"""
+Pontuação do PSQI (Índice de Qualidade do Sono de Pittsburgh)
+- Os 7 componentes (0-3) e o score global (0-21) são calculados para todas
+  as instâncias do questionário numa única passagem vetorizada sobre as
+  colunas codificadas (columns.map_column)
+- Aceita registos 'raw' (códigos 0-3) ou 'label' (rótulos das opções)
+- Calculado uma vez por snapshot; inclui as séries longitudinais por participante
+
+Regras de pontuação (Buysse et al., 1989):
+    C1 qualidade subjetiva      sleep_quality
+    C2 latência                 time_to_sleep (min) + trouble_falling_asleep
+    C3 duração                  sleep_hours
+    C4 eficiência habitual      sleep_hours / (wake_up_time - bedtime)
+    C5 perturbações             soma das 9 razões (5b-5j)
+    C6 medicação para dormir    sleep_medication_use
+    C7 disfunção diurna         trouble_staying_awake + lack_of_enthusiasm
+O score global só é calculado quando os 7 componentes estão disponíveis;
+global > 5 indica má qualidade do sono
+"""
+import numpy as np
+
+import snapshot_cache
+from columns import map_column, object_column, to_number
+
+INSTRUMENT = 'qualidade_sono_pittsburgh'
+POOR_SLEEPER_THRESHOLD = 5
+
+# Escalas das perguntas de escolha (código exportado e rótulo)
+FREQUENCY_SCALE = {'Nunca': 0, 'Menos de 1x/semana': 1, '1-2x/semana': 2, '3x/semana ou mais': 3}
+QUALITY_SCALE = {'Muito boa': 0, 'Boa': 1, 'Má': 2, 'Muito má': 3}
+
+# Razões de perturbação do sono (5b-5i); 5j (outra razão) é opcional
+DISTURBANCE_FIELDS = [
+    'waking_up_night', 'bathroom_need', 'breathing_difficulty', 'cough_snore',
+    'feeling_cold', 'feeling_hot', 'bad_dreams', 'pain'
+]
+OPTIONAL_DISTURBANCE_FIELD = 'other_reason_times'
+
+COMPONENTS = {
+    'sleep_quality': {
+        'name': 'Qualidade Subjetiva do Sono',
+        'description': 'Avaliação pessoal da qualidade do sono',
+        'fields': ['sleep_quality']
+    },
+    'sleep_latency': {
+        'name': 'Latência do Sono',
+        'description': 'Tempo necessário para adormecer',
+        'fields': ['time_to_sleep', 'trouble_falling_asleep']
+    },
+    'sleep_duration': {
+        'name': 'Duração do Sono',
+        'description': 'Número total de horas de sono',
+        'fields': ['sleep_hours']
+    },
+    'sleep_efficiency': {
+        'name': 'Eficiência do Sono',
+        'description': 'Razão entre tempo dormindo e tempo na cama',
+        'fields': ['sleep_hours', 'bedtime', 'wake_up_time']
+    },
+    'sleep_disturbances': {
+        'name': 'Perturbações do Sono',
+        'description': 'Frequência de interrupções durante a noite',
+        'fields': DISTURBANCE_FIELDS + [OPTIONAL_DISTURBANCE_FIELD]
+    },
+    'sleep_medication': {
+        'name': 'Uso de Medicação para Dormir',
+        'description': 'Frequência de uso de medicação para dormir',
+        'fields': ['sleep_medication_use']
+    },
+    'daytime_dysfunction': {
+        'name': 'Disfunção Diurna',
+        'description': 'Sonolência e falta de entusiasmo durante o dia',
+        'fields': ['trouble_staying_awake', 'lack_of_enthusiasm']
+    }
+}
+COMPONENT_KEYS = list(COMPONENTS)
+
+
+# ----------------------------------------------------------------------
+# Conversões (avaliadas uma vez por valor distinto)
+# ----------------------------------------------------------------------
+
+def _ordinal(value, scale):
+    value = str(value).strip()
+    if value in scale:
+        return scale[value]
+    if value in ('0', '1', '2', '3'):
+        return int(value)
+    return np.nan
+
+
+def frequency_score(value):
+    """Nunca=0 ... 3x/semana ou mais=3 (código ou rótulo)"""
+    return _ordinal(value, FREQUENCY_SCALE)
+
+
+def quality_score(value):
+    """Muito boa=0 ... Muito má=3 (código ou rótulo)"""
+    return _ordinal(value, QUALITY_SCALE)
+
+
+def clock_hours(value):
+    """Hora do dia em horas decimais ('22:30' -> 22.5)"""
+    value = str(value).strip()
+    if ':' not in value:
+        return np.nan
+    hours, _, minutes = value.partition(':')
+    try:
+        hours, minutes = int(hours), int(minutes[:2])
+    except ValueError:
+        return np.nan
+    if not (0 <= hours <= 24 and 0 <= minutes < 60):
+        return np.nan
+    return (hours % 24) + minutes / 60
+
+
+def duration_hours(value):
+    """Duração em horas ('07:30' ou '7.5' -> 7.5)"""
+    value = str(value).strip()
+    if ':' in value:
+        hours = clock_hours(value)
+        # '24:00' é uma duração válida
+        return 24.0 if value.startswith('24') else hours
+    number = to_number(value)
+    return number if 0 <= number <= 24 else np.nan
+
+
+def is_psqi_instrument(value):
+    """Instância do questionário de Pittsburgh (nome do instrumento ou rótulo)"""
+    return bool(value) and (value == INSTRUMENT or 'pittsburgh' in str(value).lower())
+
+
+# ----------------------------------------------------------------------
+# Pontuação vetorizada
+# ----------------------------------------------------------------------
+
+def _pair_score(a, b):
+    """Soma de dois itens 0-3 -> 0 (0), 1 (1-2), 2 (3-4), 3 (5-6)"""
+    return np.ceil((a + b) / 2)
+
+
+def _banded(conditions, scores):
+    """np.select com NaN quando nenhum intervalo se aplica (valores em falta)"""
+    return np.select(conditions, scores, default=np.nan)
+
+
+def latency_minutes_score(minutes):
+    """<=15 min: 0, 16-30: 1, 31-60: 2, >60: 3"""
+    with np.errstate(invalid='ignore'):
+        return _banded([minutes <= 15, minutes <= 30, minutes <= 60, minutes > 60], [0, 1, 2, 3])
+
+
+def duration_score(hours):
+    """>7 h: 0, 6-7 h: 1, 5-6 h: 2, <5 h: 3"""
+    with np.errstate(invalid='ignore'):
+        return _banded([hours > 7, hours >= 6, hours >= 5, hours < 5], [0, 1, 2, 3])
+
+
+def efficiency_score(efficiency):
+    """>=85%: 0, 75-84%: 1, 65-74%: 2, <65%: 3"""
+    with np.errstate(invalid='ignore'):
+        return _banded([efficiency >= 85, efficiency >= 75, efficiency >= 65, efficiency < 65],
+                       [0, 1, 2, 3])
+
+
+def disturbance_score(total):
+    """Soma 0: 0, 1-9: 1, 10-18: 2, 19-27: 3"""
+    with np.errstate(invalid='ignore'):
+        return _banded([total == 0, total <= 9, total <= 18, total > 18], [0, 1, 2, 3])
+
+
+class PSQIScores:
+    """Componentes e score global de todas as instâncias do PSQI de um snapshot"""
+
+    def __init__(self, records):
+        instrument = map_column(records, 'redcap_repeat_instrument', is_psqi_instrument, bool, False)
+        if not instrument.any():
+            # Exportações sem instrumentos repetidos: registos com a pergunta de qualidade respondida
+            instrument = ~np.isnan(map_column(records, 'sleep_quality', quality_score))
+        self.index = np.flatnonzero(instrument)
+        self.n = len(self.index)
+
+        def column(field, convert):
+            return map_column(records, field, convert)[self.index]
+
+        def text(field):
+            return object_column(records, field)[self.index]
+
+        self.participants = text('participant_code')
+        self.instances = column('redcap_repeat_instance', to_number)
+        dates = text('questionnaire_date_7')
+        filled = text('data_preench_7')
+        self.dates = np.array([
+            (date or (str(fallback)[:10] if fallback else None)) for date, fallback in zip(dates, filled)
+        ], dtype=object)
+
+        # Tempo na cama a partir das horas de deitar e levantar (passa a meia-noite)
+        sleep_hours = column('sleep_hours', duration_hours)
+        in_bed = (column('wake_up_time', clock_hours) - column('bedtime', clock_hours)) % 24
+        in_bed[in_bed == 0] = np.nan
+        with np.errstate(invalid='ignore', divide='ignore'):
+            efficiency = np.minimum(sleep_hours / in_bed * 100, 100)
+
+        disturbances = np.column_stack([column(field, frequency_score) for field in DISTURBANCE_FIELDS])
+        optional = np.nan_to_num(column(OPTIONAL_DISTURBANCE_FIELD, frequency_score), nan=0.0)
+
+        self.efficiency = efficiency
+        self.sleep_hours = sleep_hours
+        self.latency_minutes = column('time_to_sleep', to_number)
+
+        components = np.full((self.n, len(COMPONENT_KEYS)), np.nan)
+        components[:, 0] = column('sleep_quality', quality_score)
+        components[:, 1] = _pair_score(latency_minutes_score(self.latency_minutes),
+                                       column('trouble_falling_asleep', frequency_score))
+        components[:, 2] = duration_score(sleep_hours)
+        components[:, 3] = efficiency_score(efficiency)
+        components[:, 4] = disturbance_score(disturbances.sum(axis=1) + optional)
+        components[:, 5] = column('sleep_medication_use', frequency_score)
+        components[:, 6] = _pair_score(column('trouble_staying_awake', frequency_score),
+                                       column('lack_of_enthusiasm', frequency_score))
+        self.components = components
+
+        # NaN se algum componente estiver em falta
+        self.global_scores = components.sum(axis=1)
+        self.valid = ~np.isnan(self.global_scores)
+
+    # ------------------------------------------------------------------
+    # Agregações
+    # ------------------------------------------------------------------
+
+    def _order(self):
+        """Instâncias ordenadas por participante, data e número de instância"""
+        return sorted(range(self.n), key=lambda i: (
+            str(self.participants[i]), str(self.dates[i] or ''),
+            self.instances[i] if not np.isnan(self.instances[i]) else 0
+        ))
+
+    def latest_by_participant(self):
+        """Índice (nas instâncias) do último PSQI válido de cada participante"""
+        latest = {}
+        for i in self._order():
+            if self.valid[i] and self.participants[i]:
+                latest[self.participants[i]] = i
+        return latest
+
+    def component_summary(self):
+        """Média, distribuição (0-3) e número de respostas de cada componente"""
+        summary = {}
+        for j, key in enumerate(COMPONENT_KEYS):
+            scores = self.components[:, j]
+            scores = scores[~np.isnan(scores)].astype(int)
+            counts = np.bincount(scores, minlength=4)
+            summary[key] = {
+                'name': COMPONENTS[key]['name'],
+                'description': COMPONENTS[key]['description'],
+                'field': ', '.join(COMPONENTS[key]['fields']),
+                'scores': scores.tolist(),
+                'distribution': {str(score): int(count) for score, count in enumerate(counts) if count},
+                'mean_score': round(float(scores.mean()), 2) if scores.size else 0,
+                'participants': len({p for p, ok in zip(self.participants, ~np.isnan(self.components[:, j])) if ok and p})
+            }
+        return summary
+
+    def _point(self, i):
+        return {
+            'date': self.dates[i],
+            'instance': int(self.instances[i]) if not np.isnan(self.instances[i]) else None,
+            'global_score': int(self.global_scores[i]) if self.valid[i] else None,
+            'components': {
+                key: (int(score) if not np.isnan(score) else None)
+                for key, score in zip(COMPONENT_KEYS, self.components[i])
+            }
+        }
+
+    def series(self, participant):
+        """Série longitudinal de um participante (instâncias ordenadas por data)"""
+        return [self._point(i) for i in self._order() if self.participants[i] == participant]
+
+    def longitudinal(self):
+        """Séries de todos os participantes com a variação do score global (primeiro -> último)"""
+        by_participant = {}
+        for i in self._order():
+            if self.participants[i]:
+                by_participant.setdefault(self.participants[i], []).append(self._point(i))
+
+        result = {}
+        for participant, points in by_participant.items():
+            scores = [point['global_score'] for point in points if point['global_score'] is not None]
+            result[participant] = {
+                'series': points,
+                'first': scores[0] if scores else None,
+                'last': scores[-1] if scores else None,
+                'change': scores[-1] - scores[0] if len(scores) >= 2 else None
+            }
+        return result
+
+    def analysis(self):
+        """Resultado no formato usado pela página de sono"""
+        latest = self.latest_by_participant()
+        latest_scores = [int(self.global_scores[i]) for i in latest.values()]
+        good = sum(1 for score in latest_scores if score <= POOR_SLEEPER_THRESHOLD)
+        poor = len(latest_scores) - good
+        instance_scores = self.global_scores[self.valid]
+        mean_latest = round(float(np.mean(latest_scores)), 2) if latest_scores else 0
+
+        return {
+            'components': self.component_summary(),
+            'global_psqi': {
+                'scores': latest_scores,
+                'distribution': {str(s): int(c) for s, c in enumerate(np.bincount(instance_scores.astype(int), minlength=22)) if c},
+                'classification': {
+                    'good_sleepers': good,
+                    'poor_sleepers': poor,
+                    'mean_psqi': mean_latest,
+                    'total_participants': len(latest_scores)
+                }
+            },
+            'summary': {
+                'total_participants': len(latest_scores),
+                'total_instances': self.n,
+                'valid_instances': int(self.valid.sum()),
+                'mean_global_psqi': mean_latest,
+                'mean_global_psqi_all_instances': round(float(instance_scores.mean()), 2) if instance_scores.size else 0,
+                'good_sleepers_percentage': round(good / max(1, len(latest_scores)) * 100, 1) if latest_scores else 0
+            }
+        }
+
+
+def get_psqi(records):
+    """PSQIScores do snapshot (calculado uma vez por lista de registos)"""
+    return snapshot_cache.get_cached(records, ('psqi',), lambda: PSQIScores(records))
@@ -0,0 +1,115 @@
+"""
+Paginação por cursor e streaming de registos (JSON / NDJSON)
+Os registos são lidos e serializados um a um a partir do snapshot em
+memória, sem construir o payload completo da resposta
+"""
+import base64
+import json
+
+import snapshot_cache
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+FORMATS = ('json', 'ndjson')
+
+
+class CursorError(ValueError):
+    """Cursor inválido ou de um snapshot que já não está em uso"""
+
+
+def encode_cursor(version, offset):
+    """Cursor opaco: versão do snapshot + posição do próximo registo"""
+    raw = json.dumps({'v': version, 'o': offset}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, data):
+    """Retorna a posição inicial indicada pelo cursor (0 se não houver cursor)"""
+    if not cursor:
+        return 0
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        version, offset = int(payload['v']), int(payload['o'])
+    except Exception:
+        raise CursorError("Cursor inválido")
+
+    if version != snapshot_cache.snapshot_version(data):
+        raise CursorError("Cursor expirado: os dados foram atualizados, recomece sem cursor")
+    if offset < 0 or offset > len(data):
+        raise CursorError("Cursor inválido")
+
+    return offset
+
+
+def parse_page_size(value):
+    """Tamanho de página pedido; 'all' (ou 0) exporta tudo a partir do cursor"""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    if str(value).lower() in ('all', '0'):
+        return None
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise ValueError(f"page_size inválido: {value}")
+    if page_size < 0:
+        raise ValueError(f"page_size inválido: {value}")
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+class RecordWindow:
+    """Janela de registos a partir de um cursor, filtrada e projetada"""
+
+    def __init__(self, data, predicates=None, fields=None, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        self.data = data
+        self.predicates = predicates or []
+        self.fields = fields
+        self.page_size = page_size
+        self.start = decode_cursor(cursor, data)
+        self.version = snapshot_cache.snapshot_version(data)
+
+        self.positions = None
+        self.next_cursor = None
+        if page_size is not None:
+            # Só os índices da página (e a posição seguinte) ficam em memória
+            self.positions = []
+            for position in self._matches(self.start):
+                if len(self.positions) == page_size:
+                    self.next_cursor = encode_cursor(self.version, position)
+                    break
+                self.positions.append(position)
+
+    def _matches(self, start):
+        """Posições dos registos que passam todos os filtros"""
+        predicates = self.predicates
+        for position in range(start, len(self.data)):
+            record = self.data[position]
+            if all(p(record) for p in predicates):
+                yield position
+
+    def _project(self, record):
+        if self.fields is None:
+            return record
+        return {field: record.get(field) for field in self.fields}
+
+    def records(self):
+        """Gera os registos da janela (projetados)"""
+        positions = self.positions if self.positions is not None else self._matches(self.start)
+        for position in positions:
+            yield self._project(self.data[position])
+
+    def iter_ndjson(self, dumps):
+        """Um registo JSON por linha"""
+        for record in self.records():
+            yield dumps(record) + '\n'
+
+    def iter_json(self, dumps):
+        """Objeto JSON com a lista de registos, emitido registo a registo"""
+        yield '{"success": true, "records": ['
+        count = 0
+        for record in self.records():
+            yield (',' if count else '') + dumps(record)
+            count += 1
+        yield '], "count": %d, "next_cursor": %s}' % (count, dumps(self.next_cursor))
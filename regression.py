@@ -0,0 +1,263 @@
+"""
+Modelos de regressão em NumPy (sem statsmodels)
+- Matriz de desenho com intercepto, variáveis numéricas e one-hot das
+  categóricas (nível de referência = o mais frequente), construída uma vez
+- OLS por mínimos quadrados e GLM Poisson (log) / logístico (logit) por IRLS
+- Vários resultados (colunas de Y) ajustados em lote: o IRLS resolve os
+  sistemas p × p de todas as colunas numa só chamada a np.linalg.solve
+- Coeficientes, erros-padrão e valores-p (t para OLS, z de Wald para GLM)
+"""
+import numpy as np
+
+from config import Config
+from distributions import normal_two_sided, t_two_sided
+
+# Linhas de categorias com menos observações que isto ficam fora do modelo
+MIN_LEVEL_COUNT = 2
+_ETA_LIMIT = 30.0
+_MIN_WEIGHT = 1e-10
+
+
+class DesignMatrix:
+    """Matriz de desenho (apenas casos completos) e nomes das colunas"""
+
+    def __init__(self, X, names, rows, levels):
+        self.X = X
+        self.names = names
+        self.rows = rows
+        self.levels = levels
+
+    @property
+    def n(self):
+        return self.X.shape[0]
+
+    @property
+    def p(self):
+        return self.X.shape[1]
+
+
+def design_matrix(numeric=None, categorical=None, intercept=True):
+    """DesignMatrix a partir de {nome: valores numéricos} e {nome: valores categóricos}
+
+    Linhas com algum valor em falta (NaN ou categoria vazia/None) são excluídas,
+    tal como as de categorias com menos de MIN_LEVEL_COUNT observações (não são
+    codificadas como o nível de referência). Colunas constantes ou linearmente
+    dependentes das anteriores são removidas
+    """
+    numeric = {name: np.asarray(values, dtype=float) for name, values in (numeric or {}).items()}
+    categorical = {name: np.asarray(values, dtype=object) for name, values in (categorical or {}).items()}
+    lengths = {len(v) for v in list(numeric.values()) + list(categorical.values())}
+    if len(lengths) > 1:
+        raise ValueError("Todas as variáveis devem ter o mesmo número de observações")
+    n = lengths.pop() if lengths else 0
+
+    complete = np.ones(n, dtype=bool)
+    for values in numeric.values():
+        complete &= ~np.isnan(values)
+    for values in categorical.values():
+        complete &= np.array([value not in (None, '') for value in values], dtype=bool)
+
+    # Categorias raras: excluídas até não haver nenhuma (excluir linhas de uma
+    # variável pode tornar rara uma categoria de outra)
+    text = {name: values.astype(str) for name, values in categorical.items()}
+    excluded = {name: set() for name in categorical}
+    changed = True
+    while changed:
+        changed = False
+        for name, values in text.items():
+            distinct, counts = np.unique(values[complete], return_counts=True)
+            rare = distinct[counts < MIN_LEVEL_COUNT]
+            if len(rare):
+                complete &= ~np.isin(values, rare)
+                excluded[name].update(str(value) for value in rare)
+                changed = True
+    rows = np.flatnonzero(complete)
+
+    columns, names, levels = [], [], {}
+    if intercept:
+        columns.append(np.ones(len(rows)))
+        names.append('intercept')
+    for name, values in numeric.items():
+        columns.append(values[rows])
+        names.append(name)
+    for name, values in categorical.items():
+        distinct, inverse, counts = np.unique(text[name][rows], return_inverse=True, return_counts=True)
+        reference = int(np.argmax(counts)) if len(distinct) else -1
+        kept = [i for i in range(len(distinct)) if i != reference]
+        levels[name] = {'reference': str(distinct[reference]) if reference >= 0 else None,
+                        'levels': [str(distinct[i]) for i in kept],
+                        'excluded': sorted(excluded[name])}
+        if kept:
+            one_hot = inverse[:, None] == np.array(kept)[None, :]
+            columns.extend(one_hot.T.astype(float))
+            names.extend(f"{name}[{distinct[i]}]" for i in kept)
+
+    X = np.column_stack(columns) if columns else np.empty((len(rows), 0))
+    keep = _independent_columns(X)
+    return DesignMatrix(X[:, keep], [names[i] for i in keep], rows, levels)
+
+
+def _independent_columns(X):
+    """Índices das colunas que aumentam a característica (ordem original)"""
+    keep = []
+    for j in range(X.shape[1]):
+        candidate = keep + [j]
+        if np.linalg.matrix_rank(X[:, candidate]) == len(candidate):
+            keep.append(j)
+    return keep
+
+
+class FitResult:
+    """Coeficientes, erros-padrão e valores-p de um modelo ajustado"""
+
+    def __init__(self, model, names, coef, se, statistic, p_values, n, df_resid,
+                 converged=True, iterations=1, **fit_stats):
+        self.model = model
+        self.names = names
+        self.coef = coef
+        self.se = se
+        self.statistic = statistic
+        self.p_values = p_values
+        self.n = n
+        self.df_resid = df_resid
+        self.converged = converged
+        self.iterations = iterations
+        self.fit_stats = fit_stats
+
+    def coefficients(self):
+        """Lista de coeficientes (um dicionário por coluna da matriz de desenho)"""
+        return [
+            {
+                'term': name,
+                'coef': _rounded(coef),
+                'std_error': _rounded(se),
+                'statistic': _rounded(stat),
+                'p_value': _rounded(p, 6),
+                'significant': bool(p < Config.SIGNIFICANCE_LEVEL) if np.isfinite(p) else False
+            }
+            for name, coef, se, stat, p in zip(self.names, self.coef, self.se, self.statistic, self.p_values)
+        ]
+
+    def to_dict(self):
+        return {
+            'model': self.model,
+            'n': self.n,
+            'df_resid': self.df_resid,
+            'converged': self.converged,
+            'iterations': self.iterations,
+            'coefficients': self.coefficients(),
+            **{key: _rounded(value) for key, value in self.fit_stats.items()}
+        }
+
+
+def _rounded(value, digits=4):
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+
+def _as_matrix(Y):
+    Y = np.asarray(Y, dtype=float)
+    return (Y[:, None], True) if Y.ndim == 1 else (Y, False)
+
+
+def ols(X, Y, names=None):
+    """OLS de cada coluna de Y em X; lista de FitResult (um só se Y for um vetor)"""
+    X = np.asarray(X, dtype=float)
+    Y, single = _as_matrix(Y)
+    n, p = X.shape
+    names = names or [f"x{j}" for j in range(p)]
+    df_resid = n - p
+
+    coef, _, _, _ = np.linalg.lstsq(X, Y, rcond=None)
+    residuals = Y - X @ coef
+    rss = np.square(residuals).sum(axis=0)
+    tss = np.square(Y - Y.mean(axis=0)).sum(axis=0)
+    xtx_inv = np.linalg.pinv(X.T @ X)
+
+    results = []
+    for j in range(Y.shape[1]):
+        sigma2 = rss[j] / df_resid if df_resid > 0 else np.nan
+        se = np.sqrt(np.maximum(np.diag(xtx_inv) * sigma2, 0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = coef[:, j] / se
+        r2 = 1 - rss[j] / tss[j] if tss[j] > 0 else np.nan
+        results.append(FitResult(
+            'ols', names, coef[:, j], se, t, t_two_sided(t, max(df_resid, 0)) if df_resid > 0 else np.full(p, np.nan),
+            n, df_resid, r_squared=r2, residual_std_error=np.sqrt(sigma2)
+        ))
+    return results[0] if single else results
+
+
+def _family(family):
+    if family == 'poisson':
+        inverse_link = np.exp
+        variance = lambda mu: mu
+        deviance = lambda y, mu: 2 * (np.where(y > 0, y * np.log(np.where(y > 0, y, 1) / mu), 0) - (y - mu))
+        start = lambda y: np.log(np.maximum(y, 0) + 0.5)
+    elif family == 'logistic':
+        inverse_link = lambda eta: 1 / (1 + np.exp(-eta))
+        variance = lambda mu: mu * (1 - mu)
+        deviance = lambda y, mu: -2 * (y * np.log(np.maximum(mu, _MIN_WEIGHT))
+                                       + (1 - y) * np.log(np.maximum(1 - mu, _MIN_WEIGHT)))
+        start = lambda y: np.log((y + 0.5) / (1.5 - y))
+    else:
+        raise ValueError(f"Família desconhecida: {family}")
+    return inverse_link, variance, deviance, start
+
+
+def irls(X, Y, family='poisson', names=None, max_iter=50, tol=1e-8):
+    """GLM (Poisson/log ou logístico/logit) por IRLS, em lote sobre as colunas de Y"""
+    X = np.asarray(X, dtype=float)
+    Y, single = _as_matrix(Y)
+    n, p = X.shape
+    m = Y.shape[1]
+    names = names or [f"x{j}" for j in range(p)]
+    inverse_link, variance, deviance, start = _family(family)
+
+    # Início: regressão linear do preditor linear transformado
+    eta = start(Y)
+    coef = np.linalg.lstsq(X, eta, rcond=None)[0].T          # m × p
+    eta = np.clip(X @ coef.T, -_ETA_LIMIT, _ETA_LIMIT)
+    mu = inverse_link(eta)
+    dev = deviance(Y, mu).sum(axis=0)
+    converged = np.zeros(m, dtype=bool)
+    iterations = np.zeros(m, dtype=int)
+
+    for iteration in range(1, max_iter + 1):
+        active = ~converged
+        if not active.any():
+            break
+        # Logit/log canónicos: peso = variância, resposta de trabalho z = eta + (y - mu) / peso
+        weights = np.maximum(variance(mu[:, active]), _MIN_WEIGHT)
+        z = eta[:, active] + (Y[:, active] - mu[:, active]) / weights
+        xtwx = np.einsum('ni,nm,nj->mij', X, weights, X)
+        xtwz = np.einsum('ni,nm,nm->mi', X, weights, z)
+        xtwx += np.eye(p) * 1e-10
+        coef[active] = np.linalg.solve(xtwx, xtwz[..., None])[..., 0]
+
+        eta[:, active] = np.clip(X @ coef[active].T, -_ETA_LIMIT, _ETA_LIMIT)
+        mu[:, active] = inverse_link(eta[:, active])
+        new_dev = deviance(Y[:, active], mu[:, active]).sum(axis=0)
+        change = np.abs(new_dev - dev[active]) / (np.abs(new_dev) + 0.1)
+        dev[active] = new_dev
+        iterations[active] = iteration
+        converged[np.flatnonzero(active)[change < tol]] = True
+
+    # Matriz de informação no ponto final
+    weights = np.maximum(variance(mu), _MIN_WEIGHT)
+    covariance = np.linalg.pinv(np.einsum('ni,nm,nj->mij', X, weights, X))
+    null_mu = np.clip(Y.mean(axis=0), _MIN_WEIGHT, None if family == 'poisson' else 1 - _MIN_WEIGHT)
+    null_dev = deviance(Y, np.broadcast_to(null_mu, Y.shape)).sum(axis=0)
+
+    results = []
+    for j in range(m):
+        se = np.sqrt(np.maximum(np.diag(covariance[j]), 0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = coef[j] / se
+        results.append(FitResult(
+            family, names, coef[j], se, z, normal_two_sided(z), n, n - p,
+            converged=bool(converged[j]), iterations=int(iterations[j]),
+            deviance=dev[j], null_deviance=null_dev[j],
+            pseudo_r_squared=1 - dev[j] / null_dev[j] if null_dev[j] > 0 else np.nan
+        ))
+    return results[0] if single else results
@@ -0,0 +1,195 @@
+"""
+Bootstrap e testes de permutação vetorizados
+Milhares de reamostragens numa só operação NumPy: uma matriz de índices
+(reamostragens × n) indexa o vetor de valores e as estatísticas são
+calculadas por linha. As matrizes são geradas em blocos para limitar a
+memória usada; o gerador (np.random.Generator) é passado pelo chamador
+ou criado com DEFAULT_SEED, pelo que os resultados são reprodutíveis.
+Com poucos participantes o teste de permutação de dois grupos enumera
+todas as partições (valor-p exato)
+"""
+import math
+from itertools import combinations
+
+import numpy as np
+
+from config import Config
+
+DEFAULT_SEED = 42
+
+# Número máximo de índices gerados de uma vez (blocos de reamostragens)
+MAX_CHUNK_ELEMENTS = 4_000_000
+
+
+def _rng(rng):
+    return rng if rng is not None else np.random.default_rng(DEFAULT_SEED)
+
+
+def _chunks(n, n_resamples):
+    """Tamanhos dos blocos de reamostragens (cada bloco com até MAX_CHUNK_ELEMENTS índices)"""
+    chunk = max(1, MAX_CHUNK_ELEMENTS // max(n, 1))
+    for start in range(0, n_resamples, chunk):
+        yield min(chunk, n_resamples - start)
+
+
+def bootstrap_indices(n, n_resamples, rng=None):
+    """Blocos de matrizes de índices com reposição (reamostragens × n)"""
+    rng = _rng(rng)
+    for size in _chunks(n, n_resamples):
+        yield rng.integers(0, n, size=(size, n))
+
+
+def permutation_indices(n, n_resamples, rng=None):
+    """Blocos de matrizes de permutações aleatórias de 0..n-1 (permutações × n)"""
+    rng = _rng(rng)
+    for size in _chunks(n, n_resamples):
+        yield rng.permuted(np.broadcast_to(np.arange(n), (size, n)), axis=1)
+
+
+def partition_indices(n, n_a):
+    """Matriz com todas as escolhas de n_a de n índices (C(n, n_a) × n_a)"""
+    flat = np.fromiter((i for combo in combinations(range(n), n_a) for i in combo), dtype=np.int64)
+    return flat.reshape(-1, n_a)
+
+
+def _clean(values):
+    values = np.asarray(values, dtype=float)
+    return values[~np.isnan(values)]
+
+
+def bootstrap_means(values, n_resamples=None, rng=None):
+    """Médias de `n_resamples` reamostragens com reposição de `values`"""
+    values = np.asarray(values, dtype=float)
+    n_resamples = n_resamples or Config.BOOTSTRAP_RESAMPLES
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    return np.concatenate([values[indices].mean(axis=1) for indices in bootstrap_indices(n, n_resamples, rng)])
+
+
+def percentile_interval(samples, confidence=None):
+    """Intervalo de percentis (lower, upper) da distribuição bootstrap"""
+    confidence = confidence or Config.BOOTSTRAP_CONFIDENCE
+    alpha = (1 - confidence) / 2
+    lower, upper = np.percentile(samples, [100 * alpha, 100 * (1 - alpha)])
+    return float(lower), float(upper)
+
+
+def bootstrap_mean_ci(values, n_resamples=None, confidence=None, rng=None):
+    """Média e intervalo de confiança bootstrap (percentis) da média"""
+    values = _clean(values)
+    confidence = confidence or Config.BOOTSTRAP_CONFIDENCE
+    if values.size == 0:
+        return {'mean': None, 'lower': None, 'upper': None, 'n': 0, 'confidence': confidence}
+
+    means = bootstrap_means(values, n_resamples, rng)
+    lower, upper = percentile_interval(means, confidence)
+    return {
+        'mean': round(float(values.mean()), 2),
+        'lower': round(lower, 2),
+        'upper': round(upper, 2),
+        'n': int(values.size),
+        'resamples': len(means),
+        'confidence': confidence
+    }
+
+
+def bootstrap_difference_ci(a, b, n_resamples=None, confidence=None, rng=None):
+    """Diferença de médias (a - b) e intervalo de confiança bootstrap (grupos reamostrados em separado)"""
+    a, b = _clean(a), _clean(b)
+    confidence = confidence or Config.BOOTSTRAP_CONFIDENCE
+    if a.size == 0 or b.size == 0:
+        return {'difference': None, 'lower': None, 'upper': None, 'confidence': confidence}
+
+    rng = _rng(rng)
+    differences = bootstrap_means(a, n_resamples, rng) - bootstrap_means(b, n_resamples, rng)
+    lower, upper = percentile_interval(differences, confidence)
+    return {
+        'difference': round(float(a.mean() - b.mean()), 2),
+        'lower': round(lower, 2),
+        'upper': round(upper, 2),
+        'resamples': len(differences),
+        'confidence': confidence
+    }
+
+
+def _tolerance(value):
+    # Estatísticas iguais à observada (a menos do erro de arredondamento) contam como extremas
+    return 1e-9 * max(1.0, abs(value))
+
+
+def permutation_test(a, b, n_resamples=None, rng=None):
+    """Teste de permutação (bilateral) da diferença de médias entre a e b
+
+    Se o número de partições C(n, n_a) não exceder `n_resamples` todas são
+    enumeradas (valor-p exato); caso contrário usa permutações aleatórias,
+    com valor-p (extremas + 1) / (permutações + 1)
+    """
+    a, b = _clean(a), _clean(b)
+    n_resamples = n_resamples or Config.PERMUTATION_RESAMPLES
+    n_a, n = len(a), len(a) + len(b)
+    if n_a == 0 or n_a == n:
+        return {'difference': None, 'p_value': None, 'significant': False, 'exact': False, 'resamples': 0}
+
+    pooled = np.concatenate([a, b])
+    total = pooled.sum()
+    observed = a.mean() - b.mean()
+    threshold = abs(observed) - _tolerance(observed)
+
+    def differences(sums_a):
+        return sums_a / n_a - (total - sums_a) / (n - n_a)
+
+    exact = math.comb(n, n_a) <= n_resamples
+    if exact:
+        extreme = int((np.abs(differences(pooled[partition_indices(n, n_a)].sum(axis=1))) >= threshold).sum())
+        resamples = math.comb(n, n_a)
+        p_value = extreme / resamples
+    else:
+        extreme = sum(
+            int((np.abs(differences(pooled[indices[:, :n_a]].sum(axis=1))) >= threshold).sum())
+            for indices in permutation_indices(n, n_resamples, rng)
+        )
+        resamples = n_resamples
+        p_value = (extreme + 1) / (resamples + 1)
+    return {
+        'difference': round(float(observed), 2),
+        'p_value': round(p_value, 6),
+        'significant': bool(p_value < Config.SIGNIFICANCE_LEVEL),
+        'exact': exact,
+        'resamples': resamples
+    }
+
+
+def permutation_f_test(values, labels, n_resamples=None, rng=None):
+    """Teste de permutação de N grupos (estatística F da ANOVA de um fator)
+
+    Com os tamanhos dos grupos fixos, F é monótona na soma de quadrados entre
+    grupos, pelo que só as somas por grupo de cada permutação são calculadas
+    """
+    values = np.asarray(values, dtype=float)
+    labels = np.asarray(labels)
+    present = ~np.isnan(values)
+    values, labels = values[present], labels[present]
+    n_resamples = n_resamples or Config.PERMUTATION_RESAMPLES
+    groups = [labels == group for group in np.unique(labels)]
+    if len(groups) < 2:
+        return {'p_value': None, 'significant': False, 'resamples': 0}
+
+    sizes = np.array([mask.sum() for mask in groups], dtype=float)
+
+    def between(matrix):
+        sums = np.column_stack([matrix[:, mask].sum(axis=1) for mask in groups])
+        return (sums ** 2 / sizes).sum(axis=1)
+
+    observed = between(values[None, :])[0]
+    threshold = observed - _tolerance(observed)
+    extreme = sum(
+        int((between(values[indices]) >= threshold).sum())
+        for indices in permutation_indices(len(values), n_resamples, rng)
+    )
+    p_value = (extreme + 1) / (n_resamples + 1)
+    return {
+        'p_value': round(p_value, 6),
+        'significant': bool(p_value < Config.SIGNIFICANCE_LEVEL),
+        'resamples': n_resamples
+    }
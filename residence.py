@@ -0,0 +1,244 @@
+"""
+Comparação residentes (Grupo A) vs não-residentes (Grupo B)
+- Tabela por participante do motor de comparação de grupos
+  (group_comparison, agrupamento 'residence'): demografia do baseline e
+  médias por participante dos indicadores de saúde, adesão e qualidade de
+  vida (EQ-5D-5L); A/B separados por máscaras booleanas
+- Variáveis numéricas: Welch t e Mann-Whitney U (g de Hedges e rank-biserial)
+  e, em coortes pequenas, teste de permutação (exato quando possível) e
+  intervalo bootstrap da diferença (resampling); a significância é decidida
+  pela permutação quando calculada, senão pelo Welch t (o Mann-Whitney U é
+  informação secundária); categóricas: qui-quadrado (V de Cramér) — ver
+  hypothesis_tests
+- Aceita registos 'raw' (códigos) ou 'label' (rótulos das opções)
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import snapshot_cache
+from columns import baseline_values
+from config import Config
+from dyads import group_letter
+from group_comparison import RESIDENCE_GROUPS, get_group_comparison
+from hypothesis_tests import chi_square_test, mann_whitney_u, welch_t_test
+from resampling import DEFAULT_SEED, bootstrap_difference_ci, permutation_test
+
+GROUPS = RESIDENCE_GROUPS
+
+HEALTH_FIELDS = {
+    'health_status': 'Estado de Saúde',
+    'pain_today': 'Dor',
+    'fatigue_today': 'Fadiga',
+    'dizziness_today': 'Tonturas',
+    'muscle_weakness_today': 'Fraqueza Muscular'
+}
+QOL_FIELDS = {
+    'mobility': 'Mobilidade',
+    'self_care': 'Cuidados Pessoais',
+    'usual_activities': 'Atividades Habituais',
+    'pain_discomfort': 'Dor/Mal-estar',
+    'anxiety_depression': 'Ansiedade/Depressão',
+    'vas_health_today': 'EVA - Saúde Hoje'
+}
+ADHERENCE_FIELD = 'took_medications_yesterday'
+CATEGORICAL_DEMOGRAPHICS = {
+    'sex': 'sex_distribution',
+    'marital_status': 'marital_status',
+    'education_level': 'education_level'
+}
+NUMERIC_FIELDS = list(HEALTH_FIELDS) + list(QOL_FIELDS) + [ADHERENCE_FIELD, 'birth_year']
+
+
+def _direction(difference):
+    if difference is None:
+        return None
+    if difference == 0:
+        return 'similar'
+    return 'residents_higher' if difference > 0 else 'non_residents_higher'
+
+
+class ResidenceComparison:
+    """Tabela participante × indicadores dos grupos A e B e testes entre grupos"""
+
+    def __init__(self, records):
+        self.engine = get_group_comparison(records, NUMERIC_FIELDS, list(CATEGORICAL_DEMOGRAPHICS), 'residence')
+        table = self.engine.table.copy()
+        reports = self.engine.reports[ADHERENCE_FIELD]
+        table['adherence_rate'] = table[ADHERENCE_FIELD] * 100
+        table['adherence_reports'] = reports
+        table['adherence_yes'] = (table[ADHERENCE_FIELD] * reports).fillna(0)
+
+        ages = datetime.now().year - table['birth_year']
+        table['age'] = ages.where((ages > 0) & (ages < 120))
+
+        self.table = table
+        self.masks = {key: self.engine.mask(key) for key in GROUPS.values()}
+        self.total_participants = int(sum(1 for g in baseline_values(records, 'participant_group').values()
+                                          if group_letter(g)))
+
+    def counts(self):
+        return {key: int(mask.sum()) for key, mask in self.masks.items()}
+
+    def numeric_comparison(self, columns, names=None):
+        """{coluna: médias por grupo, Welch t e Mann-Whitney U} (todas as colunas numa só chamada)"""
+        values = self.table[columns].to_numpy(dtype=float)
+        residents = values[self.masks['residents']]
+        non_residents = values[self.masks['non_residents']]
+        welch = welch_t_test(residents, non_residents)
+        mann_whitney = mann_whitney_u(residents, non_residents)
+        # Permutação e bootstrap só em coortes pequenas (os testes assintóticos bastam nas grandes)
+        resample = len(residents) + len(non_residents) <= Config.RESAMPLING_MAX_PARTICIPANTS
+        rng = np.random.default_rng(DEFAULT_SEED)
+
+        comparison = {}
+        for j, column in enumerate(columns):
+            welch_j = {key: series[j] for key, series in welch.items()}
+            mann_whitney_j = {key: series[j] for key, series in mann_whitney.items()}
+            if not welch_j['n_a'] and not welch_j['n_b']:
+                continue
+            permutation = permutation_test(residents[:, j], non_residents[:, j], rng=rng) if resample else None
+            # Um só teste principal: a permutação (valor-p exato/por permutação) ou o Welch t
+            primary = 'permutation' if permutation and permutation['p_value'] is not None else 'welch_t'
+            comparison[column] = {
+                'name': (names or {}).get(column, column),
+                'residents_mean': welch_j['mean_a'],
+                'non_residents_mean': welch_j['mean_b'],
+                'residents_n': welch_j['n_a'],
+                'non_residents_n': welch_j['n_b'],
+                'difference': abs(welch_j['difference']) if welch_j['difference'] is not None else None,
+                'direction': _direction(welch_j['difference']),
+                'welch_t': {key: welch_j[key] for key in ('t', 'df', 'p_value', 'significant', 'hedges_g')},
+                'mann_whitney': mann_whitney_j,
+                'permutation': permutation,
+                'difference_ci': bootstrap_difference_ci(residents[:, j], non_residents[:, j], rng=rng)
+                if resample else None,
+                'primary_test': primary,
+                'significant': permutation['significant'] if primary == 'permutation' else welch_j['significant']
+            }
+        return comparison
+
+    def categorical_comparison(self, column):
+        """Distribuição por grupo e qui-quadrado de um campo categórico"""
+        comparison = self.engine.categorical_comparison(column)
+        comparison['distribution'] = {key: comparison['distribution'].get(key, {}) for key in GROUPS.values()}
+        return comparison
+
+    def _group_metrics(self, columns, key):
+        """{grupo: {count, key: {campo: {mean, count}}}} (médias das médias por participante)"""
+        result = {}
+        for group, mask in self.masks.items():
+            metrics = {}
+            for column in columns:
+                values = self.table.loc[mask, column].dropna()
+                if len(values):
+                    metrics[column] = {'mean': round(float(values.mean()), 2), 'count': int(len(values))}
+            result[group] = {'count': int(mask.sum()), key: metrics}
+        return result
+
+    def demographics(self):
+        counts = self.counts()
+        demographics = {key: {'count': counts[key], 'demographics': {}} for key in GROUPS.values()}
+        for key, mask in self.masks.items():
+            ages = self.table.loc[mask, 'age'].dropna()
+            if len(ages):
+                demographics[key]['demographics']['age'] = {
+                    'mean': round(float(ages.mean()), 1),
+                    'min': int(ages.min()),
+                    'max': int(ages.max()),
+                    'count': int(len(ages))
+                }
+
+        tests = self.numeric_comparison(['age'], {'age': 'Idade'})
+        for field, output_key in CATEGORICAL_DEMOGRAPHICS.items():
+            comparison = self.categorical_comparison(field)
+            for key in GROUPS.values():
+                if comparison['distribution'][key]:
+                    demographics[key]['demographics'][output_key] = comparison['distribution'][key]
+            tests[field] = comparison['chi_square']
+
+        classified = counts['residents'] + counts['non_residents']
+        return {
+            'demographic_comparison': demographics,
+            'statistical_significance': tests,
+            'data_summary': {
+                'total_participants': self.total_participants,
+                'residents_count': counts['residents'],
+                'non_residents_count': counts['non_residents'],
+                'analysis_type': 'redcap_participant_group_classification'
+            },
+            'summary': {
+                'message': f"Análise demográfica: {counts['residents']} residentes vs {counts['non_residents']} não-residentes",
+                'methodology': 'Classificação pelo participant_group do baseline; idade: permutação (ou Welch t '
+                               'em coortes grandes), Mann-Whitney U como informação secundária; '
+                               'qui-quadrado (sexo, estado civil, escolaridade)',
+                'data_coverage': f"{classified}/{self.total_participants} participantes classificados",
+                'significant_differences': [field for field, test in tests.items() if test.get('significant')]
+            }
+        }
+
+    def _outcome_result(self, fields, comparison_key, metrics_key, message):
+        counts = self.counts()
+        differences = self.numeric_comparison(list(fields), {field: name for field, name in fields.items()})
+        significant = [differences[field]['name'] for field in differences if differences[field]['significant']]
+        return {
+            comparison_key: self._group_metrics(list(fields), metrics_key),
+            'significant_differences': differences,
+            'summary': {
+                'message': f"{message}: {counts['residents']} residentes vs {counts['non_residents']} não-residentes",
+                'key_findings': f"Diferenças significativas em: {', '.join(significant)}" if significant
+                else ('Sem diferenças significativas entre grupos' if differences
+                      else 'Dados insuficientes para comparação'),
+                'methodology': 'Médias por participante; significância pelo teste de permutação (ou Welch t em '
+                               'coortes grandes), Mann-Whitney U como informação secundária'
+            }
+        }
+
+    def health(self):
+        return self._outcome_result(HEALTH_FIELDS, 'health_outcomes_comparison', 'health_metrics',
+                                    'Comparação de saúde')
+
+    def quality_of_life(self):
+        return self._outcome_result(QOL_FIELDS, 'quality_of_life_comparison', 'qol_metrics',
+                                    'Qualidade de vida (EQ-5D-5L)')
+
+    def adherence(self):
+        counts = self.counts()
+        comparison = {}
+        for key, mask in self.masks.items():
+            reports = self.table.loc[mask, 'adherence_reports'].fillna(0).sum()
+            yes = self.table.loc[mask, 'adherence_yes'].fillna(0).sum()
+            metrics = {}
+            if reports:
+                metrics['adherence_rate'] = {'percentage': round(float(yes / reports * 100), 1), 'count': int(reports)}
+            comparison[key] = {'count': counts[key], 'adherence_metrics': metrics}
+
+        tests = self.numeric_comparison(['adherence_rate'], {'adherence_rate': 'Taxa de adesão por participante (%)'})
+        # Participantes com adesão em todos os dias reportados vs restantes
+        rated = self.table[self.table['adherence_rate'].notna()]
+        full = pd.crosstab(rated['adherence_rate'] >= 100, rated['group']).reindex(columns=list(GROUPS.values()), fill_value=0)
+        tests['full_adherence'] = chi_square_test(full.to_numpy())
+
+        rates = {key: comparison[key]['adherence_metrics'].get('adherence_rate', {}).get('percentage', 0)
+                 for key in GROUPS.values()}
+        if rates['residents'] > rates['non_residents']:
+            key_differences = f"Residentes têm maior adesão ({rates['residents']}% vs {rates['non_residents']}%)"
+        elif rates['non_residents'] > rates['residents']:
+            key_differences = f"Não-residentes têm maior adesão ({rates['non_residents']}% vs {rates['residents']}%)"
+        else:
+            key_differences = "Adesão similar entre grupos"
+        return {
+            'adherence_comparison': comparison,
+            'statistical_tests': tests,
+            'summary': {
+                'message': f"Adesão medicamentosa: {counts['residents']} residentes vs {counts['non_residents']} não-residentes",
+                'key_differences': key_differences,
+                'significant': any(test.get('significant') for test in tests.values())
+            }
+        }
+
+
+def get_residence_comparison(records):
+    """ResidenceComparison do snapshot (construída uma vez por lista de registos)"""
+    return snapshot_cache.get_cached(records, ('residence',), lambda: ResidenceComparison(records))
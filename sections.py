@@ -0,0 +1,186 @@
+"""
+Secções das páginas de análise carregadas de forma assíncrona
+A página devolve só a estrutura (cabeçalho, abas e placeholders) e cada
+secção é pedida a /api/sections/<página>/<secção>. Cada análise do
+DataProcessor é calculada uma vez por snapshot e partilhada entre as
+secções que a usam
+"""
+from flask import render_template
+
+import snapshot_cache
+from data_processor import DataProcessor
+
+# Origem dos dados de cada página: 'label' (redcap.get_records, valores com
+# rótulos) ou 'raw' (get_cached_data, valores codificados)
+# Cada secção indica o template parcial e, para cada variável do template,
+# o método do DataProcessor que a calcula. Secções sem template devolvem
+# apenas os dados (JSON)
+PAGES = {
+    'sleep': {
+        'source': 'label',
+        'sections': {
+            'summary': {
+                'template': 'sections/sleep/summary.html',
+                'context': {'components': 'analyze_psqi_components_rm4health'}
+            },
+            'psqi_components': {
+                'template': 'sections/sleep/psqi_components.html',
+                'context': {'components': 'analyze_psqi_components_rm4health'}
+            },
+            'sleep_profiles': {
+                'template': 'sections/sleep/sleep_profiles.html',
+                'context': {'profiles': 'create_sleep_profiles_rm4health'}
+            },
+            'sleep_correlations': {
+                'template': 'sections/sleep/sleep_correlations.html',
+                'context': {'correlations': 'sleep_symptom_correlations_rm4health'}
+            },
+            'medication_impact': {
+                'template': 'sections/sleep/medication_impact.html',
+                'context': {'medication_impact': 'medication_sleep_impact_rm4health'}
+            },
+        }
+    },
+    'healthcare': {
+        'source': 'label',
+        'sections': {
+            'summary': {
+                'template': 'sections/healthcare/summary.html',
+                'context': {
+                    'costs': 'calculate_cost_effectiveness_rm4health',
+                    'patterns': 'analyze_service_utilization_rm4health'
+                }
+            },
+            'service_patterns': {
+                'template': 'sections/healthcare/service_patterns.html',
+                'context': {'patterns': 'analyze_service_utilization_rm4health'}
+            },
+            'cost_effectiveness': {
+                'template': 'sections/healthcare/cost_effectiveness.html',
+                'context': {'costs': 'calculate_cost_effectiveness_rm4health'}
+            },
+            'remote_impact': {
+                'template': 'sections/healthcare/remote_impact.html',
+                'context': {'remote_impact': 'assess_remote_monitoring_impact_rm4health'}
+            },
+            'utilization_predictors': {
+                'template': 'sections/healthcare/utilization_predictors.html',
+                'context': {'predictors': 'identify_utilization_predictors_rm4health'}
+            },
+        }
+    },
+    'caregivers': {
+        'source': 'label',
+        'sections': {
+            'group_comparison': {
+                'template': 'sections/caregivers/group_comparison.html',
+                'context': {'comparison': 'compare_caregiver_groups'}
+            },
+            'caregiver_burden': {
+                'template': 'sections/caregivers/caregiver_burden.html',
+                'context': {'burden': 'analyze_caregiver_burden'}
+            },
+            'support_effectiveness': {
+                'template': 'sections/caregivers/support_effectiveness.html',
+                'context': {'effectiveness': 'assess_support_effectiveness'}
+            },
+            'response_patterns': {
+                'template': 'sections/caregivers/response_patterns.html',
+                'context': {'patterns': 'caregiver_response_patterns'}
+            },
+            'summary': {
+                'template': 'sections/caregivers/summary.html',
+                'context': {'comparison': 'compare_caregiver_groups'}
+            },
+        }
+    },
+    'residence': {
+        'source': 'raw',
+        'sections': {
+            'summary': {
+                'template': 'sections/residence/summary.html',
+                'context': {'demographics': 'compare_residence_demographics'}
+            },
+            'demographics': {
+                'template': 'sections/residence/demographics.html',
+                'context': {'demographics': 'compare_residence_demographics'}
+            },
+            'insights': {
+                'template': 'sections/residence/insights.html',
+                'context': {'demographics': 'compare_residence_demographics'}
+            },
+            'health': {
+                'template': None,
+                'context': {'health': 'compare_health_outcomes'}
+            },
+            'adherence': {
+                'template': None,
+                'context': {'adherence': 'compare_adherence_by_residence'}
+            },
+            'quality_of_life': {
+                'template': None,
+                'context': {'quality': 'compare_quality_of_life'}
+            },
+        }
+    },
+}
+
+
+def get_page_source(page):
+    """Origem dos dados da página ('label' ou 'raw'); None se a página não existir"""
+    config = PAGES.get(page)
+    return config['source'] if config else None
+
+
+def get_section_config(page, section):
+    """Configuração da secção (None se a página ou a secção não existirem)"""
+    config = PAGES.get(page)
+    if config is None:
+        return None
+    return config['sections'].get(section)
+
+
+def get_analysis(data, method):
+    """Resultado de um método de análise do DataProcessor (uma vez por snapshot)"""
+    return snapshot_cache.get_cached(
+        data, ('analysis', method), lambda: getattr(DataProcessor(data), method)()
+    )
+
+
+def render_section(page, section, data, job=None):
+    """Calcula as análises da secção e renderiza o template parcial
+
+    Retorna um dicionário pronto para jsonify; levanta KeyError se a página
+    ou a secção não existirem. Quando corre como tarefa (jobs.Job), reporta
+    o progresso e verifica o cancelamento entre análises
+    """
+    config = get_section_config(page, section)
+    if config is None:
+        raise KeyError(f"Secção desconhecida: {page}/{section}")
+
+    if not data:
+        return {
+            'success': False,
+            'page': page,
+            'section': section,
+            'error': "Não foi possível obter dados do REDCap"
+        }
+
+    context = {}
+    steps = len(config['context'])
+    for done, (name, method) in enumerate(config['context'].items()):
+        if job is not None:
+            job.check_cancelled()
+            job.report(100 * done // (steps + 1), f"A calcular {method}...")
+        context[name] = get_analysis(data, method)
+
+    if job is not None:
+        job.check_cancelled()
+        job.report(100 * steps // (steps + 1), "A gerar HTML...")
+
+    result = {'success': True, 'page': page, 'section': section}
+    if config['template']:
+        result['html'] = render_template(config['template'], **context)
+    else:
+        result['data'] = context
+    return result
@@ -0,0 +1,126 @@
+"""
+Camada de serialização JSON do dashboard
+Usa orjson quando disponível (com suporte nativo a NumPy e datetime) e a
+biblioteca standard como alternativa. É usada pelo jsonify/tojson do Flask
+(FastJSONProvider), pelos gráficos Plotly e pela API de registos
+"""
+import dataclasses
+import datetime
+import decimal
+import json
+import math
+import uuid
+
+import numpy as np
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def _default(obj):
+    """Conversão de tipos não suportados nativamente pelo backend"""
+    # Figuras Plotly e outros objetos com representação JSON própria
+    if hasattr(obj, 'to_plotly_json'):
+        return obj.to_plotly_json()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):  # markupsafe.Markup
+        return str(obj.__html__())
+    if hasattr(obj, 'isoformat'):  # pandas.Timestamp
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):  # pandas.Series / Index
+        return obj.tolist()
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+def _orjson_default(obj):
+    """Como _default, mas NaN/inf convertidos passam a null (como nos floats nativos do orjson)"""
+    value = _default(obj)
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _finite(obj):
+    """Cópia de obj com NaN/inf convertidos em None (o JSON não os representa)"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def _json_default(obj):
+    """Como _default, com NaN/inf do valor convertido passados a None"""
+    return _finite(_default(obj))
+
+
+def dumps_bytes(obj, sort_keys=False, indent=None):
+    """Serializa para bytes UTF-8
+
+    NaN e infinitos são escritos como null com ambos os backends
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=option)
+        except TypeError:
+            # Ex.: inteiros acima de 64 bits; a biblioteca standard trata estes casos
+            pass
+
+    return json.dumps(_finite(obj), default=_json_default, ensure_ascii=False, allow_nan=False,
+                      sort_keys=sort_keys, indent=indent).encode('utf-8')
+
+
+def dumps(obj, sort_keys=False, indent=None):
+    """Serializa para str"""
+    return dumps_bytes(obj, sort_keys=sort_keys, indent=indent).decode('utf-8')
+
+
+def loads(data):
+    """Desserializa str ou bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider do Flask baseado na camada de serialização"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj,
+                     sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                     indent=kwargs.get('indent'))
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        body = dumps_bytes(obj, sort_keys=self.sort_keys, indent=indent)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
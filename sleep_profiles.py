@@ -0,0 +1,152 @@
+"""
+Perfis de sono por clustering (k-means) dos componentes PSQI
+- Matriz participante × componente construída num único agrupamento das
+  instâncias do PSQI (média por participante)
+- k escolhido pelo coeficiente de silhueta (clustering.choose_k)
+- Cada cluster recebe um nome a partir do seu centro (componentes 0-3)
+- Calculado uma vez por snapshot
+"""
+import numpy as np
+
+import snapshot_cache
+from clustering import choose_k
+from columns import factorize, group_nanmean
+from psqi import COMPONENT_KEYS, COMPONENTS, POOR_SLEEPER_THRESHOLD, get_psqi
+
+# Mínimo de componentes com resposta para incluir um participante
+MIN_COMPONENTS = 4
+K_VALUES = range(2, 7)
+
+PROFILE_COLORS = {
+    'Bom Dormidor': '#28a745',
+    'Sono Moderado': '#ffc107',
+    'Dependente de Medicação': '#fd7e14',
+    'Insone': '#dc3545'
+}
+
+_QUALITY = COMPONENT_KEYS.index('sleep_quality')
+_MEDICATION = COMPONENT_KEYS.index('sleep_medication')
+_DYSFUNCTION = COMPONENT_KEYS.index('daytime_dysfunction')
+_INSOMNIA = [COMPONENT_KEYS.index(key) for key in ('sleep_latency', 'sleep_efficiency', 'sleep_disturbances')]
+
+
+def participant_features(records):
+    """(participantes, matriz participante × componente PSQI) com a média das instâncias"""
+    scores = get_psqi(records)
+    keep = np.array([bool(p) for p in scores.participants], dtype=bool)
+    participants, inverse = factorize(scores.participants[keep].tolist())
+    if not participants:
+        return [], np.empty((0, len(COMPONENT_KEYS)))
+    return participants, group_nanmean(inverse, len(participants), scores.components[keep])
+
+
+def profile_name(center):
+    """Nome do perfil a partir do centro do cluster (componentes PSQI 0-3, maior = pior)"""
+    if center.sum() <= POOR_SLEEPER_THRESHOLD:
+        return 'Bom Dormidor'
+    if center[_MEDICATION] >= 2 and center[_MEDICATION] >= center[_INSOMNIA].max():
+        return 'Dependente de Medicação'
+    if center[_INSOMNIA].max() >= 2:
+        return 'Insone'
+    return 'Sono Moderado'
+
+
+class SleepProfiles:
+    """Clusters de participantes a partir dos componentes PSQI"""
+
+    def __init__(self, records):
+        participants, features = participant_features(records)
+        answered = (~np.isnan(features)).sum(axis=1) >= MIN_COMPONENTS
+        self.participants = [p for p, ok in zip(participants, answered) if ok]
+        features = features[answered]
+
+        # Componentes em falta: média do componente nos restantes participantes
+        if features.size:
+            counts = (~np.isnan(features)).sum(axis=0)
+            column_means = np.where(counts > 0, np.nansum(features, axis=0) / np.maximum(counts, 1), 0.0)
+            features = np.where(np.isnan(features), column_means, features)
+        self.features = features
+
+        self.result, self.silhouette_by_k = choose_k(features, K_VALUES) if len(features) else (None, {})
+        if self.result is None:
+            # Poucos participantes (ou todos iguais): um único perfil
+            self.labels = np.zeros(len(features), dtype=int)
+            self.centers = features.mean(axis=0, keepdims=True) if len(features) else np.empty((0, features.shape[1]))
+        else:
+            self.labels = self.result.labels
+            self.centers = self.result.centers
+
+        self.profiles = [profile_name(center) for center in self.centers]
+        self.names = self._name_clusters()
+
+    def _name_clusters(self):
+        """Nome de cada cluster; perfis repetidos são distinguidos pelo componente mais elevado"""
+        names = []
+        for c, (profile, center) in enumerate(zip(self.profiles, self.centers)):
+            if self.profiles.count(profile) == 1:
+                names.append(profile)
+                continue
+            # Componente em que o cluster mais se afasta (para pior) do centro médio
+            top = COMPONENT_KEYS[int(np.argmax(center - self.centers.mean(axis=0)))]
+            name = f"{profile} · {COMPONENTS[top]['name']}"
+            if name in names:
+                name = f"{name} ({c + 1})"
+            names.append(name)
+        return names
+
+    def analysis(self):
+        """Resultado no formato usado pela página de sono"""
+        total = len(self.participants)
+        participant_profiles = {}
+        for participant, label, row in zip(self.participants, self.labels, self.features):
+            name = self.names[label]
+            participant_profiles[str(participant)] = {
+                'profile': name,
+                'color': PROFILE_COLORS[self.profiles[label]],
+                'features': {key: round(float(value), 2) for key, value in zip(COMPONENT_KEYS, row)},
+                'sleep_quality_score': round(float(row[_QUALITY]), 2),
+                'daytime_sleepiness_score': round(float(row[_DYSFUNCTION]), 2),
+                'medication_score': round(float(row[_MEDICATION]), 2)
+            }
+
+        counts = np.bincount(self.labels, minlength=len(self.names)) if total else np.zeros(0, dtype=int)
+        order = np.argsort(-counts, kind='stable')
+        profile_distribution = {}
+        profile_statistics = {}
+        for c in order:
+            if not counts[c]:
+                continue
+            name = self.names[c]
+            members = self.features[self.labels == c]
+            means = members.mean(axis=0)
+            profile_distribution[name] = int(counts[c])
+            profile_statistics[name] = {
+                'count': int(counts[c]),
+                'percentage': round(counts[c] / total * 100, 1),
+                'avg_sleep_quality': round(float(means[_QUALITY]), 2),
+                'avg_daytime_sleepiness': round(float(means[_DYSFUNCTION]), 2),
+                'avg_medication_use': round(float(means[_MEDICATION]), 2),
+                'avg_global_psqi': round(float(means.sum()), 2),
+                'profile': self.profiles[c],
+                'color': PROFILE_COLORS[self.profiles[c]],
+                'center': {key: round(float(value), 2) for key, value in zip(COMPONENT_KEYS, self.centers[c])}
+            }
+
+        return {
+            'participant_profiles': participant_profiles,
+            'profile_distribution': profile_distribution,
+            'profile_statistics': profile_statistics,
+            'total_participants': total,
+            'clustering': {
+                'method': 'k-means (k-means++, silhueta)',
+                'features': {key: COMPONENTS[key]['name'] for key in COMPONENT_KEYS},
+                'k': len(self.names),
+                'silhouette': round(self.result.silhouette, 4) if self.result is not None else None,
+                'silhouette_by_k': self.silhouette_by_k
+            }
+        }
+
+
+def get_sleep_profiles(records):
+    """SleepProfiles do snapshot (calculado uma vez por lista de registos)"""
+    return snapshot_cache.get_cached(records, ('sleep_profiles',), lambda: SleepProfiles(records))
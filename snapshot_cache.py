@@ -0,0 +1,82 @@
+"""
+Cache de estruturas derivadas por snapshot de dados
+Matrizes, índices e perfis são calculados uma vez por snapshot e reutilizados
+entre pedidos enquanto a lista de registos for a mesma
+"""
+import threading
+from collections import OrderedDict
+
+# Número máximo de snapshots mantidos em memória (o snapshot principal,
+# a vista 'label' e eventuais listas filtradas)
+MAX_SNAPSHOTS = 8
+
+_lock = threading.RLock()
+_snapshots = OrderedDict()
+_next_version = [1]
+
+
+def _get_entry(data):
+    """Retorna (ou cria) a entrada de cache associada a uma lista de registos"""
+    key = id(data)
+    with _lock:
+        entry = _snapshots.get(key)
+        # id() pode ser reutilizado depois de a lista ser libertada
+        if entry is not None and entry['data'] is data:
+            _snapshots.move_to_end(key)
+            return entry
+
+        entry = {
+            'data': data,
+            'version': _next_version[0],
+            'entries': {}
+        }
+        _next_version[0] += 1
+        _snapshots[key] = entry
+
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+
+        return entry
+
+
+def snapshot_version(data):
+    """Retorna o número de versão do snapshot (muda sempre que os dados mudam)"""
+    return _get_entry(data)['version']
+
+
+def get_cached(data, key, builder):
+    """Retorna a estrutura `key` do snapshot, construindo-a na primeira utilização"""
+    entry = _get_entry(data)
+    entries = entry['entries']
+
+    if key in entries:
+        return entries[key]
+
+    # Construção fora do lock: cálculos pesados não bloqueiam outros snapshots
+    value = builder()
+    with _lock:
+        return entries.setdefault(key, value)
+
+
+def put(data, key, value):
+    """Associa um valor já calculado ao snapshot"""
+    entry = _get_entry(data)
+    with _lock:
+        entry['entries'][key] = value
+
+
+def peek(data, key, default=None):
+    """Retorna a estrutura `key` do snapshot sem a construir (default se não existir)"""
+    return _get_entry(data)['entries'].get(key, default)
+
+
+def invalidate(data=None):
+    """Remove as estruturas em cache de um snapshot (ou de todos)"""
+    with _lock:
+        if data is None:
+            _snapshots.clear()
+            return
+
+        entry = _snapshots.get(id(data))
+        if entry is not None and entry['data'] is data:
+            del _snapshots[id(data)]
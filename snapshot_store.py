@@ -0,0 +1,333 @@
+"""
+Snapshot colunar partilhado entre processos (ficheiro mapeado em memória)
+- publish(): grava os registos (raw e label) em colunas codificadas por
+  dicionário (códigos int32 + tabela de valores) num único ficheiro e
+  atualiza o ponteiro de versão (CURRENT) de forma atómica (os.replace)
+- attach(): mapeia o ficheiro da versão atual só para leitura; as colunas de
+  códigos são arrays NumPy sobre o mmap (sem cópia) e as páginas são
+  partilhadas por todos os processos através da page cache
+- Cada processo só volta a ler o snapshot quando a versão do ponteiro muda
+
+Formato do ficheiro:
+    MAGIC (8 bytes) | tamanho do cabeçalho (uint64 LE) | cabeçalho JSON |
+    buffers alinhados a 64 bytes (códigos int32 e tabelas de valores JSON)
+"""
+import json
+import mmap
+import os
+import struct
+import time
+import uuid
+
+import numpy as np
+
+import serialization
+import snapshot_cache
+from config import Config
+from csv_loader import LazyExtraction
+
+MAGIC = b'RM4HSNP1'
+POINTER_FILE = 'CURRENT'
+ALIGNMENT = 64
+
+# Código dos campos que não existem num registo
+ABSENT = -1
+_ABSENT_VALUE = object()
+
+# Vistas gravadas (chave em full_data -> nome da vista)
+VIEWS = {'data_raw': 'raw', 'data_labeled': 'labeled'}
+
+# Ficheiros de versões antigas mantidos (processos podem ainda tê-los mapeados)
+KEEP_VERSIONS = 2
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _value_key(value):
+    """Chave de dicionário para um valor (valores não hashable via JSON)"""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return (type(value).__name__, value)
+    return ('json', serialization.dumps(value, sort_keys=True))
+
+
+def _encode_view(records):
+    """Codifica uma lista de registos em colunas: (campos, [(códigos, valores)])"""
+    field_index = {}
+    for record in records:
+        for field in record:
+            if field not in field_index:
+                field_index[field] = len(field_index)
+
+    columns = []
+    for field in field_index:
+        lookup = {}
+        values = []
+        codes = np.empty(len(records), dtype='<i4')
+        for i, record in enumerate(records):
+            if field not in record:
+                codes[i] = ABSENT
+                continue
+            value = record[field]
+            key = _value_key(value)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(values)
+                values.append(value)
+            codes[i] = code
+        columns.append((codes, values))
+
+    return list(field_index), columns
+
+
+def get_snapshot_dir():
+    return Config.SNAPSHOT_DIR
+
+
+def _pointer_path(directory):
+    return os.path.join(directory, POINTER_FILE)
+
+
+def read_pointer(directory=None):
+    """Conteúdo do ponteiro de versão (None se ainda não houver snapshot publicado)"""
+    directory = directory or get_snapshot_dir()
+    try:
+        with open(_pointer_path(directory), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def publish(full_data, source=None, directory=None):
+    """Grava um novo snapshot e torna-o a versão atual; retorna o ponteiro"""
+    directory = directory or get_snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    start = time.time()
+    blobs = []
+    offset = 0
+
+    def add_blob(data):
+        nonlocal offset
+        offset = _align(offset)
+        blobs.append((offset, data))
+        location = [offset, len(data)]
+        offset += len(data)
+        return location
+
+    views = {}
+    for key, view in VIEWS.items():
+        records = full_data.get(key) or []
+        fields, columns = _encode_view(records)
+        views[view] = {
+            'n_records': len(records),
+            'fields': fields,
+            'columns': [
+                {'codes': add_blob(codes.tobytes()), 'values': add_blob(serialization.dumps_bytes(values))}
+                for codes, values in columns
+            ]
+        }
+
+    previous = read_pointer(directory)
+    version = (previous['version'] + 1) if previous else 1
+    header = {
+        'version': version,
+        'created_at': time.time(),
+        'source': source,
+        'metadata': add_blob(serialization.dumps_bytes(full_data.get('metadata') or [])),
+        'views': views
+    }
+    header_bytes = serialization.dumps_bytes(header)
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    filename = f'snapshot_{version:06d}_{uuid.uuid4().hex[:8]}.bin'
+    path = os.path.join(directory, filename)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for blob_offset, data in blobs:
+            f.seek(data_start + blob_offset)
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Ponteiro de versão: escrito num ficheiro temporário e trocado atomicamente
+    pointer = {'version': version, 'file': filename, 'source': source}
+    pointer_tmp = _pointer_path(directory) + f'.{os.getpid()}.tmp'
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        json.dump(pointer, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, _pointer_path(directory))
+
+    _remove_old_versions(directory, filename)
+    print(f"[OK] Snapshot v{version} publicado em {time.time() - start:.1f}s: {filename}")
+    return pointer
+
+
+def _remove_old_versions(directory, current):
+    files = sorted(name for name in os.listdir(directory)
+                   if name.startswith('snapshot_') and name.endswith('.bin') and name != current)
+    for name in files[:max(0, len(files) - (KEEP_VERSIONS - 1))]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            # Windows não permite apagar ficheiros ainda mapeados por outro processo
+            pass
+
+
+class ColumnarSnapshot:
+    """Snapshot publicado, mapeado só para leitura"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Ficheiro de snapshot inválido: {path}")
+        (header_length,) = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        self.header = serialization.loads(self._mmap[header_start:header_start + header_length])
+        self._data_start = _align(header_start + header_length)
+
+        self.version = self.header['version']
+        self.source = self.header.get('source')
+        self._views = self.header['views']
+        self._field_positions = {
+            view: {field: i for i, field in enumerate(info['fields'])}
+            for view, info in self._views.items()
+        }
+        self._values = {}
+
+    def _buffer(self, location, dtype=None):
+        offset, length = location
+        start = self._data_start + offset
+        if dtype is None:
+            return self._mmap[start:start + length]
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.frombuffer(self._mmap, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=start)
+
+    def n_records(self, view):
+        return self._views[view]['n_records']
+
+    def fields(self, view):
+        """Campos da vista pela ordem de primeira aparição"""
+        return self._views[view]['fields']
+
+    def has_field(self, view, field):
+        return field in self._field_positions[view]
+
+    def codes(self, view, field):
+        """Códigos int32 da coluna (array só de leitura sobre o mmap, ABSENT = campo inexistente)"""
+        column = self._views[view]['columns'][self._field_positions[view][field]]
+        return self._buffer(column['codes'], '<i4')
+
+    def values(self, view, field):
+        """Tabela de valores da coluna (descodificada uma vez por processo)"""
+        key = (view, field)
+        if key not in self._values:
+            column = self._views[view]['columns'][self._field_positions[view][field]]
+            self._values[key] = serialization.loads(self._buffer(column['values']))
+        return self._values[key]
+
+    def metadata(self):
+        return serialization.loads(self._buffer(self.header['metadata']))
+
+    def records(self, view):
+        """Lista de registos (dicionários) da vista, para o código que trabalha com registos"""
+        fields = self.fields(view)
+        n = self.n_records(view)
+        if n == 0:
+            return []
+
+        columns = []
+        complete = True
+        for field in fields:
+            codes = self.codes(view, field)
+            values = self.values(view, field)
+            if (codes == ABSENT).any():
+                complete = False
+                columns.append([values[c] if c != ABSENT else _ABSENT_VALUE for c in codes.tolist()])
+            else:
+                columns.append([values[c] for c in codes.tolist()])
+
+        if complete:
+            records = [dict(zip(fields, row)) for row in zip(*columns)]
+        else:
+            records = [
+                {field: value for field, value in zip(fields, row) if value is not _ABSENT_VALUE}
+                for row in zip(*columns)
+            ]
+
+        # Associa a lista ao snapshot colunar (usado, por exemplo, pela matriz de completude)
+        snapshot_cache.put(records, 'columnar_source', (self, view))
+        return records
+
+    def full_data(self):
+        """Estrutura equivalente ao JSON de extração (data_raw, data_labeled, metadata)
+
+        Só 'data_raw' é materializado de imediato; as outras vistas no primeiro acesso
+        """
+        loaders = {key: (lambda view=view: self.records(view)) for key, view in VIEWS.items() if view != 'raw'}
+        loaders['metadata'] = self.metadata
+        return LazyExtraction({'data_raw': self.records('raw')}, loaders)
+
+    def close(self):
+        self._mmap.close()
+
+
+
+def attach(directory=None, pointer=None):
+    """Mapeia a versão atual (None se não houver snapshot publicado)"""
+    directory = directory or get_snapshot_dir()
+    pointer = pointer or read_pointer(directory)
+    if pointer is None:
+        return None
+    return ColumnarSnapshot(os.path.join(directory, pointer['file']))
+
+
+def get_columnar_source(records):
+    """(snapshot, vista) de onde a lista de registos foi materializada, ou None"""
+    return snapshot_cache.peek(records, 'columnar_source')
+
+
+def file_signature(path):
+    """Identifica a versão de um ficheiro de origem (inode, mtime e tamanho)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {'path': path, 'inode': stat.st_ino, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+class PointerWatcher:
+    """Deteta mudanças do ponteiro de versão com um stat (no máximo a cada `interval` segundos)"""
+
+    def __init__(self, directory=None, interval=None):
+        self.directory = directory or get_snapshot_dir()
+        self.interval = Config.SNAPSHOT_CHECK_INTERVAL if interval is None else interval
+        self._next_check = 0
+        self._stat = None
+
+    def changed(self):
+        """Retorna o novo ponteiro se a versão mudou desde a última verificação, senão None"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return None
+        self._next_check = now + self.interval
+
+        try:
+            stat = os.stat(_pointer_path(self.directory))
+        except OSError:
+            return None
+        current = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if current == self._stat:
+            return None
+        self._stat = current
+        return read_pointer(self.directory)
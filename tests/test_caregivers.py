@@ -0,0 +1,85 @@
+"""Presença de cuidador e trajetória do estado de saúde (caregivers)"""
+import numpy as np
+import pytest
+
+from caregivers import CaregiverEngine
+from columns import HEALTH_SCALE, VISITS_SCALE
+
+GROUP_LABELS = {'a': 'Residente (Grupo A)', 'b': 'Não-Residente (Grupo B)', 'c': 'Cuidador informal (Grupo C)'}
+MARITAL_LABELS = {'0': 'Solteiro(a)', '1': 'Casado(a)/União de facto', '2': 'Viúvo(a)'}
+HEALTH_LABELS = {str(code): label for label, code in HEALTH_SCALE.items()}
+VISITS_LABELS = {str(code): label for label, code in VISITS_SCALE.items()}
+
+
+def make_records(labels=False):
+    """Registos com códigos (raw) ou com os rótulos das opções (label)"""
+    def label(mapping, value):
+        return mapping[value] if labels and value else value
+
+    def baseline(code, group, study_code, visits='0', marital='0', health='', related=''):
+        return {
+            'participant_code': code, 'participant_code_estudo': study_code, 'redcap_repeat_instrument': '',
+            'participant_group': label(GROUP_LABELS, group), 'related_participant_id': related,
+            'receiving_visits': label(VISITS_LABELS, visits), 'marital_status': label(MARITAL_LABELS, marital),
+            'health_status': label(HEALTH_LABELS, health)
+        }
+
+    def health(code, date, value):
+        return {'participant_code': code, 'redcap_repeat_instrument': 'estado_de_saude',
+                'questionnaire_date_8': date, 'health_status': label(HEALTH_LABELS, value)}
+
+    return [
+        baseline('P1', 'a', 'S1', health='3'),                      # díade com C1
+        baseline('C1', 'c', 'S10', related='S1'),
+        baseline('P2', 'b', 'S2', visits='2', health='3'),          # recebe visitas
+        baseline('P3', 'a', 'S3', marital='1', health='3'),         # casado(a)
+        baseline('P4', 'b', 'S4', marital='2', health='0'),         # saúde média 'Mal'
+        health('P4', '2025-01-01', '2'),
+        health('P4', '2025-01-31', '2'),
+        health('P4', '2025-04-01', '0'),
+        baseline('P5', 'a', 'S5', health='3'),                      # sem cuidador
+        health('P5', '2025-01-01', '2'),
+        health('P5', '2025-01-31', '3'),
+    ]
+
+
+@pytest.fixture(params=[False, True], ids=['raw', 'label'])
+def table(request):
+    return CaregiverEngine(make_records(labels=request.param)).table
+
+
+def test_has_caregiver(table):
+    assert table['has_caregiver'].to_dict() == {
+        'P1': True, 'C1': False, 'P2': True, 'P3': True, 'P4': True, 'P5': False
+    }
+
+
+def test_caregiver_source(table):
+    assert table['caregiver_source'].to_dict() == {
+        'P1': 'dyad', 'C1': None, 'P2': 'proxy', 'P3': 'proxy', 'P4': 'proxy', 'P5': None
+    }
+
+
+def test_proxy_indicators(table):
+    assert table.loc['P2', 'receives_visits'] and not table.loc['P2', 'is_married']
+    assert table.loc['P3', 'is_married'] and not table.loc['P3', 'receives_visits']
+    # (0 + 2 + 2 + 0) / 4 = 1 ('Mal')
+    assert table.loc['P4', 'health'] == 1
+    assert table.loc['P4', 'poor_health']
+    assert table.loc['C1', 'is_caregiver']
+
+
+def test_health_trend(table):
+    # P4: dias 0, 30, 90 -> x = 0, 1, 3 (períodos de 30 dias); y = 2, 2, 0
+    # declive = Sxy / Sxx = (-30/9) / (42/9) = -5/7 pontos por 30 dias
+    assert table.loc['P4', 'health_trend'] == pytest.approx(-5 / 7)
+    # P5 tem só 2 respostas datadas (mínimo 3); o registo baseline não tem data
+    assert np.isnan(table.loc['P5', 'health_trend'])
+    assert np.isnan(table.loc['P1', 'health_trend'])
+
+
+def test_raw_and_label_records_agree():
+    raw = CaregiverEngine(make_records()).table
+    labeled = CaregiverEngine(make_records(labels=True)).table
+    columns = ['has_caregiver', 'caregiver_source', 'health', 'health_trend', 'group']
+    assert raw[columns].equals(labeled[columns])
@@ -0,0 +1,92 @@
+"""K-means (k-means++), silhueta e escolha de k (clustering)"""
+import numpy as np
+import pytest
+
+from clustering import choose_k, kmeans, kmeans_plus_plus, silhouette_score
+
+CENTERS = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])
+
+
+def blobs(size=20, seed=0):
+    """Três grupos bem separados (desvio 0,5 à volta de CENTERS) e o grupo de cada ponto"""
+    rng = np.random.default_rng(seed)
+    X = np.concatenate([center + rng.normal(scale=0.5, size=(size, 2)) for center in CENTERS])
+    return X, np.repeat(np.arange(len(CENTERS)), size)
+
+
+def same_partition(labels, expected):
+    """Os rótulos definem a mesma partição (a numeração dos clusters é arbitrária)"""
+    pairs = set(zip(labels.tolist(), expected.tolist()))
+    return len(pairs) == len(set(labels.tolist())) == len(set(expected.tolist()))
+
+
+def test_kmeans_plus_plus_picks_distinct_points():
+    X, _ = blobs()
+    centers = kmeans_plus_plus(X, 3, np.random.default_rng(1))
+    assert len(np.unique(centers, axis=0)) == 3
+    assert all(any(np.array_equal(center, x) for x in X) for center in centers)
+
+
+def test_kmeans_recovers_separated_blobs():
+    X, expected = blobs()
+    result = kmeans(X, 3)
+    assert result.k == 3
+    assert same_partition(result.labels, expected)
+    for center in CENTERS:
+        assert np.min(np.linalg.norm(result.centers - center, axis=1)) < 0.5
+
+
+def test_choose_k_picks_number_of_blobs():
+    X, expected = blobs()
+    best, scores = choose_k(X)
+    assert best.k == 3
+    assert max(scores, key=scores.get) == 3
+    assert same_partition(best.labels, expected)
+    assert best.silhouette == pytest.approx(scores[3], abs=1e-4)
+
+
+def test_choose_k_limits_k_to_distinct_points():
+    X = np.array([[0.0], [0.0], [5.0], [5.0], [9.0]])
+    _, scores = choose_k(X, range(2, 7))
+    assert sorted(scores) == [2, 3]
+
+
+def test_fixed_seed_is_deterministic():
+    X, _ = blobs(seed=3)
+    first, first_scores = choose_k(X, seed=7)
+    second, second_scores = choose_k(X, seed=7)
+    assert first_scores == second_scores
+    assert np.array_equal(first.labels, second.labels)
+    assert np.array_equal(first.centers, second.centers)
+    assert first.inertia == second.inertia
+
+
+def test_silhouette_hand_computed():
+    # 0 e 11: a = 1, b = 10,5; 1 e 10: a = 1, b = 9,5
+    X = [[0.0], [1.0], [10.0], [11.0]]
+    expected = (9.5 / 10.5 + 8.5 / 9.5) / 2
+    assert silhouette_score(X, [0, 0, 1, 1]) == pytest.approx(expected)
+
+
+def test_silhouette_singleton_cluster_counts_as_zero():
+    # 0: a = 1, b = 5 -> 0,8; 1: a = 1, b = 4 -> 0,75; 5 sozinho -> 0
+    assert silhouette_score([[0.0], [1.0], [5.0]], [0, 0, 1]) == pytest.approx((0.8 + 0.75) / 3)
+
+
+def test_silhouette_single_cluster_is_zero():
+    assert silhouette_score([[0.0], [1.0], [2.0]], [0, 0, 0]) == 0.0
+
+
+def test_silhouette_sample_covering_all_points_is_exact():
+    X, labels = blobs(size=10)
+    assert silhouette_score(X, labels, sample_size=len(X)) == silhouette_score(X, labels, sample_size=10 ** 6)
+
+
+@pytest.mark.parametrize('X', [
+    np.empty((0, 2)),
+    np.array([[0.0, 1.0], [2.0, 3.0]]),
+    np.ones((5, 2)),
+])
+def test_choose_k_degenerate_inputs(X):
+    # Menos de 3 pontos ou todos iguais: não há k válido
+    assert choose_k(X) == (None, {})
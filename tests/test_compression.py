@@ -0,0 +1,79 @@
+"""Cache de respostas comprimidas por snapshot (compression.cached_response)"""
+import flask
+import pytest
+
+import compression
+import snapshot_cache
+
+
+@pytest.fixture
+def data():
+    return [{'record_id': '1'}]
+
+
+def make_app(data, responses):
+    """App com uma rota que devolve as respostas indicadas, por ordem"""
+    app = flask.Flask(__name__)
+    calls = []
+
+    @app.route('/section')
+    @compression.cached_response(lambda: data)
+    def section():
+        body, status = responses[min(len(calls), len(responses) - 1)]
+        calls.append(status)
+        return flask.jsonify(body), status
+
+    return app.test_client(), calls
+
+
+def test_accepted_response_is_not_cached_and_later_success_is(data):
+    client, calls = make_app(data, [({'status': 'queued'}, 202), ({'html': 'x' * 2000}, 200)])
+    headers = {'Accept-Encoding': 'gzip'}
+
+    assert client.get('/section', headers=headers).status_code == 202
+    assert snapshot_cache.peek(data, ('response', '/section', 'gzip')) is None
+
+    assert client.get('/section', headers=headers).status_code == 200
+    assert snapshot_cache.peek(data, ('response', '/section', 'gzip')) is not None
+
+    response = client.get('/section', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert calls == [202, 200]
+
+
+def test_error_response_is_not_cached(data):
+    client, calls = make_app(data, [({'error': 'timeout'}, 500), ({'ok': True}, 200)])
+    assert client.get('/section').status_code == 500
+    assert client.get('/section').status_code == 200
+    assert client.get('/section').status_code == 200
+    assert calls == [500, 200]
+
+
+def test_query_string_bypasses_cache(data):
+    client, calls = make_app(data, [({'ok': True}, 200)])
+    client.get('/section?page=2')
+    client.get('/section?page=2')
+    assert calls == [200, 200]
+
+
+def test_failed_analysis_page_is_not_served_from_cache(monkeypatch):
+    app_module = pytest.importorskip('app')
+    from data_processor import DataProcessor
+
+    data = [{'record_id': '1', 'participant_code': 'P1'}]
+    monkeypatch.setattr(app_module, 'get_cached_data', lambda: data)
+    monkeypatch.setattr(app_module.redcap, 'get_records', lambda *args, **kwargs: data)
+    original = DataProcessor.analyze_temporal_trends
+
+    def timeout(self):
+        raise TimeoutError('REDCap timeout')
+
+    monkeypatch.setattr(DataProcessor, 'analyze_temporal_trends', timeout)
+    client = app_module.app.test_client()
+    assert client.get('/longitudinal').status_code == 500
+
+    monkeypatch.setattr(DataProcessor, 'analyze_temporal_trends', original)
+    response = client.get('/longitudinal')
+    assert response.status_code == 200
+    assert b'REDCap timeout' not in response.get_data()
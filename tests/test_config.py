@@ -0,0 +1,24 @@
+"""Custos configurados por variáveis de ambiente (config.costs_from_env)"""
+import pytest
+
+from config import costs_from_env
+
+
+def test_unset_variable_is_empty(monkeypatch):
+    monkeypatch.delenv('SERVICE_COSTS', raising=False)
+    assert costs_from_env('SERVICE_COSTS') == {}
+
+
+def test_values_are_floats(monkeypatch):
+    monkeypatch.setenv('SERVICE_COSTS', '{"emergency_visits": 250, "hospitalizations": "1800.5"}')
+    costs = costs_from_env('SERVICE_COSTS')
+    assert costs == {'emergency_visits': 250.0, 'hospitalizations': 1800.5}
+    assert all(type(value) is float for value in costs.values())
+
+
+@pytest.mark.parametrize('text', ['{"setup": 200', '[200, 50]', '{"setup": "duzentos"}', '{"setup": null}',
+                                  '{"setup": true}', '{"setup": [200]}'])
+def test_invalid_values_name_the_variable(monkeypatch, text):
+    monkeypatch.setenv('REMOTE_MONITORING_COSTS', text)
+    with pytest.raises(ValueError, match='^REMOTE_MONITORING_COSTS: '):
+        costs_from_env('REMOTE_MONITORING_COSTS')
@@ -0,0 +1,56 @@
+"""Caudas das distribuições (distributions) contra valores de referência do scipy.stats"""
+import numpy as np
+import pytest
+
+from distributions import chi2_sf, f_sf, normal_sf, normal_two_sided, t_two_sided
+
+# Valores de referência calculados com scipy.stats (norm.sf, 2 * t.sf(|t|), f.sf, chi2.sf)
+NORMAL_SF = [(0.0, 0.5), (1.0, 0.15865525393145707), (1.96, 0.024997895148220435),
+             (3.5, 0.00023262907903552502), (-2.0, 0.9772498680518208)]
+T_TWO_SIDED = [(2.0, 5, 0.10193947882985835), (0.5, 30, 0.6207230048851272),
+               (-3.2, 12.4, 0.007350221302796965), (10.0, 3, 0.0021283990584141503)]
+F_SF = [(3.5, 2, 27, 0.04450875394640024), (1.0, 3, 10, 0.4323372030216972),
+        (12.0, 1, 5, 0.01796288460994396), (0.2, 4, 100, 0.9378114205552519)]
+CHI2_SF = [(3.84, 1, 0.05004352124870519), (10.0, 4, 0.04042768199451279), (0.5, 2, 0.7788007830714049),
+           (30.0, 10, 0.000856641210775301), (100.0, 50, 3.454931382984871e-05)]
+
+
+@pytest.mark.parametrize('z, expected', NORMAL_SF)
+def test_normal_sf(z, expected):
+    assert normal_sf(z) == pytest.approx(expected, rel=1e-9)
+
+
+def test_normal_two_sided_is_symmetric():
+    assert normal_two_sided(-1.96) == pytest.approx(2 * 0.024997895148220435, rel=1e-9)
+    assert normal_two_sided(1.96) == normal_two_sided(-1.96)
+
+
+@pytest.mark.parametrize('t, df, expected', T_TWO_SIDED)
+def test_t_two_sided(t, df, expected):
+    assert t_two_sided(t, df) == pytest.approx(expected, rel=1e-8)
+
+
+@pytest.mark.parametrize('f, df1, df2, expected', F_SF)
+def test_f_sf(f, df1, df2, expected):
+    assert f_sf(f, df1, df2) == pytest.approx(expected, rel=1e-8)
+
+
+@pytest.mark.parametrize('x, df, expected', CHI2_SF)
+def test_chi2_sf(x, df, expected):
+    assert chi2_sf(x, df) == pytest.approx(expected, rel=1e-8)
+
+
+def test_arrays_are_evaluated_elementwise():
+    x = np.array([x for x, _, _ in CHI2_SF])
+    df = np.array([df for _, df, _ in CHI2_SF])
+    np.testing.assert_allclose(chi2_sf(x, df), [p for _, _, p in CHI2_SF], rtol=1e-8)
+    t = np.array([t for t, _, _ in T_TWO_SIDED])
+    dfs = np.array([df for _, df, _ in T_TWO_SIDED])
+    np.testing.assert_allclose(t_two_sided(t, dfs), [p for _, _, p in T_TWO_SIDED], rtol=1e-8)
+
+
+def test_edge_values():
+    assert chi2_sf(0.0, 3) == 1.0
+    assert f_sf(0.0, 2, 10) == 1.0
+    assert t_two_sided(0.0, 10) == pytest.approx(1.0)
+    assert np.isnan(chi2_sf(np.nan, 2))
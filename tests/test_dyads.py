@@ -0,0 +1,78 @@
+"""Índice de díades paciente ↔ cuidador (dyads)"""
+import pandas as pd
+import pytest
+
+from dyads import DyadIndex, group_letter
+
+
+def baseline(code, group, study_code='', related=''):
+    return {'participant_code': code, 'participant_code_estudo': study_code, 'participant_group': group,
+            'related_participant_id': related, 'redcap_repeat_instrument': ''}
+
+
+RECORDS = [
+    baseline('P1', 'a', 'S1'),
+    baseline('C1', 'c', 'S10', related='S1'),          # cuidador -> paciente (código de estudo)
+    baseline('P2', 'b', 'S2', related='S11'),          # paciente -> cuidador
+    baseline('C2', 'd', 'S11', related='S2'),          # a mesma díade declarada dos dois lados
+    baseline('P3', 'Residente (Grupo A)', 'S3'),
+    baseline('C3', 'Cuidador informal (Grupo C)', 'S12', related='P3'),  # código REDCap
+    baseline('P4', 'b', 'S4', related='S99'),          # código inexistente
+    baseline('P5', 'a', 'S5', related='S1'),           # paciente -> paciente
+    {'participant_code': 'C1', 'redcap_repeat_instrument': 'visita', 'related_participant_id': 'S2'},
+]
+
+
+@pytest.fixture
+def index():
+    return DyadIndex(RECORDS)
+
+
+@pytest.mark.parametrize('value, expected', [('a', 'A'), ('C', 'C'), ('Não-Residente (Grupo B)', 'B'),
+                                             ('', None), (None, None)])
+def test_group_letter(value, expected):
+    assert group_letter(value) == expected
+
+
+def test_pairs_are_patient_caregiver(index):
+    pairs = sorted(zip(index.pairs['patient'], index.pairs['caregiver']))
+    assert pairs == [('P1', 'C1'), ('P2', 'C2'), ('P3', 'C3')]
+    assert len(index) == 3
+
+
+def test_caregiver_declared_link_is_flipped(index):
+    assert index.caregivers_of('P1') == ['C1']
+    assert index.patients_of('C1') == ['P1']
+
+
+def test_related_id_resolves_study_and_redcap_codes(index):
+    assert index.caregivers_of('P2') == ['C2']
+    assert index.caregivers_of('P3') == ['C3']
+
+
+def test_repeat_instruments_are_ignored(index):
+    # O registo repetido de C1 aponta para S2 (P2), mas só o baseline conta
+    assert index.patients_of('C1') == ['P1']
+    assert 'C1' not in index.caregivers_of('P2')
+
+
+def test_unresolved_and_invalid_links(index):
+    summary = index.summary()
+    assert summary['unresolved_links'] == 1
+    assert summary['invalid_links'] == 1
+    assert summary['patients'] == 5
+    assert summary['caregivers'] == 3
+    assert summary['by_caregiver_type'] == {'Cuidador informal': 2, 'Cuidador formal': 1}
+
+
+def test_has_caregiver(index):
+    assert index.has_caregiver(['P1', 'P4', 'C1', 'P3']).tolist() == [True, False, False, True]
+
+
+def test_join_by_dyad(index):
+    patients = pd.DataFrame({'health': [3, 4, 5]}, index=['P1', 'P2', 'P3'])
+    caregivers = pd.DataFrame({'health': [2, 1]}, index=['C1', 'C3'])
+    joined = index.join(patients, caregivers).set_index('patient')
+    assert joined.loc['P1', 'health_caregiver'] == 2
+    assert pd.isna(joined.loc['P2', 'health_caregiver'])
+    assert joined.loc['P3', 'health_patient'] == 5
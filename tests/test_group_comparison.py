@@ -0,0 +1,101 @@
+"""Motor de comparação entre grupos: validação dos campos e cache"""
+import pytest
+
+import group_comparison
+from config import Config
+from group_comparison import GroupComparison, get_group_comparison, normalize_fields
+
+
+def make_records():
+    records = []
+    for i in range(12):
+        code = f'P{i}'
+        group = 'ABC'[i % 3]
+        records.append({'participant_code': code, 'redcap_repeat_instrument': '', 'participant_group': group,
+                        'sex': 'Feminino' if i % 2 else 'Masculino', 'vas_health_today': ''})
+        for visit in range(2):
+            records.append({'participant_code': code, 'redcap_repeat_instrument': 'estado_saude',
+                            'vas_health_today': str(40 + 10 * 'ABC'.index(group) + i + visit)})
+    return records
+
+
+def test_normalize_fields_dedupes_and_sorts():
+    assert normalize_fields(['b', 'a', 'b'], ['sex', 'sex']) == (('a', 'b'), ('sex',))
+
+
+def test_field_in_both_lists_is_rejected():
+    with pytest.raises(ValueError):
+        normalize_fields(['sex'], ['sex'])
+    with pytest.raises(ValueError):
+        GroupComparison(make_records(), ['sex'], ['sex'])
+
+
+def test_duplicate_fields_are_compared_once():
+    records = make_records()
+    analysis = GroupComparison(records, ['vas_health_today', 'vas_health_today'], ['sex', 'sex']).analysis()
+    assert list(analysis['numeric']) == ['vas_health_today']
+    assert list(analysis['categorical']) == ['sex']
+    assert analysis['groups'] == {'A': 4, 'B': 4, 'C': 4}
+    assert analysis['numeric']['vas_health_today']['anova']['df_between'] == 2
+
+
+def test_cache_key_is_normalised():
+    records = make_records()
+    first = get_group_comparison(records, ['vas_health_today', 'vas_health_today'], ['sex'])
+    assert get_group_comparison(records, ['vas_health_today'], ['sex', 'sex']) is first
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(group_comparison, 'MAX_CACHED_COMPARISONS', 2)
+    records = make_records()
+    first = get_group_comparison(records, ['vas_health_today'], [])
+    get_group_comparison(records, [], ['sex'])
+    get_group_comparison(records, ['vas_health_today'], ['sex'])
+    assert get_group_comparison(records, ['vas_health_today'], []) is not first
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app_module = pytest.importorskip('app')
+    records = make_records()
+    monkeypatch.setattr(app_module, 'get_cached_data', lambda: records)
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('query', [
+    'numeric=sex&categorical=sex',
+    'numeric=sex',  # 'sex' também está nos categóricos por omissão
+    'numeric=unknown_field',
+    'grouping=unknown_field',
+])
+def test_api_rejects_invalid_fields(client, query):
+    response = client.get(f'/api/group-comparison?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_api_accepts_duplicate_fields(client):
+    response = client.get('/api/group-comparison?numeric=vas_health_today,vas_health_today&categorical=sex')
+    assert response.status_code == 200
+    assert list(response.get_json()['comparison']['numeric']) == ['vas_health_today']
+
+
+def test_permutation_decides_significance_in_small_cohorts():
+    analysis = GroupComparison(make_records(), ['vas_health_today'], []).analysis()
+    result = analysis['numeric']['vas_health_today']
+    assert result['primary_test'] == 'permutation'
+    assert result['significant'] == result['permutation']['significant']
+    assert ('vas_health_today' in analysis['summary']['significant_fields']) == result['significant']
+
+
+def test_anova_decides_significance_without_resampling(monkeypatch):
+    monkeypatch.setattr(Config, 'RESAMPLING_MAX_PARTICIPANTS', 0)
+    result = GroupComparison(make_records(), ['vas_health_today'], []).analysis()['numeric']['vas_health_today']
+    assert result['permutation'] is None
+    assert result['primary_test'] == 'anova'
+    assert result['significant'] == result['anova']['significant']
+
+
+def test_kruskal_wallis_alone_is_not_significant():
+    result = {'anova': {'significant': False}, 'kruskal_wallis': {'significant': True}, 'permutation': None}
+    assert group_comparison._primary_test(result) == ('anova', False)
@@ -0,0 +1,127 @@
+"""Testes de hipóteses vetorizados (hypothesis_tests) contra valores de referência do scipy.stats
+
+Referências: ttest_ind(equal_var=False), mannwhitneyu(method='asymptotic',
+use_continuity=True), chi2_contingency(correction=False), f_oneway e kruskal
+"""
+import numpy as np
+import pytest
+
+from hypothesis_tests import chi_square_test, kruskal_wallis, mann_whitney_u, one_way_anova, welch_t_test
+
+A = [4.1, 5.2, 6.3, 5.5, 4.8, 7.1, 6.0]
+B = [3.2, 4.0, 3.9, 5.1, 4.4, 3.8]
+TIES_A = [1, 2, 2, 3, 3, 3, 4]
+TIES_B = [2, 3, 3, 4, 4, 5, 5, 5]
+
+GROUPS = [[5.1, 4.9, 6.2, 5.8], [6.5, 7.1, 6.8, 7.4, 6.9], [4.2, 4.8, 5.0, 4.4, 4.1, 4.6]]
+TIES_GROUPS = [[1, 2, 2, 3], [2, 3, 3, 3, 4], [1, 1, 2, 2, 2, 3]]
+
+
+def stacked(groups):
+    """(valores, código do grupo de cada valor)"""
+    values = np.concatenate([np.asarray(group, dtype=float) for group in groups])
+    labels = np.concatenate([np.full(len(group), code) for code, group in enumerate(groups)])
+    return values, labels
+
+
+def test_welch_t_test():
+    result = welch_t_test(A, B)
+    assert result['t'][0] == pytest.approx(3.28721112079993, abs=1e-4)
+    assert result['df'][0] == pytest.approx(10.286939148468807, abs=0.05)
+    assert result['p_value'][0] == pytest.approx(0.007891834147976135, abs=1e-6)
+    assert result['significant'] == [True]
+    assert result['hedges_g'][0] == pytest.approx(1.6426573991115685, abs=1e-3)
+
+
+def test_welch_columns_are_independent_and_ignore_nan():
+    # Os mesmos valores nas duas colunas, com os valores em falta em linhas diferentes
+    a = np.column_stack([A + [np.nan], [np.nan] + A[::-1]])
+    b = np.column_stack([B + [np.nan], [np.nan] + B])
+    result = welch_t_test(a, b)
+    assert result['n_a'] == [7, 7]
+    assert result['n_b'] == [6, 6]
+    assert result['p_value'][0] == result['p_value'][1] == pytest.approx(0.007891834147976135, abs=1e-6)
+
+
+def test_welch_needs_two_values_per_group():
+    result = welch_t_test([1.0], [2.0, 3.0, 4.0])
+    assert result['p_value'] == [None]
+    assert result['significant'] == [False]
+
+
+def test_mann_whitney_u():
+    result = mann_whitney_u(A, B)
+    assert result['u'][0] == 39.0
+    assert result['p_value'][0] == pytest.approx(0.012419330651552265, abs=1e-6)
+    assert result['rank_biserial'][0] == pytest.approx(2 * 39 / 42 - 1, abs=1e-3)
+
+
+def test_mann_whitney_u_with_ties():
+    result = mann_whitney_u(TIES_A, TIES_B)
+    assert result['u'][0] == 11.0
+    assert result['p_value'][0] == pytest.approx(0.049238967838553395, abs=1e-6)
+    assert result['rank_biserial'][0] < 0
+
+
+def test_chi_square_test():
+    result = chi_square_test([[10, 20, 30], [15, 15, 10]])
+    assert result['chi2'] == pytest.approx(8.035714285714285, abs=1e-4)
+    assert result['df'] == 2
+    assert result['p_value'] == pytest.approx(0.017991476826658487, abs=1e-6)
+    assert result['cramers_v'] == pytest.approx(np.sqrt(8.035714285714285 / 100), abs=1e-3)
+    assert result['low_expected_cells'] == 0.0
+
+
+def test_chi_square_ignores_empty_rows_and_columns():
+    assert chi_square_test([[10, 0, 20, 30], [0, 0, 0, 0], [15, 0, 15, 10]])['p_value'] == \
+        pytest.approx(0.017991476826658487, abs=1e-6)
+
+
+def test_chi_square_needs_two_by_two():
+    result = chi_square_test([[5, 7]])
+    assert result['p_value'] is None
+    assert result['significant'] is False
+
+
+def test_one_way_anova():
+    values, labels = stacked(GROUPS)
+    result = one_way_anova(values, labels)
+    assert result['f'][0] == pytest.approx(44.595895695108766, abs=1e-4)
+    assert result['df_between'] == [2]
+    assert result['df_within'] == [12]
+    assert result['p_value'][0] == pytest.approx(2.7810946571965747e-06, abs=1e-6)
+    assert result['eta_squared'][0] == pytest.approx(0.8814133060089289, abs=1e-3)
+
+
+def test_kruskal_wallis():
+    values, labels = stacked(GROUPS)
+    result = kruskal_wallis(values, labels)
+    assert result['h'][0] == pytest.approx(11.895833333333343, abs=1e-4)
+    assert result['df'] == [2]
+    assert result['p_value'][0] == pytest.approx(0.00261127501178684, abs=1e-6)
+    assert result['epsilon_squared'][0] == pytest.approx(11.895833333333343 / 14, abs=1e-3)
+
+
+def test_kruskal_wallis_with_ties():
+    values, labels = stacked(TIES_GROUPS)
+    result = kruskal_wallis(values, labels)
+    assert result['h'][0] == pytest.approx(5.227877578176989, abs=1e-4)
+    assert result['p_value'][0] == pytest.approx(0.07324547636592785, abs=1e-6)
+    assert result['significant'] == [False]
+
+
+def test_omnibus_tests_skip_groups_without_values():
+    values, labels = stacked(GROUPS + [[np.nan, np.nan]])
+    # Uma segunda coluna só com os dois primeiros grupos
+    second = np.where(labels < 2, values, np.nan)
+    anova = one_way_anova(np.column_stack([values, second]), labels)
+    kruskal = kruskal_wallis(np.column_stack([values, second]), labels)
+    assert anova['df_between'] == [2, 1]
+    assert anova['p_value'][0] == pytest.approx(2.7810946571965747e-06, abs=1e-6)
+    assert kruskal['df'] == [2, 1]
+
+
+def test_omnibus_tests_need_two_groups():
+    values, labels = stacked(GROUPS[:1])
+    assert one_way_anova(values, labels)['p_value'] == [None]
+    assert kruskal_wallis(values, labels)['p_value'] == [None]
@@ -0,0 +1,105 @@
+"""Fila de tarefas em processo (jobs.JobManager)"""
+import threading
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture
+def manager():
+    manager = jobs.JobManager(max_workers=1, max_pending=5, retention=60)
+    yield manager
+    manager.shutdown()
+
+
+def blocking_task(release):
+    def task(job):
+        release.wait(5)
+        job.check_cancelled()
+        return 'ok'
+    return task
+
+
+def test_job_runs_and_returns_result(manager):
+    job = manager.submit('soma', lambda job, a, b: a + b, 2, 3)
+    assert job.wait(5)
+    assert job.status == jobs.DONE
+    assert job.to_dict()['result'] == 5
+    assert manager.get(job.id) is job
+
+
+def test_failed_job_keeps_the_error(manager):
+    def fail(job):
+        raise RuntimeError('falhou')
+    job = manager.submit('erro', fail)
+    assert job.wait(5)
+    assert job.status == jobs.FAILED
+    assert job.error == 'falhou'
+
+
+def test_same_key_reuses_unfinished_job(manager):
+    release = threading.Event()
+    first = manager.submit('a', blocking_task(release), key=('section', 'x'))
+    second = manager.submit('a', blocking_task(release), key=('section', 'x'))
+    other = manager.submit('b', blocking_task(release), key=('section', 'y'))
+    assert second is first
+    assert other is not first
+
+    release.set()
+    assert first.wait(5) and other.wait(5)
+    # Depois de terminar, a mesma chave cria uma tarefa nova
+    third = manager.submit('a', lambda job: 'novo', key=('section', 'x'))
+    assert third is not first
+    assert third.wait(5) and third.result == 'novo'
+
+
+def test_cancel_queued_job_never_runs(manager):
+    release = threading.Event()
+    ran = []
+    running = manager.submit('bloqueia', blocking_task(release))
+    queued = manager.submit('em fila', lambda job: ran.append(True))
+
+    assert manager.cancel(queued.id) is queued
+    assert queued.status == jobs.CANCELLED
+    release.set()
+    assert running.wait(5)
+    assert ran == []
+
+
+def test_cancel_running_job_is_cooperative(manager):
+    started, release = threading.Event(), threading.Event()
+
+    def task(job):
+        started.set()
+        release.wait(5)
+        job.check_cancelled()
+        return 'não devia terminar'
+
+    job = manager.submit('longa', task)
+    assert started.wait(5)
+    manager.cancel(job.id)
+    assert job.message == 'Cancelamento pedido'
+    release.set()
+    assert job.wait(5)
+    assert job.status == jobs.CANCELLED
+    assert 'result' not in job.to_dict()
+
+
+def test_cancel_unknown_job_returns_none(manager):
+    assert manager.cancel('0' * 32) is None
+
+
+def test_queue_full(manager):
+    release = threading.Event()
+    for i in range(5):
+        manager.submit(f't{i}', blocking_task(release))
+    with pytest.raises(jobs.QueueFull):
+        manager.submit('extra', blocking_task(release))
+    release.set()
+
+
+def test_events_end_with_finished_state(manager):
+    job = manager.submit('rápida', lambda job: 1)
+    states = [info for info in manager.events(job, heartbeat=1) if info is not None]
+    assert states[-1]['status'] == jobs.DONE
@@ -0,0 +1,115 @@
+"""Regras de pontuação dos componentes do PSQI (Buysse et al., 1989)"""
+import numpy as np
+import pytest
+
+import psqi
+
+
+def band(func, values):
+    return func(np.array(values, dtype=float)).tolist()
+
+
+def test_latency_minutes_bands():
+    assert band(psqi.latency_minutes_score, [0, 15, 16, 30, 31, 60, 61]) == [0, 0, 1, 1, 2, 2, 3]
+
+
+def test_duration_bands():
+    assert band(psqi.duration_score, [8, 7.5, 7, 6, 5.9, 5, 4.9]) == [0, 0, 1, 1, 2, 2, 3]
+
+
+def test_efficiency_bands():
+    assert band(psqi.efficiency_score, [100, 85, 84.9, 75, 74.9, 65, 64.9]) == [0, 0, 1, 1, 2, 2, 3]
+
+
+def test_disturbance_bands():
+    assert band(psqi.disturbance_score, [0, 1, 9, 10, 18, 19, 27]) == [0, 1, 1, 2, 2, 3, 3]
+
+
+def test_missing_values_have_no_score():
+    assert np.isnan(psqi.duration_score(np.array([np.nan]))).all()
+    assert np.isnan(psqi.latency_minutes_score(np.array([np.nan]))).all()
+
+
+@pytest.mark.parametrize('a, b, expected', [(0, 0, 0), (1, 0, 1), (1, 1, 1), (2, 1, 2), (2, 2, 2),
+                                            (3, 2, 3), (3, 3, 3)])
+def test_pair_score(a, b, expected):
+    assert psqi._pair_score(np.array([a]), np.array([b]))[0] == expected
+
+
+@pytest.mark.parametrize('value, expected', [('22:30', 22.5), ('00:15', 0.25), ('24:00', 0.0), ('7h', None)])
+def test_clock_hours(value, expected):
+    result = psqi.clock_hours(value)
+    assert np.isnan(result) if expected is None else result == expected
+
+
+def psqi_record(**fields):
+    record = {
+        'participant_code': 'P1',
+        'redcap_repeat_instrument': psqi.INSTRUMENT,
+        'redcap_repeat_instance': '1',
+        'questionnaire_date_7': '2025-01-10',
+        'sleep_quality': '1',
+        'time_to_sleep': '20',
+        'trouble_falling_asleep': '2',
+        'sleep_hours': '6.5',
+        'bedtime': '23:00',
+        'wake_up_time': '07:00',
+        'sleep_medication_use': '0',
+        'trouble_staying_awake': '1',
+        'lack_of_enthusiasm': '1',
+        **{field: '1' for field in psqi.DISTURBANCE_FIELDS}
+    }
+    record.update(fields)
+    return record
+
+
+def test_components_and_global_score():
+    scores = psqi.PSQIScores([psqi_record()])
+    # C1=1, C2: 20 min (1) + 2 -> 2, C3: 6.5 h -> 1, C4: 6.5/8 h = 81% -> 1,
+    # C5: soma 8 -> 1, C6=0, C7: 1 + 1 -> 1
+    assert scores.components[0].tolist() == [1, 2, 1, 1, 1, 0, 1]
+    assert scores.global_scores[0] == 7
+    assert scores.efficiency[0] == pytest.approx(81.25)
+
+
+def test_labels_score_like_codes():
+    labeled = psqi_record(
+        sleep_quality='Boa', trouble_falling_asleep='1-2x/semana', sleep_medication_use='Nunca',
+        trouble_staying_awake='Menos de 1x/semana', lack_of_enthusiasm='Menos de 1x/semana',
+        **{field: 'Menos de 1x/semana' for field in psqi.DISTURBANCE_FIELDS}
+    )
+    assert psqi.PSQIScores([labeled]).components.tolist() == psqi.PSQIScores([psqi_record()]).components.tolist()
+
+
+def test_time_in_bed_crosses_midnight_and_efficiency_is_capped():
+    scores = psqi.PSQIScores([psqi_record(bedtime='22:00', wake_up_time='05:00', sleep_hours='8')])
+    assert scores.efficiency[0] == 100
+    assert scores.components[0, 3] == 0
+
+
+def test_optional_disturbance_counts_only_when_answered():
+    without = psqi.PSQIScores([psqi_record(**{field: '2' for field in psqi.DISTURBANCE_FIELDS})])
+    with_other = psqi.PSQIScores([psqi_record(other_reason_times='3',
+                                              **{field: '2' for field in psqi.DISTURBANCE_FIELDS})])
+    # 8 razões x 2 = 16 -> 2; com a razão opcional 19 -> 3
+    assert without.components[0, 4] == 2
+    assert with_other.components[0, 4] == 3
+
+
+def test_global_score_requires_all_components():
+    scores = psqi.PSQIScores([psqi_record(sleep_hours='')])
+    assert np.isnan(scores.components[0, 2])
+    assert not scores.valid[0]
+
+
+def test_latest_score_classifies_sleepers():
+    records = [
+        psqi_record(),  # global 7
+        psqi_record(redcap_repeat_instance='2', questionnaire_date_7='2025-03-01', sleep_quality='0',
+                    trouble_falling_asleep='0', time_to_sleep='10'),  # global 4
+        psqi_record(participant_code='P2'),
+    ]
+    result = psqi.PSQIScores(records).analysis()
+    assert sorted(result['global_psqi']['scores']) == [4, 7]
+    assert result['global_psqi']['classification']['good_sleepers'] == 1
+    assert result['global_psqi']['classification']['poor_sleepers'] == 1
@@ -0,0 +1,87 @@
+"""Paginação por cursor da API de registos (record_stream.RecordWindow)"""
+import json
+
+import pytest
+
+from record_stream import CursorError, RecordWindow, decode_cursor, encode_cursor, parse_page_size
+from snapshot_cache import snapshot_version
+
+
+def make_records(n=30):
+    return [{'record_id': str(i), 'participant_code': f'P{i % 4}', 'value': i} for i in range(n)]
+
+
+def collect_pages(data, page_size, predicates=None, fields=None):
+    """Percorre todas as páginas seguindo o next_cursor; retorna (registos, número de páginas)"""
+    records, pages, cursor = [], 0, None
+    while True:
+        window = RecordWindow(data, predicates=predicates, fields=fields, cursor=cursor, page_size=page_size)
+        records.extend(window.records())
+        pages += 1
+        cursor = window.next_cursor
+        if cursor is None:
+            return records, pages
+
+
+def test_cursor_round_trip_visits_every_record_once():
+    data = make_records(30)
+    records, pages = collect_pages(data, page_size=7)
+    assert records == data
+    assert pages == 5
+
+
+def test_cursor_round_trip_with_filter_and_projection():
+    data = make_records(30)
+    records, _ = collect_pages(data, page_size=4, predicates=[lambda r: r['participant_code'] == 'P1'],
+                               fields=['record_id'])
+    assert records == [{'record_id': str(i)} for i in range(1, 30, 4)]
+
+
+def test_exact_multiple_of_page_size_has_no_empty_last_page():
+    data = make_records(20)
+    window = RecordWindow(data, page_size=10, cursor=RecordWindow(data, page_size=10).next_cursor)
+    assert len(list(window.records())) == 10
+    assert window.next_cursor is None
+
+
+def test_cursor_encodes_snapshot_version_and_offset():
+    data = make_records(10)
+    window = RecordWindow(data, page_size=3)
+    assert decode_cursor(window.next_cursor, data) == 3
+    assert decode_cursor(None, data) == 0
+
+
+def test_cursor_from_previous_snapshot_is_rejected():
+    data = make_records(10)
+    cursor = RecordWindow(data, page_size=3).next_cursor
+    with pytest.raises(CursorError):
+        RecordWindow(list(data), cursor=cursor, page_size=3)
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '!!!'])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(CursorError):
+        RecordWindow(make_records(5), cursor=cursor)
+
+
+def test_out_of_range_offset_is_rejected():
+    data = make_records(5)
+    with pytest.raises(CursorError):
+        decode_cursor(encode_cursor(snapshot_version(data), 6), data)
+
+
+def test_iter_json_is_valid_json():
+    data = make_records(5)
+    window = RecordWindow(data, page_size=2)
+    payload = json.loads(''.join(window.iter_json(json.dumps)))
+    assert payload['records'] == data[:2]
+    assert payload['count'] == 2
+    assert payload['next_cursor'] == window.next_cursor
+
+
+def test_parse_page_size():
+    assert parse_page_size(None) == 100
+    assert parse_page_size('all') is None
+    assert parse_page_size('5000') == 1000
+    with pytest.raises(ValueError):
+        parse_page_size('-1')
@@ -0,0 +1,72 @@
+"""OLS e GLM por IRLS (regression) contra valores de referência do scipy
+
+Coeficientes de referência obtidos por máxima verosimilhança com
+scipy.optimize e scipy.stats.linregress sobre os mesmos dados
+"""
+import numpy as np
+import pytest
+
+from config import Config
+from regression import design_matrix, irls, ols
+
+x = np.array([0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5, 6.0])
+COUNTS = np.array([0, 1, 1, 2, 1, 3, 2, 4, 5, 4, 7, 8])
+BINARY = np.array([0, 0, 1, 0, 0, 1, 0, 1, 1, 1, 0, 1])
+X = np.column_stack([np.ones_like(x), x])
+
+
+def test_ols_matches_linregress():
+    fit = ols(X, COUNTS)
+    np.testing.assert_allclose(fit.coef, [-1.060606060606061, 1.3006993006993008], rtol=1e-9)
+    np.testing.assert_allclose(fit.se, [0.5898172927216777, 0.16028077797362306], rtol=1e-9)
+    assert fit.p_values[1] == pytest.approx(1.0387474966167326e-05, rel=1e-6)
+    assert fit.fit_stats['r_squared'] == pytest.approx(0.8681701074045574, rel=1e-9)
+
+
+def test_poisson_irls():
+    fit = irls(X, COUNTS, family='poisson')
+    assert fit.converged
+    np.testing.assert_allclose(fit.coef, [-0.6432440921876957, 0.4608363661844577], rtol=1e-6)
+    np.testing.assert_allclose(fit.se, [0.5257488566116426, 0.11178618159747052], rtol=1e-5)
+    np.testing.assert_allclose(fit.p_values, [0.22114782103837283, 3.748141683244223e-05], rtol=1e-4)
+
+
+def test_logistic_irls():
+    fit = irls(X, BINARY, family='logistic')
+    assert fit.converged
+    np.testing.assert_allclose(fit.coef, [-1.861152234926593, 0.5726622174878319], rtol=1e-6)
+    np.testing.assert_allclose(fit.se, [1.4680486414521383, 0.4063379322116283], rtol=1e-5)
+    np.testing.assert_allclose(fit.p_values, [0.20487907439967346, 0.15873908162240835], rtol=1e-4)
+
+
+def test_batched_fit_matches_single_fits():
+    batched = irls(X, np.column_stack([COUNTS, COUNTS[::-1]]), family='poisson')
+    for j, y in enumerate([COUNTS, COUNTS[::-1]]):
+        np.testing.assert_allclose(batched[j].coef, irls(X, y, family='poisson').coef, rtol=1e-8)
+
+
+def test_unknown_family():
+    with pytest.raises(ValueError):
+        irls(X, COUNTS, family='gamma')
+
+
+def test_rare_levels_are_excluded_not_coded_as_reference():
+    design = design_matrix(categorical={'x': ['a', 'b', 'a', None, 'c', 'c', 'a']})
+    assert design.rows.tolist() == [0, 2, 4, 5, 6]
+    assert design.names == ['intercept', 'x[c]']
+    assert design.levels['x'] == {'reference': 'a', 'levels': ['c'], 'excluded': ['b']}
+    assert design.X[:, 1].tolist() == [0, 0, 1, 1, 0]
+
+
+def test_excluding_rows_can_make_another_level_rare():
+    design = design_matrix(categorical={'x': ['a', 'a', 'a', 'b', 'b'], 'y': ['u', 'u', 'v', 'v', 'w']})
+    # 'w' é rara; sem essa linha 'b' fica só com uma observação e, sem a de 'b', 'v' também
+    assert design.levels['x']['excluded'] == ['b']
+    assert design.levels['y']['excluded'] == ['v', 'w']
+    assert design.rows.tolist() == [0, 1]
+
+
+def test_significance_uses_configured_level(monkeypatch):
+    fit = irls(X, BINARY, family='logistic')
+    monkeypatch.setattr(Config, 'SIGNIFICANCE_LEVEL', 0.2)
+    assert [c['significant'] for c in fit.coefficients()] == [False, True]
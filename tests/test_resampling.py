@@ -0,0 +1,85 @@
+"""Bootstrap e testes de permutação (resampling)"""
+import math
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import resampling
+from resampling import (bootstrap_difference_ci, bootstrap_indices, bootstrap_mean_ci, partition_indices,
+                        permutation_f_test, permutation_test)
+
+A = [5.1, 4.9, 6.2, 5.8, 6.0]
+B = [4.2, 4.8, 5.0, 4.4, 4.1, 4.6]
+
+
+def brute_force_p_value(a, b):
+    """Proporção das partições com |diferença de médias| >= a observada"""
+    pooled = np.array(a + b)
+    observed = abs(np.mean(a) - np.mean(b))
+    extreme = total = 0
+    for chosen in combinations(range(len(pooled)), len(a)):
+        mask = np.zeros(len(pooled), dtype=bool)
+        mask[list(chosen)] = True
+        extreme += abs(pooled[mask].mean() - pooled[~mask].mean()) >= observed - 1e-12
+        total += 1
+    return extreme / total
+
+
+def test_exact_permutation_test_enumerates_all_partitions():
+    # Bilateral pela diferença absoluta (o scipy duplica a menor cauda: 4/462 aqui)
+    result = permutation_test(A, B)
+    assert result['exact'] is True
+    assert result['resamples'] == math.comb(11, 5)
+    assert result['p_value'] == pytest.approx(brute_force_p_value(A, B), abs=1e-6)
+    assert result['p_value'] == pytest.approx(2 / 462, abs=1e-6)
+    assert result['significant'] is True
+    assert permutation_test(A[:3], B[:3])['p_value'] == pytest.approx(brute_force_p_value(A[:3], B[:3]), abs=1e-6)
+
+
+def test_random_permutation_test_is_reproducible():
+    first = permutation_test(A, B, n_resamples=100)
+    assert first['exact'] is False
+    assert first == permutation_test(A, B, n_resamples=100)
+    # Valor-p (extremas + 1) / (permutações + 1): nunca zero
+    assert 0 < first['p_value'] <= 1
+
+
+def test_permutation_test_needs_both_groups():
+    assert permutation_test(A, [np.nan])['p_value'] is None
+
+
+def test_partition_indices():
+    partitions = partition_indices(5, 2)
+    assert partitions.shape == (10, 2)
+    assert len({tuple(row) for row in partitions}) == 10
+
+
+def test_bootstrap_indices_are_chunked_and_in_range(monkeypatch):
+    monkeypatch.setattr(resampling, 'MAX_CHUNK_ELEMENTS', 50)
+    chunks = list(bootstrap_indices(10, 23))
+    assert [len(chunk) for chunk in chunks] == [5, 5, 5, 5, 3]
+    assert all(chunk.min() >= 0 and chunk.max() < 10 for chunk in chunks)
+
+
+def test_bootstrap_intervals_contain_the_estimate():
+    mean = bootstrap_mean_ci(A + [np.nan])
+    assert mean['n'] == 5
+    assert mean['lower'] <= mean['mean'] <= mean['upper']
+
+    difference = bootstrap_difference_ci(A, B)
+    assert difference['difference'] == pytest.approx(np.mean(A) - np.mean(B), abs=0.01)
+    assert 0 < difference['lower'] <= difference['difference'] <= difference['upper']
+    assert difference == bootstrap_difference_ci(A, B)
+
+
+def test_permutation_f_test():
+    values = np.array(A + B + [6.5, 7.1, 6.8, 7.4])
+    labels = np.array([0] * 5 + [1] * 6 + [2] * 4)
+    result = permutation_f_test(values, labels, n_resamples=500)
+    assert result['significant'] is True
+    assert result['p_value'] == pytest.approx(1 / 501, abs=1e-6)
+
+    same = permutation_f_test(np.tile([1.0, 2.0, 3.0], 4), np.repeat([0, 1, 2, 3], 3), n_resamples=200)
+    assert same['significant'] is False
+    assert permutation_f_test(values, np.zeros(len(values), dtype=int))['p_value'] is None
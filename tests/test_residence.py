@@ -0,0 +1,50 @@
+"""Comparação residentes vs não-residentes: teste principal de cada variável"""
+import residence
+from config import Config
+from residence import ResidenceComparison
+
+
+def make_records():
+    records = []
+    for i in range(10):
+        group = 'A' if i < 5 else 'B'
+        code = f'P{i}'
+        records.append({'participant_code': code, 'redcap_repeat_instrument': '', 'participant_group': group,
+                        'birth_year': str(1935 + i), 'sex': '1' if i % 2 else '2'})
+        for visit in range(2):
+            records.append({'participant_code': code, 'redcap_repeat_instrument': 'estado_saude',
+                            'pain_today': str(1 + (i + visit) % 3 + (2 if group == 'B' else 0))})
+    return records
+
+
+def test_permutation_decides_significance_in_small_cohorts():
+    comparison = ResidenceComparison(make_records()).numeric_comparison(['pain_today', 'age'])
+    for result in comparison.values():
+        assert result['primary_test'] == 'permutation'
+        assert result['significant'] == result['permutation']['significant']
+
+
+def test_welch_decides_significance_without_resampling(monkeypatch):
+    monkeypatch.setattr(Config, 'RESAMPLING_MAX_PARTICIPANTS', 0)
+    comparison = ResidenceComparison(make_records()).numeric_comparison(['pain_today', 'age'])
+    for result in comparison.values():
+        assert result['permutation'] is None
+        assert result['primary_test'] == 'welch_t'
+        assert result['significant'] == result['welch_t']['significant']
+    # O Mann-Whitney U continua a ser reportado, mas não decide
+    assert 'p_value' in comparison['pain_today']['mann_whitney']
+
+
+def test_mann_whitney_alone_is_not_significant(monkeypatch):
+    def fake_welch(a, b):
+        return {'n_a': [5], 'n_b': [5], 'mean_a': [1.0], 'mean_b': [2.0], 'difference': [-1.0], 't': [-1.5],
+                'df': [8.0], 'p_value': [0.2], 'significant': [False], 'hedges_g': [-0.9]}
+
+    def fake_mann_whitney(a, b):
+        return {'u': [2.0], 'z': [-2.1], 'p_value': [0.03], 'significant': [True], 'rank_biserial': [-0.8]}
+
+    monkeypatch.setattr(Config, 'RESAMPLING_MAX_PARTICIPANTS', 0)
+    monkeypatch.setattr(residence, 'welch_t_test', fake_welch)
+    monkeypatch.setattr(residence, 'mann_whitney_u', fake_mann_whitney)
+    result = ResidenceComparison(make_records()).numeric_comparison(['pain_today'])['pain_today']
+    assert result['significant'] is False
@@ -0,0 +1,51 @@
+"""Camada de serialização JSON: mesma saída com orjson e com a biblioteca standard"""
+import datetime
+import json
+
+import numpy as np
+import pytest
+
+import serialization
+
+PAYLOAD = {
+    'nan': float('nan'),
+    'inf': [1.5, float('inf'), -float('inf')],
+    'array': np.array([1.0, np.nan]),
+    'scalar': np.float64('nan'),
+    'integer': np.int64(3),
+    'tuple': (1, 2.5),
+    'date': datetime.date(2025, 1, 31),
+    'nested': {'values': [{'x': float('nan')}]}
+}
+EXPECTED = {
+    'nan': None,
+    'inf': [1.5, None, None],
+    'array': [1.0, None],
+    'scalar': None,
+    'integer': 3,
+    'tuple': [1, 2.5],
+    'date': '2025-01-31',
+    'nested': {'values': [{'x': None}]}
+}
+
+
+@pytest.fixture
+def stdlib_backend(monkeypatch):
+    monkeypatch.setattr(serialization, 'orjson', None)
+
+
+def test_stdlib_backend_writes_valid_json(stdlib_backend):
+    text = serialization.dumps(PAYLOAD)
+    assert 'NaN' not in text and 'Infinity' not in text
+    assert json.loads(text) == EXPECTED
+
+
+@pytest.mark.skipif(serialization.orjson is None, reason='orjson não instalado')
+def test_backends_agree(monkeypatch):
+    fast = json.loads(serialization.dumps(PAYLOAD))
+    monkeypatch.setattr(serialization, 'orjson', None)
+    assert json.loads(serialization.dumps(PAYLOAD)) == fast == EXPECTED
+
+
+def test_large_integers_fall_back_to_stdlib():
+    assert json.loads(serialization.dumps({'big': 2 ** 70, 'nan': float('nan')})) == {'big': 2 ** 70, 'nan': None}
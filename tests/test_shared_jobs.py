@@ -0,0 +1,85 @@
+"""Estado de tarefas partilhado entre workers (jobs.SharedJobStore)
+
+Dois JobManager com o mesmo diretório fazem de dois workers prefork: só
+o diretório é partilhado, como entre processos
+"""
+import json
+import threading
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture
+def workers(tmp_path):
+    owner = jobs.JobManager(max_workers=1, retention=60, store=jobs.SharedJobStore(str(tmp_path)))
+    other = jobs.JobManager(max_workers=1, retention=60, store=jobs.SharedJobStore(str(tmp_path)))
+    yield owner, other
+    owner.shutdown()
+    other.shutdown()
+
+
+def test_other_worker_sees_state_and_result(workers):
+    owner, other = workers
+    job = owner.submit('secção', lambda job: {'html': '<p>ok</p>'})
+    assert job.wait(5)
+
+    shared = other.get(job.id)
+    assert isinstance(shared, jobs.SharedJob)
+    assert shared.status == jobs.DONE
+    assert shared.to_dict()['result'] == {'html': '<p>ok</p>'}
+    assert 'result' not in shared.to_dict(include_result=False)
+    assert [j.id for j in other.list()] == [job.id]
+
+
+def test_cancel_from_other_worker(workers):
+    owner, other = workers
+    started, release = threading.Event(), threading.Event()
+
+    def task(job):
+        started.set()
+        release.wait(5)
+        job.check_cancelled()
+        return 'não devia terminar'
+
+    job = owner.submit('longa', task)
+    assert started.wait(5)
+    assert other.cancel(job.id) is not None
+    release.set()
+    assert job.wait(5)
+    assert job.status == jobs.CANCELLED
+    assert other.get(job.id).status == jobs.CANCELLED
+
+
+def test_events_from_other_worker(workers, monkeypatch):
+    monkeypatch.setattr(jobs, 'SHARED_POLL_INTERVAL', 0.01)
+    owner, other = workers
+    release = threading.Event()
+
+    def task(job):
+        release.wait(5)
+        return 1
+
+    job = owner.submit('tarefa', task)
+    events = other.events(other.get(job.id), heartbeat=5)
+    assert next(events)['status'] in (jobs.QUEUED, jobs.RUNNING)
+    release.set()
+    assert [info for info in events if info is not None][-1]['status'] == jobs.DONE
+
+
+def test_job_of_dead_worker_is_reported_failed(tmp_path):
+    store = jobs.SharedJobStore(str(tmp_path))
+    job_id = 'a' * 32
+    (tmp_path / f'{job_id}.json').write_text(json.dumps({
+        'job_id': job_id, 'name': 'órfã', 'status': jobs.RUNNING, 'created_at': 1.0,
+        'finished_at': None, 'revision': 3, 'pid': 2 ** 22 + 1
+    }))
+    job = store.load(job_id)
+    assert job.status == jobs.FAILED
+    assert 'pid' not in job.to_dict()
+
+
+@pytest.mark.parametrize('job_id', ['../etc/passwd', 'A' * 32, ''])
+def test_invalid_job_ids_are_not_read(tmp_path, job_id):
+    assert jobs.SharedJobStore(str(tmp_path)).load(job_id) is None
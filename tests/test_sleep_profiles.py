@@ -0,0 +1,88 @@
+"""Perfis de sono por k-means dos componentes PSQI (sleep_profiles)"""
+import numpy as np
+import pytest
+
+import psqi
+from psqi import COMPONENT_KEYS
+from sleep_profiles import SleepProfiles, profile_name
+
+GOOD = {
+    'sleep_quality': '0', 'time_to_sleep': '10', 'trouble_falling_asleep': '0', 'sleep_hours': '8',
+    'bedtime': '23:00', 'wake_up_time': '07:00', 'sleep_medication_use': '0',
+    'trouble_staying_awake': '0', 'lack_of_enthusiasm': '0',
+    **{field: '0' for field in psqi.DISTURBANCE_FIELDS}
+}
+INSOMNIA = {
+    'sleep_quality': '3', 'time_to_sleep': '70', 'trouble_falling_asleep': '3', 'sleep_hours': '4',
+    'bedtime': '22:00', 'wake_up_time': '08:00', 'sleep_medication_use': '0',
+    'trouble_staying_awake': '1', 'lack_of_enthusiasm': '1',
+    **{field: '3' for field in psqi.DISTURBANCE_FIELDS}
+}
+
+
+def psqi_record(participant, answers):
+    return {
+        'participant_code': participant,
+        'redcap_repeat_instrument': psqi.INSTRUMENT,
+        'redcap_repeat_instance': '1',
+        'questionnaire_date_7': '2025-01-10',
+        **answers
+    }
+
+
+def center(**components):
+    values = np.zeros(len(COMPONENT_KEYS))
+    for key, value in components.items():
+        values[COMPONENT_KEYS.index(key)] = value
+    return values
+
+
+@pytest.mark.parametrize('components, expected', [
+    ({}, 'Bom Dormidor'),
+    ({'sleep_quality': 1, 'sleep_latency': 1, 'sleep_duration': 1, 'daytime_dysfunction': 1}, 'Bom Dormidor'),
+    ({'sleep_medication': 3, 'sleep_latency': 2, 'sleep_quality': 1}, 'Dependente de Medicação'),
+    ({'sleep_medication': 2, 'sleep_latency': 3, 'sleep_quality': 1}, 'Insone'),
+    ({key: 1 for key in COMPONENT_KEYS}, 'Sono Moderado'),
+])
+def test_profile_name(components, expected):
+    assert profile_name(center(**components)) == expected
+
+
+def test_clusters_good_sleepers_and_insomniacs():
+    records = [psqi_record(f'G{i}', GOOD) for i in range(3)] + [psqi_record(f'I{i}', INSOMNIA) for i in range(3)]
+    profiles = SleepProfiles(records)
+    result = profiles.analysis()
+    assert result['clustering']['k'] == 2
+    assert result['profile_distribution'] == {'Bom Dormidor': 3, 'Insone': 3}
+    assert {code: profile['profile'] for code, profile in result['participant_profiles'].items()} == {
+        **{f'G{i}': 'Bom Dormidor' for i in range(3)}, **{f'I{i}': 'Insone' for i in range(3)}
+    }
+    assert result['clustering']['silhouette'] == pytest.approx(1.0)
+
+
+def test_same_records_give_same_profiles():
+    records = [psqi_record(f'G{i}', GOOD) for i in range(4)] + [psqi_record(f'I{i}', INSOMNIA) for i in range(4)]
+    first, second = SleepProfiles(records), SleepProfiles(records)
+    assert np.array_equal(first.labels, second.labels)
+    assert first.analysis() == second.analysis()
+
+
+@pytest.mark.parametrize('records', [
+    [psqi_record('G0', GOOD)],
+    [psqi_record(f'G{i}', GOOD) for i in range(3)],
+])
+def test_single_profile_without_valid_k(records):
+    # Um só participante ou todos iguais: choose_k não devolve resultado
+    profiles = SleepProfiles(records)
+    assert profiles.result is None
+    assert profiles.labels.tolist() == [0] * len(records)
+    result = profiles.analysis()
+    assert result['clustering']['k'] == 1
+    assert result['clustering']['silhouette'] is None
+    assert result['profile_distribution'] == {'Bom Dormidor': len(records)}
+
+
+def test_no_psqi_records():
+    result = SleepProfiles([{'participant_code': 'P1'}]).analysis()
+    assert result['total_participants'] == 0
+    assert result['profile_distribution'] == {}
@@ -0,0 +1,133 @@
+"""
+Cubo de utilização de serviços de saúde: participante × serviço × período
+- Construído uma vez por snapshot (groupby/unstack do pandas) a partir das
+  instâncias do questionário de utilização de serviços e eventos
+- Período 'baseline' = primeira instância de cada participante;
+  'monitoring' = instâncias seguintes (durante o monitoramento remoto)
+- Guarda somas e número de respostas por célula, pelo que médias por
+  período, totais e contagens de participantes são fatias baratas do cubo
+"""
+import numpy as np
+import pandas as pd
+
+import snapshot_cache
+from columns import map_column, object_column, to_number
+
+INSTRUMENT = 'utilizacao_servicos_saude_eventos'
+
+# Serviços de saúde (contagens no último ano) e eventos do mesmo questionário
+SERVICES = {
+    'scheduled_medical_visits': 'Consultas Médicas Programadas',
+    'unscheduled_medical_visits': 'Consultas Médicas Não Programadas',
+    'emergency_visits': 'Idas ao Serviço de Urgência',
+    'hospitalizations': 'Internamentos Hospitalares'
+}
+EVENTS = {
+    'falls': 'Quedas'
+}
+PERIODS = ('baseline', 'monitoring')
+
+
+def count_value(value):
+    """Contagem de utilizações (NaN se vazia, inválida ou negativa)"""
+    number = to_number(value)
+    return number if number >= 0 else np.nan
+
+
+class UtilizationCube:
+    """Somas e número de respostas por participante × campo × período"""
+
+    def __init__(self, records):
+        self.fields = list(SERVICES) + list(EVENTS)
+        self.names = {**SERVICES, **EVENTS}
+        self.periods = list(PERIODS)
+
+        counts = np.column_stack([map_column(records, field, count_value) for field in self.fields])
+        participants = object_column(records, 'participant_code')
+        # Instâncias com pelo menos uma contagem registada
+        answered = ~np.isnan(counts).all(axis=1) & participants.astype(bool)
+
+        frame = pd.DataFrame(counts[answered], columns=self.fields)
+        frame['participant'] = participants[answered]
+        frame['instance'] = map_column(records, 'redcap_repeat_instance', to_number)[answered]
+        first = frame.groupby('participant', sort=False)['instance'].transform('min')
+        frame['period'] = np.where(frame['instance'].fillna(0) <= first.fillna(0), 'baseline', 'monitoring')
+        self.frame = frame
+
+        grouped = frame.groupby(['participant', 'period'], sort=False)
+        sums = grouped[self.fields].sum(min_count=1).unstack('period')
+        answers = grouped[self.fields].count().unstack('period')
+        instances = grouped.size().unstack('period')
+
+        self.participants = frame['participant'].drop_duplicates().tolist()
+        columns = pd.MultiIndex.from_product([self.fields, self.periods])
+        shape = (len(self.participants), len(self.fields), len(self.periods))
+        self.sums = np.nan_to_num(
+            sums.reindex(index=self.participants, columns=columns).to_numpy(dtype=float), nan=0.0
+        ).reshape(shape)
+        self.answers = answers.reindex(index=self.participants, columns=columns).fillna(0) \
+            .to_numpy(dtype=float).reshape(shape)
+        self.instances = instances.reindex(index=self.participants, columns=self.periods).fillna(0) \
+            .to_numpy(dtype=int)
+
+    def _field_indices(self, fields):
+        return [self.fields.index(field) for field in (fields or list(SERVICES))]
+
+    def _period_indices(self, period):
+        return list(range(len(self.periods))) if period is None else [self.periods.index(period)]
+
+    def means(self, fields=None, period=None):
+        """Matriz participante × campo com a média anual (NaN se sem respostas)"""
+        f, t = self._field_indices(fields), self._period_indices(period)
+        sums = self.sums[:, f][:, :, t].sum(axis=2)
+        answers = self.answers[:, f][:, :, t].sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / answers
+
+    def matrix(self, fields=None, period=None):
+        """(participantes, matriz participante × campo) dos participantes com respostas
+
+        Um campo sem resposta num participante com outras respostas conta como 0
+        """
+        means = self.means(fields, period)
+        keep = ~np.isnan(means).all(axis=1)
+        return [p for p, k in zip(self.participants, keep) if k], np.nan_to_num(means[keep], nan=0.0)
+
+    def services_used(self, period=None):
+        """Número de serviços de saúde utilizados (média anual > 0) por participante"""
+        return (np.nan_to_num(self.means(list(SERVICES), period)) > 0).sum(axis=1)
+
+    def field_summary(self, field):
+        """Participantes que utilizaram o serviço e distribuição das respostas (> 0)"""
+        j = self.fields.index(field)
+        means = self.means([field])[:, 0]
+        values = self.frame[field].dropna()
+        distribution = values[values > 0].value_counts().sort_index()
+        return {
+            'name': self.names[field],
+            'participants_using': int((means > 0).sum()),
+            'participants_answered': int((~np.isnan(means)).sum()),
+            'total_count': int(self.sums[:, j].sum()),
+            'average_per_participant': round(float(np.nanmean(means)), 2) if (~np.isnan(means)).any() else 0,
+            'frequency_distribution': {f"{value:g}": int(count) for value, count in distribution.items()}
+        }
+
+    def paired_period_means(self, fields=None):
+        """{campo: média baseline, média monitoring, n} nos participantes com os dois períodos"""
+        fields = fields or list(SERVICES)
+        baseline = self.means(fields, 'baseline')
+        monitoring = self.means(fields, 'monitoring')
+        result = {}
+        for j, field in enumerate(fields):
+            paired = ~np.isnan(baseline[:, j]) & ~np.isnan(monitoring[:, j])
+            result[field] = {
+                'baseline': round(float(baseline[paired, j].mean()), 2) if paired.any() else 0,
+                'monitoring': round(float(monitoring[paired, j].mean()), 2) if paired.any() else 0,
+                'participants': int(paired.sum())
+            }
+        return result
+
+
+def get_utilization_cube(records):
+    """UtilizationCube do snapshot (construído uma vez por lista de registos)"""
+    return snapshot_cache.get_cached(records, ('utilization_cube',), lambda: UtilizationCube(records))
@@ -0,0 +1,179 @@
+"""
+Preditores de utilização de serviços de saúde (modelos de regressão)
+- Uma linha por participante: utilização anual média por serviço (fatia do
+  cubo de utilização) e covariáveis do registo baseline (idade, sexo,
+  escolaridade, estado civil, grupo)
+- Modelos univariáveis (um por preditor) e multivariável (todos os preditores,
+  se houver graus de liberdade suficientes), cada um ajustado em lote para
+  todos os resultados: OLS e Poisson (contagens) e logístico (alto utilizador)
+- Calculado uma vez por snapshot
+"""
+from datetime import datetime
+
+import numpy as np
+
+import snapshot_cache
+from columns import baseline_values, to_number
+from regression import design_matrix, irls, ols
+from utilization_cube import SERVICES as SERVICE_NAMES, get_utilization_cube
+
+SERVICES = list(SERVICE_NAMES)
+TOTAL = 'total_services'
+
+# Campo de origem, tipo, categoria e nome de cada preditor
+PREDICTORS = {
+    'age': ('birth_year', 'numeric', 'demographic', 'Idade'),
+    'sex': ('sex', 'categorical', 'demographic', 'Sexo'),
+    'education_level': ('education_level', 'categorical', 'demographic', 'Nível de Educação'),
+    'marital_status': ('marital_status', 'categorical', 'demographic', 'Estado Civil'),
+    'group': ('participant_group', 'categorical', 'clinical', 'Grupo de Participantes')
+}
+
+# Graus de liberdade residuais mínimos para ajustar um modelo
+MIN_RESIDUAL_DF = 3
+
+
+def is_high_utilizer(counts):
+    """Alto utilizador: usa 2 ou mais tipos de serviço ou 3 ou mais utilizações por ano"""
+    return ((counts > 0).sum(axis=1) >= 2) | (counts.sum(axis=1) >= 3)
+
+
+def _fit_models(design, counts, high):
+    """OLS e Poisson (em lote sobre as contagens) e logístico na matriz de desenho"""
+    if design.n - design.p < MIN_RESIDUAL_DF or design.p < 2:
+        return None
+    rows = design.rows
+    names = design.names
+    ols_fits = ols(design.X, counts[rows], names)
+    poisson_fits = irls(design.X, counts[rows], 'poisson', names)
+    outcomes = SERVICES + [TOTAL]
+    models = {
+        'n': design.n,
+        'terms': names,
+        'levels': design.levels,
+        'ols': {outcome: fit.to_dict() for outcome, fit in zip(outcomes, ols_fits)},
+        'poisson': {outcome: fit.to_dict() for outcome, fit in zip(outcomes, poisson_fits)}
+    }
+    y = high[rows]
+    # Logístico só é estimável se houver as duas classes
+    if 0 < y.sum() < len(y):
+        models['logistic'] = {'high_utilizer': irls(design.X, y, 'logistic', names).to_dict()}
+    return models
+
+
+class UtilizationPredictors:
+    """Matriz participante × preditor e modelos de regressão da utilização"""
+
+    def __init__(self, records):
+        self.participants, counts = get_utilization_cube(records).matrix(SERVICES)
+        # Última coluna: total de utilizações por ano
+        self.counts = np.column_stack([counts, counts.sum(axis=1)]) if len(counts) else np.empty((0, len(SERVICES) + 1))
+        self.high = is_high_utilizer(counts).astype(float) if len(counts) else np.empty(0)
+
+        current_year = datetime.now().year
+        self.numeric, self.categorical = {}, {}
+        for predictor, (field, kind, _, _) in PREDICTORS.items():
+            values = baseline_values(records, field)
+            column = [values.get(p) for p in self.participants]
+            if kind == 'numeric':
+                years = np.array([to_number(v) if v is not None else np.nan for v in column])
+                ages = current_year - years
+                # Anos de nascimento fora do intervalo plausível contam como em falta
+                self.numeric[predictor] = np.where((ages >= 0) & (ages <= 120), ages, np.nan)
+            else:
+                self.categorical[predictor] = np.array(column, dtype=object)
+
+        self.univariable = {}
+        for predictor, (_, kind, _, _) in PREDICTORS.items():
+            if kind == 'numeric':
+                design = design_matrix(numeric={predictor: self.numeric[predictor]})
+            else:
+                design = design_matrix(categorical={predictor: self.categorical[predictor]})
+            self.univariable[predictor] = (design, _fit_models(design, self.counts, self.high))
+
+        self.multivariable_design = design_matrix(self.numeric, self.categorical)
+        self.multivariable = _fit_models(self.multivariable_design, self.counts, self.high)
+
+    def predictor_strength(self):
+        """Força preditiva de cada preditor (modelos univariáveis do total de utilizações)"""
+        strength = {}
+        for predictor, (design, models) in self.univariable.items():
+            _, _, category, name = PREDICTORS[predictor]
+            entry = {'name': name, 'category': category, 'data_points': design.n, 'estimable': models is not None}
+            if models is not None:
+                total_ols = models['ols'][TOTAL]
+                total_poisson = models['poisson'][TOTAL]
+                terms = [c for c in total_poisson['coefficients'] if c['term'] != 'intercept']
+                p_values = [c['p_value'] for c in terms if c['p_value'] is not None]
+                entry.update({
+                    'r_squared': total_ols.get('r_squared'),
+                    'pseudo_r_squared': total_poisson.get('pseudo_r_squared'),
+                    'min_p_value': min(p_values) if p_values else None,
+                    'significant': any(c['significant'] for c in terms)
+                })
+            strength[predictor] = entry
+        return strength
+
+    def analysis(self):
+        """Resultado no formato usado pela página de utilização de serviços"""
+        n = len(self.participants)
+        high_utilizers = [str(p) for p, high in zip(self.participants, self.high) if high]
+        strength = self.predictor_strength()
+
+        predictor_analysis = {}
+        for predictor, entry in strength.items():
+            if not entry['data_points']:
+                continue
+            category = predictor_analysis.setdefault(entry['category'], {
+                'available_predictors': 0,
+                'data_quality': 'real_data_analysis',
+                'predictors': {}
+            })
+            category['available_predictors'] += 1
+            category['predictors'][predictor] = {
+                **entry,
+                'coverage_rate': round(entry['data_points'] / n * 100, 1) if n else 0
+            }
+
+        multivariable = self.multivariable or {
+            'message': f"Dados insuficientes para o modelo multivariável "
+                       f"({self.multivariable_design.n} participantes, {self.multivariable_design.p} termos)"
+        }
+        available = [p for p, entry in strength.items() if entry['data_points']]
+        return {
+            'predictor_analysis': predictor_analysis,
+            'predictor_strength': strength,
+            'models': {
+                'univariable': {predictor: models for predictor, (_, models) in self.univariable.items()
+                                if models is not None},
+                'multivariable': multivariable
+            },
+            'utilization_analysis': {
+                'total_participants': n,
+                'participants_with_utilization_data': n,
+                'high_utilizers_count': len(high_utilizers),
+                'high_utilization_rate': round(len(high_utilizers) / n * 100, 1) if n else 0,
+                'average_services_per_participant': round(float((self.counts[:, :-1] > 0).sum(axis=1).mean()), 1) if n else 0,
+                'average_annual_utilizations': round(float(self.counts[:, -1].mean()), 2) if n else 0
+            },
+            'high_utilizers': high_utilizers[:10],
+            'data_summary': {
+                'analysis_type': 'real_data_only',
+                'simulation_used': False,
+                'available_data_fields': available,
+                'missing_data_fields': [p for p in PREDICTORS if p not in available],
+                'service_fields_analyzed': SERVICES
+            },
+            'summary': {
+                'message': 'Modelos de regressão (OLS, Poisson e logístico) com dados reais do REDCap',
+                'participants_analyzed': n,
+                'participants_with_utilization': n,
+                'significant_predictors': [p for p, entry in strength.items() if entry.get('significant')],
+                'high_utilizer_identification': f"{len(high_utilizers)} participantes identificados"
+            }
+        }
+
+
+def get_utilization_predictors(records):
+    """UtilizationPredictors do snapshot (calculado uma vez por lista de registos)"""
+    return snapshot_cache.get_cached(records, ('utilization_predictors',), lambda: UtilizationPredictors(records))